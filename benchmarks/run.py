@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# benchmarks/run.py
+
+"""
+Run `geminiai bench backup` for every tree profile and save the results.
+
+    python benchmarks/run.py                        # all profiles -> benchmarks/results/
+    python benchmarks/run.py --profiles small,deep
+    python benchmarks/run.py --baseline-dir benchmarks/results-main
+
+With --baseline-dir, each profile is compared against <dir>/<profile>.json
+from an earlier run (e.g. on the main branch).
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from geminiai_cli.bench import PROFILES, PHASES, run_bench, print_report  # noqa: E402
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--profiles", default=",".join(PROFILES), help="Comma-separated profiles to run")
+    p.add_argument("--phases", default=",".join(PHASES), help="Comma-separated phases to run")
+    p.add_argument("--compression", help="Passed to backup")
+    p.add_argument("--out-dir", default=os.path.join(here, "results"), help="Where to write <profile>.json")
+    p.add_argument("--baseline-dir", help="Directory with <profile>.json from an earlier run")
+    args = p.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    options = {"compression": args.compression} if args.compression else {}
+    failed = False
+    for name in args.profiles.split(","):
+        profile = PROFILES[name]
+        print(f"\n=== {name} ===")
+        report = run_bench(profile["files"], profile["sizes"], profile["depth"],
+                           phases=tuple(args.phases.split(",")), options=options)
+        baseline = None
+        if args.baseline_dir and os.path.exists(os.path.join(args.baseline_dir, f"{name}.json")):
+            with open(os.path.join(args.baseline_dir, f"{name}.json"), "r", encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        print_report(report, baseline)
+        with open(os.path.join(args.out_dir, f"{name}.json"), "w", encoding="utf-8") as fh:
+            json.dump(report.to_dict(), fh, indent=2)
+        failed = failed or not all(ph.ok for ph in report.phases)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/archive.py
+
+"""
+archive.py - In-process streaming archive engine used by backup.
+
+Replaces `tar -czf` with a single pass over the source tree: every regular
+file is opened once and the same read feeds the tar stream, the compressor and
+a SHA-256 hasher.  The result is a normal compressed tar (members are stored as
+"./<path>" exactly like `tar -C src -czf archive .`) plus a Manifest of every
+file that went into it.  See compression.py for the available codecs.
+"""
+from __future__ import annotations
+import grp
+import os
+import pwd
+import shutil
+import stat
+import tarfile
+from typing import Callable, Dict, Iterator, Optional
+
+from .manifest import Manifest, FileEntry, HashingReader, TreeItem, CHUNK_SIZE, walk_tree
+from .compression import (BLOCK_SIZE, DEFAULT_CODEC, codec_from_magic, compressed_writer, decompressed_reader,
+                          detect_codec, seek_point)
+from .encryption import EncryptingWriter, DecryptingReader
+
+
+class _NameCache:
+    """uid/gid -> name lookups are surprisingly costly per file; do each id once."""
+
+    def __init__(self):
+        self._users: Dict[int, str] = {}
+        self._groups: Dict[int, str] = {}
+
+    def user(self, uid: int) -> str:
+        if uid not in self._users:
+            try:
+                self._users[uid] = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                self._users[uid] = ""
+        return self._users[uid]
+
+    def group(self, gid: int) -> str:
+        if gid not in self._groups:
+            try:
+                self._groups[gid] = grp.getgrgid(gid).gr_name
+            except KeyError:
+                self._groups[gid] = ""
+        return self._groups[gid]
+
+
+def _make_tarinfo(item: TreeItem, names: _NameCache) -> Optional[tarfile.TarInfo]:
+    """Build a TarInfo from the stat we already have instead of re-stat'ing via gettarinfo."""
+    st = item.st
+    info = tarfile.TarInfo(f"./{item.path}")
+    info.mode = st.st_mode & 0o7777
+    info.uid = st.st_uid
+    info.gid = st.st_gid
+    info.uname = names.user(st.st_uid)
+    info.gname = names.group(st.st_gid)
+    info.mtime = int(st.st_mtime)
+
+    if item.is_file:
+        info.type = tarfile.REGTYPE
+        info.size = st.st_size
+    elif item.is_dir:
+        info.type = tarfile.DIRTYPE
+    elif item.is_symlink:
+        info.type = tarfile.SYMTYPE
+        info.linkname = os.readlink(item.full_path)
+    else:
+        # Sockets, fifos and devices have no place in a config backup
+        return None
+    return info
+
+
+def write_tar_stream(src: str, fileobj, parent: Optional[Manifest] = None, exclude=None) -> Manifest:
+    """
+    Stream a tar of src into the (already compressing) binary fileobj.
+    Returns the manifest of regular files, built from the same reads.
+
+    With a parent manifest the archive is incremental: directories and symlinks
+    are always stored, but regular files whose (size, mtime) match the parent
+    are skipped and their parent entry is carried into the new manifest. The
+    paths actually stored are listed in manifest.meta["archived"], and the
+    directories/symlinks in manifest.meta["others"].
+
+    exclude (an exclude.ExcludeMatcher) leaves matching paths out entirely;
+    its patterns are recorded in manifest.meta["excludes"].
+
+    The offset of every stored member in the uncompressed stream goes to
+    manifest.meta["index"]["members"], for selective restores (see
+    extract_members), and the symlinks among them to ["symlinks"].
+    """
+    manifest = Manifest()
+    names = _NameCache()
+    archived = []
+    others = []
+    offsets: Dict[str, int] = {}
+    symlinks = []
+
+    with tarfile.open(fileobj=fileobj, mode="w|", format=tarfile.GNU_FORMAT) as tar:
+        root_info = _make_tarinfo(TreeItem("", src, os.stat(src)), names)
+        root_info.name = "."
+        tar.addfile(root_info)
+
+        for item in walk_tree(src, exclude=exclude):
+            info = _make_tarinfo(item, names)
+            if info is None:
+                continue
+            if info.type != tarfile.REGTYPE:
+                offsets[item.path] = tar.offset
+                tar.addfile(info)
+                others.append(item.path)
+                if info.type == tarfile.SYMTYPE:
+                    symlinks.append(item.path)
+                continue
+
+            prev = parent.files.get(item.path) if parent else None
+            if prev and prev.size == item.st.st_size and prev.mtime_ns == item.st.st_mtime_ns:
+                manifest.add(item.path, prev)
+                continue
+
+            try:
+                fh = open(item.full_path, "rb")
+            except FileNotFoundError:
+                continue
+            with fh:
+                reader = HashingReader(fh)
+                offsets[item.path] = tar.offset
+                tar.addfile(info, reader)
+            manifest.add(item.path, FileEntry(
+                size=item.st.st_size,
+                mtime_ns=item.st.st_mtime_ns,
+                sha256=reader.hexdigest(),
+            ))
+            archived.append(item.path)
+
+    if parent is not None:
+        # Restoring a chain needs the full set of live paths to drop deleted ones
+        manifest.meta["archived"] = archived
+        manifest.meta["others"] = others
+    if exclude:
+        manifest.meta["excludes"] = list(exclude.patterns)
+    manifest.meta["index"] = {"members": offsets, "symlinks": symlinks}
+    return manifest
+
+
+def write_archive(src: str, raw, level: Optional[int] = None, parent: Optional[Manifest] = None,
+                  codec: str = DEFAULT_CODEC, threads: Optional[int] = None,
+                  passphrase: Optional[str] = None, exclude=None) -> Manifest:
+    """
+    Write the (compressed, optionally encrypted) archive of src into the binary
+    stream raw, which is left open, and return its manifest. raw can be any
+    writer, e.g. a file or a cloud provider's open_upload_stream().
+
+    The compressor's seek points complete the member index in
+    manifest.meta["index"]["blocks"], as [compressed offset (of the decrypted
+    stream), uncompressed offset] pairs.
+    """
+    sink = EncryptingWriter(raw, passphrase) if passphrase else raw
+    with compressed_writer(sink, codec, level=level, threads=threads) as out:
+        manifest = write_tar_stream(src, out, parent=parent, exclude=exclude)
+    if passphrase:
+        sink.close()
+    manifest.meta["index"]["blocks"] = [list(point) for point in out.seek_points]
+    return manifest
+
+
+def create_archive(src: str, archive_path: str, level: Optional[int] = None,
+                   parent: Optional[Manifest] = None, codec: str = DEFAULT_CODEC,
+                   threads: Optional[int] = None, passphrase: Optional[str] = None,
+                   exclude=None) -> Manifest:
+    """
+    Create a compressed tar of src at archive_path in one pass and return its
+    manifest. Pass the previous backup's manifest as parent for an incremental
+    archive. level defaults to the codec's default; threads to every core.
+    With a passphrase the compressed stream is encrypted on its way to disk.
+
+    The archive is written to a sibling .part file and renamed into place, so a
+    crashed backup never leaves a truncated archive that sync/restore would pick up.
+    """
+    tmp_path = f"{archive_path}.part"
+    try:
+        with open(tmp_path, "wb") as raw:
+            manifest = write_archive(src, raw, level=level, parent=parent, codec=codec,
+                                     threads=threads, passphrase=passphrase, exclude=exclude)
+        os.replace(tmp_path, archive_path)
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return manifest
+
+
+# extractall/extract policy: keep our own permissions but refuse absolute paths / escapes from dest
+_EXTRACT_FILTER = {"filter": "tar"} if hasattr(tarfile, "tar_filter") else {}
+
+
+def _member_path(dest: str, name: str) -> str:
+    """Relative posix path of a tar member ("" for the root), refusing anything outside dest."""
+    rel = os.path.normpath(name.replace(os.sep, "/")) if name else "."
+    if os.path.isabs(rel) or rel == ".." or rel.startswith("../"):
+        raise RuntimeError(f"Refusing to extract '{name}' outside {dest}")
+    return "" if rel == "." else rel
+
+
+# What tarfile's "tar" filter strips from member modes
+_UNSAFE_MODE_BITS = stat.S_ISUID | stat.S_ISGID | stat.S_ISVTX | stat.S_IWGRP | stat.S_IWOTH
+
+
+def _set_attrs(path, member: tarfile.TarInfo, chown: bool):
+    """Owner (root only), mode and mtime of member on path, which may be an open fd."""
+    if chown:
+        try:
+            os.chown(path, member.uid, member.gid)
+        except OSError:
+            pass
+    os.chmod(path, member.mode & 0o7777 & ~_UNSAFE_MODE_BITS)
+    os.utime(path, (member.mtime, member.mtime))
+
+
+class _TarExtractor:
+    """
+    Writes tar members into dest one at a time, hashing regular files as they
+    are written; shared by whole-archive and selective extraction.
+
+    The policy is that of extractall(filter="tar"): nothing is written outside
+    dest, through a symlink, or with setuid/group-writable bits.
+    """
+
+    def __init__(self, dest: str, manifest: Manifest):
+        self.dest = dest
+        self.manifest = manifest
+        self.others = set(manifest.meta.get("others", []))
+        self.dirs = []
+        self.chown = os.geteuid() == 0
+        # Directories under dest known to be real directories (not symlinks), so
+        # each one is checked or created once rather than once per file
+        self.real_dirs = {""}
+        os.makedirs(dest, exist_ok=True)
+
+    def _ensure_parent(self, rel: str):
+        parent = rel.rpartition("/")[0]
+        if parent in self.real_dirs:
+            return
+        self._ensure_parent(parent)
+        path = os.path.join(self.dest, parent)
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            os.mkdir(path)
+        else:
+            if stat.S_ISLNK(st.st_mode) or not stat.S_ISDIR(st.st_mode):
+                raise RuntimeError(f"Refusing to extract '{rel}' through non-directory '{parent}' in {self.dest}")
+        self.real_dirs.add(parent)
+
+    def _clear(self, target: str, rel: str):
+        try:
+            st = os.lstat(target)
+        except FileNotFoundError:
+            return
+        if stat.S_ISDIR(st.st_mode):
+            shutil.rmtree(target)
+            # Anything cached below it is gone too
+            self.real_dirs.difference_update([d for d in self.real_dirs if d == rel or d.startswith(rel + "/")])
+        else:
+            os.remove(target)
+
+    def extract(self, tar: tarfile.TarFile, member: tarfile.TarInfo, rel: str):
+        dest, manifest = self.dest, self.manifest
+        target = os.path.join(dest, rel) if rel else dest
+        if rel:
+            self._ensure_parent(rel)
+
+        if member.isdir():
+            if rel and rel not in self.real_dirs:
+                try:
+                    st = os.lstat(target)
+                except FileNotFoundError:
+                    os.mkdir(target)
+                else:
+                    if not stat.S_ISDIR(st.st_mode):
+                        os.remove(target)
+                        os.mkdir(target)
+                self.real_dirs.add(rel)
+            self.dirs.append((target, member))
+            if rel:
+                self.others.add(rel)
+                manifest.files.pop(rel, None)
+            return
+
+        self._clear(target, rel)
+        if member.isfile():
+            with tar.extractfile(member) as src, open(target, "wb") as out:
+                reader = HashingReader(src)
+                shutil.copyfileobj(reader, out, CHUNK_SIZE)
+                out.flush()
+                _set_attrs(out.fileno(), member, self.chown)
+                st = os.fstat(out.fileno())
+            manifest.add(rel, FileEntry(size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=reader.hexdigest()))
+            self.others.discard(rel)
+            return
+
+        if member.issym() or member.islnk():
+            # Links are vetted by tarfile's own filter: no absolute or escaping targets
+            if hasattr(tarfile, "tar_filter"):
+                member = tarfile.tar_filter(member, dest)
+        if member.issym():
+            os.symlink(member.linkname, target)
+        else:
+            # Hardlinks and the like from archives made by `tar` itself
+            tar.extract(member, dest, set_attrs=True, **_EXTRACT_FILTER)
+        self.others.add(rel)
+        manifest.files.pop(rel, None)
+
+    def finish(self) -> Manifest:
+        # Directory modes and times last, deepest first, as extractall does
+        for target, member in sorted(self.dirs, key=lambda d: d[0], reverse=True):
+            _set_attrs(target, member, self.chown)
+        self.dirs = []
+        self.manifest.meta["others"] = sorted(self.others)
+        return self.manifest
+
+
+def extract_tar_stream(stream, dest: str, manifest: Manifest,
+                       select: Optional[Callable[[str, bool], bool]] = None) -> Manifest:
+    """
+    Extract the uncompressed tar stream into dest, hashing every regular file
+    as it is written, so the result can be checked against the backup's
+    manifest without reading the tree back.
+
+    Entries are recorded in `manifest` (size and mtime as written to disk),
+    replacing those of an earlier archive when a chain is replayed into the
+    same dest; directories and symlinks go to manifest.meta["others"].
+    With select(rel_path, is_dir), only the members it accepts are written.
+    """
+    extractor = _TarExtractor(dest, manifest)
+    with tarfile.open(fileobj=stream, mode="r|") as tar:
+        for member in tar:
+            rel = _member_path(dest, member.name)
+            if select is None or (rel and select(rel, member.isdir())):
+                extractor.extract(tar, member, rel)
+    return extractor.finish()
+
+
+def _open_source(raw, codec: Optional[str], passphrase: Optional[str], path: str):
+    """(decrypted stream, codec) for an archive file opened as raw."""
+    source = raw
+    if passphrase is not None:
+        source = DecryptingReader(raw, passphrase)
+        codec = codec or codec_from_magic(source.peek(4)) or DEFAULT_CODEC
+    return source, codec or detect_codec(path)
+
+
+def _skip(stream, count: int):
+    while count > 0:
+        chunk = stream.read(min(count, CHUNK_SIZE))
+        if not chunk:
+            raise RuntimeError("Archive index points past the end of the archive")
+        count -= len(chunk)
+
+
+def extract_members(archive_path: str, dest: str, offsets, manifest: Manifest,
+                    blocks=None, codec: Optional[str] = None, passphrase: Optional[str] = None) -> Manifest:
+    """
+    Extract only the members starting at `offsets` (uncompressed positions from
+    manifest.meta["index"]["members"]) into dest, hashing them into manifest.
+
+    Each run of nearby members is read by seeking to the compressed block that
+    holds it (`blocks`, the index's seek points) and decoding from there, so a
+    few files come out of a large archive without decompressing all of it.
+    """
+    wanted = sorted(set(offsets))
+    extractor = _TarExtractor(dest, manifest)
+    with open(archive_path, "rb") as raw:
+        source, codec = _open_source(raw, codec, passphrase, archive_path)
+        i = 0
+        while i < len(wanted):
+            base = wanted[i]
+            compressed, start = seek_point(blocks, codec, base)
+            source.seek(compressed)
+            stream = decompressed_reader(source, codec)
+            _skip(stream, base - start)
+            position = base
+            try:
+                with tarfile.open(fileobj=stream, mode="r|") as tar:
+                    for member in tar:
+                        position = base + member.offset
+                        if position < wanted[i]:
+                            continue
+                        if position > wanted[i]:
+                            break
+                        extractor.extract(tar, member, _member_path(dest, member.name))
+                        i += 1
+                        # Skipping through a block or two is cheaper than a new seek
+                        if i >= len(wanted) or wanted[i] - position > 2 * BLOCK_SIZE:
+                            break
+            except tarfile.ReadError as e:
+                raise RuntimeError(f"Archive index of {archive_path} does not match its contents ({e})") from None
+            if i < len(wanted) and wanted[i] <= position:
+                raise RuntimeError(f"Archive index of {archive_path} does not match its contents")
+    return extractor.finish()
+
+
+def extract_archive_file(archive_path: str, dest: str, codec: Optional[str] = None,
+                         passphrase: Optional[str] = None, manifest: Optional[Manifest] = None,
+                         select: Optional[Callable[[str, bool], bool]] = None):
+    """
+    Extract an archive into dest in-process. Encrypted (.enc) archives need the
+    passphrase and are decrypted in the stream; the codec is detected if not given.
+    With a manifest, files are hashed while extracting (see extract_tar_stream),
+    and select limits extraction to the members it accepts.
+    """
+    os.makedirs(dest, exist_ok=True)
+    with open(archive_path, "rb") as raw:
+        source, codec = _open_source(raw, codec, passphrase, archive_path)
+        stream = decompressed_reader(source, codec)
+        if manifest is not None:
+            extract_tar_stream(stream, dest, manifest, select=select)
+            return
+        with tarfile.open(fileobj=stream, mode="r|") as tar:
+            tar.extractall(dest, **_EXTRACT_FILTER)
+
+
+def list_archive(archive_path: str, codec: Optional[str] = None,
+                 passphrase: Optional[str] = None) -> Iterator[tarfile.TarInfo]:
+    """Members of an archive without an index, read by decompressing the stream (no data is written)."""
+    with open(archive_path, "rb") as raw:
+        source, codec = _open_source(raw, codec, passphrase, archive_path)
+        with tarfile.open(fileobj=decompressed_reader(source, codec), mode="r|") as tar:
+            for member in tar:
+                rel = _member_path(archive_path, member.name)
+                if rel:
+                    member.name = rel
+                    yield member
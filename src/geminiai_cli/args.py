@@ -13,6 +13,7 @@ from .config import (
     CHAT_HISTORY_BACKUP_PATH
 )
 from .project_config import load_project_config, normalize_config_keys
+from .bench import add_bench_arguments
 
 class RichHelpParser(argparse.ArgumentParser):
     """
@@ -103,20 +104,43 @@ def get_parser() -> argparse.ArgumentParser:
 
     # Backup command
     backup_parser = subparsers.add_parser("backup", help="Backup Gemini configuration and chats (local or Backblaze B2 cloud).")
+    backup_parser.add_argument("backup_action", nargs="?", choices=["ls"], help="ls <archive> [GLOB ...]: list the files in a backup archive")
+    backup_parser.add_argument("archive", nargs="?", help="With ls: archive path or name in --archive-dir")
+    backup_parser.add_argument("ls_paths", nargs="*", metavar="GLOB", help="With ls: only list paths matching these gitignore-style patterns")
     backup_parser.add_argument("--src", default="~/.gemini", help="Source gemini dir (default ~/.gemini)")
     backup_parser.add_argument("--archive-dir", default=DEFAULT_BACKUP_DIR, help="Directory to store tar.gz archives (default: ~/.geminiai-cli/backups)")
     backup_parser.add_argument("--dest-dir-parent", default=OLD_CONFIGS_DIR, help="Parent directory where timestamped directory backups are stored")
     backup_parser.add_argument("--dry-run", action="store_true", help="Do not perform destructive actions")
     backup_parser.add_argument("--cloud", action="store_true", help="Create local backup AND upload to Cloud (B2)")
+    backup_parser.add_argument("--no-local", action="store_true", help="With --cloud: stream the archive straight to the bucket without keeping a local copy")
     backup_parser.add_argument("--bucket", help="B2 Bucket Name")
     backup_parser.add_argument("--b2-id", help="B2 Key ID (or set env GEMINI_B2_KEY_ID)")
     backup_parser.add_argument("--b2-key", help="B2 App Key (or set env GEMINI_B2_APP_KEY)")
+    backup_parser.add_argument("--engine", choices=["archive", "chunked"], default="archive", help="Backup engine: tar.gz archive (default) or deduplicated chunk repository")
+    backup_parser.add_argument("--incremental", action="store_true", help="Archive only files changed since the last backup of this account")
+    backup_parser.add_argument("--full-every", type=int, help="Take a full backup once the incremental chain reaches this length (default 24)")
+    backup_parser.add_argument("--verify", choices=["manifest", "diff"], help="Verify the directory copy from a hash manifest built while copying (default) or with diff -r")
+    backup_parser.add_argument("--snapshot-mode", choices=["copy", "hardlink", "reflink"], help="Directory backup: full copy (default), or hardlink/reflink files unchanged since the previous one")
+    backup_parser.add_argument("--compression", choices=["gzip", "zstd", "lz4", "none"], help="Archive codec (default gzip, multi-threaded); zstd/lz4 need the optional packages")
+    backup_parser.add_argument("--level", type=int, help="Compression level (gzip 1-9, zstd 1-22, lz4 0-16; default per codec)")
+    backup_parser.add_argument("--encrypt", action="store_true", help="Encrypt the backup archive (passphrase from GEMINI_BACKUP_PASSWORD or prompt)")
+    backup_parser.add_argument("--encryption", choices=["aead", "gpg"], help="With --encrypt: in-process streaming AES-GCM (default, .enc) or gpg (.gpg)")
+    backup_parser.add_argument("--exclude", action="append", metavar="PATTERN", help="Leave paths matching this gitignore-style pattern out of the backup (repeatable)")
+    backup_parser.add_argument("--exclude-from", action="append", metavar="FILE", help="Read exclude patterns from FILE, one per line (repeatable)")
+    backup_parser.add_argument("--no-default-excludes", action="store_true", help="Also back up regenerable runtime data (tmp/bin, tmp/<hash>) skipped by default")
+    backup_parser.add_argument("--sources", help="Back up many .gemini dirs concurrently: a glob (e.g. '/home/*/.gemini') or a file listing one path/glob per line")
+    backup_parser.add_argument("--jobs", type=int, help="With --sources: how many backups run at once (default min(4, cores))")
+    backup_parser.add_argument("--watch", action="store_true", help="Keep running and take an incremental backup whenever ~/.gemini changes (debounced)")
+    backup_parser.add_argument("--quiet-period", type=float, help="With --watch: seconds without changes before backing up (default 30)")
+    backup_parser.add_argument("--min-interval", type=float, help="With --watch: minimum seconds between two backups (default 300)")
+    backup_parser.add_argument("--timings", action="store_true", help="Print wall/CPU time, bytes read/written and file counts per phase")
+    backup_parser.add_argument("--metrics-json", metavar="PATH", help="Write per-phase timings and resource counters to PATH as JSON")
 
     # Restore command
     restore_parser = subparsers.add_parser("restore", help="Restore Gemini configuration from a backup (local or Backblaze B2 cloud).")
     restore_parser.add_argument("--from-dir", help="Directory backup to restore from (preferred)")
     restore_parser.add_argument("--from-archive", help="Tar.gz archive to restore from")
-    restore_parser.add_argument("--search-dir", default=DEFAULT_BACKUP_DIR, help="Directory to search for backup archives (*.gemini.tar.gz) when no --from-dir (default: ~/.geminiai-cli/backups)")
+    restore_parser.add_argument("--search-dir", default=DEFAULT_BACKUP_DIR, help="Directory to search for backup archives (*.gemini.tar.*) when no --from-dir (default: ~/.geminiai-cli/backups)")
     restore_parser.add_argument("--dest", default="~/.gemini", help="Destination (default ~/.gemini)")
     restore_parser.add_argument("--force", action="store_true", help="Allow destructive replace without keeping .bak")
     restore_parser.add_argument("--dry-run", action="store_true", help="Do a dry run without destructive actions")
@@ -124,7 +148,15 @@ def get_parser() -> argparse.ArgumentParser:
     restore_parser.add_argument("--bucket", help="B2 Bucket Name")
     restore_parser.add_argument("--b2-id", help="B2 Key ID")
     restore_parser.add_argument("--b2-key", help="B2 App Key")
+    restore_parser.add_argument("--no-cache", action="store_true", help="Download again instead of using the download cache (~/.geminiai-cli/cache)")
     restore_parser.add_argument("--auto", action="store_true", help="Automatically restore the best available account")
+    restore_parser.add_argument("--engine", choices=["archive", "chunked"], default="archive", help="Restore from tar.gz archives (default) or the chunk repository")
+    restore_parser.add_argument("--verify", choices=["manifest", "diff"], help="Verify the restored copy from a hash manifest built while copying (default) or with diff -r")
+    restore_parser.add_argument("--path", action="append", metavar="GLOB", help="Restore only paths matching this gitignore-style pattern into the existing ~/.gemini (repeatable)")
+    restore_parser.add_argument("--delta", action="store_true", help="Rewrite only files that differ from the backup and delete extra ones, in a transaction that rolls back on failure")
+    restore_parser.add_argument("--timings", action="store_true", help="Print wall/CPU time, bytes read/written and file counts per phase")
+    restore_parser.add_argument("--metrics-json", metavar="PATH", help="Write per-phase timings and resource counters to PATH as JSON")
+    restore_parser.add_argument("--prefetch", action="store_true", help="Then download the next recommended account's newest cloud backup into the download cache in the background")
 
     # Chat command
     chat_parser = subparsers.add_parser("chat", help="Manage chat history.")
@@ -147,6 +179,7 @@ def get_parser() -> argparse.ArgumentParser:
     list_backups_parser.add_argument("--bucket", help="B2 Bucket Name")
     list_backups_parser.add_argument("--b2-id", help="B2 Key ID")
     list_backups_parser.add_argument("--b2-key", help="B2 App Key")
+    list_backups_parser.add_argument("--refresh-catalog", action="store_true", help="Rebuild the bucket's backup catalog from a full listing (with --cloud)")
 
     # Check B2 command
     check_b2_parser = subparsers.add_parser("check-b2", help="Verify Backblaze B2 credentials.")
@@ -171,6 +204,7 @@ def get_parser() -> argparse.ArgumentParser:
     pull_parser.add_argument("--bucket", help="B2 Bucket Name")
     pull_parser.add_argument("--b2-id", help="B2 Key ID")
     pull_parser.add_argument("--b2-key", help="B2 App Key")
+    pull_parser.add_argument("--no-cache", action="store_true", help="Download again instead of using the download cache (~/.geminiai-cli/cache)")
 
     # Config command
     config_parser = subparsers.add_parser("config", help="Manage persistent configuration.")
@@ -209,10 +243,11 @@ def get_parser() -> argparse.ArgumentParser:
     cooldown_parser.add_argument("--b2-key", help="B2 App Key")
     cooldown_parser.add_argument("--remove", nargs=1, help="Remove an account from the dashboard (both cooldown and resets).")
     cooldown_parser.add_argument("--reset-all", action="store_true", help="⚠️ Clear ALL account activity and reset data (Local & Cloud).")
+    cooldown_parser.add_argument("--prefetch", action="store_true", help="Then download the next recommended account's newest cloud backup into the download cache in the background")
 
     # Recommend command
     recommend_parser = subparsers.add_parser("recommend", aliases=["next"], help="Suggest the next best account (Green & Least Recently Used).")
-    # No arguments needed for now, but could add specific filters later.
+    recommend_parser.add_argument("--prefetch", action="store_true", help="Then download the next recommended account's newest cloud backup into the download cache in the background")
 
     # Stats command
     stats_parser = subparsers.add_parser("stats", aliases=["usage"], help="Show usage statistics (last 7 days).")
@@ -230,4 +265,29 @@ def get_parser() -> argparse.ArgumentParser:
     profile_import.add_argument("file", help="Input zip filename")
     profile_import.add_argument("--force", action="store_true", help="Overwrite existing files without confirmation")
 
+    # Slots command
+    slots_parser = subparsers.add_parser("slots", help="Keep verified, extracted account trees ready and switch ~/.gemini to one by rename.")
+    slots_subparsers = slots_parser.add_subparsers(dest="slots_command", help="Slot commands")
+    slots_subparsers.add_parser("list", help="Show the ready slots and the backup each holds.")
+    slots_refresh = slots_subparsers.add_parser("refresh", help="Stage each account's latest backup into its slot if it is newer.")
+    slots_refresh.add_argument("--email", action="append", help="Only refresh this account's slot (repeatable)")
+    slots_refresh.add_argument("--search-dir", default=DEFAULT_BACKUP_DIR, help="Directory with the backup archives (default: ~/.geminiai-cli/backups)")
+    slots_refresh.add_argument("--interval", type=float, help="Keep running, checking for newer backups every this many seconds")
+    slots_refresh.add_argument("--cloud", action="store_true", help="Stage the latest backups in the Cloud bucket instead")
+    slots_refresh.add_argument("--bucket", help="B2 Bucket Name")
+    slots_refresh.add_argument("--b2-id", help="B2 Key ID")
+    slots_refresh.add_argument("--b2-key", help="B2 App Key")
+    slots_refresh.add_argument("--no-cache", action="store_true", help="Download again instead of using the download cache (~/.geminiai-cli/cache)")
+    slots_switch = slots_subparsers.add_parser("switch", help="Install an account's slot as ~/.gemini (a rename).")
+    slots_switch.add_argument("email", nargs="?", help="Account to switch to")
+    slots_switch.add_argument("--auto", action="store_true", help="Switch to the recommended account")
+    slots_switch.add_argument("--dest", default="~/.gemini", help="Destination (default ~/.gemini)")
+    slots_switch.add_argument("--force", action="store_true", help="Delete the previous ~/.gemini instead of keeping a .bak")
+
+    # Bench command
+    bench_parser = subparsers.add_parser("bench", help="Benchmark backup/restore on a synthetic .gemini tree.")
+    bench_subparsers = bench_parser.add_subparsers(dest="bench_command", help="Benchmarks")
+    bench_backup = bench_subparsers.add_parser("backup", help="Time backup, integrity check, sync and restore.")
+    add_bench_arguments(bench_backup)
+
     return parser
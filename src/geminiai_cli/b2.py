@@ -6,12 +6,50 @@ import os
 import sys
 import io
 from .ui import cprint, NEON_GREEN, NEON_RED, NEON_YELLOW
-from .cloud_storage import CloudStorageProvider, CloudFile
+from .cloud_storage import CloudStorageProvider, CloudFile, StreamingUpload, RangedDownload, download_settings
+from .config import GEMINI_CLI_HOME
+from .settings import get_setting
+
+# Files per b2_list_file_names call (the API maximum)
+B2_LIST_PAGE_SIZE = 10000
+# Auth token, API URLs and bucket ids kept between runs with setting b2_auth_cache
+B2_AUTH_CACHE = os.path.join(GEMINI_CLI_HOME, "b2_account_info.sqlite")
 
 try:
-    from b2sdk.v2 import InMemoryAccountInfo, B2Api
+    from b2sdk.v2 import InMemoryAccountInfo, B2Api, SqliteAccountInfo, AuthInfoCache
+    from b2sdk.v2.exception import FileNotPresent
 except ImportError:
     B2Api = None
+    FileNotPresent = FileNotFoundError  # never raised: B2Manager refuses to start without b2sdk
+
+def _sha1_checksum(content_sha1):
+    """B2 reports "none" (large files) or "unverified:<hex>" where it has no verified SHA-1."""
+    if isinstance(content_sha1, str) and len(content_sha1) == 40:
+        return f"sha1:{content_sha1}"
+    return None
+
+def auth_cache_enabled() -> bool:
+    """Setting b2_auth_cache: keep B2 authorization on disk so later runs skip authorize_account."""
+    return get_setting("b2_auth_cache", False) in (True, "true", "1", 1)
+
+def _cached_account_info(path=None):
+    """
+    SqliteAccountInfo at path (B2_AUTH_CACHE). It holds the application key
+    and auth token, so the file is only ever readable by its owner.
+    """
+    path = path or B2_AUTH_CACHE
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        os.chmod(path, 0o600)
+    return SqliteAccountInfo(file_name=path)
+
+def _authorized_as(info, key_id) -> bool:
+    """Whether info already holds an auth token for key_id (b2sdk re-authorizes by itself once it expires)."""
+    try:
+        return info.get_application_key_id() == key_id and bool(info.get_account_auth_token())
+    except Exception:
+        # MissingAccountData: nothing cached yet
+        return False
 
 class B2Manager(CloudStorageProvider):
     def __init__(self, key_id, app_key, bucket_name):
@@ -19,13 +57,20 @@ class B2Manager(CloudStorageProvider):
             cprint(NEON_RED, "[ERROR] 'b2sdk' is not installed. Please run: pip install b2sdk")
             sys.exit(1)
         
-        self.info = InMemoryAccountInfo()
-        self.b2_api = B2Api(self.info)
+        cached = auth_cache_enabled()
+        if cached:
+            # Bucket name -> id lookups are cached alongside the token
+            self.info = _cached_account_info()
+            self.b2_api = B2Api(self.info, cache=AuthInfoCache(self.info))
+        else:
+            self.info = InMemoryAccountInfo()
+            self.b2_api = B2Api(self.info)
         self.bucket_name = bucket_name
         
         try:
-            cprint(NEON_YELLOW, "[CLOUD] Authenticating with Backblaze B2...")
-            self.b2_api.authorize_account("production", key_id, app_key)
+            if not (cached and _authorized_as(self.info, key_id)):
+                cprint(NEON_YELLOW, "[CLOUD] Authenticating with Backblaze B2...")
+                self.b2_api.authorize_account("production", key_id, app_key)
             self.bucket = self.b2_api.get_bucket_by_name(bucket_name)
             cprint(NEON_GREEN, f"[CLOUD] Connected to bucket: {bucket_name}")
         except Exception as e:
@@ -40,22 +85,58 @@ class B2Manager(CloudStorageProvider):
         """Standard interface method for download."""
         self.download(remote_path, local_path)
 
-    def list_files(self, prefix=""):
+    @staticmethod
+    def _cloud_file(file_version):
+        return CloudFile(
+            name=file_version.file_name,
+            size=file_version.size,
+            last_modified=file_version.upload_timestamp / 1000, # Convert ms to seconds
+            checksum=_sha1_checksum(getattr(file_version, "content_sha1", None)),
+        )
+
+    def iter_files(self, prefix="", page_size=B2_LIST_PAGE_SIZE, latest_only=True):
+        """
+        Lazily list the files under prefix, one B2 page at a time.
+
+        The prefix is passed to b2_list_file_names (b2_list_file_versions with
+        latest_only=False) and paging starts at it, so B2 only ever returns
+        keys that match, whether or not the prefix contains a "/".
+        latest_only=False also yields older versions of each file.
+        """
+        session = self.bucket.api.session
+        factory = self.bucket.api.file_version_factory
+        start_name, start_id = prefix or None, None
+        while True:
+            if latest_only:
+                response = session.list_file_names(self.bucket.id_, start_name, page_size, prefix)
+            else:
+                response = session.list_file_versions(self.bucket.id_, start_name, start_id, page_size, prefix)
+            for entry in response["files"]:
+                file_version = factory.from_api_response(entry)
+                # Versions listings also hold hide markers and unfinished large files
+                if getattr(file_version, "action", "upload") == "upload":
+                    yield self._cloud_file(file_version)
+            start_name, start_id = response.get("nextFileName"), response.get("nextFileId")
+            if start_name is None:
+                return
+
+    def list_files(self, prefix="", latest_only=True):
         """Standard interface method for listing files."""
-        # Adapter to convert B2 ls generator to List[CloudFile]
         files = []
         try:
-            for file_version, _ in self.bucket.ls(recursive=True):
-                if file_version.file_name.startswith(prefix):
-                    files.append(CloudFile(
-                        name=file_version.file_name,
-                        size=file_version.size,
-                        last_modified=file_version.upload_timestamp / 1000 # Convert ms to seconds
-                    ))
+            for f in self.iter_files(prefix, latest_only=latest_only):
+                files.append(f)
         except Exception as e:
             cprint(NEON_RED, f"[CLOUD] List failed: {str(e)}")
         return files
 
+    def file_info(self, remote_path):
+        """One b2_get_file_info_by_name request instead of a listing."""
+        try:
+            return self._cloud_file(self.bucket.get_file_info_by_name(remote_path))
+        except FileNotPresent:
+            return None
+
     def delete_file(self, remote_path):
          # B2 SDK delete needs file id usually, but let's try to hide that complexity or implement it properly
          # B2 simple delete by name isn't direct in older SDKs without getting ID first.
@@ -81,6 +162,16 @@ class B2Manager(CloudStorageProvider):
         except Exception as e:
             cprint(NEON_RED, f"[CLOUD] Upload failed: {str(e)}")
 
+    def open_upload_stream(self, remote_name):
+        """Streaming writer backed by upload_unbound_stream (B2 large-file parts as the data arrives)."""
+        cprint(NEON_YELLOW, f"[CLOUD] Streaming upload -> {remote_name}...")
+
+        def consume(reader):
+            self.bucket.upload_unbound_stream(reader, remote_name)
+            cprint(NEON_GREEN, "[CLOUD] Upload successful!")
+
+        return StreamingUpload(consume)
+
     def upload_string(self, data_str, remote_name):
         """Uploads a string directly to B2."""
         cprint(NEON_YELLOW, f"[CLOUD] Syncing cooldowns -> {remote_name}...")
@@ -99,11 +190,26 @@ class B2Manager(CloudStorageProvider):
         """Returns a generator of file versions. Deprecated in favor of list_files for generic use."""
         return self.bucket.ls(recursive=True)
 
+    def _read_range(self, file_id, start, end):
+        # By id, not name: every range comes from the version whose size was looked up,
+        # even if the name is re-uploaded while the download runs
+        buf = io.BytesIO()
+        self.b2_api.download_file_by_id(file_id, range_=(start, end)).save(buf)
+        return buf.getvalue()
+
     def download(self, remote_name, local_path):
+        """Files larger than one part are fetched as concurrent, resumable byte ranges (see RangedDownload)."""
         cprint(NEON_YELLOW, f"[CLOUD] Downloading {remote_name} -> {local_path}...")
         try:
-            download_dest = self.bucket.download_file_by_name(remote_name)
-            download_dest.save_to(local_path)
+            workers, part_size = download_settings()
+            info = self.bucket.get_file_info_by_name(remote_name)
+            size = getattr(info, "size", None)
+            if isinstance(size, int) and size > part_size:
+                RangedDownload(lambda start, end: self._read_range(info.id_, start, end), size,
+                               str(info.id_), local_path, workers=workers, part_size=part_size).run()
+            else:
+                download_dest = self.bucket.download_file_by_name(remote_name)
+                download_dest.save_to(local_path)
 
             cprint(NEON_GREEN, "[CLOUD] Download successful!")
         except Exception as e:
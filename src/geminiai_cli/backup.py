@@ -7,7 +7,7 @@ backup.py - automatic Gemini CLI backup that names backups with timestamp + emai
 Example result:
   /root/2025-10-22_042211-bose13x@gmail.com.gemini
 Archive:
-  /root/backups/2025-10-22_042211-bose13x@gmail.com.gemini.tar.gz
+  /root/backups/2025-10-22_042211-bose13x@gmail.com.gemini.tar.gz (or .tar.zst/.tar.lz4/.tar)
 Stable "latest" symlink:
   /root/bose13x@gmail.com.gemini -> /root/2025-10-22_042211-bose13x@gmail.com.gemini
 
@@ -20,6 +20,7 @@ Usage:
 from __future__ import annotations
 import argparse
 import fcntl
+import hashlib
 import json
 import os
 import shutil
@@ -27,14 +28,30 @@ import subprocess
 import sys
 import time
 import tempfile
-from typing import Optional
+from typing import Optional, Tuple
 from .config import TIMESTAMPED_DIR_REGEX, DEFAULT_BACKUP_DIR, OLD_CONFIGS_DIR, GEMINI_CLI_HOME
 from .cloud_factory import get_cloud_provider
 from .settings import get_setting
+from .verify import VERIFY_MODES, LINK_MODES, copy_tree, verify_tree, report_problems, verify_mode, link_mode
 from .credentials import resolve_credentials
+from .archive import create_archive, write_archive
+from .manifest import Manifest, manifest_path_for, dir_manifest_path_for
+from .compression import CODECS, archive_suffix, codec_available, codec_from_args, level_from_args
+from .encryption import ENCRYPTED_SUFFIX, ENCRYPTION_MODES, aead_available, encryption_mode, read_passphrase
+from .restore import find_latest_archive_backup_for_email
+from .chunkstore import ChunkStore, snapshot_name_for, push_snapshot
+from .catalog import catalog_added
+from .exclude import excludes_from_args
+from .metrics import Metrics, metrics_from_args
+from .watch import watch_backups
+from .multi_backup import perform_multi_backup
 
 LOCKFILE = os.path.join(GEMINI_CLI_HOME, ".backup.lock")
 
+# An incremental chain is capped at this many archives (full included) unless
+# overridden with --full-every or the "backup_full_every" setting.
+DEFAULT_FULL_EVERY = 24
+
 def acquire_lock(path: str = LOCKFILE):
     # Ensure the directory for the lockfile exists
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -46,6 +63,17 @@ def acquire_lock(path: str = LOCKFILE):
         sys.exit(2)
     return fd
 
+def lock_path_for(src: str) -> str:
+    """
+    Lock for backing up src: the global lock for the user's own ~/.gemini
+    (shared with restore), a per-source lock for any other tree so several
+    homes can be backed up at once.
+    """
+    if src == os.path.abspath(os.path.expanduser("~/.gemini")):
+        return LOCKFILE
+    digest = hashlib.sha1(src.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(GEMINI_CLI_HOME, "locks", f"backup-{digest}.lock")
+
 def run(cmd: str, check: bool = True, capture: bool = False):
     if capture:
         return subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
@@ -100,11 +128,59 @@ def atomic_symlink(target: str, link_name: str):
             except Exception:
                 pass
 
+def find_incremental_parent(archive_dir: str, email: str, full_every: int) -> Tuple[Optional[str], Optional[Manifest]]:
+    """
+    Return (parent_archive_path, parent_manifest) for an incremental backup of
+    email, or (None, None) when a full backup should be taken instead: no
+    previous backup, no manifest for it, or the chain already reached full_every.
+    """
+    parent_path = find_latest_archive_backup_for_email(archive_dir, email)
+    if not parent_path:
+        print("No previous backup for this account; taking a full backup.")
+        return None, None
+
+    parent_manifest = Manifest.load(manifest_path_for(parent_path))
+    if parent_manifest is None:
+        print(f"Previous backup {os.path.basename(parent_path)} has no manifest; taking a full backup.")
+        return None, None
+
+    chain_length = int(parent_manifest.meta.get("chain_length", 0))
+    if chain_length + 1 >= full_every:
+        print(f"Incremental chain reached {chain_length + 1} backups (limit {full_every}); taking a full backup.")
+        return None, None
+
+    return parent_path, parent_manifest
+
+def find_previous_snapshot(dest_parent: str, email: str) -> Tuple[Optional[str], Optional[Manifest]]:
+    """
+    Return (path, manifest) of the newest directory backup of email that has a
+    manifest, for --snapshot-mode hardlink/reflink to reuse; (None, None) if none.
+    """
+    if not os.path.isdir(dest_parent):
+        return None, None
+    suffix = f"-{email}.gemini"
+    candidates = []
+    for name in os.listdir(dest_parent):
+        m = TIMESTAMPED_DIR_REGEX.match(name)
+        path = os.path.join(dest_parent, name)
+        if m and name.endswith(suffix) and os.path.isdir(path) and not os.path.islink(path):
+            candidates.append((m.group(1), path))
+    for _, path in sorted(candidates, reverse=True):
+        manifest = Manifest.load(dir_manifest_path_for(path))
+        if manifest is not None:
+            return path, manifest
+    return None, None
+
 def perform_backup(args: argparse.Namespace):
     """
     Main backup logic separated from argument parsing.
     Accepts an argparse.Namespace or any object with the required attributes.
     """
+    with metrics_from_args("backup", args) as metrics:
+        _perform_backup(args, metrics)
+
+
+def _perform_backup(args: argparse.Namespace, metrics: Metrics):
     src = os.path.abspath(os.path.expanduser(args.src))
     archive_dir = os.path.abspath(os.path.expanduser(args.archive_dir))
     dest_parent = os.path.abspath(os.path.expanduser(args.dest_dir_parent))
@@ -126,96 +202,263 @@ def perform_backup(args: argparse.Namespace):
         print(f"Error: Generated backup name '{dest_basename}' does not match the required pattern.")
         sys.exit(1)
 
+    try:
+        exclude = excludes_from_args(args)
+    except OSError as e:
+        print(f"Error: cannot read exclude file: {e}")
+        sys.exit(1)
+
+    codec = codec_from_args(args)
+    level = level_from_args(args)
+    # Set by the --sources pool so concurrent backups share the cores
+    threads = getattr(args, "threads", None)
+    threads = threads if isinstance(threads, int) and not isinstance(threads, bool) and threads > 0 else None
+    if not codec_available(codec):
+        print(f"Error: --compression {codec} needs an optional package that is not installed "
+              f"(pip install {'zstandard' if codec == 'zstd' else codec}).")
+        sys.exit(1)
+
     dest = os.path.join(dest_parent, dest_basename)
-    archive_path = os.path.join(archive_dir, f"{dest_basename}.tar.gz")
+    archive_path = os.path.join(archive_dir, f"{dest_basename}{archive_suffix(codec)}")
     latest_symlink = os.path.join(dest_parent, f"{active_email}.gemini") if active_email else None
 
-    lockfd = acquire_lock()
-    try:
-        # 1) Create archive (tar gz) of the source
-        print(f"[1/4] Creating archive: {archive_path}")
+    chunked = getattr(args, "engine", None) == "chunked"
+    store = ChunkStore() if chunked else None
+    snapshot_name = snapshot_name_for(dest_basename)
+    if chunked and getattr(args, "encrypt", False):
+        print("Error: --encrypt is not supported with --engine chunked.")
+        sys.exit(1)
+
+    # --encrypt: in-process streaming AEAD (.enc) unless --encryption gpg is asked for
+    passphrase = None
+    aead = bool(hasattr(args, 'encrypt') and args.encrypt) and not chunked and encryption_mode(args) == "aead"
+    if aead:
+        if not aead_available():
+            print("Error: --encryption aead needs the 'cryptography' package (pip install cryptography), "
+                  "or use --encryption gpg.")
+            sys.exit(1)
+        archive_path += ENCRYPTED_SUFFIX
         if not args.dry_run:
-            ensure_dir(archive_dir)
-            tar_cmd = f"tar -C {shlex_quote(src)} -czf {shlex_quote(archive_path)} ."
-            run(tar_cmd)
-
-            # --- ENCRYPTION LOGIC ---
-            if hasattr(args, 'encrypt') and args.encrypt:
-                print(f"Encrypting archive: {archive_path} -> .gpg")
-                passphrase = os.environ.get("GEMINI_BACKUP_PASSWORD")
-                if not passphrase:
-                    import getpass
-                    passphrase = getpass.getpass("Enter passphrase for backup encryption: ")
-
-                if not passphrase:
-                    print("Error: Encryption requested but no passphrase provided.")
-                    sys.exit(1)
-
-                encrypted_path = f"{archive_path}.gpg"
-                # gpg --symmetric --cipher-algo AES256 --passphrase-fd 0 --batch --yes --output <out> <in>
-                gpg_cmd = [
-                    "gpg", "--symmetric", "--cipher-algo", "AES256",
-                    "--passphrase-fd", "0", "--batch", "--yes",
-                    "--output", encrypted_path, archive_path
-                ]
+            passphrase = read_passphrase("Enter passphrase for backup encryption: ")
+            if not passphrase:
+                print("Error: Encryption requested but no passphrase provided.")
+                sys.exit(1)
 
-                try:
-                    proc = subprocess.run(gpg_cmd, input=passphrase.encode(), check=False)
-                    if proc.returncode != 0:
-                        print("Error: GPG encryption failed.")
-                        sys.exit(1)
+    # --no-local: stream the archive straight into the cloud instead of archive_dir
+    no_local = getattr(args, "no_local", False) is True
+    provider = None
+    if no_local:
+        if not args.cloud:
+            print("Error: --no-local requires --cloud.")
+            sys.exit(1)
+        if chunked:
+            print("Error: --no-local is not supported with --engine chunked.")
+            sys.exit(1)
+        if getattr(args, "encrypt", False) and not aead:
+            print("Error: --no-local cannot be combined with --encryption gpg (gpg needs a local archive).")
+            sys.exit(1)
+        if not args.dry_run:
+            provider = get_cloud_provider(args)
+            if not provider:
+                print("Error: Cloud backup requested but no valid credentials found.")
+                sys.exit(1)
 
-                    # Remove original unencrypted archive and update path
-                    os.remove(archive_path)
-                    archive_path = encrypted_path
-                    print(f"Encrypted archive created at: {archive_path}")
+    lockfd = acquire_lock(lock_path_for(src))
+    try:
+        if chunked:
+            # 1) Store a deduplicated snapshot in the chunk repository
+            print(f"[1/4] Storing chunked snapshot: {store.snapshot_path(snapshot_name)}")
+            phase = metrics.begin("snapshot")
+            if not args.dry_run:
+                parent = store.latest_snapshot_for_email(active_email) if active_email else None
+                with store.locked():
+                    _, stats = store.backup(src, snapshot_name, parent=parent, exclude=exclude)
+                phase.files = stats.files
+                print(f"Snapshot stored: {stats.files} files ({stats.reused_files} unchanged), "
+                      f"{stats.new_chunks}/{stats.chunks} new chunks, {stats.new_bytes} new bytes.")
+            else:
+                print("DRY RUN: would store chunked snapshot ...")
+        else:
+            # 1) Create archive (compressed tar) of the source in a single streaming pass
+            if no_local:
+                print(f"[1/4] Streaming archive to cloud: {os.path.basename(archive_path)} ({codec})")
+            else:
+                print(f"[1/4] Creating archive: {archive_path} ({codec})")
+            # Streaming to the bucket overlaps archiving with the transfer
+            phase = metrics.begin("archive", cloud=no_local)
+            if not args.dry_run:
+                parent_path, parent_manifest = None, None
+                if getattr(args, 'incremental', False) and active_email:
+                    if no_local:
+                        print("No local backup chain with --no-local; taking a full backup.")
+                    else:
+                        full_every = getattr(args, 'full_every', None) or int(get_setting("backup_full_every", DEFAULT_FULL_EVERY))
+                        parent_path, parent_manifest = find_incremental_parent(archive_dir, active_email, full_every)
+
+                if no_local:
+                    # Nothing touches the local disk: the stream goes out part by part as it is produced
+                    with provider.open_upload_stream(os.path.basename(archive_path)) as out:
+                        manifest = write_archive(src, out, level=level, codec=codec, threads=threads,
+                                                 passphrase=passphrase, exclude=exclude)
+                else:
+                    ensure_dir(archive_dir)
+                    manifest = create_archive(src, archive_path, level=level, parent=parent_manifest, codec=codec,
+                                              threads=threads, passphrase=passphrase, exclude=exclude)
+                phase.files = len(manifest.files)
+                if aead:
+                    manifest.meta["encrypted"] = "aead"
+                if parent_manifest is not None:
+                    manifest.meta["kind"] = "incremental"
+                    manifest.meta["parent"] = os.path.basename(parent_path)
+                    manifest.meta["chain_length"] = int(parent_manifest.meta.get("chain_length", 0)) + 1
+                    print(f"Incremental on {manifest.meta['parent']}: archived {len(manifest.meta['archived'])} "
+                          f"of {len(manifest.files)} files.")
+                else:
+                    manifest.meta["kind"] = "full"
+                    manifest.meta["chain_length"] = 0
+                    print(f"Archived {len(manifest.files)} files ({manifest.total_size()} bytes).")
+
+                # --- ENCRYPTION LOGIC (gpg mode; aead already happened in the stream) ---
+                if hasattr(args, 'encrypt') and args.encrypt and not aead:
+                    print(f"Encrypting archive: {archive_path} -> .gpg")
+                    metrics.begin("encrypt")
+                    passphrase = os.environ.get("GEMINI_BACKUP_PASSWORD")
+                    if not passphrase:
+                        import getpass
+                        passphrase = getpass.getpass("Enter passphrase for backup encryption: ")
+
+                    if not passphrase:
+                        print("Error: Encryption requested but no passphrase provided.")
+                        sys.exit(1)
 
-                except FileNotFoundError:
-                     print("Error: 'gpg' command not found. Please install GPG or disable encryption.")
-                     sys.exit(1)
-            # -------------------------
+                    encrypted_path = f"{archive_path}.gpg"
+                    # gpg --symmetric --cipher-algo AES256 --passphrase-fd 0 --batch --yes --output <out> <in>
+                    gpg_cmd = [
+                        "gpg", "--symmetric", "--cipher-algo", "AES256",
+                        "--passphrase-fd", "0", "--batch", "--yes",
+                        "--output", encrypted_path, archive_path
+                    ]
+
+                    try:
+                        proc = subprocess.run(gpg_cmd, input=passphrase.encode(), check=False)
+                        if proc.returncode != 0:
+                            print("Error: GPG encryption failed.")
+                            sys.exit(1)
+
+                        # Remove original unencrypted archive and update path
+                        os.remove(archive_path)
+                        archive_path = encrypted_path
+                        manifest.meta["encrypted"] = True
+                        print(f"Encrypted archive created at: {archive_path}")
+
+                    except FileNotFoundError:
+                         print("Error: 'gpg' command not found. Please install GPG or disable encryption.")
+                         sys.exit(1)
+                # -------------------------
+
+                # Record the per-file listing next to the archive for later verification
+                manifest.meta["archive"] = os.path.basename(archive_path)
+                manifest.meta["compression"] = codec
+                manifest.meta["created"] = ts
+                if no_local:
+                    metrics.begin("upload-manifest", cloud=True)
+                    provider.upload_string(manifest.dumps(), os.path.basename(manifest_path_for(archive_path)))
+                    catalog_added(provider, [os.path.basename(archive_path),
+                                             os.path.basename(manifest_path_for(archive_path))])
+                else:
+                    manifest.save(manifest_path_for(archive_path))
 
-        else:
-            print("DRY RUN: would run tar -C ...")
-            if hasattr(args, 'encrypt') and args.encrypt:
-                print("DRY RUN: would run gpg --symmetric ...")
+            else:
+                print("DRY RUN: would stream archive to cloud ..." if no_local else "DRY RUN: would create archive ...")
+                if aead:
+                    print("DRY RUN: would encrypt the archive stream (AES-GCM) ...")
+                elif hasattr(args, 'encrypt') and args.encrypt:
+                    print("DRY RUN: would run gpg --symmetric ...")
 
         # 2) Copy to temporary location (sibling of dest)
         tmp_parent = os.path.dirname(dest) or "/tmp"
         tmp_dest = os.path.join(tmp_parent, f".{os.path.basename(dest)}.tmp-{ts}")
+        mode = verify_mode(args)
+        snapshot_mode = link_mode(args)
+        copy_manifest = None
         print(f"[2/4] Copying to temporary location: {tmp_dest}")
+        phase = metrics.begin("copy")
         if not args.dry_run:
             if os.path.exists(tmp_dest):
                 shutil.rmtree(tmp_dest)
-            cp_cmd = f"cp -a {shlex_quote(src)} {shlex_quote(tmp_dest)}"
-            run(cp_cmd)
+            if mode == "diff" and snapshot_mode == "copy":
+                cp_cmd = f"cp -a {shlex_quote(src)} {shlex_quote(tmp_dest)}"
+                run(cp_cmd)
+            else:
+                # Hash while copying, so verification never has to read src again
+                link_dest, link_manifest = None, None
+                if snapshot_mode != "copy" and active_email:
+                    link_dest, link_manifest = find_previous_snapshot(dest_parent, active_email)
+                    if link_dest:
+                        print(f"Reusing unchanged files from {link_dest} ({snapshot_mode}).")
+                ensure_dir(tmp_parent)
+                copy_manifest = copy_tree(src, tmp_dest, link_dest=link_dest,
+                                          link_manifest=link_manifest, link_mode=snapshot_mode,
+                                          exclude=exclude)
+                phase.files = len(copy_manifest.files)
+                if "linked" in copy_manifest.meta:
+                    print(f"Copied {len(copy_manifest.files) - len(copy_manifest.meta['linked'])} files, "
+                          f"{snapshot_mode}ed {len(copy_manifest.meta['linked'])} unchanged.")
         else:
-            print("DRY RUN: would cp -a ...")
-
-        # 3) Verify copy with diff -r
-        print("[3/4] Verifying copy with diff -r")
-        if not args.dry_run:
-            diff_proc = run(f"diff -r {shlex_quote(src)} {shlex_quote(tmp_dest)}", check=False, capture=True)
-            if diff_proc.returncode != 0:
-                print("Verification FAILED: diff reported differences.")
-                if diff_proc.stdout:
-                    print(diff_proc.stdout)
-                shutil.rmtree(tmp_dest, ignore_errors=True)
-                print("Temporary copy removed. Aborting.")
-                sys.exit(3)
+            print("DRY RUN: would cp -a ..." if mode == "diff" else "DRY RUN: would copy and hash ...")
+
+        # 3) Verify copy
+        phase = metrics.begin("verify")
+        if mode == "diff":
+            print("[3/4] Verifying copy with diff -r")
+            if not args.dry_run:
+                diff_proc = run(f"diff -r {shlex_quote(src)} {shlex_quote(tmp_dest)}", check=False, capture=True)
+                if diff_proc.returncode != 0:
+                    print("Verification FAILED: diff reported differences.")
+                    if diff_proc.stdout:
+                        print(diff_proc.stdout)
+                    shutil.rmtree(tmp_dest, ignore_errors=True)
+                    print("Temporary copy removed. Aborting.")
+                    sys.exit(3)
+                else:
+                    print("Verification OK (no differences).")
             else:
-                print("Verification OK (no differences).")
+                print("DRY RUN: would run diff -r ...")
         else:
-            print("DRY RUN: would run diff -r ...")
+            print("[3/4] Verifying copy against its manifest")
+            if not args.dry_run:
+                # Linked files were verified when the previous snapshot was taken
+                problems = verify_tree(tmp_dest, copy_manifest, verified=copy_manifest.meta.get("linked"),
+                                       exclude=exclude)
+                if problems:
+                    print("Verification FAILED: copy does not match the source manifest.")
+                    report_problems(problems)
+                    shutil.rmtree(tmp_dest, ignore_errors=True)
+                    print("Temporary copy removed. Aborting.")
+                    sys.exit(3)
+                else:
+                    phase.files = len(copy_manifest.files)
+                    print(f"Verification OK ({len(copy_manifest.files)} files).")
+            else:
+                print("DRY RUN: would verify copy against manifest ...")
 
         # 4) Move temporary backup into final timestamped destination
         print(f"[4/4] Installing directory backup: {dest}")
+        metrics.begin("install")
         if not args.dry_run:
             ensure_dir(os.path.dirname(dest))
             # tmp_dest is full copy of src; move it to dest (atomic rename)
             os.replace(tmp_dest, dest)
             print("Directory backup created at:", dest)
-            print("Archive saved at:", archive_path)
+            if copy_manifest is not None:
+                # Lets the next --snapshot-mode hardlink/reflink backup find unchanged files
+                copy_manifest.save(dir_manifest_path_for(dest))
+            if chunked:
+                print("Snapshot saved at:", store.snapshot_path(snapshot_name))
+            elif no_local:
+                print("Archive uploaded as:", os.path.basename(archive_path))
+            else:
+                print("Archive saved at:", archive_path)
 
             # Update stable symlink /root/<email>.gemini -> timestamped dir
             if latest_symlink:
@@ -230,15 +473,33 @@ def perform_backup(args: argparse.Namespace):
             print("DRY RUN: would os.replace(tmp_dest, dest) and update symlink if available")
         
         # --- NEW CODE BLOCK: CLOUD UPLOAD ---
-        if args.cloud:
+        metrics.end()
+        if args.cloud and not no_local:
+            phase = metrics.begin("upload", cloud=True)
             provider = get_cloud_provider(args)
             if provider:
-                # Upload the tar.gz we just created
-                provider.upload_file(archive_path, os.path.basename(archive_path))
+                if chunked:
+                    # Only chunks the bucket doesn't already have are uploaded
+                    uploaded = push_snapshot(store, provider, snapshot_name)
+                    print(f"Uploaded snapshot {snapshot_name} ({uploaded} new chunks).")
+                else:
+                    # Upload the tar.gz we just created, plus its manifest (needed to restore incrementals)
+                    provider.upload_file(archive_path, os.path.basename(archive_path))
+                    sidecar = manifest_path_for(archive_path)
+                    phase.files = 1
+                    if os.path.exists(sidecar):
+                        provider.upload_file(sidecar, os.path.basename(sidecar))
+                        phase.files = 2
+                    recorded = catalog_added(provider, [os.path.basename(archive_path), os.path.basename(sidecar)])
+                    if os.path.basename(archive_path) not in recorded:
+                        # Some providers report a failed upload without raising
+                        print(f"Error: {os.path.basename(archive_path)} is not in the bucket after uploading it.")
+                        sys.exit(1)
             else:
                 print("Error: Cloud backup requested but no valid credentials found.")
                 sys.exit(1)
         # ------------------------------------
+        metrics.end()
 
         print("Backup complete.")
     finally:
@@ -252,16 +513,40 @@ def perform_backup(args: argparse.Namespace):
 def main():
     p = argparse.ArgumentParser(description="Safe timestamped backup for ~/.gemini (name: YYYY-MM-DD_HHMMSS-email.gemini)")
     p.add_argument("--src", default="~/.gemini", help="Source gemini dir (default ~/.gemini)")
-    p.add_argument("--archive-dir", default=DEFAULT_BACKUP_DIR, help="Directory to store tar.gz archives")
+    p.add_argument("--archive-dir", default=DEFAULT_BACKUP_DIR, help="Directory to store backup archives")
     p.add_argument("--dest-dir-parent", default=OLD_CONFIGS_DIR, help="Parent directory where timestamped backups are stored")
     p.add_argument("--dry-run", action="store_true", help="Do not perform destructive actions")
-    p.add_argument("--encrypt", action="store_true", help="Encrypt the backup archive using GPG")
+    p.add_argument("--encrypt", action="store_true", help="Encrypt the backup archive (passphrase from GEMINI_BACKUP_PASSWORD or prompt)")
+    p.add_argument("--engine", choices=["archive", "chunked"], default="archive", help="Backup engine: tar.gz archive (default) or deduplicated chunk repository")
+    p.add_argument("--incremental", action="store_true", help="Archive only files changed since the last backup of this account")
+    p.add_argument("--full-every", type=int, help=f"Take a full backup once the incremental chain reaches this length (default {DEFAULT_FULL_EVERY})")
+    p.add_argument("--verify", choices=VERIFY_MODES, help="Verify the directory copy from a hash manifest built while copying (default) or with diff -r")
+    p.add_argument("--snapshot-mode", choices=LINK_MODES, help="Directory backup: full copy (default), or hardlink/reflink files unchanged since the previous one")
+    p.add_argument("--compression", choices=CODECS, help="Archive codec (default gzip, multi-threaded); zstd/lz4 need the optional packages")
+    p.add_argument("--level", type=int, help="Compression level (gzip 1-9, zstd 1-22, lz4 0-16; default per codec)")
+    p.add_argument("--encryption", choices=ENCRYPTION_MODES, help="With --encrypt: in-process streaming AES-GCM (default, .enc) or gpg (.gpg)")
+    p.add_argument("--exclude", action="append", metavar="PATTERN", help="Leave paths matching this gitignore-style pattern out of the backup (repeatable)")
+    p.add_argument("--exclude-from", action="append", metavar="FILE", help="Read exclude patterns from FILE, one per line (repeatable)")
+    p.add_argument("--no-default-excludes", action="store_true", help="Also back up regenerable runtime data (tmp/bin, tmp/<hash>) skipped by default")
+    p.add_argument("--sources", help="Back up many .gemini dirs concurrently: a glob (e.g. '/home/*/.gemini') or a file listing one path/glob per line")
+    p.add_argument("--jobs", type=int, help="With --sources: how many backups run at once (default min(4, cores))")
+    p.add_argument("--watch", action="store_true", help="Keep running and take an incremental backup whenever ~/.gemini changes (debounced)")
+    p.add_argument("--quiet-period", type=float, help="With --watch: seconds without changes before backing up (default 30)")
+    p.add_argument("--min-interval", type=float, help="With --watch: minimum seconds between two backups (default 300)")
+    p.add_argument("--timings", action="store_true", help="Print wall/CPU time, bytes read/written and file counts per phase")
+    p.add_argument("--metrics-json", metavar="PATH", help="Write per-phase timings and resource counters to PATH as JSON")
     p.add_argument("--cloud", action="store_true", help="Upload backup to Cloud (B2)")
+    p.add_argument("--no-local", action="store_true", help="With --cloud: stream the archive straight to the bucket without keeping a local copy")
     p.add_argument("--bucket", help="B2 Bucket Name")
     p.add_argument("--b2-id", help="B2 Key ID (or set env GEMINI_B2_KEY_ID)")
     p.add_argument("--b2-key", help="B2 App Key (or set env GEMINI_B2_APP_KEY)")
     args = p.parse_args()
-    perform_backup(args)
+    if args.sources:
+        perform_multi_backup(args)
+    elif args.watch:
+        watch_backups(args)
+    else:
+        perform_backup(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/bench.py
+
+"""
+bench.py - `geminiai bench backup`: benchmark the backup/restore pipeline.
+
+Generates a synthetic ~/.gemini tree (file count, size distribution and
+chat-session nesting depth are configurable, with named profiles), then times
+the real commands against it:
+
+    backup         perform_backup (archive + directory snapshot + verification)
+    integrity      perform_integrity_check
+    sync           perform_sync push, into a local-directory provider
+    restore        perform_restore from the local archive
+    restore-cloud  perform_restore --cloud, from the local-directory provider
+
+Every phase runs in its own child process with HOME pointing into the
+benchmark's work directory, so nothing touches the real ~/.gemini, settings,
+locks or cloud credentials, and the child's peak RSS can be read back with
+wait4(). Results can be written as JSON and compared against a baseline run.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+
+from rich.table import Table
+
+from .ui import console
+
+BENCH_EMAIL = "bench@example.com"
+
+PHASES = ("backup", "integrity", "sync", "restore", "restore-cloud")
+
+# Not passed to the phase processes, so they can only ever reach the local-directory bucket
+BUCKET_CREDENTIAL_ENV = ("GEMINI_B2_KEY_ID", "GEMINI_B2_APP_KEY", "GEMINI_B2_BUCKET", "GEMINI_AWS_ACCESS_KEY_ID",
+                         "GEMINI_AWS_SECRET_ACCESS_KEY", "GEMINI_S3_BUCKET", "DOPPLER_TOKEN")
+
+SIZE_DISTRIBUTIONS = ("small", "mixed", "large")
+
+PROFILES: Dict[str, Dict[str, object]] = {
+    "small": {"files": 300, "sizes": "small", "depth": 2},
+    "medium": {"files": 3000, "sizes": "mixed", "depth": 4},
+    "large": {"files": 400, "sizes": "large", "depth": 2},
+    "deep": {"files": 3000, "sizes": "small", "depth": 10},
+}
+DEFAULT_PROFILE = "small"
+
+_WORDS = ("the user model assistant function call result tool gemini session token context "
+          "prompt response code file path error retry stream chunk json text part role "
+          "candidate safety rating history turn system instruction").split()
+
+
+@dataclass
+class TreeStats:
+    files: int = 0
+    dirs: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class PhaseResult:
+    phase: str
+    ok: bool
+    seconds: float
+    peak_rss: int  # bytes
+    mb_per_s: float = 0.0
+    files_per_s: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)  # backup/restore internals (--metrics-json)
+    log: str = ""
+
+
+@dataclass
+class BenchReport:
+    profile: Dict[str, object]
+    tree: TreeStats
+    phases: List[PhaseResult] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "profile": self.profile,
+            "tree": asdict(self.tree),
+            "phases": [{k: v for k, v in asdict(p).items() if k != "log"} for p in self.phases],
+        }
+
+
+def _file_size(rng: random.Random, sizes: str) -> int:
+    if sizes == "small":
+        return rng.randint(200, 8 * 1024)
+    if sizes == "large":
+        return rng.randint(256 * 1024, 4 * 1024 * 1024)
+    # mixed: log-normal, median ~5 KiB with a tail into megabytes, like real chat logs
+    return int(min(16 * 1024 * 1024, max(64, rng.lognormvariate(8.5, 1.6))))
+
+
+def generate_tree(root: str, files: int, sizes: str = "small", depth: int = 2, seed: int = 0,
+                  runtime: bool = True) -> TreeStats:
+    """
+    Write a synthetic .gemini tree at root: account/config files, `files` chat
+    files spread over projects under tmp/ and nested up to `depth` directories,
+    plus (with runtime=True) the regenerable tmp/bin and hash directories.
+    Deterministic for a given seed.
+    """
+    if sizes not in SIZE_DISTRIBUTIONS:
+        raise ValueError(f"Unknown size distribution: {sizes}")
+    rng = random.Random(seed)
+    stats = TreeStats()
+    text = " ".join(rng.choice(_WORDS) for _ in range(40000)).encode()
+    made_dirs = set()
+
+    def write(rel: str, size: int, binary: bool = False):
+        path = os.path.join(root, rel)
+        parent = os.path.dirname(path)
+        if parent not in made_dirs:
+            missing = parent
+            while missing not in made_dirs and not os.path.isdir(missing):
+                made_dirs.add(missing)
+                stats.dirs += 1
+                missing = os.path.dirname(missing)
+            os.makedirs(parent, exist_ok=True)
+            made_dirs.add(parent)
+        with open(path, "wb") as fh:
+            if binary:
+                fh.write(rng.getrandbits(8 * size).to_bytes(size, "little") if size else b"")
+            else:
+                remaining = size
+                while remaining > 0:
+                    start = rng.randrange(len(text) // 2)
+                    piece = text[start:start + min(remaining, len(text) - start)]
+                    fh.write(piece)
+                    remaining -= len(piece)
+        stats.files += 1
+        stats.bytes += size
+
+    os.makedirs(root, exist_ok=True)
+    accounts = json.dumps({"active": BENCH_EMAIL, "old": []}).encode()
+    with open(os.path.join(root, "google_accounts.json"), "wb") as fh:
+        fh.write(accounts)
+    stats.files += 1
+    stats.bytes += len(accounts)
+    write("settings.json", 600)
+    write("oauth_creds.json", 1800)
+
+    projects = max(1, files // 50)
+    for i in range(files):
+        parts = ["tmp", f"project-{i % projects:03d}", "chats"]
+        for level in range(rng.randint(0, max(0, depth - 1))):
+            parts.append(f"session-{level}-{rng.randint(0, 3)}")
+        # A few percent of files are incompressible (pasted images, binary attachments)
+        write("/".join(parts + [f"log-{i:05d}.json"]), _file_size(rng, sizes), binary=rng.random() < 0.05)
+
+    if runtime:
+        write("tmp/bin/rg", 1024 * 1024, binary=True)
+        for _ in range(2):
+            digest = "%064x" % rng.getrandbits(256)
+            for j in range(5):
+                write(f"tmp/{digest}/state-{j}.json", 4096)
+    return stats
+
+
+def _phase_argv(phase: str, options: Dict[str, object]) -> List[str]:
+    if phase == "backup":
+        argv = ["backup"]
+        if options.get("compression"):
+            argv += ["--compression", str(options["compression"])]
+        if options.get("verify"):
+            argv += ["--verify", str(options["verify"])]
+        return argv
+    if phase == "integrity":
+        return ["check-integrity"]
+    if phase == "sync":
+        return ["sync", "push"]
+    if phase == "restore":
+        from .config import DEFAULT_BACKUP_DIR
+        from .restore import find_latest_archive_backup_for_email
+        archive = find_latest_archive_backup_for_email(DEFAULT_BACKUP_DIR, BENCH_EMAIL)
+        return ["restore", "--from-archive", archive or "missing"]
+    if phase == "restore-cloud":
+        return ["restore", "--cloud"]
+    raise ValueError(f"Unknown phase: {phase}")
+
+
+def _child(phase: str, options: Dict[str, object], result_path: str):
+    """Run one phase in this (isolated) process and record its wall time."""
+    from .args import get_parser
+    from .backup import perform_backup
+    from .integrity import perform_integrity_check
+    from .restore import perform_restore
+    from .sync import perform_sync
+
+    argv = _phase_argv(phase, options)
+    if argv[0] in ("backup", "restore"):
+        argv += ["--metrics-json", f"{result_path}.metrics"]
+    args = get_parser().parse_args(argv)
+    start = time.perf_counter()
+    if phase == "backup":
+        perform_backup(args)
+    elif phase == "integrity":
+        perform_integrity_check(args)
+    elif phase == "sync":
+        perform_sync(args.sync_direction, args)
+    else:
+        perform_restore(args)
+    seconds = time.perf_counter() - start
+    with open(result_path, "w", encoding="utf-8") as fh:
+        json.dump({"seconds": seconds}, fh)
+
+
+def _maxrss_bytes(rusage) -> int:
+    # Linux reports KiB, macOS bytes
+    return rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+
+
+def run_phase(phase: str, workdir: str, options: Dict[str, object], tree: TreeStats) -> PhaseResult:
+    home = os.path.join(workdir, "home")
+    result_path = os.path.join(workdir, f"{phase}.result.json")
+    log_path = os.path.join(workdir, "logs", f"{phase}.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    # Real bucket credentials would take precedence over the local-directory bucket
+    env = {k: v for k, v in os.environ.items() if k not in BUCKET_CREDENTIAL_ENV}
+    env["HOME"] = home
+    env["GEMINI_LOCAL_CLOUD_DIR"] = os.path.join(workdir, "cloud")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (package_parent, env.get("PYTHONPATH")) if p)
+    cmd = [sys.executable, "-m", "geminiai_cli.bench", "--child", phase,
+           "--options", json.dumps(options), "--result", result_path]
+
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, cwd=workdir, env=env)
+        # wait4 gives this child's own rusage (RUSAGE_CHILDREN would be a running maximum)
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+
+    seconds = 0.0
+    if proc.returncode == 0 and os.path.exists(result_path):
+        with open(result_path, "r", encoding="utf-8") as fh:
+            seconds = float(json.load(fh)["seconds"])
+    with open(log_path, "r", encoding="utf-8", errors="replace") as fh:
+        log_text = fh.read()
+    stages = {}
+    if os.path.exists(f"{result_path}.metrics"):
+        with open(f"{result_path}.metrics", "r", encoding="utf-8") as fh:
+            stages = {p["name"]: p["wall_seconds"] for p in json.load(fh)["phases"]}
+
+    result = PhaseResult(phase=phase, ok=proc.returncode == 0 and seconds > 0, seconds=seconds,
+                         peak_rss=_maxrss_bytes(rusage), stages=stages, log=log_text)
+    if result.ok:
+        result.mb_per_s = tree.bytes / seconds / 1e6
+        result.files_per_s = tree.files / seconds
+    return result
+
+
+def run_bench(files: int, sizes: str, depth: int, seed: int = 0, phases=PHASES,
+              options: Optional[Dict[str, object]] = None, workdir: Optional[str] = None,
+              keep: bool = False) -> BenchReport:
+    options = dict(options or {})
+    own_workdir = workdir is None
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="gemini-bench-"))
+    try:
+        home = os.path.join(workdir, "home")
+        tree = generate_tree(os.path.join(home, ".gemini"), files, sizes=sizes, depth=depth, seed=seed)
+        report = BenchReport(profile={"files": files, "sizes": sizes, "depth": depth, "seed": seed, **options},
+                             tree=tree)
+        for phase in phases:
+            console.print(f"[cyan]Running {phase}...[/]")
+            result = run_phase(phase, workdir, options, tree)
+            report.phases.append(result)
+            if not result.ok:
+                console.print(f"[bold red]{phase} failed; log tail:[/]")
+                print("\n".join(result.log.splitlines()[-20:]))
+                break
+        return report
+    finally:
+        if own_workdir and not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        elif keep:
+            console.print(f"[dim]Work directory kept at {workdir}[/]")
+
+
+def print_report(report: BenchReport, baseline: Optional[Dict[str, object]] = None):
+    tree = report.tree
+    console.print(f"[bold]Tree:[/] {tree.files} files, {tree.dirs} dirs, {tree.bytes / 1e6:.1f} MB "
+                  f"({report.profile['sizes']} sizes, depth {report.profile['depth']})")
+    base = {p["phase"]: p for p in (baseline or {}).get("phases", [])}
+
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Time", justify="right")
+    table.add_column("MB/s", justify="right")
+    table.add_column("files/s", justify="right")
+    table.add_column("Peak RSS", justify="right")
+    if base:
+        table.add_column("vs baseline", justify="right")
+    for p in report.phases:
+        row = [p.phase,
+               f"{p.seconds:.2f}s" if p.ok else "[bold red]FAILED[/]",
+               f"{p.mb_per_s:.1f}" if p.ok else "-",
+               f"{p.files_per_s:.0f}" if p.ok else "-",
+               f"{p.peak_rss / 1e6:.0f} MB"]
+        if base:
+            old = base.get(p.phase)
+            if p.ok and old and old.get("ok") and old.get("seconds"):
+                change = (p.seconds / old["seconds"] - 1) * 100
+                color = "green" if change <= 0 else "red"
+                row.append(f"[{color}]{change:+.0f}%[/]")
+            else:
+                row.append("-")
+        table.add_row(*row)
+    console.print(table)
+    for p in report.phases:
+        if p.stages:
+            console.print(f"[dim]{p.phase}: " + ", ".join(f"{k} {v:.2f}s" for k, v in p.stages.items()) + "[/]")
+
+
+def do_bench(args):
+    """Entry point for `geminiai bench backup`."""
+    profile = dict(PROFILES[args.profile or DEFAULT_PROFILE])
+    for key in ("files", "sizes", "depth"):
+        if getattr(args, key, None) is not None:
+            profile[key] = getattr(args, key)
+
+    phases = PHASES
+    if getattr(args, "phases", None):
+        phases = tuple(p.strip() for p in args.phases.split(",") if p.strip())
+        unknown = [p for p in phases if p not in PHASES]
+        if unknown:
+            print(f"Error: unknown phase(s) {', '.join(unknown)}; choose from {', '.join(PHASES)}")
+            sys.exit(1)
+
+    baseline = None
+    if getattr(args, "baseline", None):
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+
+    options = {k: getattr(args, k) for k in ("compression", "verify") if getattr(args, k, None)}
+    report = run_bench(profile["files"], profile["sizes"], profile["depth"], seed=args.seed or 0,
+                       phases=phases, options=options, workdir=getattr(args, "workdir", None),
+                       keep=getattr(args, "keep", False))
+    print_report(report, baseline)
+
+    if getattr(args, "json", None):
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report.to_dict(), fh, indent=2)
+        print(f"Results written to {args.json}")
+    if not all(p.ok for p in report.phases):
+        sys.exit(1)
+
+
+def add_bench_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--profile", choices=sorted(PROFILES), help=f"Tree shape preset (default {DEFAULT_PROFILE})")
+    parser.add_argument("--files", type=int, help="Number of chat files (overrides the profile)")
+    parser.add_argument("--sizes", choices=SIZE_DISTRIBUTIONS, help="File size distribution (overrides the profile)")
+    parser.add_argument("--depth", type=int, help="Max chat-session nesting depth (overrides the profile)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated tree")
+    parser.add_argument("--phases", help=f"Comma-separated subset of: {', '.join(PHASES)}")
+    parser.add_argument("--compression", choices=["gzip", "zstd", "lz4", "none"], help="Passed to backup")
+    parser.add_argument("--verify", choices=["manifest", "diff"], help="Passed to backup")
+    parser.add_argument("--workdir", help="Work directory (default: a temporary one, removed afterwards)")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the backup/restore pipeline")
+    p.add_argument("--child", choices=PHASES, help=argparse.SUPPRESS)
+    p.add_argument("--options", default="{}", help=argparse.SUPPRESS)
+    p.add_argument("--result", help=argparse.SUPPRESS)
+    add_bench_arguments(p)
+    args = p.parse_args()
+    if args.child:
+        _child(args.child, json.loads(args.options), args.result)
+    else:
+        do_bench(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/catalog.py
+
+"""
+catalog.py - Backup catalog object kept in the bucket.
+
+Listing a bucket of thousands of archives takes seconds and is billed per
+call. Instead the bucket holds gemini-catalog.json, one entry per backup
+archive and per manifest sidecar:
+
+    {"kind": "gemini-backup-catalog", "version": 1, "listed": <time of the last full listing>,
+     "entries": {"<name>": {"email", "timestamp", "size", "checksum", "last_modified"}}}
+
+`restore --cloud`, `sync`, `slots refresh --cloud`, `list-backups --cloud`,
+`prune --cloud` and prefetching read it with a single GET. Uploads and
+deletes made by this tool update it (each new object's entry comes from a
+metadata request for that one object). A bucket without a readable catalog is
+listed once in full and the catalog written from that; `list-backups --cloud
+--refresh-catalog` does the same after the bucket was changed by other means.
+
+Objects written by other tools or older versions are not in the catalog. An
+archive asked for by name is looked up directly when the catalog lacks it,
+a catalog whose last full listing is older than CATALOG_MAX_AGE is rebuilt,
+and `prune --cloud` always lists before deleting anything.
+"""
+from __future__ import annotations
+import json
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .cloud_storage import CloudFile
+from .compression import is_archive_name, strip_archive_suffix
+from .config import TIMESTAMPED_DIR_REGEX, NEON_YELLOW
+from .manifest import MANIFEST_SUFFIX
+from .ui import cprint
+
+CATALOG_NAME = "gemini-catalog.json"
+CATALOG_KIND = "gemini-backup-catalog"
+CATALOG_VERSION = 1
+# Save-and-read-back rounds before giving up on a catalog other runs keep rewriting
+CATALOG_WRITE_ATTEMPTS = 3
+# Seconds after a full listing before the bucket is listed again to pick up objects made behind our back
+CATALOG_MAX_AGE = 24 * 3600
+
+
+def is_catalog_name(name: str) -> bool:
+    """Backup archives and their manifest sidecars are catalogued."""
+    if name.endswith(MANIFEST_SUFFIX):
+        name = name[:-len(MANIFEST_SUFFIX)]
+    return is_archive_name(name, encrypted=True)
+
+
+def _entry(f: CloudFile) -> dict:
+    name = f.name[:-len(MANIFEST_SUFFIX)] if f.name.endswith(MANIFEST_SUFFIX) else f.name
+    m = TIMESTAMPED_DIR_REGEX.match(name)
+    base = (strip_archive_suffix(name[18:]) if m else None) or ""
+    last_modified = f.last_modified
+    if hasattr(last_modified, "timestamp"):
+        last_modified = last_modified.timestamp()
+    return {
+        "email": base[:-len(".gemini")] if base.endswith(".gemini") else None,
+        "timestamp": m.group(1) if m else None,
+        "size": f.size,
+        "checksum": f.checksum,
+        "last_modified": last_modified,
+    }
+
+
+def _read_catalog(provider) -> Optional[dict]:
+    try:
+        text = provider.download_to_string(CATALOG_NAME)
+        data = json.loads(text) if isinstance(text, str) else None
+    except Exception:
+        return None
+    if not isinstance(data, dict) or data.get("kind") != CATALOG_KIND or data.get("version") != CATALOG_VERSION:
+        return None
+    return data if isinstance(data.get("entries"), dict) else None
+
+
+def load_catalog(provider) -> Optional[Dict[str, dict]]:
+    """The catalog's entries, or None when the bucket has no readable catalog."""
+    data = _read_catalog(provider)
+    return data["entries"] if data is not None else None
+
+
+def save_catalog(provider, entries: Dict[str, dict], listed: Optional[float] = None):
+    """Write the catalog; listed is when its entries were last taken from a full listing (default: now)."""
+    now = time.time()
+    provider.upload_string(json.dumps({"kind": CATALOG_KIND, "version": CATALOG_VERSION, "updated": now,
+                                       "listed": now if listed is None else listed, "entries": entries},
+                                      sort_keys=True, separators=(",", ":")),
+                           CATALOG_NAME)
+
+
+def _listed_entries(provider) -> Dict[str, dict]:
+    return {f.name: _entry(f) for f in provider.list_files() if is_catalog_name(f.name)}
+
+
+def rebuild_catalog(provider) -> Dict[str, dict]:
+    """List the whole bucket and write the catalog from it."""
+    entries = _listed_entries(provider)
+    # An empty listing may be a failed one: never let it hide the bucket's backups
+    if entries:
+        save_catalog(provider, entries)
+    return entries
+
+
+def _stale(data: dict) -> bool:
+    listed = data.get("listed")
+    return not isinstance(listed, (int, float)) or time.time() - listed > CATALOG_MAX_AGE
+
+
+def cloud_backups(provider, names: Iterable[str] = ()) -> List[CloudFile]:
+    """
+    Backup archives and sidecars in the bucket, from the catalog (built first
+    if missing or stale). names are archives the caller asks for explicitly:
+    ones the catalog lacks are looked up directly and added to it.
+    """
+    data = _read_catalog(provider)
+    entries = data["entries"] if data is not None and not _stale(data) else None
+    if entries is None:
+        entries = _listed_entries(provider)
+        if entries:
+            try:
+                save_catalog(provider, entries)
+            except Exception as e:
+                # The caller only needs the listing; the catalog is written next time
+                cprint(NEON_YELLOW, f"[WARN] Could not write the backup catalog: {e}")
+    else:
+        missing = [name for name in names if name not in entries and is_catalog_name(name)]
+        missing += [f"{name}{MANIFEST_SUFFIX}" for name in missing]
+        found = _look_up(provider, missing)
+        if found:
+            entries.update(found)
+            try:
+                _update_catalog(provider, found, ())
+            except Exception as e:
+                cprint(NEON_YELLOW, f"[WARN] Could not update the backup catalog: {e}")
+    return [CloudFile(name, e.get("size"), e.get("last_modified"), e.get("checksum"))
+            for name, e in sorted(entries.items())]
+
+
+def _look_up(provider, names: Iterable[str]) -> Dict[str, dict]:
+    """Entries for those of names that exist, one metadata request each."""
+    found = {}
+    for name in names:
+        f = provider.file_info(name)
+        if f is not None:
+            found[name] = _entry(f)
+    return found
+
+
+def _update_catalog(provider, added: Dict[str, dict], removed: Iterable[str]):
+    """
+    Apply this run's changes to the catalog. Buckets have no conditional
+    writes, so another run saving between our read and our write would drop
+    our changes: read back after saving and merge again until they stuck.
+    """
+    removed = set(removed)
+    for _ in range(CATALOG_WRITE_ATTEMPTS):
+        data = _read_catalog(provider)
+        if data is None:
+            rebuild_catalog(provider)
+            return
+        entries = data["entries"]
+        entries.update(added)
+        for name in removed:
+            entries.pop(name, None)
+        # Our own changes do not make up for a listing: keep its time
+        save_catalog(provider, entries, listed=data.get("listed", 0))
+        current = load_catalog(provider) or {}
+        if all(current.get(name) == entry for name, entry in added.items()) and not removed & set(current):
+            return
+    cprint(NEON_YELLOW, "[WARN] The backup catalog kept changing underneath; "
+                        "run `list-backups --cloud --refresh-catalog` to rebuild it.")
+
+
+def catalog_added(provider, names: Iterable[str]) -> List[str]:
+    """
+    Record objects this tool just uploaded. Each is looked up on its own
+    first; returns the names actually found in the bucket (an upload that
+    failed quietly is not recorded).
+    """
+    added = _look_up(provider, names)
+    if added:
+        _update_catalog(provider, added, ())
+    return list(added)
+
+
+def catalog_removed(provider, names: Iterable[str]):
+    """Record objects this tool just deleted."""
+    _update_catalog(provider, {}, names)
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/chunkstore.py
+
+"""
+chunkstore.py - Content-addressed, deduplicating chunk repository for backups.
+
+Used by `backup --engine chunked` / `restore --engine chunked`.  Files are cut
+into variable-size chunks with a gear rolling hash (content-defined chunking,
+as in restic/borg), so an edit in the middle of a file only produces new
+chunks around the edit.  Each unique chunk is stored once, zlib-compressed and
+named by the SHA-256 of its plaintext.
+
+Repository layout (default: ~/.geminiai-cli/chunks):
+  objects/ab/ab12...ef          one file per unique chunk
+  snapshots/<ts>-<email>.gemini.snapshot.json
+
+The same layout is mirrored in the cloud bucket under "chunks/"; pushing a
+snapshot only uploads the chunks the bucket does not have yet.  `prune
+--cloud` forgets old cloud snapshots and sweeps the bucket's chunks that no
+remaining snapshot references.
+"""
+from __future__ import annotations
+import fcntl
+import hashlib
+import json
+import os
+import random
+import re
+import stat
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Any, Set
+
+from .config import CHUNK_REPO_DIR, TIMESTAMPED_DIR_REGEX
+from .manifest import Manifest, FileEntry, walk_tree
+
+SNAPSHOT_SUFFIX = ".snapshot.json"
+CLOUD_CHUNK_PREFIX = "chunks/"
+
+# Chunk size bounds. Average is ~16 KiB (14-bit mask); files below MIN_CHUNK
+# are stored as a single chunk without running the rolling hash at all.
+MIN_CHUNK = 4 * 1024
+AVG_MASK = (1 << 14) - 1
+MAX_CHUNK = 64 * 1024
+READ_SIZE = 1024 * 1024
+# Bytes hashed per step when looking for a cut point
+CUT_BLOCK = 4096
+# Cloud chunks younger than this are never swept: a push uploads its chunks before its snapshot
+CLOUD_GC_GRACE = 6 * 3600
+
+_CHUNK_ID = re.compile(r"[0-9a-f]{64}")
+
+
+def _gear_table() -> List[int]:
+    # Fixed seed: chunk boundaries must be identical across runs and hosts,
+    # otherwise nothing would ever deduplicate.
+    rnd = random.Random(0x67656D69)
+    return [rnd.getrandbits(32) for _ in range(256)]
+
+
+GEAR = _gear_table()
+
+# The cut test only looks at the low bits of h = (h << 1) + GEAR[byte], and
+# those depend on the last WINDOW bytes alone (byte i-j enters shifted left by
+# j). So a block of positions is hashed at once with big-int arithmetic, one
+# 32-bit lane per byte, instead of a Python loop per byte; the cut points are
+# exactly those of that loop.
+WINDOW = AVG_MASK.bit_length()
+_GEAR_LO = bytes(g & 0xFF for g in GEAR)
+_GEAR_HI = bytes((g >> 8) & (AVG_MASK >> 8) for g in GEAR)
+_MASK_HI = bytes(b & (AVG_MASK >> 8) for b in range(256))
+
+
+def _block_hits(window: bytes, skip: int) -> bytes:
+    """One byte per position of window[skip:], zero where the gear hash of that position is a cut."""
+    n = len(window)
+    lanes = bytearray(4 * n)
+    lanes[0::4] = window.translate(_GEAR_LO)
+    lanes[1::4] = window.translate(_GEAR_HI)
+    x = int.from_bytes(lanes, "little")
+    # Sum lane i-j shifted by j bits into lane i, for j < WINDOW (= 14 = 8 + 4 + 2)
+    h2 = x + (x << 33)
+    h4 = h2 + (h2 << 66)
+    h8 = h4 + (h4 << 132)
+    h = (h8 + ((h4 + (h2 << 132)) << 264)).to_bytes(4 * (n + WINDOW), "little")
+    hits = int.from_bytes(h[4 * skip:4 * n:4], "little") | \
+        int.from_bytes(h[4 * skip + 1:4 * n:4].translate(_MASK_HI), "little")
+    return hits.to_bytes(n - skip, "little")
+
+
+def _find_cut(data: bytes, start: int, end: int) -> int:
+    """Return the end offset of the chunk starting at start, never past end."""
+    if end - start <= MIN_CHUNK:
+        return end
+    limit = min(end, start + MAX_CHUNK)
+    # Bytes before MIN_CHUNK can never be a cut point, so don't hash them
+    first = pos = start + MIN_CHUNK
+    while pos < limit:
+        stop = min(limit, pos + CUT_BLOCK)
+        # The bytes before pos that are still in its window (none before first: the hash starts there)
+        back = min(WINDOW - 1, pos - first)
+        i = _block_hits(data[pos - back:stop], back).find(0)
+        if i >= 0:
+            return pos + i + 1
+        pos = stop
+    return limit
+
+
+def iter_chunks(fh) -> Iterator[bytes]:
+    """Yield content-defined chunks of a binary file object."""
+    buf = b""
+    pos = 0
+    eof = False
+    while True:
+        # Keep at least MAX_CHUNK bytes ahead so a cut is never decided on partial data
+        if not eof and len(buf) - pos < MAX_CHUNK:
+            data = fh.read(READ_SIZE)
+            if data:
+                buf = buf[pos:] + data
+                pos = 0
+                continue
+            eof = True
+        if pos >= len(buf):
+            return
+        cut = _find_cut(buf, pos, len(buf))
+        yield buf[pos:cut]
+        pos = cut
+
+
+def _snapshot_rel(name: str, rel: str) -> str:
+    """A path from snapshot `name`, refusing anything that would land outside the restore target."""
+    norm = os.path.normpath(rel) if rel else ""
+    if not norm or os.path.isabs(norm) or norm == "." or norm == ".." or norm.startswith("../"):
+        raise RuntimeError(f"Refusing to restore '{rel}' from snapshot {name}: path leaves the target")
+    return norm
+
+
+def snapshot_name_for(dest_basename: str) -> str:
+    """<ts>-<email>.gemini -> <ts>-<email>.gemini.snapshot.json"""
+    return f"{dest_basename}{SNAPSHOT_SUFFIX}"
+
+
+def snapshot_base_name(name: str) -> Optional[str]:
+    """Strip the snapshot suffix; returns None if name is not a valid snapshot name."""
+    if not name.endswith(SNAPSHOT_SUFFIX):
+        return None
+    base = name[:-len(SNAPSHOT_SUFFIX)]
+    if not TIMESTAMPED_DIR_REGEX.match(base) or not base.endswith(".gemini"):
+        return None
+    return base
+
+
+def snapshot_email(name: str) -> Optional[str]:
+    base = snapshot_base_name(name)
+    if not base or len(base) <= 18:
+        return None
+    return base[18:-len(".gemini")]
+
+
+@dataclass
+class SnapshotStats:
+    files: int = 0
+    bytes: int = 0
+    reused_files: int = 0
+    chunks: int = 0
+    new_chunks: int = 0
+    new_bytes: int = 0
+
+
+class ChunkStore:
+    def __init__(self, root: str = CHUNK_REPO_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+
+    # --- chunks -------------------------------------------------------------
+
+    def chunk_relpath(self, cid: str) -> str:
+        # Chunk ids come from snapshot files, which may have been pulled from a bucket
+        if not isinstance(cid, str) or not _CHUNK_ID.fullmatch(cid):
+            raise RuntimeError(f"Invalid chunk id {cid!r}")
+        return f"objects/{cid[:2]}/{cid}"
+
+    def chunk_path(self, cid: str) -> str:
+        return os.path.join(self.root, self.chunk_relpath(cid))
+
+    def has_chunk(self, cid: str) -> bool:
+        return os.path.exists(self.chunk_path(cid))
+
+    def put_chunk(self, data: bytes) -> tuple:
+        """Store data if new. Returns (chunk_id, was_new)."""
+        cid = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(cid)
+        if os.path.exists(path):
+            return cid, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A private temp name per write: parallel backups into one store may write the same chunk
+        fd, tmp = tempfile.mkstemp(prefix=f".{cid}.", suffix=".part", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(zlib.compress(data, 6))
+            if os.path.exists(path):
+                # Another writer stored it meanwhile; the content is the same
+                return cid, False
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return cid, True
+
+    def get_chunk(self, cid: str) -> bytes:
+        with open(self.chunk_path(cid), "rb") as fh:
+            data = zlib.decompress(fh.read())
+        if hashlib.sha256(data).hexdigest() != cid:
+            raise ValueError(f"Chunk {cid} is corrupt")
+        return data
+
+    def all_chunk_ids(self) -> Set[str]:
+        ids = set()
+        if not os.path.isdir(self.objects_dir):
+            return ids
+        for prefix in os.listdir(self.objects_dir):
+            for name in os.listdir(os.path.join(self.objects_dir, prefix)):
+                if not name.endswith(".part"):
+                    ids.add(name)
+        return ids
+
+    @contextmanager
+    def locked(self, exclusive: bool = False):
+        """
+        Store lock: shared while chunks are added or read, exclusive for gc, so
+        gc never deletes a chunk that a running backup or pull is about to reference.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "w") as lockfh:
+            fcntl.flock(lockfh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockfh, fcntl.LOCK_UN)
+
+    # --- snapshots ----------------------------------------------------------
+
+    def snapshot_path(self, name: str) -> str:
+        return os.path.join(self.snapshots_dir, name)
+
+    def list_snapshots(self) -> List[str]:
+        """Valid snapshot names, oldest first (names sort by timestamp)."""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(n for n in os.listdir(self.snapshots_dir) if snapshot_base_name(n))
+
+    def latest_snapshot_for_email(self, email: str) -> Optional[str]:
+        matches = [n for n in self.list_snapshots() if snapshot_email(n) == email]
+        return matches[-1] if matches else None
+
+    def load_snapshot(self, name: str) -> Dict[str, Any]:
+        with open(self.snapshot_path(name), "r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def save_snapshot(self, name: str, snapshot: Dict[str, Any]):
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        path = self.snapshot_path(name)
+        tmp = f"{path}.part"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(snapshot, fh, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def backup(self, src: str, name: str, parent: Optional[str] = None, exclude=None) -> tuple:
+        """
+        Store src as snapshot `name`. Files whose (size, mtime) match the parent
+        snapshot reuse its chunk list without being read. Paths matched by
+        exclude (an exclude.ExcludeMatcher) are left out.
+        Returns (snapshot_dict, SnapshotStats).
+        """
+        parent_files: Dict[str, Any] = {}
+        if parent:
+            try:
+                parent_files = self.load_snapshot(parent).get("files", {})
+            except (OSError, ValueError):
+                parent_files = {}
+
+        stats = SnapshotStats()
+        dirs: Dict[str, int] = {}
+        symlinks: Dict[str, str] = {}
+        files: Dict[str, Any] = {}
+
+        for item in walk_tree(src, exclude=exclude):
+            mode = stat.S_IMODE(item.st.st_mode)
+            if item.is_dir:
+                dirs[item.path] = mode
+                continue
+            if item.is_symlink:
+                symlinks[item.path] = os.readlink(item.full_path)
+                continue
+            if not item.is_file:
+                continue
+
+            stats.files += 1
+            stats.bytes += item.st.st_size
+            prev = parent_files.get(item.path)
+            if (prev and prev["size"] == item.st.st_size and prev["mtime_ns"] == item.st.st_mtime_ns
+                    and all(self.has_chunk(c) for c in prev["chunks"])):
+                files[item.path] = dict(prev, mode=mode)
+                stats.reused_files += 1
+                stats.chunks += len(prev["chunks"])
+                continue
+
+            h = hashlib.sha256()
+            chunk_ids = []
+            try:
+                with open(item.full_path, "rb") as fh:
+                    for chunk in iter_chunks(fh):
+                        h.update(chunk)
+                        cid, new = self.put_chunk(chunk)
+                        chunk_ids.append(cid)
+                        stats.chunks += 1
+                        if new:
+                            stats.new_chunks += 1
+                            stats.new_bytes += len(chunk)
+            except FileNotFoundError:
+                stats.files -= 1
+                stats.bytes -= item.st.st_size
+                continue
+
+            files[item.path] = {
+                "size": item.st.st_size,
+                "mtime_ns": item.st.st_mtime_ns,
+                "sha256": h.hexdigest(),
+                "mode": mode,
+                "chunks": chunk_ids,
+            }
+
+        snapshot = {
+            "version": 1,
+            "name": name,
+            "parent": parent,
+            "dirs": dirs,
+            "symlinks": symlinks,
+            "files": files,
+        }
+        self.save_snapshot(name, snapshot)
+        return snapshot, stats
+
+    def snapshot_manifest(self, snapshot: Dict[str, Any]) -> Manifest:
+        return Manifest(files={
+            p: FileEntry(size=f["size"], mtime_ns=f["mtime_ns"], sha256=f["sha256"])
+            for p, f in snapshot.get("files", {}).items()
+        }, meta={"snapshot": snapshot.get("name")})
+
+    def restore(self, name: str, dest: str, select: Optional[Callable[[str, bool], bool]] = None) -> Manifest:
+        """
+        Materialize snapshot `name` into dest (created if needed), verifying every
+        file hash. With select(rel_path, is_dir) only the paths it accepts are written.
+        """
+        snapshot = self.load_snapshot(name)
+        if select is not None:
+            snapshot = dict(snapshot,
+                            dirs={r: m for r, m in snapshot.get("dirs", {}).items() if select(r, True)},
+                            files={r: f for r, f in snapshot.get("files", {}).items() if select(r, False)},
+                            symlinks={r: t for r, t in snapshot.get("symlinks", {}).items() if select(r, False)})
+        # Every path is checked before anything is written
+        for kind in ("dirs", "files", "symlinks"):
+            snapshot[kind] = {_snapshot_rel(name, rel): v for rel, v in snapshot.get(kind, {}).items()}
+        os.makedirs(dest, exist_ok=True)
+
+        for rel in sorted(snapshot.get("dirs", {})):
+            os.makedirs(os.path.join(dest, rel), exist_ok=True)
+
+        for rel, meta in snapshot.get("files", {}).items():
+            path = os.path.join(dest, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            h = hashlib.sha256()
+            with open(path, "wb") as out:
+                for cid in meta["chunks"]:
+                    data = self.get_chunk(cid)
+                    h.update(data)
+                    out.write(data)
+            if h.hexdigest() != meta["sha256"]:
+                raise ValueError(f"Restored file {rel} does not match snapshot hash")
+            os.chmod(path, meta.get("mode", 0o644))
+            os.utime(path, ns=(meta["mtime_ns"], meta["mtime_ns"]))
+
+        for rel, target in snapshot.get("symlinks", {}).items():
+            path = os.path.join(dest, rel)
+            if os.path.lexists(path):
+                os.remove(path)
+            os.symlink(target, path)
+
+        # Directory modes last, so read-only dirs don't block writing their contents
+        for rel, mode in snapshot.get("dirs", {}).items():
+            os.chmod(os.path.join(dest, rel), mode)
+
+        return self.snapshot_manifest(snapshot)
+
+    # --- housekeeping -------------------------------------------------------
+
+    def forget(self, name: str):
+        path = self.snapshot_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def gc(self) -> int:
+        """Delete chunks no longer referenced by any snapshot. Returns the number removed."""
+        with self.locked(exclusive=True):
+            referenced: Set[str] = set()
+            for name in self.list_snapshots():
+                try:
+                    for meta in self.load_snapshot(name).get("files", {}).values():
+                        referenced.update(meta["chunks"])
+                except (OSError, ValueError):
+                    # An unreadable snapshot could reference anything; don't risk deleting
+                    return 0
+            removed = 0
+            for cid in self.all_chunk_ids() - referenced:
+                if _CHUNK_ID.fullmatch(cid):
+                    os.remove(self.chunk_path(cid))
+                    removed += 1
+            return removed
+
+
+def push_snapshot(store: ChunkStore, provider, name: str) -> int:
+    """
+    Upload snapshot `name` and any of its chunks missing from the bucket.
+    The snapshot object is uploaded last so a partial push is never visible.
+    Returns the number of chunks uploaded.
+    """
+    snapshot = store.load_snapshot(name)
+    remote = {f.name for f in provider.iter_files(prefix=f"{CLOUD_CHUNK_PREFIX}objects/")}
+    needed = []
+    for meta in snapshot.get("files", {}).values():
+        needed.extend(meta["chunks"])
+
+    uploaded = 0
+    for cid in dict.fromkeys(needed):
+        rel = store.chunk_relpath(cid)
+        if f"{CLOUD_CHUNK_PREFIX}{rel}" in remote:
+            continue
+        provider.upload_file(store.chunk_path(cid), f"{CLOUD_CHUNK_PREFIX}{rel}")
+        uploaded += 1
+
+    provider.upload_file(store.snapshot_path(name), f"{CLOUD_CHUNK_PREFIX}snapshots/{name}")
+    return uploaded
+
+
+def list_cloud_snapshots(provider) -> List[str]:
+    prefix = f"{CLOUD_CHUNK_PREFIX}snapshots/"
+    names = []
+    for f in provider.iter_files(prefix=prefix):
+        name = f.name[len(prefix):]
+        if snapshot_base_name(name):
+            names.append(name)
+    return sorted(names)
+
+
+def forget_cloud_snapshot(provider, name: str):
+    if not snapshot_base_name(name):
+        raise RuntimeError(f"Invalid snapshot name {name!r}")
+    provider.delete_file(f"{CLOUD_CHUNK_PREFIX}snapshots/{name}")
+
+
+def gc_cloud(provider, grace: float = CLOUD_GC_GRACE) -> int:
+    """
+    Delete the bucket's chunks that no cloud snapshot references. Chunks
+    uploaded within `grace` seconds are kept, as they may belong to a push
+    whose snapshot is not uploaded yet. Returns the number removed.
+    """
+    referenced: Set[str] = set()
+    for name in list_cloud_snapshots(provider):
+        try:
+            snapshot = json.loads(provider.download_to_string(f"{CLOUD_CHUNK_PREFIX}snapshots/{name}") or "")
+            for meta in snapshot.get("files", {}).values():
+                referenced.update(meta["chunks"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # An unreadable snapshot could reference anything; don't risk deleting
+            return 0
+
+    now = time.time()
+    unreferenced = []
+    for f in provider.iter_files(prefix=f"{CLOUD_CHUNK_PREFIX}objects/"):
+        cid = f.name.rsplit("/", 1)[-1]
+        uploaded = f.last_modified.timestamp() if hasattr(f.last_modified, "timestamp") else f.last_modified
+        if (_CHUNK_ID.fullmatch(cid) and cid not in referenced
+                and isinstance(uploaded, (int, float)) and now - uploaded >= grace):
+            unreferenced.append(f.name)
+    for remote in unreferenced:
+        provider.delete_file(remote)
+    return len(unreferenced)
+
+
+def _pull_chunk(store: ChunkStore, provider, cid: str):
+    """Download one chunk next to its final path and move it into place only once its content hash checks out."""
+    path = store.chunk_path(cid)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{cid}.", suffix=".part", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        provider.download_file(f"{CLOUD_CHUNK_PREFIX}{store.chunk_relpath(cid)}", tmp)
+        with open(tmp, "rb") as fh:
+            try:
+                data = zlib.decompress(fh.read())
+            except zlib.error:
+                data = None
+        if data is None or hashlib.sha256(data).hexdigest() != cid:
+            raise RuntimeError(f"Chunk {cid} downloaded from the cloud is corrupt")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def pull_snapshot(store: ChunkStore, provider, name: str) -> int:
+    """
+    Download snapshot `name` and whichever of its chunks are not in the local
+    store. Each chunk is verified against its id before it enters the store.
+    """
+    if not snapshot_base_name(name):
+        raise RuntimeError(f"Invalid snapshot name {name!r}")
+    os.makedirs(store.snapshots_dir, exist_ok=True)
+    with store.locked():
+        provider.download_file(f"{CLOUD_CHUNK_PREFIX}snapshots/{name}", store.snapshot_path(name))
+        snapshot = store.load_snapshot(name)
+
+        fetched = 0
+        for meta in snapshot.get("files", {}).values():
+            for cid in meta["chunks"]:
+                if store.has_chunk(cid):
+                    continue
+                _pull_chunk(store, provider, cid)
+                fetched += 1
+    return fetched
@@ -23,11 +23,16 @@ from .config import (
     CHAT_HISTORY_BACKUP_PATH
 )
 from .backup import perform_backup
+from .watch import watch_backups
+from .multi_backup import perform_multi_backup
 from .restore import perform_restore
 from .integrity import perform_integrity_check
-from .list_backups import perform_list_backups
+from .list_backups import perform_list_backups, perform_archive_listing
 from .check_b2 import perform_check_b2
 from .sync import perform_sync
+from .bench import do_bench
+from .slots import do_slots
+from .prefetch import start_prefetch
 from .chat import backup_chat_history, restore_chat_history, cleanup_chat_history, resume_chat
 
 def main():
@@ -40,9 +45,17 @@ def main():
     args = parser.parse_args()
 
     if args.command == "backup":
-        perform_backup(args)
+        if getattr(args, "backup_action", None) == "ls":
+            perform_archive_listing(args)
+        elif getattr(args, "sources", None):
+            perform_multi_backup(args)
+        elif getattr(args, "watch", False):
+            watch_backups(args)
+        else:
+            perform_backup(args)
     elif args.command == "restore":
         perform_restore(args)
+        start_prefetch(args)
     elif args.command == "chat":
         if args.chat_command == "backup":
             backup_chat_history(CHAT_HISTORY_BACKUP_PATH, DEFAULT_GEMINI_HOME)
@@ -79,10 +92,19 @@ def main():
             do_remove_account(args.remove[0], args)
         else:
             do_cooldown_list(args)
+            start_prefetch(args)
     elif args.command == "recommend" or args.command == "next":
         do_recommend(args)
+        start_prefetch(args)
     elif args.command == "stats" or args.command == "usage":
         do_stats(args)
+    elif args.command == "slots":
+        do_slots(args)
+    elif args.command == "bench":
+        if args.bench_command == "backup":
+            do_bench(args)
+        else:
+            parser.parse_args(["bench", "--help"])
     elif args.command == "resets":
         if not handle_resets_command(args):
             # We need to print help for the resets command.
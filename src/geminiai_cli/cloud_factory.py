@@ -1,13 +1,45 @@
 import os
+import threading
+from typing import Dict, Tuple
 from .b2 import B2Manager
 from .cloud_s3 import S3Provider
+from .cloud_local import LocalProvider
 from .ui import console
 from .credentials import resolve_credentials # <--- ADD THIS IMPORT
+from .cloud_storage import CloudStorageProvider
+
+# One authorized client per (backend, credentials, bucket) for the life of the process
+_PROVIDERS: Dict[Tuple, CloudStorageProvider] = {}
+_PROVIDERS_LOCK = threading.Lock()
+
+
+def shared_provider(backend, *params) -> CloudStorageProvider:
+    """
+    The process's provider for backend(*params), constructed (and so
+    authorized) on first use. Every module asking for the same bucket with
+    the same credentials gets the same client and its connection pool.
+    """
+    key = (backend,) + params
+    with _PROVIDERS_LOCK:
+        provider = _PROVIDERS.get(key)
+        if provider is None:
+            provider = backend(*params)
+            _PROVIDERS[key] = provider
+    return provider
+
+
+def clear_providers():
+    """Forget the shared providers (the next use authorizes again)."""
+    with _PROVIDERS_LOCK:
+        _PROVIDERS.clear()
 
 def get_cloud_provider(args):
     """
     Factory to return the appropriate cloud provider based on args/config.
     """
+    # A local directory "bucket" (benchmarks, NAS mounts) is only used when no real bucket is configured
+    local_dir = os.environ.get("GEMINI_LOCAL_CLOUD_DIR")
+
     # S3
     s3_key = os.environ.get("GEMINI_AWS_ACCESS_KEY_ID")
     s3_secret = os.environ.get("GEMINI_AWS_SECRET_ACCESS_KEY")
@@ -19,11 +51,18 @@ def get_cloud_provider(args):
 
     # If B2 credentials were resolved, return B2Manager
     if b2_id and b2_key and b2_bucket:
-        return B2Manager(b2_id, b2_key, b2_bucket)
+        if local_dir:
+            console.print("[yellow]GEMINI_LOCAL_CLOUD_DIR is ignored: B2 credentials are configured.[/]")
+        return shared_provider(B2Manager, b2_id, b2_key, b2_bucket)
 
     # If S3 env vars exist -> S3 (keeping this logic for now)
     if s3_key and s3_secret and s3_bucket:
-        return S3Provider(s3_bucket, s3_key, s3_secret, s3_region)
+        if local_dir:
+            console.print("[yellow]GEMINI_LOCAL_CLOUD_DIR is ignored: S3 credentials are configured.[/]")
+        return shared_provider(S3Provider, s3_bucket, s3_key, s3_secret, s3_region)
+
+    if local_dir:
+        return shared_provider(LocalProvider, local_dir)
 
     console.print("[yellow]No valid cloud credentials found. Please configure B2 or S3.[/]")
     return None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/cloud_local.py
+
+"""
+cloud_local.py - CloudStorageProvider backed by a local directory.
+
+Objects are plain files under `root` (remote paths map to relative paths).
+Used by the benchmark suite so sync/cloud restore can be timed without a
+network, and usable as a "bucket" on a mounted NAS via GEMINI_LOCAL_CLOUD_DIR.
+Writes go to a private .part file and are renamed into place, like a real
+object store an object only becomes visible once it is complete.
+"""
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+
+from .cloud_storage import CloudStorageProvider, CloudFile
+
+PART_SUFFIX = ".part"
+
+
+class _LocalUpload:
+    """Streaming writer for LocalProvider: a .part file renamed over the object on close."""
+
+    def __init__(self, path: str):
+        self._path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A private temp name per upload: two uploads of one object must not share a file
+        fd, self._tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=PART_SUFFIX,
+                                         dir=os.path.dirname(path))
+        self._fh = os.fdopen(fd, "wb")
+        self.closed = False
+
+    def write(self, data) -> int:
+        return self._fh.write(data)
+
+    def flush(self):
+        self._fh.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._fh.close()
+        os.replace(self._tmp, self._path)
+
+    def abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._fh.close()
+        os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class LocalProvider(CloudStorageProvider):
+    def __init__(self, root: str):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.bucket_name = self.root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, remote_path: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, remote_path.lstrip("/")))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise ValueError(f"Remote path escapes the bucket: {remote_path}")
+        return path
+
+    def upload_file(self, local_path: str, remote_path: str):
+        with open(local_path, "rb") as src, self.open_upload_stream(remote_path) as out:
+            shutil.copyfileobj(src, out, 1024 * 1024)
+
+    def download_file(self, remote_path: str, local_path: str):
+        path = self._path(remote_path)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No such object: {remote_path}")
+        shutil.copyfile(path, local_path)
+
+    def list_files(self, prefix: str = "") -> List[CloudFile]:
+        files = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(PART_SUFFIX):
+                    continue
+                full = os.path.join(dirpath, filename)
+                name = os.path.relpath(full, self.root).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    st = os.stat(full)
+                    files.append(CloudFile(name=name, size=st.st_size, last_modified=st.st_mtime))
+        return sorted(files, key=lambda f: f.name)
+
+    def file_info(self, remote_path: str) -> Optional[CloudFile]:
+        path = self._path(remote_path)
+        if not os.path.isfile(path):
+            return None
+        st = os.stat(path)
+        return CloudFile(name=remote_path, size=st.st_size, last_modified=st.st_mtime)
+
+    def delete_file(self, remote_path: str):
+        path = self._path(remote_path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def upload_string(self, data_str: str, remote_path: str):
+        with self.open_upload_stream(remote_path) as out:
+            out.write(data_str.encode("utf-8"))
+
+    def download_to_string(self, remote_path: str) -> Optional[str]:
+        try:
+            with open(self._path(remote_path), "r", encoding="utf-8") as fh:
+                return fh.read()
+        except (OSError, ValueError):
+            return None
+
+    def open_upload_stream(self, remote_path: str) -> _LocalUpload:
+        return _LocalUpload(self._path(remote_path))
@@ -1,9 +1,98 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 import boto3
 from botocore.exceptions import ClientError # Import ClientError
-from .cloud_storage import CloudStorageProvider, CloudFile
+from .cloud_storage import CloudStorageProvider, CloudFile, ObjectChanged, RangedDownload, download_settings, LIST_PAGE_SIZE
 from .ui import console
 
+# S3 parts must be at least 5 MiB (except the last one)
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _md5_checksum(etag):
+    """The ETag of a single-part upload is the object's MD5; multipart ETags ("<hex>-<parts>") are not."""
+    etag = (etag or "").strip('"')
+    if len(etag) == 32 and "-" not in etag:
+        return f"md5:{etag}"
+    return None
+
+
+class S3MultipartWriter:
+    """
+    Binary writer that uploads to S3 as a multipart upload, one part per
+    part_size bytes, so only one part is ever held in memory. The multipart
+    upload is started with the first full part (small streams are sent with a
+    single put_object), completed on close() and aborted by abort().
+    """
+
+    def __init__(self, client, bucket_name: str, key: str, part_size: int = MULTIPART_CHUNK_SIZE):
+        self._client = client
+        self._bucket = bucket_name
+        self._key = key
+        self._part_size = part_size
+        self._buf = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self.closed = False
+
+    def _upload_part(self, data: bytes):
+        if self._upload_id is None:
+            response = self._client.create_multipart_upload(Bucket=self._bucket, Key=self._key)
+            self._upload_id = response["UploadId"]
+        number = len(self._parts) + 1
+        response = self._client.upload_part(Bucket=self._bucket, Key=self._key, UploadId=self._upload_id,
+                                            PartNumber=number, Body=data)
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def write(self, data) -> int:
+        self._buf += data
+        while len(self._buf) >= self._part_size:
+            self._upload_part(bytes(self._buf[:self._part_size]))
+            del self._buf[:self._part_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self._client.put_object(Bucket=self._bucket, Key=self._key, Body=bytes(self._buf))
+            else:
+                if self._buf:
+                    self._upload_part(bytes(self._buf))
+                self._client.complete_multipart_upload(Bucket=self._bucket, Key=self._key, UploadId=self._upload_id,
+                                                       MultipartUpload={"Parts": self._parts})
+        except Exception:
+            self.abort()
+            raise
+        self._buf.clear()
+        self.closed = True
+
+    def abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._buf.clear()
+        if self._upload_id is not None:
+            try:
+                self._client.abort_multipart_upload(Bucket=self._bucket, Key=self._key, UploadId=self._upload_id)
+            except Exception as e:
+                console.print(f"[bold red]S3 Abort Error:[/ {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
 class S3Provider(CloudStorageProvider):
     def __init__(self, bucket_name: str, aws_access_key_id: str, aws_secret_access_key: str, region_name: str = "us-east-1"):
         self.bucket_name = bucket_name
@@ -23,31 +112,82 @@ class S3Provider(CloudStorageProvider):
             console.print(f"[bold red]S3 Upload Error:[/ {e}")
             raise
 
+    def open_upload_stream(self, remote_path: str) -> S3MultipartWriter:
+        console.print(f"[cyan]Streaming upload to S3://{self.bucket_name}/{remote_path}...[/]")
+        return S3MultipartWriter(self.client, self.bucket_name, remote_path)
+
+    def _read_range(self, remote_path: str, start: int, end: int, etag: str) -> bytes:
+        # IfMatch: a range of an object replaced mid-download fails (412) instead of mixing versions
+        try:
+            response = self.client.get_object(Bucket=self.bucket_name, Key=remote_path, Range=f"bytes={start}-{end}",
+                                              IfMatch=etag)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("PreconditionFailed", "412"):
+                raise ObjectChanged(f"{remote_path} changed during the download; run it again") from e
+            raise
+        return response["Body"].read()
+
     def download_file(self, remote_path: str, local_path: str):
+        """Objects larger than one part are fetched as concurrent, resumable byte ranges (see RangedDownload)."""
         try:
             console.print(f"[cyan]Downloading S3://{self.bucket_name}/{remote_path} to {local_path}...[/]")
-            self.client.download_file(self.bucket_name, remote_path, local_path)
+            workers, part_size = download_settings()
+            head = self.client.head_object(Bucket=self.bucket_name, Key=remote_path)
+            size = head.get("ContentLength")
+            if isinstance(size, int) and size > part_size:
+                etag = head.get("ETag")
+                RangedDownload(lambda start, end: self._read_range(remote_path, start, end, etag), size,
+                               str(etag), local_path, workers=workers, part_size=part_size).run()
+            else:
+                self.client.download_file(self.bucket_name, remote_path, local_path)
             console.print(f"[green]Download successful.[/]")
         except Exception as e:
             console.print(f"[bold red]S3 Download Error:[/ {e}")
             raise
 
-    def list_files(self, prefix: str = "") -> list[CloudFile]:
-        try:
-            response = self.client.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
-            files = []
-            if "Contents" in response:
-                for obj in response["Contents"]:
-                    files.append(CloudFile(
+    def _list_page(self, prefix: str, page_size: int, token: str | None) -> dict:
+        kwargs = {"Bucket": self.bucket_name, "Prefix": prefix, "MaxKeys": page_size}
+        if token:
+            kwargs["ContinuationToken"] = token
+        return self.client.list_objects_v2(**kwargs)
+
+    def iter_files(self, prefix: str = "", page_size: int = LIST_PAGE_SIZE) -> Iterator[CloudFile]:
+        """Follows continuation tokens; the next page is requested while the caller works through this one."""
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(self._list_page, prefix, page_size, None)
+            while future is not None:
+                response = future.result()
+                token = response.get("NextContinuationToken") if response.get("IsTruncated") else None
+                future = pool.submit(self._list_page, prefix, page_size, token) if token else None
+                for obj in response.get("Contents", []):
+                    yield CloudFile(
                         name=obj["Key"],
                         size=obj["Size"],
-                        last_modified=obj["LastModified"]
-                    ))
-            return files
+                        last_modified=obj["LastModified"],
+                        checksum=_md5_checksum(obj.get("ETag")),
+                    )
+
+    def list_files(self, prefix: str = "") -> list[CloudFile]:
+        try:
+            return list(self.iter_files(prefix))
         except Exception as e:
             console.print(f"[bold red]S3 List Error:[/ {e}")
             return []
 
+    def file_info(self, remote_path: str) -> CloudFile | None:
+        try:
+            head = self.client.head_object(Bucket=self.bucket_name, Key=remote_path)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return CloudFile(
+            name=remote_path,
+            size=head["ContentLength"],
+            last_modified=head["LastModified"],
+            checksum=_md5_checksum(head.get("ETag")),
+        )
+
     def delete_file(self, remote_path: str):
         try:
             self.client.delete_object(Bucket=self.bucket_name, Key=remote_path)
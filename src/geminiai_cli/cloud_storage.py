@@ -1,11 +1,292 @@
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+from .settings import get_setting
+
+DEFAULT_DOWNLOAD_WORKERS = 4
+# Objects up to one part are downloaded in a single request
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+RANGE_RETRIES = 3
+# Keys per listing request (the S3 maximum)
+LIST_PAGE_SIZE = 1000
 
 class CloudFile:
-    def __init__(self, name, size, last_modified):
+    def __init__(self, name, size, last_modified, checksum=None):
         self.name = name
         self.size = size
         self.last_modified = last_modified
+        # Content checksum reported by the provider, "sha1:<hex>" / "md5:<hex>", when it has one
+        self.checksum = checksum
+
+
+class UploadAborted(Exception):
+    """Raised to a streaming upload's consumer when the producer gave up."""
+
+
+class ObjectChanged(Exception):
+    """The object was replaced while a ranged download of it was running; retrying a range cannot help."""
+
+
+class _QueueReader:
+    """Read side of a StreamingUpload: a blocking, read-only file-like over queued chunks."""
+
+    def __init__(self, q: "queue.Queue"):
+        self._queue = q
+        # Pending chunks, joined once per read: appending to one bytes object is quadratic in the read size
+        self._pieces: List[bytes] = []
+        self._buffered = 0
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or self._buffered < size):
+            item = self._queue.get()
+            if item is None:
+                self._eof = True
+            elif item is UploadAborted:
+                raise UploadAborted("Upload aborted by writer")
+            elif item:
+                self._pieces.append(item)
+                self._buffered += len(item)
+        data = b"".join(self._pieces)
+        self._pieces, self._buffered = [], 0
+        if 0 <= size < len(data):
+            data, rest = data[:size], data[size:]
+            self._pieces, self._buffered = [rest], len(rest)
+        return data
+
+    def close(self):
+        pass
+
+
+class StreamingUpload:
+    """
+    Binary writer whose bytes are handed to consume(reader) running in a
+    background thread, e.g. an SDK call that uploads from a readable stream.
+    Memory is bounded by max_chunks queued writes. Exiting the context
+    normally waits for the upload; an exception aborts it.
+    """
+
+    def __init__(self, consume: Callable[[_QueueReader], None], max_chunks: int = 16):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_chunks)
+        self._error: Optional[BaseException] = None
+        self.closed = False
+
+        def run():
+            try:
+                consume(_QueueReader(self._queue))
+            except BaseException as e:  # surfaced to the writer on its next write/close
+                self._error = e
+            finally:
+                # Unblock a writer stuck on a full queue after the consumer stopped early
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while True:
+            if self._error is not None or not self._thread.is_alive():
+                raise IOError(f"Streaming upload failed: {self._error}")
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data) -> int:
+        if data:
+            self._put(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise IOError(f"Streaming upload failed: {self._error}")
+
+    def abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._thread.is_alive():
+            try:
+                self._queue.put(UploadAborted, timeout=5)
+            except queue.Full:
+                pass
+        self._thread.join(timeout=30)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class _SpooledUpload:
+    """Fallback streaming writer: spool to a temp file and upload_file() it on close."""
+
+    def __init__(self, provider: "CloudStorageProvider", remote_path: str):
+        self._provider = provider
+        self._remote_path = remote_path
+        fd, self._path = tempfile.mkstemp(prefix="gemini-upload-")
+        self._fh = os.fdopen(fd, "wb")
+        self.closed = False
+
+    def write(self, data) -> int:
+        return self._fh.write(data)
+
+    def flush(self):
+        self._fh.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._fh.close()
+            self._provider.upload_file(self._path, self._remote_path)
+        finally:
+            os.remove(self._path)
+
+    def abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._fh.close()
+        os.remove(self._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def download_settings():
+    """(workers, part size in bytes) for ranged downloads: settings download_workers / download_part_size (MiB)."""
+    try:
+        workers = max(1, int(get_setting("download_workers", DEFAULT_DOWNLOAD_WORKERS)))
+    except (TypeError, ValueError):
+        workers = DEFAULT_DOWNLOAD_WORKERS
+    try:
+        part_size = int(float(get_setting("download_part_size", DEFAULT_PART_SIZE / (1024 * 1024))) * 1024 * 1024)
+    except (TypeError, ValueError):
+        part_size = DEFAULT_PART_SIZE
+    return workers, max(part_size, 64 * 1024)
+
+
+class RangedDownload:
+    """
+    Download an object of known size as concurrent byte ranges into
+    local_path, resumably.
+
+    Ranges are written at their offsets into <local_path>.part, and
+    <local_path>.part.json records which ones are on disk (flushed to disk
+    first). A download that was killed or failed picks up the missing ranges
+    when started again for the same object; identity (an ETag or file id)
+    tells whether the remote object is still the one the journal was made
+    for, else it starts over. Each range is retried RANGE_RETRIES times.
+
+    read_range(start, end) returns bytes start..end inclusive.
+    """
+
+    def __init__(self, read_range: Callable[[int, int], bytes], size: int, identity: str, local_path: str,
+                 workers: int = DEFAULT_DOWNLOAD_WORKERS, part_size: int = DEFAULT_PART_SIZE,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.read_range = read_range
+        self.size = size
+        self.identity = identity
+        self.local_path = local_path
+        self.workers = workers
+        self.part_size = part_size
+        self.sleep = sleep
+        self.part_path = f"{local_path}.part"
+        self.journal_path = f"{local_path}.part.json"
+        self._lock = threading.Lock()
+
+    def _load_journal(self) -> set:
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as fh:
+                journal = json.load(fh)
+        except (OSError, ValueError):
+            return set()
+        if (journal.get("size"), journal.get("identity"), journal.get("part_size")) != \
+                (self.size, self.identity, self.part_size) or not os.path.exists(self.part_path):
+            return set()
+        return set(journal.get("done", []))
+
+    def _save_journal(self, done: set):
+        tmp = f"{self.journal_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"size": self.size, "identity": self.identity, "part_size": self.part_size,
+                       "done": sorted(done)}, fh)
+        os.replace(tmp, self.journal_path)
+
+    def _fetch(self, index: int, done: set):
+        start = index * self.part_size
+        end = min(start + self.part_size, self.size) - 1
+        for attempt in range(RANGE_RETRIES + 1):
+            try:
+                data = self.read_range(start, end)
+                if len(data) != end - start + 1:
+                    raise IOError(f"short read for bytes {start}-{end}: {len(data)} bytes")
+                break
+            except ObjectChanged:
+                raise
+            except Exception:
+                if attempt == RANGE_RETRIES:
+                    raise
+                self.sleep(2 ** attempt)
+        with open(self.part_path, "r+b") as fh:
+            fh.seek(start)
+            fh.write(data)
+            fh.flush()
+            # The journal may only claim ranges that are on disk
+            os.fsync(fh.fileno())
+        with self._lock:
+            done.add(index)
+            self._save_journal(done)
+
+    def run(self) -> int:
+        """Download what is missing; returns the number of ranges fetched now."""
+        parts = max(1, -(-self.size // self.part_size))
+        done = self._load_journal()
+        if not done:
+            with open(self.part_path, "wb") as fh:
+                fh.truncate(self.size)
+            self._save_journal(done)
+        todo = [i for i in range(parts) if i not in done]
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(todo)) or 1) as pool:
+            for future in [pool.submit(self._fetch, i, done) for i in todo]:
+                future.result()
+        os.replace(self.part_path, self.local_path)
+        os.remove(self.journal_path)
+        return len(todo)
+
 
 class CloudStorageProvider(ABC):
     @abstractmethod
@@ -20,6 +301,24 @@ class CloudStorageProvider(ABC):
     def list_files(self, prefix: str = "") -> List[CloudFile]:
         pass
 
+    def iter_files(self, prefix: str = "", page_size: int = LIST_PAGE_SIZE) -> Iterator[CloudFile]:
+        """
+        Objects under prefix as a generator, so callers can stop early.
+        Providers whose listings come in pages override this to yield each
+        page as it arrives.
+        """
+        return iter(self.list_files(prefix))
+
+    def file_info(self, remote_path: str) -> Optional[CloudFile]:
+        """
+        The one object at remote_path, or None when there is none. Providers
+        override this with a single metadata request; the default lists.
+        """
+        for f in self.iter_files(remote_path):
+            if f.name == remote_path:
+                return f
+        return None
+
     @abstractmethod
     def delete_file(self, remote_path: str):
         pass
@@ -31,3 +330,14 @@ class CloudStorageProvider(ABC):
     @abstractmethod
     def download_to_string(self, remote_path: str) -> Optional[str]:
         pass
+
+    def open_upload_stream(self, remote_path: str):
+        """
+        Return a binary writer (a context manager) that uploads to remote_path
+        as it is written. The object only appears once the writer is closed
+        without error; leaving the context with an exception aborts the upload.
+
+        Providers with multipart/streaming APIs override this; the default
+        spools to a temporary file and calls upload_file() on close.
+        """
+        return _SpooledUpload(self, remote_path)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/compression.py
+
+"""
+compression.py - Archive compression codecs.
+
+gzip (default), zstd (needs the `zstandard` package), lz4 (needs the `lz4`
+package) and none (plain tar). Compressed codecs are written pigz-style, in
+independent blocks on every core, which also makes archives seekable.  The codec is recorded in
+the archive name (.tar.gz / .tar.zst / .tar.lz4 / .tar) and detected from the
+file's magic bytes when reading, so restore needs no flag.
+"""
+from __future__ import annotations
+import bisect
+import collections
+import gzip
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - depends on the environment
+    lz4_frame = None
+
+from .settings import get_setting
+
+CODECS = ("gzip", "zstd", "lz4", "none")
+DEFAULT_CODEC = "gzip"
+
+CODEC_SUFFIXES = {
+    "gzip": ".tar.gz",
+    "zstd": ".tar.zst",
+    "lz4": ".tar.lz4",
+    "none": ".tar",
+}
+
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3, "lz4": 0, "none": 0}
+LEVEL_RANGES = {"gzip": (1, 9), "zstd": (1, 22), "lz4": (0, 16), "none": (0, 0)}
+
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"\x04\x22\x4d\x18", "lz4"),
+)
+
+# .gpg: legacy gpg --symmetric; .enc: in-process streaming AEAD (encryption.py)
+ENCRYPTION_SUFFIXES = (".gpg", ".enc")
+
+# Uncompressed bytes per independently compressed block (gzip member / zstd or lz4 frame)
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def codec_available(codec: str) -> bool:
+    if codec == "zstd":
+        return zstandard is not None
+    if codec == "lz4":
+        return lz4_frame is not None
+    return codec in CODECS
+
+
+def archive_suffix(codec: str) -> str:
+    return CODEC_SUFFIXES[codec]
+
+
+def _strip_encryption(name: str) -> str:
+    for suffix in ENCRYPTION_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def is_archive_name(name: str, encrypted: bool = False) -> bool:
+    """True for <...>.gemini.tar[.gz|.zst|.lz4]; with encrypted=True also accept a trailing .gpg/.enc."""
+    if encrypted:
+        name = _strip_encryption(name)
+    return any(name.endswith(f".gemini{suffix}") for suffix in CODEC_SUFFIXES.values())
+
+
+def strip_archive_suffix(name: str) -> Optional[str]:
+    """'<ts>-<email>.gemini.tar.zst[.gpg]' -> '<ts>-<email>.gemini', or None if not an archive name."""
+    name = _strip_encryption(name)
+    for suffix in CODEC_SUFFIXES.values():
+        if name.endswith(f".gemini{suffix}"):
+            return name[:-len(suffix)]
+    return None
+
+
+def codec_from_name(name: str) -> Optional[str]:
+    name = _strip_encryption(name)
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if name.endswith(suffix):
+            return codec
+    return None
+
+
+def codec_from_magic(head: bytes) -> Optional[str]:
+    """Codec for the first bytes of a (decrypted) archive stream, None if too short to tell."""
+    for magic, codec in _MAGIC:
+        if head.startswith(magic):
+            return codec
+    # Anything else with content is an uncompressed tar
+    return "none" if len(head) >= 4 else None
+
+
+def detect_codec(path: str) -> str:
+    """Codec of the archive at path, from its magic bytes; falls back to the name, then gzip."""
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(4)
+    except OSError:
+        head = b""
+    return codec_from_magic(head) or codec_from_name(path) or DEFAULT_CODEC
+
+
+def resolve_level(codec: str, level: Optional[int]) -> int:
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if level is None:
+        return DEFAULT_LEVELS[codec]
+    low, high = LEVEL_RANGES[codec]
+    return max(low, min(high, int(level)))
+
+
+def codec_from_args(args) -> str:
+    """--compression, falling back to setting compression, then gzip."""
+    codec = getattr(args, "compression", None)
+    if codec not in CODECS:
+        codec = get_setting("compression", DEFAULT_CODEC)
+    return codec if codec in CODECS else DEFAULT_CODEC
+
+
+def level_from_args(args) -> Optional[int]:
+    """--level, falling back to setting compression_level; None means the codec default."""
+    level = getattr(args, "level", None)
+    if not isinstance(level, int):
+        level = get_setting("compression_level", None)
+    try:
+        return int(level) if level is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def default_threads() -> int:
+    """Compression threads: setting compression_threads, or every core."""
+    threads = int(get_setting("compression_threads", 0) or 0)
+    return threads if threads > 0 else (os.cpu_count() or 1)
+
+
+class ParallelBlockWriter:
+    """
+    pigz-style block writer: the stream is cut into fixed-size blocks that are
+    compressed as independent gzip members / zstd or lz4 frames on a thread
+    pool (the compressors release the GIL) and written in order. Concatenated
+    members/frames are a valid stream for the codec's own tools and readers.
+    The output stream is not closed.
+
+    Every block starts a fresh member, so its position is a seek point:
+    seek_points lists (offset in the output, offset in the uncompressed
+    stream) for each block, which lets a reader decompress from the block
+    holding a given byte instead of from the start.
+    """
+
+    def __init__(self, raw, compress, threads: Optional[int] = None, block_size: int = BLOCK_SIZE):
+        self._raw = raw
+        self._compress = compress
+        self._threads = threads or os.cpu_count() or 1
+        self._block_size = block_size
+        self._pool = ThreadPoolExecutor(max_workers=self._threads)
+        self._pending = collections.deque()
+        self._buf = bytearray()
+        self._members = 0
+        self._written = 0
+        self.seek_points: List[Tuple[int, int]] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buf += data
+        while len(self._buf) >= self._block_size:
+            block = bytes(self._buf[:self._block_size])
+            del self._buf[:self._block_size]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block: bytes):
+        self._pending.append(self._pool.submit(self._compress, block))
+        self._members += 1
+        # Bound memory: a couple of blocks in flight per worker
+        while len(self._pending) > 2 * self._threads:
+            self._emit(self._pending.popleft().result())
+
+    def _emit(self, member: bytes):
+        self.seek_points.append((self._written, len(self.seek_points) * self._block_size))
+        self._raw.write(member)
+        self._written += len(member)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buf or not self._members:
+                self._submit(bytes(self._buf))
+                self._buf.clear()
+            while self._pending:
+                self._emit(self._pending.popleft().result())
+        finally:
+            self._pool.shutdown(wait=True)
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParallelGzipWriter(ParallelBlockWriter):
+    """ParallelBlockWriter producing a multi-member gzip file (gzip -d, tar -z and Python's gzip read it)."""
+
+    def __init__(self, raw, level: int = DEFAULT_LEVELS["gzip"], threads: Optional[int] = None,
+                 block_size: int = BLOCK_SIZE):
+        super().__init__(raw, lambda block: gzip.compress(block, level, mtime=0),
+                         threads=threads, block_size=block_size)
+
+
+def _zstd_compress(level: int):
+    # A ZstdCompressor must not be shared between threads; keep one per worker
+    local = threading.local()
+
+    def compress(block: bytes) -> bytes:
+        if not hasattr(local, "cctx"):
+            local.cctx = zstandard.ZstdCompressor(level=level)
+        return local.cctx.compress(block)
+    return compress
+
+
+class _Uncompressed:
+    """Pass-through writer for codec 'none' that leaves the underlying file open."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def write(self, data) -> int:
+        return self._raw.write(data)
+
+    def flush(self):
+        self._raw.flush()
+
+    def close(self):
+        pass
+
+    @property
+    def seek_points(self) -> List[Tuple[int, int]]:
+        # Every offset of a plain tar is its own seek point
+        return []
+
+
+@contextmanager
+def compressed_writer(raw, codec: str = DEFAULT_CODEC, level: Optional[int] = None,
+                      threads: Optional[int] = None):
+    """Yield a writable stream compressing into raw; finishes the stream on exit (raw stays open)."""
+    level = resolve_level(codec, level)
+    threads = threads or default_threads()
+    # Compressed in independent blocks (see ParallelBlockWriter), so archives are seekable
+    if codec == "gzip":
+        writer = ParallelGzipWriter(raw, level=level, threads=threads)
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+        writer = ParallelBlockWriter(raw, _zstd_compress(level), threads=threads)
+    elif codec == "lz4":
+        if lz4_frame is None:
+            raise RuntimeError("lz4 compression requires the 'lz4' package (pip install lz4)")
+        writer = ParallelBlockWriter(raw, lambda block: lz4_frame.compress(block, compression_level=level),
+                                     threads=threads)
+    elif codec == "none":
+        writer = _Uncompressed(raw)
+    else:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    try:
+        yield writer
+    finally:
+        writer.close()
+
+
+def decompressed_reader(raw, codec: str):
+    """Return a readable stream of raw's decompressed bytes (closing it does not close raw)."""
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd archives require the 'zstandard' package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+    if codec == "lz4":
+        if lz4_frame is None:
+            raise RuntimeError("lz4 archives require the 'lz4' package (pip install lz4)")
+        return lz4_frame.LZ4FrameFile(raw, mode="rb")
+    if codec == "none":
+        return raw
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def seek_point(seek_points, codec: str, offset: int) -> Tuple[int, int]:
+    """
+    (compressed offset, uncompressed offset) of the block to start decoding
+    from to reach uncompressed `offset`; (0, 0) without seek points.
+    """
+    if codec == "none":
+        return offset, offset
+    if not seek_points:
+        return 0, 0
+    i = bisect.bisect_right([start for _, start in seek_points], offset) - 1
+    compressed, start = seek_points[max(i, 0)]
+    return compressed, start
@@ -20,6 +20,9 @@ GEMINI_CLI_HOME = os.path.join(os.path.expanduser("~"), ".geminiai-cli")
 DEFAULT_BACKUP_DIR = os.path.join(GEMINI_CLI_HOME, "backups")
 CHAT_HISTORY_BACKUP_PATH = os.path.join(GEMINI_CLI_HOME, "chat_backups")
 OLD_CONFIGS_DIR = os.path.join(GEMINI_CLI_HOME, "old_configs")
+CHUNK_REPO_DIR = os.path.join(GEMINI_CLI_HOME, "chunks")
+# Pre-extracted account trees, switched into ~/.gemini by rename (same filesystem)
+SLOTS_DIR = os.path.join(GEMINI_CLI_HOME, "slots")
 
 # Data files
 COOLDOWN_FILE = os.path.join(GEMINI_CLI_HOME, "cooldown.json")
@@ -35,5 +38,5 @@ for _dir in [GEMINI_CLI_HOME, DEFAULT_BACKUP_DIR, CHAT_HISTORY_BACKUP_PATH, OLD_
     os.makedirs(_dir, exist_ok=True)
 
 LOGIN_URL_PATH = "/sdcard/tools/login_url.txt"
-# Updated regex to allow optional .gpg extension
-TIMESTAMPED_DIR_REGEX = re.compile(r"^(\d{4}-\d{2}-\d{2}_\d{6})-.+\.gemini(\.tar\.gz)?(\.gpg)?$")
+# Directory backups, and archives in any codec (.tar.gz/.tar.zst/.tar.lz4/.tar), optionally .gpg/.enc encrypted
+TIMESTAMPED_DIR_REGEX = re.compile(r"^(\d{4}-\d{2}-\d{2}_\d{6})-.+\.gemini(\.tar(?:\.gz|\.zst|\.lz4)?)?(\.gpg|\.enc)?$")
@@ -8,6 +8,7 @@ from typing import Dict, Optional
 
 from .ui import cprint, console, NEON_CYAN, NEON_GREEN, NEON_YELLOW, NEON_RED, RESET
 from .b2 import B2Manager
+from .cloud_factory import shared_provider
 from .credentials import resolve_credentials
 from .reset_helpers import get_all_resets, remove_entry_by_id, sync_resets_with_cloud
 from . import history
@@ -52,7 +53,7 @@ def do_reset_all(args):
         key_id, app_key, bucket_name = resolve_credentials(args)
         if key_id and app_key and bucket_name:
             cprint(NEON_CYAN, "Wiping cloud data...")
-            b2 = B2Manager(key_id, app_key, bucket_name)
+            b2 = shared_provider(B2Manager, key_id, app_key, bucket_name)
             
             # Overwrite both cloud files with empty state
             b2.upload_string("{}", "gemini-cooldown.json")
@@ -109,7 +110,7 @@ def do_remove_account(email: str, args=None):
             
             # 3b. Sync Resets (Direct Upload to ensure removal sticks)
             try:
-                b2 = B2Manager(key_id, app_key, bucket_name)
+                b2 = shared_provider(B2Manager, key_id, app_key, bucket_name)
                 # Overwrite cloud file with clean local state
                 local_resets = get_all_resets()
                 resets_json_str = json.dumps(local_resets, ensure_ascii=False, indent=2)
@@ -142,12 +143,13 @@ def _sync_cooldown_file(direction: str, args):
         args: Command-line arguments containing B2 credentials.
     """
     try:
-        key_id, app_key, bucket_name = resolve_credentials(args)
+        # allow_fail: a missing B2 config should skip the sync, not abort the caller (e.g. a finished restore)
+        key_id, app_key, bucket_name = resolve_credentials(args, allow_fail=True)
         if not all([key_id, app_key, bucket_name]):
             cprint(NEON_YELLOW, "Warning: Cloud credentials not fully configured. Skipping cloud sync.")
             return
 
-        b2 = B2Manager(key_id, app_key, bucket_name)
+        b2 = shared_provider(B2Manager, key_id, app_key, bucket_name)
         local_path = os.path.expanduser(COOLDOWN_FILE)
 
         if direction == "download":
@@ -276,7 +278,7 @@ def do_cooldown_list(args=None):
         try:
             key_id, app_key, bucket_name = resolve_credentials(args)
             if key_id and app_key and bucket_name:
-                b2 = B2Manager(key_id, app_key, bucket_name)
+                b2 = shared_provider(B2Manager, key_id, app_key, bucket_name)
                 sync_resets_with_cloud(b2)
         except Exception as e:
              cprint(NEON_RED, f"[WARN] Failed to sync resets: {e}")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/delta.py
+
+"""
+delta.py - Delta restore: rewrite only what differs between a backup and dest.
+
+plan_delta() compares the backup's manifest (path, size, sha256, recorded at
+backup time) with the tree currently in dest. Files of the same size are
+hashed; files that match are left alone, so switching between accounts whose
+trees share most of their content writes only the difference.
+
+A DeltaTransaction then applies the plan under a journal, in a directory next
+to dest (same filesystem, so every step is a rename):
+
+    <dest>.delta-<ts>/journal.json   state and the list of operations
+    <dest>.delta-<ts>/new/           changed entries, extracted from the backup
+    <dest>.delta-<ts>/old/           what the operations replaced or removed
+
+Each operation first moves the current entry to old/ and then installs its
+replacement. Rolling back walks the journal backwards and needs no record of
+how far it got: where old/ has an entry it goes back, and what was installed
+is recognised by its staged copy being gone. A transaction interrupted by a
+crash is rolled back by the next restore of the same dest (recover()).
+"""
+from __future__ import annotations
+import glob
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from .manifest import FileEntry, Manifest, hash_file, walk_tree
+
+JOURNAL_NAME = "journal.json"
+
+
+def target_entries(manifest: Manifest) -> Tuple[Dict[str, FileEntry], Set[str], Set[str]]:
+    """(files, directories, symlinks) a restore of the manifest's backup produces."""
+    index = manifest.meta.get("index") or {}
+    others = manifest.meta.get("others")
+    if others is None:
+        # Full archives list directories and symlinks only in their member index
+        others = [p for p in index.get("members", {}) if p not in manifest.files]
+    symlinks = set(index.get("symlinks", []))
+    return manifest.files, set(others) - symlinks, symlinks
+
+
+@dataclass
+class DeltaPlan:
+    """What has to change in dest: entries to take from the backup and entries to remove."""
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # Files already identical in dest, with their on-disk size/mtime
+    unchanged: Dict[str, FileEntry] = field(default_factory=dict)
+    dirs: Set[str] = field(default_factory=set)
+
+    @property
+    def empty(self) -> bool:
+        return not self.changed and not self.removed
+
+
+def plan_delta(dest: str, manifest: Manifest) -> DeltaPlan:
+    """Compare dest with the backup described by manifest (see module docstring)."""
+    files, dirs, symlinks = target_entries(manifest)
+    plan = DeltaPlan(dirs=dirs)
+    seen = set()
+    # Directories that go (or are replaced) as a whole; their contents are not looked at
+    dropped = []
+
+    for item in walk_tree(dest):
+        if any(item.path.startswith(d + "/") for d in dropped):
+            continue
+        seen.add(item.path)
+        entry = files.get(item.path)
+        if entry is not None:
+            if item.is_file and item.st.st_size == entry.size and hash_file(item.full_path) == entry.sha256:
+                plan.unchanged[item.path] = FileEntry(item.st.st_size, item.st.st_mtime_ns, entry.sha256)
+            else:
+                plan.changed.append(item.path)
+                if item.is_dir:
+                    dropped.append(item.path)
+        elif item.path in dirs:
+            if not item.is_dir:
+                plan.changed.append(item.path)
+        elif item.path in symlinks:
+            # Link targets are not in the manifest; a symlink is cheap to put back
+            plan.changed.append(item.path)
+        else:
+            plan.removed.append(item.path)
+            if item.is_dir:
+                dropped.append(item.path)
+
+    plan.changed.extend(p for p in list(files) + sorted(dirs | symlinks) if p not in seen)
+    plan.changed.sort()
+    return plan
+
+
+class DeltaTransaction:
+    """Journaled application of a DeltaPlan to dest (see module docstring)."""
+
+    def __init__(self, dest: str, ts: str):
+        self.dest = dest
+        self.root = f"{dest}.delta-{ts}"
+        self.new = os.path.join(self.root, "new")
+        self.old = os.path.join(self.root, "old")
+        self.ops: List[dict] = []
+        self.state = "prepared"
+
+    @classmethod
+    def load(cls, root: str) -> Optional["DeltaTransaction"]:
+        try:
+            with open(os.path.join(root, JOURNAL_NAME), "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        txn = cls(data["dest"], "")
+        txn.root = root
+        txn.new = os.path.join(root, "new")
+        txn.old = os.path.join(root, "old")
+        txn.ops = data["ops"]
+        txn.state = data["state"]
+        return txn
+
+    def _write_journal(self):
+        path = os.path.join(self.root, JOURNAL_NAME)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"dest": self.dest, "state": self.state, "ops": self.ops}, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    def prepare(self, plan: DeltaPlan):
+        """Record the operations; the changed entries must already be extracted into self.new."""
+        self.ops = [{"op": "remove", "path": p} for p in plan.removed]
+        for path in plan.changed:
+            if not os.path.lexists(os.path.join(self.new, path)):
+                raise RuntimeError(f"backup does not contain {path}")
+            self.ops.append({"op": "mkdir" if path in plan.dirs else "replace", "path": path})
+        os.makedirs(self.root, exist_ok=True)
+        self._write_journal()
+
+    def _set_aside(self, path: str):
+        current = os.path.join(self.dest, path)
+        if os.path.lexists(current):
+            saved = os.path.join(self.old, path)
+            os.makedirs(os.path.dirname(saved), exist_ok=True)
+            os.rename(current, saved)
+
+    def apply(self):
+        """Perform every operation; on any error everything done so far is rolled back."""
+        self.state = "applying"
+        self._write_journal()
+        try:
+            for op in self.ops:
+                path = op["path"]
+                target = os.path.join(self.dest, path)
+                self._set_aside(path)
+                if op["op"] == "mkdir":
+                    os.mkdir(target)
+                    shutil.copystat(os.path.join(self.new, path), target)
+                elif op["op"] == "replace":
+                    os.rename(os.path.join(self.new, path), target)
+        except BaseException:
+            self.rollback()
+            raise
+        self.state = "committed"
+        self._write_journal()
+
+    def rollback(self):
+        """Undo the operations (in any state of completion) and discard the transaction."""
+        for op in reversed(self.ops):
+            path = op["path"]
+            target = os.path.join(self.dest, path)
+            saved = os.path.join(self.old, path)
+            installed = False
+            if op["op"] == "replace":
+                installed = os.path.lexists(target) and not os.path.lexists(os.path.join(self.new, path))
+            elif op["op"] == "mkdir":
+                # Planned only where dest had no directory, so one there now is ours
+                installed = os.path.isdir(target) and not os.path.islink(target)
+            if installed:
+                if os.path.isdir(target) and not os.path.islink(target):
+                    shutil.rmtree(target)
+                else:
+                    os.remove(target)
+            if os.path.lexists(saved) and not os.path.lexists(target):
+                os.rename(saved, target)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def finish(self, backup_dir: Optional[str] = None):
+        """After commit: keep what was replaced in backup_dir (None deletes it) and drop the transaction."""
+        if backup_dir and os.path.isdir(self.old) and os.listdir(self.old):
+            os.makedirs(os.path.dirname(backup_dir), exist_ok=True)
+            shutil.move(self.old, backup_dir)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def pending(dest: str) -> List[str]:
+    """Transaction directories on dest left behind by an interrupted delta restore."""
+    return sorted(glob.glob(f"{glob.escape(dest)}.delta-*"))
+
+
+def recover(dest: str, backup_dir: Optional[str] = None) -> int:
+    """
+    Settle transactions on dest left behind by an interrupted delta restore:
+    uncommitted ones are rolled back, committed ones finished. Returns how many
+    were found.
+    """
+    found = 0
+    for root in pending(dest):
+        txn = DeltaTransaction.load(root)
+        found += 1
+        if txn is None:
+            # Never got as far as its journal: nothing in dest was touched
+            shutil.rmtree(root, ignore_errors=True)
+        elif txn.state == "committed":
+            txn.finish(backup_dir)
+        else:
+            txn.rollback()
+    return found
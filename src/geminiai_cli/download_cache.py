@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/download_cache.py
+
+"""
+download_cache.py - Size-capped LRU cache of archives downloaded from the cloud.
+
+Restoring the same cloud backup twice, or pulling one that a restore already
+fetched, is served from ~/.geminiai-cli/cache instead of downloading again:
+
+    cache/objects/<sha256>   downloaded content, named by its hash (so a file
+                             reachable under two names is stored once)
+    cache/index.json         "<provider>:<bucket>/<name>" -> sha256, size,
+                             provider checksum, last-modified, and last use
+    cache/locks/<key hash>   held while that key is being downloaded, so a
+                             background prefetch and a restore of the same
+                             object never share a partial download
+
+An entry is used only while the remote object still has the size and
+checksum (or, where the provider reports none, the modification time) in the
+current listing. Fresh downloads are checked against the provider's checksum
+(B2 content SHA-1, S3 single-part ETag MD5) before entering the cache.
+Callers get a hardlink to the cached file (a copy across filesystems).
+
+The cap is setting download_cache_size in MiB (default 2048, 0 disables the
+cache); the least recently used objects are evicted to stay under it.
+"""
+from __future__ import annotations
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .config import GEMINI_CLI_HOME
+from .manifest import CHUNK_SIZE
+from .settings import get_setting
+
+CACHE_DIR = os.path.join(GEMINI_CLI_HOME, "cache")
+DEFAULT_CACHE_SIZE_MB = 2048
+STALE_DOWNLOAD_SECONDS = 7 * 24 * 3600
+
+
+class ChecksumMismatch(RuntimeError):
+    """A download does not match the checksum the provider reported for it."""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name}: downloaded content does not match the provider checksum")
+        self.name = name
+
+
+def cache_limit(args=None) -> int:
+    """Cache cap in bytes: 0 with --no-cache, else setting download_cache_size (MiB)."""
+    if args is not None and getattr(args, "no_cache", False) is True:
+        return 0
+    try:
+        return int(float(get_setting("download_cache_size", DEFAULT_CACHE_SIZE_MB)) * 1024 * 1024)
+    except (TypeError, ValueError):
+        return DEFAULT_CACHE_SIZE_MB * 1024 * 1024
+
+
+def provider_key(provider, name: str) -> str:
+    return f"{type(provider).__name__}:{getattr(provider, 'bucket_name', '')}/{name}"
+
+
+def _hash_file(path: str, checksum: Optional[str]):
+    """sha256 of path, and its digest in the algorithm of checksum ("sha1:<hex>" / "md5:<hex>")."""
+    algo = checksum.split(":", 1)[0] if checksum else None
+    extra = hashlib.new(algo) if algo in ("sha1", "md5") else None
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while True:
+            data = fh.read(CHUNK_SIZE)
+            if not data:
+                break
+            h.update(data)
+            if extra is not None:
+                extra.update(data)
+    return h.hexdigest(), (f"{algo}:{extra.hexdigest()}" if extra is not None else None)
+
+
+def _deliver(src: str, dest: str):
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class DownloadCache:
+    def __init__(self, root: str = CACHE_DIR, limit: int = DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.root = root
+        self.limit = limit
+        self.objects = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.json")
+
+    @contextmanager
+    def _locked(self):
+        """The index, loaded under an exclusive lock and saved on the way out."""
+        os.makedirs(self.objects, exist_ok=True)
+        with open(os.path.join(self.root, "index.lock"), "w") as lockfh:
+            fcntl.flock(lockfh, fcntl.LOCK_EX)
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as fh:
+                    index = json.load(fh)
+            except (OSError, ValueError):
+                index = {}
+            yield index
+            tmp = f"{self.index_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(index, fh, indent=1, sort_keys=True)
+            os.replace(tmp, self.index_path)
+
+    @contextmanager
+    def _key_locked(self, digest: str):
+        """Exclusive lock on one cache key, held for the whole of its download."""
+        locks = os.path.join(self.root, "locks")
+        os.makedirs(locks, exist_ok=True)
+        os.makedirs(self.objects, exist_ok=True)
+        with open(os.path.join(locks, digest), "w") as lockfh:
+            fcntl.flock(lockfh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockfh, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _matches(entry: dict, remote) -> bool:
+        if entry.get("size") != remote.size:
+            return False
+        checksum = getattr(remote, "checksum", None)
+        if checksum and entry.get("checksum"):
+            return entry["checksum"] == checksum
+        return entry.get("last_modified") == str(remote.last_modified)
+
+    def fetch(self, provider, name: str, local_path: str, remote=None) -> bool:
+        """
+        Put the object `name` at local_path, from the cache when possible.
+        remote is its CloudFile from a listing; without one (or one with no
+        size, or with the cache disabled) this is a plain download. Returns
+        True on a cache hit.
+        """
+        size = getattr(remote, "size", None)
+        if not isinstance(size, int) or self.limit <= 0 or size > self.limit:
+            provider.download_file(name, local_path)
+            return False
+
+        key = provider_key(provider, name)
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        # One download per key at a time: a prefetch and a restore of the same
+        # object share the resumable tmp file and its journal
+        with self._key_locked(digest):
+            with self._locked() as index:
+                # Checked only once the key is ours: whoever held it may just have cached it
+                entry = index.get(key)
+                blob = os.path.join(self.objects, entry["sha256"]) if entry else None
+                if entry and self._matches(entry, remote) and os.path.isfile(blob) \
+                        and os.path.getsize(blob) == remote.size:
+                    _deliver(blob, local_path)
+                    entry["used"] = time.time()
+                    return True
+
+            # Named after the key, so a ranged download killed half way resumes next time
+            tmp = os.path.join(self.root, "download-" + digest)
+            try:
+                provider.download_file(name, tmp)
+                checksum = getattr(remote, "checksum", None)
+                sha256, actual = _hash_file(tmp, checksum)
+                if checksum and actual != checksum:
+                    raise ChecksumMismatch(name)
+                with self._locked() as index:
+                    blob = os.path.join(self.objects, sha256)
+                    os.replace(tmp, blob)
+                    index[key] = {"sha256": sha256, "size": remote.size, "checksum": checksum,
+                                  "last_modified": str(remote.last_modified), "used": time.time()}
+                    _deliver(blob, local_path)
+                    self._evict(index)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        return False
+
+    def _evict(self, index: Dict[str, dict]):
+        """Drop least recently used objects (and every key naming them) until under the cap."""
+        used: Dict[str, float] = {}
+        for entry in index.values():
+            used[entry["sha256"]] = max(used.get(entry["sha256"], 0), entry["used"])
+        sizes = {}
+        for sha in used:
+            try:
+                sizes[sha] = os.path.getsize(os.path.join(self.objects, sha))
+            except FileNotFoundError:
+                sizes[sha] = 0
+        total = sum(sizes.values())
+        for sha in os.listdir(self.objects):
+            if sha not in used:
+                # Replaced by a newer download under the same name
+                os.remove(os.path.join(self.objects, sha))
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith("download-") and os.path.getmtime(path) < time.time() - STALE_DOWNLOAD_SECONDS:
+                # Abandoned partial downloads
+                os.remove(path)
+        for sha in sorted(used, key=used.get):
+            if total <= self.limit:
+                break
+            try:
+                os.remove(os.path.join(self.objects, sha))
+            except FileNotFoundError:
+                pass
+            total -= sizes[sha]
+            for key in [k for k, e in index.items() if e["sha256"] == sha]:
+                del index[key]
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def download_cache(args=None) -> DownloadCache:
+    """The shared cache, sized from --no-cache / setting download_cache_size."""
+    return DownloadCache(CACHE_DIR, cache_limit(args))
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/encryption.py
+
+"""
+encryption.py - Streaming, chunked AEAD encryption for backup archives.
+
+Sits between the compressor and the archive file, in both directions, so an
+encrypted backup is written (and read) in a single pass and no plaintext ever
+touches the disk.  Needs the optional `cryptography` package; `gpg` remains
+available as the legacy mode, and .gpg archives can always be restored.
+
+File layout (".enc" archives):
+
+    header:  MAGIC | version | salt(16) | log2(N) | r | p | chunk size(u32) | nonce prefix(7)
+    chunks:  AES-256-GCM(chunk) || tag(16), repeated
+
+The key comes from the passphrase via scrypt(salt, N, r, p).  Chunk i uses the
+nonce  prefix || i (u32, big endian) || last-flag  and the header as associated
+data, so reordered, truncated or spliced chunks fail authentication (the
+"STREAM" construction).
+"""
+from __future__ import annotations
+import os
+import struct
+from typing import Optional
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+except ImportError:  # pragma: no cover - depends on the environment
+    AESGCM = None
+
+from .settings import get_setting
+
+ENCRYPTED_SUFFIX = ".enc"
+GPG_SUFFIX = ".gpg"
+
+ENCRYPTION_MODES = ("aead", "gpg")
+
+MAGIC = b"GMAE"
+FORMAT_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+TAG_SIZE = 16
+SALT_SIZE = 16
+NONCE_PREFIX_SIZE = 7
+
+# scrypt cost: 2**15 * 8 * 128 bytes = 32 MiB and ~0.1s per archive
+SCRYPT_LOG_N = 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+_HEADER = struct.Struct(f">4sB{SALT_SIZE}sBBBI{NONCE_PREFIX_SIZE}s")
+
+
+class DecryptionError(ValueError):
+    """Wrong passphrase, or an archive that was corrupted or tampered with."""
+
+
+def aead_available() -> bool:
+    return AESGCM is not None
+
+
+def encryption_mode(args) -> str:
+    """--encryption, else setting encryption, else aead when `cryptography` is installed."""
+    mode = getattr(args, "encryption", None)
+    if mode not in ENCRYPTION_MODES:
+        mode = get_setting("encryption", None)
+    if mode not in ENCRYPTION_MODES:
+        mode = "aead" if aead_available() else "gpg"
+    return mode
+
+
+def read_passphrase(prompt: str) -> Optional[str]:
+    """GEMINI_BACKUP_PASSWORD, or ask on the terminal."""
+    passphrase = os.environ.get("GEMINI_BACKUP_PASSWORD")
+    if not passphrase:
+        import getpass
+        passphrase = getpass.getpass(prompt)
+    return passphrase or None
+
+
+def _derive_key(passphrase: str, salt: bytes, log_n: int, r: int, p: int) -> bytes:
+    kdf = Scrypt(salt=salt, length=32, n=2 ** log_n, r=r, p=p)
+    return kdf.derive(passphrase.encode("utf-8"))
+
+
+def _nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    return prefix + struct.pack(">I", counter) + (b"\x01" if last else b"\x00")
+
+
+def _require_aead():
+    if AESGCM is None:
+        raise RuntimeError("Archive encryption requires the 'cryptography' package (pip install cryptography)")
+
+
+class EncryptingWriter:
+    """Write-only stream that encrypts into raw chunk by chunk. close() writes the final chunk (raw stays open)."""
+
+    def __init__(self, raw, passphrase: str, chunk_size: int = CHUNK_SIZE):
+        _require_aead()
+        self._raw = raw
+        self._chunk_size = chunk_size
+        salt = os.urandom(SALT_SIZE)
+        self._prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self._header = _HEADER.pack(MAGIC, FORMAT_VERSION, salt, SCRYPT_LOG_N, SCRYPT_R, SCRYPT_P,
+                                    chunk_size, self._prefix)
+        self._aead = AESGCM(_derive_key(passphrase, salt, SCRYPT_LOG_N, SCRYPT_R, SCRYPT_P))
+        self._counter = 0
+        self._buf = bytearray()
+        self.closed = False
+        raw.write(self._header)
+
+    def _emit(self, data: bytes, last: bool):
+        if self._counter > 0xFFFFFFFF:
+            raise OverflowError("Archive too large for a single encryption stream")
+        nonce = _nonce(self._prefix, self._counter, last)
+        self._raw.write(self._aead.encrypt(nonce, data, self._header))
+        self._counter += 1
+
+    def write(self, data) -> int:
+        self._buf += data
+        # Keep at least one byte back so the final chunk is never empty unless the stream is
+        while len(self._buf) > self._chunk_size:
+            self._emit(bytes(self._buf[:self._chunk_size]), last=False)
+            del self._buf[:self._chunk_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        self._emit(bytes(self._buf), last=True)
+        self._buf.clear()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DecryptingReader:
+    """Read-only stream over an encrypted archive; every chunk is authenticated before it is returned."""
+
+    def __init__(self, raw, passphrase: str):
+        _require_aead()
+        self._raw = raw
+        header = raw.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise DecryptionError("Not an encrypted archive (truncated header)")
+        magic, version, salt, log_n, r, p, chunk_size, prefix = _HEADER.unpack(header)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise DecryptionError("Not an encrypted archive (unknown format)")
+        # The header is untrusted: never let it ask for more scrypt memory/time or a bigger read than we write
+        if not (1 <= log_n <= SCRYPT_LOG_N and 1 <= r <= SCRYPT_R and 1 <= p <= SCRYPT_P
+                and 1 <= chunk_size <= CHUNK_SIZE):
+            raise DecryptionError("Not an encrypted archive (header parameters out of range)")
+        self._header = header
+        self._prefix = prefix
+        self._sealed_size = chunk_size + TAG_SIZE
+        self._aead = AESGCM(_derive_key(passphrase, salt, log_n, r, p))
+        self._counter = 0
+        self._next = raw.read(self._sealed_size)
+        self._buf = b""
+        self._pos = 0
+        self._done = False
+
+    def _fill(self):
+        sealed = self._next
+        self._next = self._raw.read(self._sealed_size)
+        last = not self._next
+        try:
+            self._buf = self._aead.decrypt(_nonce(self._prefix, self._counter, last), sealed, self._header)
+        except InvalidTag:
+            raise DecryptionError("Decryption failed: wrong passphrase or corrupted archive") from None
+        self._pos = 0
+        self._counter += 1
+        self._done = last
+
+    def read(self, size: int = -1) -> bytes:
+        out = []
+        while size < 0 or size > 0:
+            if self._pos >= len(self._buf):
+                if self._done:
+                    break
+                self._fill()
+                continue
+            end = len(self._buf) if size < 0 else min(len(self._buf), self._pos + size)
+            piece = self._buf[self._pos:end]
+            self._pos = end
+            out.append(piece)
+            if size > 0:
+                size -= len(piece)
+        return b"".join(out)
+
+    def seek(self, offset: int):
+        """Continue reading at plaintext `offset`; only the chunk holding it is decrypted (raw must be seekable)."""
+        chunk_size = self._sealed_size - TAG_SIZE
+        index = offset // chunk_size
+        self._raw.seek(_HEADER.size + index * self._sealed_size)
+        self._counter = index
+        self._next = self._raw.read(self._sealed_size)
+        self._buf = b""
+        self._pos = 0
+        self._done = not self._next
+        if not self._done:
+            self._fill()
+            self._pos = offset - index * chunk_size
+
+    def peek(self, size: int) -> bytes:
+        """Return up to size upcoming plaintext bytes (from the current chunk) without consuming them."""
+        if self._pos >= len(self._buf) and not self._done:
+            self._fill()
+        return self._buf[self._pos:self._pos + size]
+
+    def close(self):
+        pass
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/exclude.py
+
+"""
+exclude.py - gitignore-style exclusion of paths from backups.
+
+Patterns follow .gitignore rules (relative to the backup source):
+
+    # comment          blank lines and comments are ignored
+    *.log              no slash: matches the name at any depth
+    tmp/bin/           trailing slash: directories only
+    /settings.json     leading or inner slash: anchored to the source root
+    logs/**            ** matches any number of directories
+    !keep.log          re-include something an earlier pattern excluded
+
+An excluded directory is pruned as a whole (walk_tree never descends into it),
+so, as in git, nothing below it can be re-included. `restore --path` uses the
+same syntax to select paths (path_selector). All patterns are compiled
+once; without negations they are folded into a single regex.
+"""
+from __future__ import annotations
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .settings import get_setting
+
+# Regenerable runtime data that chat.backup_chat_history also skips: the helper
+# binaries and the per-project 64-hex runtime hash directories under tmp/
+DEFAULT_EXCLUDES = (
+    "/tmp/bin/",
+    "/tmp/" + "[0-9a-f]" * 64 + "/",
+)
+
+
+def _translate(glob: str) -> str:
+    """Glob (without anchoring/dir markers) -> regex body matching a whole relative path."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = glob.find("]", i + 2 if glob[i + 1:i + 2] in ("!", "^") else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = glob[i + 1:end]
+            if body[:1] in ("!", "^"):
+                body = "^" + body[1:]
+            out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(glob[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+class ExcludeMatcher:
+    """Compiled exclusion patterns; call matcher(rel_path, is_dir) -> True to exclude."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._rules = []  # (regex, negate, dir_only), in order
+        for raw in patterns:
+            line = raw.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            self.patterns.append(line)
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash anywhere but the end anchors the pattern to the root
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            body = _translate(line)
+            regex = f"^{body}$" if anchored else f"^(?:.*/)?{body}$"
+            self._rules.append((re.compile(regex), negate, dir_only))
+
+        # Fast path: with no negations the last-match-wins evaluation reduces to "any rule matches"
+        self._fast = not any(neg for _, neg, _ in self._rules)
+        self._any = None
+        self._any_files = None
+        if self._fast:
+            all_rules = [r.pattern for r, _, _ in self._rules]
+            file_rules = [r.pattern for r, _, dir_only in self._rules if not dir_only]
+            self._any = re.compile("|".join(f"(?:{p})" for p in all_rules)) if all_rules else None
+            self._any_files = re.compile("|".join(f"(?:{p})" for p in file_rules)) if file_rules else None
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def __call__(self, path: str, is_dir: bool = False) -> bool:
+        if self._fast:
+            regex = self._any if is_dir else self._any_files
+            return bool(regex and regex.match(path))
+        excluded = False
+        for regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(path):
+                excluded = not negate
+        return excluded
+
+
+def path_selector(patterns: Iterable[str]) -> Callable[[str], bool]:
+    """
+    select(rel_path, is_dir) for `restore --path`: the same pattern syntax,
+    used to pick paths instead of leaving them out. A path is selected when it
+    or any directory above it matches, so `chats/` or `tmp/*/chats` select
+    whole subtrees.
+    """
+    matcher = ExcludeMatcher(patterns)
+    dirs: Dict[str, bool] = {"": False}
+
+    def dir_selected(rel: str) -> bool:
+        if rel not in dirs:
+            dirs[rel] = dir_selected(rel.rpartition("/")[0]) or matcher(rel, True)
+        return dirs[rel]
+
+    def select(rel: str, is_dir: bool = False) -> bool:
+        return dir_selected(rel) if is_dir else dir_selected(rel.rpartition("/")[0]) or matcher(rel, False)
+    return select
+
+
+def read_exclude_file(path: str) -> List[str]:
+    with open(os.path.expanduser(path), "r", encoding="utf-8") as fh:
+        return fh.read().splitlines()
+
+
+def excludes_from_args(args) -> Optional[ExcludeMatcher]:
+    """
+    Build the matcher for a backup: the default profile (unless
+    --no-default-excludes / setting default_excludes=false), setting
+    backup_excludes, every --exclude-from file and every --exclude, in that
+    order. None when nothing is excluded.
+    """
+    patterns: List[str] = []
+    use_defaults = getattr(args, "no_default_excludes", False) is not True
+    if use_defaults and get_setting("default_excludes", True) not in (False, "false", "0", 0):
+        patterns.extend(DEFAULT_EXCLUDES)
+
+    configured = get_setting("backup_excludes", None)
+    if isinstance(configured, str):
+        configured = [p for p in configured.split(",")]
+    if isinstance(configured, list):
+        patterns.extend(str(p).strip() for p in configured)
+
+    exclude_from = getattr(args, "exclude_from", None)
+    if isinstance(exclude_from, list):
+        for path in exclude_from:
+            patterns.extend(read_exclude_file(path))
+
+    exclude = getattr(args, "exclude", None)
+    if isinstance(exclude, list):
+        patterns.extend(exclude)
+
+    matcher = ExcludeMatcher(patterns)
+    return matcher if matcher else None
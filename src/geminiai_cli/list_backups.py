@@ -4,28 +4,40 @@
 """
 list_backups.py
 
-Lists all available backups from the backup directory.
+Lists all available backups from the backup directory, and the contents of
+one archive (`backup ls`).
 """
+import datetime
 import os
 import sys
 import argparse
 from .ui import cprint, NEON_CYAN, NEON_YELLOW, NEON_RED
 from .b2 import B2Manager
+from .cloud_factory import shared_provider
 from .settings import get_setting
 from .config import DEFAULT_BACKUP_DIR, OLD_CONFIGS_DIR
+from .compression import is_archive_name
 from .credentials import resolve_credentials
+from .manifest import Manifest, manifest_path_for
+from .catalog import cloud_backups, rebuild_catalog
+from .exclude import path_selector
+from .archive import list_archive
+from .encryption import ENCRYPTED_SUFFIX, DecryptionError, read_passphrase
 
 def perform_list_backups(args: argparse.Namespace):
     if hasattr(args, 'cloud') and args.cloud:
         key_id, app_key, bucket_name = resolve_credentials(args)
 
-        b2 = B2Manager(key_id, app_key, bucket_name)
+        b2 = shared_provider(B2Manager, key_id, app_key, bucket_name)
         cprint(NEON_CYAN, f"Available backups in B2 bucket: {bucket_name}:")
         try:
             found_backups = False
-            for file_version, _ in b2.list_backups():
-                if file_version.file_name.endswith(".gemini.tar.gz"):
-                    cprint(NEON_CYAN, f"  {file_version.file_name}")
+            if getattr(args, 'refresh_catalog', False):
+                # The bucket was changed by something other than this tool
+                rebuild_catalog(b2)
+            for f in cloud_backups(b2):
+                if is_archive_name(f.name):
+                    cprint(NEON_CYAN, f"  {f.name}")
                     found_backups = True
             if not found_backups:
                 cprint(NEON_YELLOW, "No backups found in B2 bucket.")
@@ -40,9 +52,9 @@ def perform_list_backups(args: argparse.Namespace):
             cprint(NEON_YELLOW, f"Archive backup directory not found: {archive_dir}")
         else:
             try:
-                archives = [f for f in os.listdir(archive_dir) if os.path.isfile(os.path.join(archive_dir, f)) and f.endswith('.gemini.tar.gz')]
+                archives = [f for f in os.listdir(archive_dir) if os.path.isfile(os.path.join(archive_dir, f)) and is_archive_name(f)]
                 if not archives:
-                    cprint(NEON_YELLOW, f"No archive backups (*.tar.gz) found in {archive_dir}")
+                    cprint(NEON_YELLOW, f"No archive backups (*.gemini.tar.*) found in {archive_dir}")
                 else:
                     cprint(NEON_CYAN, f"Available archive backups in {archive_dir}:")
                     for backup in sorted(archives):
@@ -68,6 +80,67 @@ def perform_list_backups(args: argparse.Namespace):
             except OSError as e:
                 cprint(NEON_RED, f"Error reading directory backup path: {e}")
 
+def _format_mtime(seconds: float) -> str:
+    return datetime.datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M")
+
+
+def perform_archive_listing(args: argparse.Namespace):
+    """
+    backup ls <archive> [GLOB...]: the files a restore of the archive would
+    produce (its incremental chain included), read from the manifest stored
+    next to it, so nothing is decompressed. Archives without a manifest are
+    listed by reading through the tar stream. GLOBs filter like restore --path.
+    """
+    name = getattr(args, "archive", None)
+    if not isinstance(name, str) or not name:
+        cprint(NEON_RED, "Usage: geminiai backup ls <archive> [GLOB ...]")
+        sys.exit(2)
+    archive_path = os.path.abspath(os.path.expanduser(name))
+    if not os.path.exists(archive_path):
+        archive_dir = getattr(args, "archive_dir", None)
+        candidate = os.path.join(os.path.expanduser(archive_dir if isinstance(archive_dir, str) else DEFAULT_BACKUP_DIR),
+                                 os.path.basename(name))
+        if not os.path.exists(candidate):
+            cprint(NEON_RED, f"Archive not found: {name}")
+            sys.exit(1)
+        archive_path = candidate
+
+    patterns = getattr(args, "ls_paths", None)
+    select = path_selector(patterns) if isinstance(patterns, list) and patterns else None
+
+    rows = []
+    manifest = Manifest.load(manifest_path_for(archive_path))
+    if manifest is not None:
+        stored = manifest.meta.get("index", {}).get("members")
+        for path, entry in sorted(manifest.files.items()):
+            if select is None or select(path, False):
+                # Files of an incremental backup that did not change live in an earlier archive
+                marker = "" if stored is None or path in stored else "  (earlier backup)"
+                rows.append((entry.size, entry.mtime_ns / 1e9, path + marker))
+    elif archive_path.endswith(".gpg"):
+        cprint(NEON_RED, "This archive has no manifest; list a .gpg archive after decrypting it with gpg.")
+        sys.exit(1)
+    else:
+        passphrase = None
+        if archive_path.endswith(ENCRYPTED_SUFFIX):
+            passphrase = read_passphrase("Enter passphrase to decrypt backup: ")
+            if not passphrase:
+                cprint(NEON_RED, "Passphrase required for decryption.")
+                sys.exit(1)
+        try:
+            for member in list_archive(archive_path, passphrase=passphrase):
+                if member.isfile() and (select is None or select(member.name, False)):
+                    rows.append((member.size, member.mtime, member.name))
+        except (DecryptionError, RuntimeError, OSError, EOFError) as e:
+            cprint(NEON_RED, f"Could not read {archive_path}: {e}")
+            sys.exit(1)
+        rows.sort(key=lambda row: row[2])
+
+    for size, mtime, path in rows:
+        print(f"{size:>12}  {_format_mtime(mtime)}  {path}")
+    cprint(NEON_CYAN, f"{len(rows)} files, {sum(row[0] for row in rows)} bytes in {os.path.basename(archive_path)}")
+
+
 def main():
     parser = argparse.ArgumentParser(description="List available Gemini backups.")
     parser.add_argument("--search-dir", default=DEFAULT_BACKUP_DIR, help=f"Directory to search for archive backups (default {DEFAULT_BACKUP_DIR})")
@@ -75,6 +148,7 @@ def main():
     parser.add_argument("--bucket", help="B2 Bucket Name")
     parser.add_argument("--b2-id", help="B2 Key ID (or set env GEMINI_B2_KEY_ID)")
     parser.add_argument("--b2-key", help="B2 App Key (or set env GEMINI_B2_APP_KEY)")
+    parser.add_argument("--refresh-catalog", action="store_true", help="Rebuild the bucket's backup catalog from a full listing (with --cloud)")
     args = parser.parse_args()
 
     perform_list_backups(args)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/manifest.py
+
+"""
+manifest.py - Per-file (size, mtime, sha256) listings of a Gemini tree.
+
+A manifest is produced as a side effect of reading files for another purpose
+(archiving, copying), so that later steps can verify or compare trees without
+reading the data again.  Manifests are stored as JSON next to the archive they
+describe: <archive>.manifest.json
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import stat
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterator, Optional, Any
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# Read size used when streaming file contents through hashers/copies
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class FileEntry:
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+@dataclass
+class TreeItem:
+    """A single node found while walking a tree (relative posix path + lstat result)."""
+    path: str
+    full_path: str
+    st: os.stat_result
+
+    @property
+    def is_dir(self) -> bool:
+        return stat.S_ISDIR(self.st.st_mode)
+
+    @property
+    def is_file(self) -> bool:
+        return stat.S_ISREG(self.st.st_mode)
+
+    @property
+    def is_symlink(self) -> bool:
+        return stat.S_ISLNK(self.st.st_mode)
+
+
+class Manifest:
+    """Mapping of relative posix path -> FileEntry for every regular file in a tree."""
+
+    def __init__(self, files: Optional[Dict[str, FileEntry]] = None, meta: Optional[Dict[str, Any]] = None):
+        self.files: Dict[str, FileEntry] = files if files is not None else {}
+        self.meta: Dict[str, Any] = meta if meta is not None else {}
+
+    def add(self, path: str, entry: FileEntry):
+        self.files[path] = entry
+
+    def total_size(self) -> int:
+        return sum(e.size for e in self.files.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "meta": self.meta,
+            "files": {p: asdict(e) for p, e in sorted(self.files.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Manifest":
+        files = {p: FileEntry(**e) for p, e in data.get("files", {}).items()}
+        return cls(files=files, meta=data.get("meta", {}))
+
+    @classmethod
+    def loads(cls, text) -> Optional["Manifest"]:
+        """Parse a manifest from JSON text (e.g. fetched from the cloud), or None if invalid."""
+        if not isinstance(text, str):
+            return None
+        try:
+            return cls.from_dict(json.loads(text))
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+    def dumps(self) -> str:
+        """Serialize to compact JSON, the inverse of loads()."""
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def save(self, path: str):
+        """Write atomically so a crash never leaves a truncated manifest behind."""
+        tmp = f"{path}.part"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.dumps())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Manifest"]:
+        """Return the manifest stored at path, or None if missing/unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                return cls.from_dict(json.load(fh))
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+def manifest_path_for(archive_path: str) -> str:
+    return f"{archive_path}{MANIFEST_SUFFIX}"
+
+
+def dir_manifest_path_for(dir_path: str) -> str:
+    """Manifest of a directory backup: a hidden sibling, so the backup itself stays a plain copy."""
+    parent, name = os.path.split(dir_path.rstrip(os.sep))
+    return os.path.join(parent, f".{name}{MANIFEST_SUFFIX}")
+
+
+class HashingReader:
+    """
+    File-like wrapper that hashes every byte read through it, so a consumer
+    (tarfile, shutil.copyfileobj, ...) and the hasher share the same read.
+    """
+
+    def __init__(self, fh):
+        self._fh = fh
+        self._hash = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fh.read(size)
+        if data:
+            self._hash.update(data)
+            self.bytes_read += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while True:
+            data = fh.read(CHUNK_SIZE)
+            if not data:
+                break
+            h.update(data)
+    return h.hexdigest()
+
+
+def walk_tree(root: str, exclude: Optional[Callable[[str, bool], bool]] = None) -> Iterator[TreeItem]:
+    """
+    Walk root once, yielding directories before their contents, in sorted order.
+
+    Uses os.scandir so each node is stat'ed exactly once; symlinks are reported
+    as symlinks and never followed. exclude(rel_path, is_dir) -> True skips an
+    entry; an excluded directory is not descended into.
+    """
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        full_dir = os.path.join(root, rel_dir) if rel_dir else root
+        try:
+            with os.scandir(full_dir) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except FileNotFoundError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                # Vanished between listing and stat (e.g. Gemini rotating a temp file)
+                continue
+            item = TreeItem(rel, entry.path, st)
+            if exclude is not None and exclude(rel, item.is_dir):
+                continue
+            yield item
+            if item.is_dir:
+                subdirs.append(rel)
+
+        # Reverse so the stack pops subdirectories in sorted order
+        stack.extend(reversed(subdirs))
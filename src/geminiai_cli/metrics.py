@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/metrics.py
+
+"""
+metrics.py - Per-phase timing and resource counters for backup and restore.
+
+`--timings` prints a table after the run, `--metrics-json <path>` (or setting
+metrics_json) writes the same data as JSON for dashboards and slowdown alerts.
+Each phase records:
+
+    wall_seconds    elapsed time
+    cpu_seconds     user+system CPU of this process (all threads) and of any
+                    subprocesses it waited for (cp, diff, gpg)
+    bytes_read      bytes read/written by this process through read/write
+    bytes_written   system calls (/proc/self/io rchar/wchar, Linux only), so
+                    cloud transfers over sockets are included
+    files           files handled by the phase, where the phase knows it
+
+Phases flagged `cloud` (uploads, downloads, streaming to a bucket) are summed
+into `cloud_seconds`. Counters are process-wide: with --sources, concurrent
+backups share them.
+"""
+from __future__ import annotations
+import datetime
+import json
+import os
+import resource
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+
+from .settings import get_setting
+
+
+@dataclass
+class PhaseMetrics:
+    name: str
+    cloud: bool = False
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    bytes_read: Optional[int] = None
+    bytes_written: Optional[int] = None
+    files: Optional[int] = None
+
+
+def _read_proc_io():
+    """(rchar, wchar) of this process, or None where /proc/self/io is unavailable."""
+    try:
+        with open("/proc/self/io", "r") as fh:
+            fields = dict(line.split(":", 1) for line in fh if ":" in line)
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _cpu_seconds() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _peak_rss() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Metrics:
+    """
+    Sequential phase recorder: begin(name) ends the running phase and starts
+    the next one. Used as a context manager around a whole command, it ends
+    the last phase, marks the run failed if it raised (SystemExit included),
+    and prints/writes the report when asked to.
+    """
+
+    def __init__(self, command: str, timings: bool = False, json_path: Optional[str] = None):
+        self.command = command
+        self.timings = timings
+        self.json_path = json_path
+        self.phases: List[PhaseMetrics] = []
+        self.ok = False
+        self.started = datetime.datetime.now().astimezone().isoformat(timespec="seconds")
+        self._current: Optional[PhaseMetrics] = None
+        self._start = None
+        self._run_start = (time.perf_counter(), _cpu_seconds())
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.timings or self.json_path)
+
+    def begin(self, name: str, cloud: bool = False) -> PhaseMetrics:
+        self.end()
+        self._current = PhaseMetrics(name=name, cloud=cloud)
+        self._start = (time.perf_counter(), _cpu_seconds(), _read_proc_io())
+        return self._current
+
+    def end(self):
+        phase = self._current
+        if phase is None:
+            return
+        wall, cpu, io = self._start
+        phase.wall_seconds = round(time.perf_counter() - wall, 6)
+        phase.cpu_seconds = round(_cpu_seconds() - cpu, 6)
+        io_now = _read_proc_io()
+        if io is not None and io_now is not None:
+            phase.bytes_read = io_now[0] - io[0]
+            phase.bytes_written = io_now[1] - io[1]
+        self.phases.append(phase)
+        self._current = None
+
+    def to_dict(self) -> dict:
+        wall, cpu = self._run_start
+        return {
+            "command": self.command,
+            "ok": self.ok,
+            "started": self.started,
+            "wall_seconds": round(time.perf_counter() - wall, 6),
+            "cpu_seconds": round(_cpu_seconds() - cpu, 6),
+            "cloud_seconds": round(sum(p.wall_seconds for p in self.phases if p.cloud), 6),
+            "peak_rss": _peak_rss(),
+            "phases": [asdict(p) for p in self.phases],
+        }
+
+    def report(self):
+        data = self.to_dict()
+        if self.timings:
+            print_timings(data)
+        if self.json_path:
+            path = os.path.abspath(os.path.expanduser(self.json_path))
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    json.dump(data, fh, indent=2)
+                os.replace(tmp, path)
+            except OSError as e:
+                # Metrics must never turn a successful backup into a failed one
+                print(f"Warning: could not write metrics to {path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end()
+        self.ok = exc_type is None or (exc_type is SystemExit and exc.code in (None, 0))
+        if self.enabled:
+            self.report()
+        return False
+
+
+def _fmt_bytes(n: Optional[int]) -> str:
+    if n is None:
+        return "-"
+    if n < 1000:
+        return f"{n} B"
+    for unit in ("KB", "MB", "GB"):
+        n /= 1000
+        if n < 1000 or unit == "GB":
+            return f"{n:.1f} {unit}"
+
+
+def print_timings(data: dict):
+    from rich.table import Table
+    from .ui import console
+
+    table = Table(title=f"{data['command']} timings", show_header=True, header_style="bold magenta")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Wall", justify="right")
+    table.add_column("CPU", justify="right")
+    table.add_column("Read", justify="right")
+    table.add_column("Written", justify="right")
+    table.add_column("Files", justify="right")
+    for p in data["phases"]:
+        table.add_row(p["name"] + (" ☁" if p["cloud"] else ""), f"{p['wall_seconds']:.2f}s",
+                      f"{p['cpu_seconds']:.2f}s", _fmt_bytes(p["bytes_read"]), _fmt_bytes(p["bytes_written"]),
+                      "-" if p["files"] is None else str(p["files"]))
+    table.add_row("[bold]total[/]", f"[bold]{data['wall_seconds']:.2f}s[/]", f"[bold]{data['cpu_seconds']:.2f}s[/]",
+                  "", "", "")
+    console.print(table)
+    extra = f"cloud transfer {data['cloud_seconds']:.2f}s, " if data["cloud_seconds"] else ""
+    console.print(f"[dim]{extra}peak RSS {_fmt_bytes(data['peak_rss'])}"
+                  f"{'' if data['ok'] else ', run FAILED'}[/]")
+
+
+def metrics_from_args(command: str, args) -> Metrics:
+    """--timings / --metrics-json (falling back to setting metrics_json)."""
+    timings = getattr(args, "timings", False) is True
+    json_path = getattr(args, "metrics_json", None)
+    if not isinstance(json_path, str):
+        json_path = get_setting("metrics_json", None)
+    return Metrics(command, timings=timings, json_path=json_path if isinstance(json_path, str) and json_path else None)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/multi_backup.py
+
+"""
+multi_backup.py - `backup --sources`: back up many .gemini trees concurrently.
+
+For shared servers where every Unix user has a ~/.gemini. The sources come
+from a glob (e.g. "/home/*/.gemini") or a file listing one path or glob per
+line. A bounded pool of workers runs perform_backup for each source: every
+source takes its own lock (backup.lock_path_for), gets its own subdirectory
+of --archive-dir and --dest-dir-parent so names can never collide, and shares
+the compression threads with the other workers. Each worker's output is
+captured and only shown for sources that failed, followed by a summary table.
+"""
+from __future__ import annotations
+import copy
+import glob
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from rich.table import Table
+
+from .compression import default_threads
+from .settings import get_setting
+from .ui import console
+
+DEFAULT_MAX_JOBS = 4
+
+
+@dataclass
+class SourceResult:
+    label: str
+    src: str
+    status: str  # "ok", "failed" or "locked"
+    seconds: float
+    output: str = ""
+
+
+class _ThreadStdout:
+    """sys.stdout replacement that sends each worker thread's prints to its own buffer."""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def capture(self, buf: Optional[io.StringIO]):
+        self._local.buf = buf
+
+    def write(self, text):
+        buf = getattr(self._local, "buf", None)
+        return (buf or self._fallback).write(text)
+
+    def flush(self):
+        buf = getattr(self._local, "buf", None)
+        (buf or self._fallback).flush()
+
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+
+
+def expand_sources(spec: str) -> List[str]:
+    """
+    Directories named by spec: a glob, or a file with one path/glob per line
+    (blank lines and # comments ignored). Sorted, deduplicated, absolute.
+    """
+    spec = os.path.expanduser(spec)
+    if os.path.isfile(spec):
+        with open(spec, "r", encoding="utf-8") as fh:
+            patterns = [line.strip() for line in fh]
+        patterns = [p for p in patterns if p and not p.startswith("#")]
+    else:
+        patterns = [spec]
+
+    found = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.expanduser(pattern)):
+            if os.path.isdir(path):
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def source_labels(sources: List[str]) -> List[Tuple[str, str]]:
+    """(label, src) pairs: the owning home's name for /home/<user>/.gemini, unique across sources."""
+    labels = []
+    seen = {}
+    for src in sources:
+        base = os.path.basename(src)
+        label = os.path.basename(os.path.dirname(src)) if base.startswith(".") else base
+        label = label or "root"
+        count = seen.get(label, 0)
+        seen[label] = count + 1
+        labels.append((f"{label}-{count + 1}" if count else label, src))
+    return labels
+
+
+def max_jobs(args) -> int:
+    """--jobs, else setting backup_jobs, else min(4, cores)."""
+    jobs = getattr(args, "jobs", None)
+    if not isinstance(jobs, int) or isinstance(jobs, bool) or jobs < 1:
+        jobs = int(get_setting("backup_jobs", 0) or 0)
+    return jobs if jobs > 0 else min(DEFAULT_MAX_JOBS, os.cpu_count() or 1)
+
+
+def _run_one(backup: Callable, args, label: str, src: str, stdout: _ThreadStdout) -> SourceResult:
+    buf = io.StringIO()
+    stdout.capture(buf)
+    start = time.monotonic()
+    status = "ok"
+    try:
+        backup(args)
+    except SystemExit as e:
+        if e.code == 2:
+            status = "locked"
+        elif e.code:
+            status = "failed"
+    except Exception as e:
+        print(f"Error: {e}")
+        status = "failed"
+    finally:
+        stdout.capture(None)
+    return SourceResult(label, src, status, time.monotonic() - start, buf.getvalue())
+
+
+def backup_sources(args, sources: List[Tuple[str, str]], backup: Callable, jobs: int) -> List[SourceResult]:
+    """Back up every (label, src) with at most jobs running at once; results in input order."""
+    archive_root = os.path.abspath(os.path.expanduser(args.archive_dir))
+    dest_root = os.path.abspath(os.path.expanduser(args.dest_dir_parent))
+    threads = max(1, default_threads() // jobs)
+
+    stdout = _ThreadStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = []
+            for label, src in sources:
+                run_args = copy.copy(args)
+                run_args.src = src
+                run_args.archive_dir = os.path.join(archive_root, label)
+                run_args.dest_dir_parent = os.path.join(dest_root, label)
+                run_args.threads = threads
+                futures.append(pool.submit(_run_one, backup, run_args, label, src, stdout))
+            return [f.result() for f in futures]
+    finally:
+        sys.stdout = stdout._fallback
+
+
+def print_summary(results: List[SourceResult]):
+    for r in results:
+        if r.status == "failed" and r.output:
+            console.print(f"[bold red]--- {r.label} ({r.src}) ---[/]")
+            print(r.output.rstrip())
+
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Source", style="cyan")
+    table.add_column("Path", style="dim")
+    table.add_column("Status", justify="center")
+    table.add_column("Time", justify="right")
+    styles = {"ok": "[bold green]OK[/]", "failed": "[bold red]FAILED[/]", "locked": "[bold yellow]LOCKED[/]"}
+    for r in results:
+        table.add_row(r.label, r.src, styles[r.status], f"{r.seconds:.1f}s")
+    console.print(table)
+
+    ok = sum(1 for r in results if r.status == "ok")
+    console.print(f"{ok}/{len(results)} sources backed up.")
+
+
+def perform_multi_backup(args, backup: Optional[Callable] = None):
+    """Entry point for backup --sources. Exits 1 if any source failed or was locked."""
+    if backup is None:
+        from .backup import perform_backup as backup
+
+    if getattr(args, "watch", False) is True:
+        print("Error: --sources cannot be combined with --watch.")
+        sys.exit(1)
+
+    sources = expand_sources(args.sources)
+    if not sources:
+        print(f"Error: no source directories match {args.sources}")
+        sys.exit(1)
+
+    jobs = min(max_jobs(args), len(sources))
+    print(f"Backing up {len(sources)} sources with {jobs} workers.")
+    results = backup_sources(args, source_labels(sources), backup, jobs)
+    print_summary(results)
+    if any(r.status != "ok" for r in results):
+        sys.exit(1)
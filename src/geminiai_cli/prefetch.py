@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/prefetch.py
+
+"""
+prefetch.py - Background download of the next recommended account's backup.
+
+With --prefetch (or setting prefetch = true), `recommend`, `cooldown` and a
+finished `restore` start a detached `python -m geminiai_cli.prefetch`. It asks
+get_recommendation() for the next account and pulls that account's newest
+cloud backup (and its incremental parents) into the download cache, where it
+is verified against the provider checksum. The later `restore --auto --cloud`
+then takes the archive from the cache instead of the network.
+
+Only one prefetch runs at a time (CACHE_DIR/prefetch.lock); its output goes to
+CACHE_DIR/prefetch.log. Nothing is prefetched with the cache disabled.
+"""
+from __future__ import annotations
+import argparse
+import fcntl
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Optional
+
+from .catalog import cloud_backups
+from .cloud_factory import get_cloud_provider
+from .download_cache import CACHE_DIR, download_cache
+from .recommend import get_recommendation
+from .restore import download_cloud_chain
+from .settings import get_setting
+from .slots import latest_backups
+
+PREFETCH_LOCK = os.path.join(CACHE_DIR, "prefetch.lock")
+PREFETCH_LOG = os.path.join(CACHE_DIR, "prefetch.log")
+
+# CLI credential flags handed to the background process through its environment
+CREDENTIAL_ENV = {"b2_id": "GEMINI_B2_KEY_ID", "b2_key": "GEMINI_B2_APP_KEY", "bucket": "GEMINI_B2_BUCKET"}
+
+
+def prefetch_enabled(args: Optional[argparse.Namespace] = None) -> bool:
+    """--prefetch, or setting prefetch."""
+    if getattr(args, 'prefetch', False) is True:
+        return True
+    return get_setting("prefetch", False) in (True, "true", "1", 1)
+
+
+def prefetch_recommended(args: Optional[argparse.Namespace] = None, provider=None) -> Optional[str]:
+    """
+    Download the recommended account's newest cloud backup into the download
+    cache. Returns the backup's name, or None when there was nothing to fetch.
+    """
+    cache = download_cache(args)
+    if cache.limit <= 0:
+        print("Download cache is disabled; nothing to prefetch.")
+        return None
+    rec = get_recommendation()
+    if not rec:
+        print("No 'Green' (Ready) account to prefetch.")
+        return None
+    provider = provider or get_cloud_provider(args)
+    if not provider:
+        return None
+
+    listing = {f.name: f for f in cloud_backups(provider)}
+    name = latest_backups(list(listing)).get(rec.email)
+    if not name:
+        print(f"No backups found in cloud for recommended account: {rec.email}")
+        return None
+
+    print(f"Prefetching {name} for {rec.email}...")
+    download_dir = tempfile.mkdtemp(prefix="gemini-prefetch-")
+    try:
+        # The cache keeps its own copy; the delivered files are not needed
+        download_cloud_chain(provider, name, download_dir, listing=listing, cache=cache)
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+    print(f"{name} is in the download cache.")
+    return name
+
+
+def start_prefetch(args: Optional[argparse.Namespace] = None) -> Optional[subprocess.Popen]:
+    """When prefetching is enabled, start it in a detached background process."""
+    if not prefetch_enabled(args) or getattr(args, 'dry_run', False) is True:
+        return None
+    env = dict(os.environ)
+    for attr, var in CREDENTIAL_ENV.items():
+        value = getattr(args, attr, None)
+        if isinstance(value, str) and value:
+            env[var] = value
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(PREFETCH_LOG, "a") as log:
+        return subprocess.Popen([sys.executable, "-m", "geminiai_cli.prefetch"], stdin=subprocess.DEVNULL,
+                                stdout=log, stderr=subprocess.STDOUT, env=env, start_new_session=True)
+
+
+def main():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(PREFETCH_LOCK, "w") as lockfh:
+        try:
+            fcntl.flock(lockfh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print("Another prefetch is running.")
+            return
+        try:
+            prefetch_recommended(argparse.Namespace())
+        except Exception as e:
+            print(f"Prefetch failed: {e}")
+            sys.exit(1)
+        finally:
+            fcntl.flock(lockfh, fcntl.LOCK_UN)
+
+
+if __name__ == "__main__":
+    main()
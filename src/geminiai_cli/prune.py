@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 # src/geminiai_cli/prune.py
 
+import fcntl
 import os
 import time
 from .ui import cprint, NEON_GREEN, NEON_RED, NEON_YELLOW, NEON_CYAN
 from .b2 import B2Manager
+from .cloud_factory import shared_provider
 import shutil
 from .credentials import resolve_credentials
 from .config import TIMESTAMPED_DIR_REGEX, OLD_CONFIGS_DIR
+from .manifest import Manifest, manifest_path_for, dir_manifest_path_for
+from .compression import is_archive_name
+from .backup import acquire_lock
+from .chunkstore import ChunkStore, snapshot_base_name, list_cloud_snapshots, forget_cloud_snapshot, gc_cloud
+from .catalog import rebuild_catalog, catalog_removed
 
 def parse_ts(name):
     m = TIMESTAMPED_DIR_REGEX.match(name)
@@ -23,7 +30,7 @@ def get_backup_list(files):
     """
     valid = []
     for f in files:
-        if f.endswith(".gemini.tar.gz"):
+        if is_archive_name(f):
             ts = parse_ts(f)
             if ts:
                 valid.append((ts, f))
@@ -43,9 +50,9 @@ def get_backup_list_dirs(files):
         # The pattern does not need to check for .tar.gz
         m = TIMESTAMPED_DIR_REGEX.match(f)
         if m:
-            # Check if the matched part is the whole string, but without .tar.gz
+            # Check if the matched part is the whole string, but without an archive suffix
             # This avoids matching archive files if they are passed in
-            if not f.endswith(".tar.gz"):
+            if not is_archive_name(f, encrypted=True):
                 ts = parse_ts(f)
                 if ts:
                     valid.append((ts, f))
@@ -53,11 +60,29 @@ def get_backup_list_dirs(files):
     valid.sort(key=lambda x: x[0], reverse=True)
     return valid
 
-def prune_list(backups, keep_count, dry_run, delete_callback):
+def chain_ancestors(names, load_manifest):
+    """
+    Return every archive the incremental backups in `names` depend on.
+    load_manifest: func(archive_name) -> Manifest or None
+    """
+    needed = set()
+    for name in names:
+        manifest = load_manifest(name)
+        while manifest is not None and manifest.meta.get("kind") == "incremental":
+            parent = manifest.meta.get("parent")
+            if not parent or parent in needed:
+                break
+            needed.add(parent)
+            manifest = load_manifest(parent)
+    return needed
+
+def prune_list(backups, keep_count, dry_run, delete_callback, load_manifest=None):
     """
     backups: list of (ts, filename) sorted newest first.
     keep_count: int
     delete_callback: func(filename)
+    load_manifest: optional func(filename) -> Manifest; when given, archives that a
+        kept incremental backup still depends on are not deleted.
     """
     if len(backups) <= keep_count:
         cprint(NEON_GREEN, f"Total backups ({len(backups)}) <= keep count ({keep_count}). No pruning needed.")
@@ -66,6 +91,13 @@ def prune_list(backups, keep_count, dry_run, delete_callback):
     to_keep = backups[:keep_count]
     to_delete = backups[keep_count:]
 
+    if load_manifest is not None:
+        needed = chain_ancestors([f for _, f in to_keep], load_manifest)
+        if needed:
+            to_keep += [b for b in to_delete if b[1] in needed]
+            to_delete = [b for b in to_delete if b[1] not in needed]
+            cprint(NEON_CYAN, f"Retaining {len(needed)} older backups needed by incremental chains.")
+
     cprint(NEON_CYAN, f"Keeping {len(to_keep)} latest backups.")
     cprint(NEON_YELLOW, f"Pruning {len(to_delete)} old backups...")
 
@@ -99,8 +131,16 @@ def do_prune(args):
                     os.remove(path)
                 except Exception as e:
                     cprint(NEON_RED, f"Failed to remove {path}: {e}")
+                    return
+                # Drop the sidecar manifest too, it is meaningless without its archive
+                sidecar = manifest_path_for(path)
+                if os.path.exists(sidecar):
+                    os.remove(sidecar)
 
-            prune_list(backups, keep, dry_run, local_delete_file)
+            def local_manifest(fname):
+                return Manifest.load(manifest_path_for(os.path.join(archive_dir, fname)))
+
+            prune_list(backups, keep, dry_run, local_delete_file, local_manifest)
         else:
              cprint(NEON_YELLOW, f"Archive backup directory not found: {archive_dir}")
 
@@ -116,35 +156,78 @@ def do_prune(args):
                     shutil.rmtree(path)
                 except Exception as e:
                     cprint(NEON_RED, f"Failed to remove directory {path}: {e}")
+                    return
+                sidecar = dir_manifest_path_for(path)
+                if os.path.exists(sidecar):
+                    os.remove(sidecar)
 
             prune_list(dir_backups, keep, dry_run, local_delete_dir)
         else:
             cprint(NEON_YELLOW, f"Directory backup path not found: {dir_backup_path}")
 
-    # 2. Cloud Prune (Only for archives, which is correct)
+        # Prune chunked snapshots, then drop chunks nothing references anymore
+        store = ChunkStore()
+        snapshots = store.list_snapshots()
+        if snapshots:
+            cprint(NEON_CYAN, f"\n[CHUNK SNAPSHOTS] Scanning {store.snapshots_dir}...")
+            snap_backups = [(parse_ts(snapshot_base_name(n)), n) for n in snapshots]
+            snap_backups.sort(key=lambda x: x[0], reverse=True)
+            # Not while a backup or restore of ~/.gemini is using the store
+            lockfd = None if dry_run else acquire_lock()
+            try:
+                prune_list(snap_backups, keep, dry_run, store.forget)
+                if not dry_run:
+                    removed = store.gc()
+                    if removed:
+                        cprint(NEON_GREEN, f"Removed {removed} unreferenced chunks.")
+            finally:
+                if lockfd is not None:
+                    fcntl.flock(lockfd, fcntl.LOCK_UN)
+                    lockfd.close()
+
+    # 2. Cloud Prune (archives and chunked snapshots)
     if args.cloud or args.cloud_only:
         key_id, app_key, bucket_name = resolve_credentials(args)
 
         if key_id and app_key and bucket_name:
             cprint(NEON_CYAN, f"\n[CLOUD] Scanning B2 Bucket: {bucket_name}...")
             try:
-                b2 = B2Manager(key_id, app_key, bucket_name)
-                files = []
-                cloud_files_map = {} # fname -> file_id (for deletion)
-                
-                for fv, _ in b2.list_backups():
-                    files.append(fv.file_name)
-                    cloud_files_map[fv.file_name] = fv.id_
-                
+                b2 = shared_provider(B2Manager, key_id, app_key, bucket_name)
+                # Deleting from a catalog that misses objects uploaded elsewhere could break their chains
+                files = set(rebuild_catalog(b2))
                 backups = get_backup_list(files)
-                
+                deleted = []
+
                 def cloud_delete(fname):
                     try:
-                        b2.bucket.delete_file_version(cloud_files_map[fname], fname)
+                        for name in (fname, manifest_path_for(fname)):
+                            if name in files:
+                                b2.bucket.delete_file_version(b2.bucket.get_file_info_by_name(name).id_, name)
+                                deleted.append(name)
                     except Exception as e:
                          cprint(NEON_RED, f"Failed to delete cloud file {fname}: {e}")
 
-                prune_list(backups, keep, dry_run, cloud_delete)
+                def cloud_manifest(fname):
+                    sidecar = manifest_path_for(fname)
+                    if sidecar not in files:
+                        return None
+                    return Manifest.loads(b2.download_to_string(sidecar))
+
+                prune_list(backups, keep, dry_run, cloud_delete, cloud_manifest)
+                if deleted:
+                    catalog_removed(b2, deleted)
+
+                # Chunked snapshots pushed with --engine chunked --cloud, then their orphaned chunks
+                snapshots = list_cloud_snapshots(b2)
+                if snapshots:
+                    cprint(NEON_CYAN, "\n[CLOUD CHUNK SNAPSHOTS] Scanning...")
+                    snap_backups = [(parse_ts(snapshot_base_name(n)), n) for n in snapshots]
+                    snap_backups.sort(key=lambda x: x[0], reverse=True)
+                    prune_list(snap_backups, keep, dry_run, lambda name: forget_cloud_snapshot(b2, name))
+                    if not dry_run:
+                        removed = gc_cloud(b2)
+                        if removed:
+                            cprint(NEON_GREEN, f"Removed {removed} unreferenced cloud chunks.")
 
             except Exception as e:
                 cprint(NEON_RED, f"[ERROR] Cloud prune failed: {e}")
@@ -29,7 +29,7 @@ import subprocess
 import sys
 import tempfile
 import time
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from .config import DEFAULT_BACKUP_DIR, NEON_GREEN, NEON_RED, NEON_YELLOW, NEON_CYAN, RESET, DEFAULT_GEMINI_HOME, TIMESTAMPED_DIR_REGEX, OLD_CONFIGS_DIR, GEMINI_CLI_HOME
 from .cloud_factory import get_cloud_provider
 from .settings import get_setting
@@ -39,18 +39,32 @@ from .cooldown import record_switch
 from .reset_helpers import add_24h_cooldown_for_email, sync_resets_with_cloud
 from .recommend import get_recommendation, Recommendation
 from .ui import cprint, NEON_YELLOW, NEON_RED, NEON_GREEN, NEON_CYAN
+from .chunkstore import ChunkStore, list_cloud_snapshots, pull_snapshot, snapshot_email
+from .manifest import Manifest, manifest_path_for, walk_tree
+from .exclude import path_selector
+from .delta import DeltaTransaction, plan_delta, pending as pending_delta, recover as recover_delta, target_entries
+from .compression import detect_codec, is_archive_name, strip_archive_suffix
+from .archive import extract_archive_file, extract_members
+from .encryption import ENCRYPTED_SUFFIX, DecryptionError, read_passphrase
+from .metrics import Metrics, metrics_from_args
+from .download_cache import ChecksumMismatch, DownloadCache, download_cache
+from .catalog import cloud_backups
+from .verify import VERIFY_MODES, copy_tree, verify_tree, compare_manifests, report_problems, verify_mode
 
 LOCKFILE = os.path.join(GEMINI_CLI_HOME, ".backup.lock")
 
-def acquire_lock(path: str = LOCKFILE):
+def acquire_lock(path: str = LOCKFILE, wait: bool = False):
     # Ensure the directory for the lockfile exists
     os.makedirs(os.path.dirname(path), exist_ok=True)
     fd = open(path, "w+")
     try:
         fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
     except BlockingIOError:
-        print("Another backup/restore is running. Exiting.")
-        sys.exit(2)
+        if not wait:
+            print("Another backup/restore is running. Exiting.")
+            sys.exit(2)
+        print("Waiting for a running backup/restore to finish...")
+        fcntl.flock(fd, fcntl.LOCK_EX)
     return fd
 
 def run(cmd: str, check: bool = True, capture: bool = False):
@@ -76,11 +90,21 @@ def parse_timestamp_from_name(name: str) -> Optional[time.struct_time]:
         return None
 
 def is_backup_archive(filename: str) -> bool:
-    return filename.endswith(".gemini.tar.gz") or filename.endswith(".gemini.tar.gz.gpg")
+    """Any codec's archive name (.tar.gz, .tar.zst, .tar.lz4, .tar), optionally .gpg encrypted."""
+    return is_archive_name(filename, encrypted=True)
+
+def is_parent_name(name) -> bool:
+    """
+    A manifest's `parent` must be a plain backup archive name: it comes from
+    a file that may have been downloaded from the bucket and is joined onto
+    local directories.
+    """
+    return (isinstance(name, str) and name == os.path.basename(name) and "/" not in name
+            and not name.startswith(".") and bool(TIMESTAMPED_DIR_REGEX.match(name)) and is_backup_archive(name))
 
 def find_oldest_archive_backup(search_dir: str) -> Optional[str]:
     """
-    Search search_dir for backup archives (*.gemini.tar.gz or *.gpg) matching the
+    Search search_dir for backup archives (*.gemini.tar.* or *.gpg) matching the
     timestamp pattern and return the full path of the oldest backup (earliest
     timestamp). If none found, return None.
     """
@@ -120,21 +144,16 @@ def find_latest_archive_backup_for_email(search_dir: str, email: str) -> Optiona
                 continue
 
             # Robust matching: Parse filename to extract email
-            # Format: YYYY-MM-DD_HHMMSS-<email>.gemini.tar.gz[.gpg]
+            # Format: YYYY-MM-DD_HHMMSS-<email>.gemini.tar[.gz|.zst|.lz4][.gpg]
 
             # Extract suffix after first 18 chars (timestamp + hyphen)
             if len(entry) <= 18:
                 continue
 
-            suffix = entry[18:] # <email>.gemini.tar.gz[.gpg]
-
-            email_in_file = None
-            if suffix.endswith(".gemini.tar.gz"):
-                 email_in_file = suffix[:-14]
-            elif suffix.endswith(".gemini.tar.gz.gpg"):
-                 email_in_file = suffix[:-18]
-            else:
+            base = strip_archive_suffix(entry[18:]) # <email>.gemini
+            if not base:
                 continue
+            email_in_file = base[:-len(".gemini")]
 
             if email_in_file != email:
                 continue
@@ -153,16 +172,104 @@ def find_latest_archive_backup_for_email(search_dir: str, email: str) -> Optiona
     return candidates[0][1]
 
 
-def extract_archive(archive_path: str, extract_to: str):
+def select_snapshot(args: argparse.Namespace, store: ChunkStore) -> str:
+    """
+    Pick the chunked snapshot to restore, using the same rules as archives:
+    --auto -> latest for the recommended account, --from-archive -> that name,
+    otherwise the oldest. With --cloud the snapshot and its missing chunks are
+    pulled into the local chunk store first.
+    """
+    provider = None
+    if getattr(args, 'cloud', False):
+        provider = get_cloud_provider(args)
+        if not provider:
+            sys.exit(1)
+        print("Fetching snapshot list from Cloud...")
+        names = list_cloud_snapshots(provider)
+    else:
+        names = store.list_snapshots()
+
+    if not names:
+        print("No chunked snapshots found.")
+        sys.exit(1)
+
+    if getattr(args, 'auto', False):
+        rec = get_recommendation()
+        if not rec:
+            cprint(NEON_RED, "No 'Green' (Ready) accounts available for auto-switch.")
+            sys.exit(1)
+        cprint(NEON_CYAN, f"Auto-switch recommendation: {rec.email}")
+        candidates = [n for n in names if snapshot_email(n) == rec.email]
+        if not candidates:
+            cprint(NEON_RED, f"No snapshots found for recommended account: {rec.email}")
+            sys.exit(1)
+        name = candidates[-1]
+        cprint(NEON_GREEN, f"Selected latest snapshot for {rec.email}: {name}")
+    elif getattr(args, 'from_archive', None):
+        name = os.path.basename(args.from_archive)
+        if name not in names:
+            print(f"Error: Specified snapshot '{name}' not found.")
+            sys.exit(1)
+        print(f"Selected specified snapshot: {name}")
+    else:
+        name = names[0]
+        print(f"Auto-selected oldest snapshot: {name}")
+
+    if provider:
+        try:
+            fetched = pull_snapshot(store, provider, name)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"Pulled snapshot {name} ({fetched} chunks downloaded).")
+    return name
+
+def chain_passphrase(chain: List[str]) -> Optional[str]:
+    """Ask once for the passphrase of a chain holding encrypted archives; None when none is encrypted."""
+    if not any(path.endswith((ENCRYPTED_SUFFIX, ".gpg")) for path in chain):
+        return None
+    passphrase = read_passphrase("Enter passphrase to decrypt backup: ")
+    if not passphrase:
+        print("Error: Passphrase required for decryption.")
+        sys.exit(1)
+    return passphrase
+
+def extract_archive(archive_path: str, extract_to: str, manifest: Optional[Manifest] = None,
+                    select=None, offsets: Optional[List[int]] = None, blocks=None,
+                    passphrase: Optional[str] = None):
+    """
+    Extract one archive (any codec, .enc or .gpg) into extract_to. With a
+    manifest, extraction is in-process and hashes files into it; then either
+    only the members at `offsets` are read, by seeking through the archive's
+    index (`blocks`), or the members select(rel_path, is_dir) accepts.
+    An encrypted archive asks for its passphrase unless one is given.
+    """
     os.makedirs(extract_to, exist_ok=True)
 
+    # .enc archives are decrypted in the extraction stream; nothing plaintext is written but the files
+    if archive_path.endswith(ENCRYPTED_SUFFIX):
+        print(f"Detected encrypted backup: {archive_path}")
+        passphrase = passphrase or read_passphrase("Enter passphrase to decrypt backup: ")
+        if not passphrase:
+            print("Error: Passphrase required for decryption.")
+            sys.exit(1)
+        try:
+            if offsets is not None:
+                extract_members(archive_path, extract_to, offsets, manifest, blocks=blocks, passphrase=passphrase)
+            else:
+                extract_archive_file(archive_path, extract_to, passphrase=passphrase, manifest=manifest, select=select)
+        except (DecryptionError, RuntimeError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
     # Handle Decryption if .gpg
     final_archive_path = archive_path
     decrypted_tmp_path = None
 
     if archive_path.endswith(".gpg"):
         print(f"Detected encrypted backup: {archive_path}")
-        passphrase = os.environ.get("GEMINI_BACKUP_PASSWORD")
+        passphrase = passphrase or os.environ.get("GEMINI_BACKUP_PASSWORD")
         if not passphrase:
             import getpass
             passphrase = getpass.getpass("Enter passphrase to decrypt backup: ")
@@ -193,13 +300,441 @@ def extract_archive(archive_path: str, extract_to: str):
              sys.exit(1)
 
     try:
-        cmd = f"tar -C {shlex_quote(extract_to)} -xzf {shlex_quote(final_archive_path)}"
-        run(cmd)
+        codec = detect_codec(final_archive_path)
+        if codec == "gzip" and manifest is None:
+            cmd = f"tar -C {shlex_quote(extract_to)} -xzf {shlex_quote(final_archive_path)}"
+            run(cmd)
+        else:
+            # zstd/lz4/plain tar (and any archive being hashed) are decoded in-process
+            if codec != "gzip":
+                print(f"Detected {codec} archive.")
+            if offsets is not None:
+                # A .gpg archive decrypts to the same compressed stream the index was taken of
+                extract_members(final_archive_path, extract_to, offsets, manifest, blocks=blocks, codec=codec)
+            else:
+                extract_archive_file(final_archive_path, extract_to, codec=codec, manifest=manifest, select=select)
     finally:
         if decrypted_tmp_path and os.path.exists(decrypted_tmp_path):
             os.remove(decrypted_tmp_path)
 
+def resolve_backup_chain(archive_path: str) -> List[str]:
+    """
+    Return the archives needed to rebuild archive_path, oldest (the full backup)
+    first. An archive without a manifest, or a full one, is its own chain.
+    """
+    chain = [archive_path]
+    seen = {os.path.basename(archive_path)}
+    manifest = Manifest.load(manifest_path_for(archive_path))
+    while manifest is not None and manifest.meta.get("kind") == "incremental":
+        parent_name = manifest.meta.get("parent") or ""
+        if not is_parent_name(parent_name):
+            print(f"Error: incremental chain is broken, invalid parent backup name {parent_name!r}.")
+            sys.exit(1)
+        parent_path = os.path.join(os.path.dirname(archive_path), parent_name)
+        if parent_name in seen or not os.path.exists(parent_path):
+            print(f"Error: incremental chain is broken, parent backup '{parent_name}' is missing.")
+            sys.exit(1)
+        seen.add(parent_name)
+        chain.insert(0, parent_path)
+        manifest = Manifest.load(manifest_path_for(parent_path))
+    return chain
+
+def remove_paths_not_in_manifest(root: str, manifest: Manifest, extracted: Optional[Manifest] = None):
+    """
+    Delete anything under root that the (incremental) manifest doesn't list as
+    live, and drop it from `extracted` (the manifest built while extracting).
+    """
+    live = set(manifest.files) | set(manifest.meta.get("others", []))
+    for item in list(walk_tree(root)):
+        if item.path in live or not os.path.lexists(item.full_path):
+            continue
+        if item.is_dir:
+            shutil.rmtree(item.full_path)
+        else:
+            os.remove(item.full_path)
+    if extracted is not None:
+        for path in [p for p in extracted.files if p not in live]:
+            del extracted.files[path]
+        extracted.meta["others"] = [p for p in extracted.meta.get("others", []) if p in live]
+
+def extract_backup(archive_path: str, extract_to: str, manifest: Optional[Manifest] = None,
+                   passphrase: Optional[str] = None):
+    """
+    Extract archive_path into extract_to, replaying its incremental chain if it
+    has one. With a manifest, files are hashed as they are extracted and the
+    result (of the whole chain) is recorded in it. An encrypted chain's
+    passphrase is asked for once, unless given.
+    """
+    chain = resolve_backup_chain(archive_path)
+    if len(chain) > 1:
+        print(f"Rebuilding from an incremental chain of {len(chain)} archives.")
+    # One prompt for the whole chain, not one per archive
+    passphrase = passphrase or chain_passphrase(chain)
+    secret = {"passphrase": passphrase} if passphrase else {}
+    for path in chain:
+        if manifest is not None:
+            extract_archive(path, extract_to, manifest=manifest, **secret)
+        else:
+            extract_archive(path, extract_to, **secret)
+    if len(chain) > 1:
+        remove_paths_not_in_manifest(extract_to, Manifest.load(manifest_path_for(archive_path)), extracted=manifest)
+
+def extract_selected(archive_path: str, extract_to: str, select, manifest: Manifest,
+                     passphrase: Optional[str] = None) -> Manifest:
+    """
+    Extract only the paths select(rel_path, is_dir) accepts from archive_path
+    and its incremental chain, hashing them into manifest.
+
+    With the member index stored in the archives' manifests each path is read
+    from the newest archive that holds it, seeking straight to it; archives
+    without an index are scanned and only matching members written.
+    """
+    chain = resolve_backup_chain(archive_path)
+    passphrase = passphrase or chain_passphrase(chain)
+    secret = {"passphrase": passphrase} if passphrase else {}
+    manifests = [Manifest.load(manifest_path_for(path)) for path in chain]
+    indexes = [m.meta.get("index") if m is not None else None for m in manifests]
+    owner = {}
+    for path, index in zip(chain, indexes):
+        for rel in (index or {}).get("members", {}):
+            owner[rel] = path
+
+    os.makedirs(extract_to, exist_ok=True)
+    for path, m, index in zip(chain, manifests, indexes):
+        if not index or "blocks" not in index:
+            extract_archive(path, extract_to, manifest=manifest, select=select, **secret)
+            continue
+        offsets = [offset for rel, offset in index["members"].items()
+                   if owner[rel] == path and select(rel, rel not in m.files)]
+        if offsets:
+            extract_archive(path, extract_to, manifest=manifest, offsets=offsets, blocks=index["blocks"], **secret)
+    if len(chain) > 1:
+        remove_paths_not_in_manifest(extract_to, manifests[-1], extracted=manifest)
+    return manifest
+
+def download_cloud_chain(provider, name: str, download_dir: str, listing: Optional[dict] = None,
+                         cache: Optional[DownloadCache] = None) -> List[str]:
+    """
+    Download cloud archive `name`, its manifest and, for incremental backups,
+    every parent archive into download_dir. Returns all local paths written.
+
+    With a cache and listing (name -> CloudFile, from provider.list_files())
+    archives are taken from the download cache when it holds them unchanged.
+    """
+    downloaded: List[str] = []
+    seen = set()
+    while name and name not in seen:
+        seen.add(name)
+        local_path = os.path.join(download_dir, name)
+        if cache is None:
+            provider.download_file(name, local_path)
+        elif cache.fetch(provider, name, local_path, (listing or {}).get(name)):
+            print(f"{name}: taken from the download cache")
+        downloaded.append(local_path)
+
+        sidecar = manifest_path_for(local_path)
+        manifest = Manifest.loads(provider.download_to_string(os.path.basename(sidecar)))
+        if manifest is None:
+            break
+        manifest.save(sidecar)
+        downloaded.append(sidecar)
+        name = manifest.meta.get("parent") if manifest.meta.get("kind") == "incremental" else None
+        if name and not is_parent_name(name):
+            print(f"Error: {os.path.basename(sidecar)} names an invalid parent backup {name!r}.")
+            sys.exit(1)
+    return downloaded
+
+def record_account_switch(args: argparse.Namespace, email_before: Optional[str], provider=None):
+    """
+    After a restore: put the outgoing account on its 24h cooldown (synced to
+    the cloud when configured) and record a switch to the restored account.
+    provider is the cloud provider a --cloud restore already opened.
+    """
+    # --- Auto-Cooldown for Outgoing Account ---
+    if email_before:
+        cprint(NEON_YELLOW, f"Auto-adding 24h cooldown for outgoing account: {email_before}")
+        add_24h_cooldown_for_email(email_before)
+
+        # Sync with Cloud
+        try:
+            provider_for_sync = provider if getattr(args, 'cloud', False) else None
+            if not provider_for_sync:
+                provider_for_sync = get_cloud_provider(args)
+            if provider_for_sync:
+                sync_resets_with_cloud(provider_for_sync)
+        except Exception as e:
+            cprint(NEON_RED, f"[WARN] Could not sync resets to cloud: {e}")
+
+        # Also update the cooldown dashboard (gemini-cooldown.json)
+        record_switch(email_before, args=args)
+    # ------------------------------------------
+
+    email_after = get_active_session()
+    if email_before != email_after and email_after is not None:
+        print(f"Account switch detected: -> {email_after}")
+        print("Recording switch for 24h cooldown period...")
+        # Pass args to handle potential cloud upload
+        record_switch(email_after, args=args)
+
+
+def _set_aside(path: str, backup_path: Optional[str]):
+    """Move path to backup_path (keeping its relative place), or delete it when None (--force)."""
+    if backup_path is None:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+    shutil.move(path, backup_path)
+
+
+def restore_paths(args: argparse.Namespace, metrics: Metrics, dest: str, ts_now: str, select,
+                  from_archive: Optional[str] = None, from_snapshot: Optional[str] = None,
+                  store: Optional[ChunkStore] = None):
+    """
+    restore --path: put back only the selected files and subtrees, leaving the
+    rest of dest as it is. They are extracted into a sibling staging dir
+    (seeking through the archive's index where it has one), checked against
+    the backup's manifest, and moved into place one by one; whatever they
+    replace goes to OLD_CONFIGS_DIR/.gemini.bak-<ts>/ unless --force.
+    """
+    if not (from_archive or from_snapshot):
+        print("Error: --path restores from an archive or a chunked snapshot, not --from-dir.")
+        sys.exit(1)
+
+    if getattr(args, 'dry_run', False):
+        if from_archive:
+            listed = Manifest.load(manifest_path_for(from_archive))
+        else:
+            listed = store.snapshot_manifest(store.load_snapshot(from_snapshot))
+        if listed is None:
+            print("DRY RUN: would extract the paths matching --path (archive has no manifest to list them).")
+            return
+        for rel in sorted(p for p in listed.files if select(p, False)):
+            print(f"DRY RUN: would restore {rel}")
+        return
+
+    email_before = get_active_session()
+    stage = f"{dest}.partial-{ts_now}"
+    lockfd = acquire_lock()
+    try:
+        source = from_archive or from_snapshot
+        print(f"Extracting selected paths from {source} -> {stage}")
+        phase = metrics.begin("extract")
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            if from_archive:
+                extracted = extract_selected(from_archive, stage, select, Manifest())
+            else:
+                extracted = store.restore(from_snapshot, stage, select=select)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        phase.files = len(extracted.files)
+        items = list(walk_tree(stage)) if os.path.isdir(stage) else []
+        if not any(not item.is_dir for item in items):
+            print("No files in the backup match --path.")
+            sys.exit(1)
+
+        # Chunked snapshots check every hash while materializing
+        metrics.begin("verify")
+        expected = Manifest.load(manifest_path_for(from_archive)) if from_archive else None
+        if expected is not None:
+            wanted = Manifest({p: e for p, e in expected.files.items() if select(p, False)})
+            problems = compare_manifests(wanted, extracted)
+            if problems:
+                print("Verification FAILED (restored files do not match manifest):")
+                report_problems(problems)
+                sys.exit(3)
+        print(f"Verification OK ({len(extracted.files)} files).")
+
+        metrics.begin("install")
+        bak_root = os.path.join(OLD_CONFIGS_DIR, f".gemini.bak-{ts_now}")
+        replaced = 0
+        for item in items:
+            target = os.path.join(dest, item.path)
+            if item.is_dir and os.path.isdir(target) and not os.path.islink(target):
+                continue
+            if os.path.lexists(target):
+                _set_aside(target, None if args.force else os.path.join(bak_root, item.path))
+                replaced += 1
+            if item.is_dir:
+                os.makedirs(target)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(item.full_path, target)
+        metrics.end()
+        print(f"Restored {len(items)} paths into {dest}.")
+        if replaced and not args.force:
+            print(f"Replaced files moved to: {bak_root}")
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
+        try:
+            fcntl.flock(lockfd, fcntl.LOCK_UN)
+            lockfd.close()
+        except Exception:
+            pass
+
+    # Only a restored google_accounts.json switches accounts
+    if get_active_session() != email_before:
+        record_account_switch(args, email_before)
+
+
+def delta_enabled(args: argparse.Namespace) -> bool:
+    """--delta, or setting restore_delta."""
+    if getattr(args, 'delta', False) is True:
+        return True
+    return get_setting("restore_delta", False) in (True, "true", "1", 1)
+
+
+def _snapshot_target(store: ChunkStore, name: str) -> Manifest:
+    """Manifest of a chunked snapshot, with its directories and symlinks as an archive manifest records them."""
+    snapshot = store.load_snapshot(name)
+    manifest = store.snapshot_manifest(snapshot)
+    symlinks = sorted(snapshot.get("symlinks", {}))
+    manifest.meta["others"] = sorted(snapshot.get("dirs", {})) + symlinks
+    manifest.meta["index"] = {"symlinks": symlinks}
+    return manifest
+
+
+def restore_delta(args: argparse.Namespace, metrics: Metrics, dest: str, ts_now: str,
+                  from_archive: Optional[str] = None, from_snapshot: Optional[str] = None,
+                  store: Optional[ChunkStore] = None, provider=None) -> bool:
+    """
+    restore --delta: make dest identical to the backup by rewriting only the
+    files whose size or hash differ and deleting the ones the backup lacks,
+    in a journaled transaction (see delta.py) that is rolled back if anything
+    fails. Returns False, having done nothing, where a delta cannot be
+    computed (no manifest, no existing dest, --from-dir) so the caller falls
+    back to a full restore.
+    """
+    if from_archive:
+        target = Manifest.load(manifest_path_for(from_archive))
+    elif from_snapshot:
+        target = _snapshot_target(store, from_snapshot)
+    else:
+        target = None
+    if target is None or not os.path.isdir(dest):
+        reason = "nothing to compare with" if target is not None else "the backup has no manifest"
+        print(f"Delta restore not possible ({reason}); doing a full restore.")
+        return False
+
+    email_before = get_active_session()
+    bak_root = None if args.force else os.path.join(OLD_CONFIGS_DIR, f".gemini.bak-{ts_now}")
+    lockfd = acquire_lock()
+    try:
+        if getattr(args, 'dry_run', False):
+            if pending_delta(dest):
+                print("DRY RUN: would first settle an interrupted delta restore.")
+        elif recover_delta(dest, bak_root):
+            print("Rolled back an interrupted delta restore.")
+
+        print(f"Comparing {dest} with {from_archive or from_snapshot}")
+        phase = metrics.begin("plan")
+        plan = plan_delta(dest, target)
+        phase.files = len(plan.unchanged) + len(plan.changed)
+        print(f"{len(plan.unchanged)} files unchanged, {len(plan.changed)} paths to write, "
+              f"{len(plan.removed)} to remove.")
+        if getattr(args, 'dry_run', False):
+            for rel in plan.changed:
+                print(f"DRY RUN: would write {rel}")
+            for rel in plan.removed:
+                print(f"DRY RUN: would remove {rel}")
+            return True
+        if plan.empty:
+            print("Already up to date.")
+            return True
+
+        txn = DeltaTransaction(dest, ts_now)
+        try:
+            changed = set(plan.changed)
+            select = lambda rel, is_dir: rel in changed
+            phase = metrics.begin("extract")
+            try:
+                if from_archive:
+                    extracted = extract_selected(from_archive, txn.new, select, Manifest())
+                else:
+                    extracted = store.restore(from_snapshot, txn.new, select=select)
+            except RuntimeError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            phase.files = len(extracted.files)
+
+            metrics.begin("verify")
+            wanted = Manifest({p: e for p, e in target.files.items() if p in changed})
+            problems = compare_manifests(wanted, extracted)
+            if problems:
+                print("Verification FAILED (restored files do not match manifest):")
+                report_problems(problems)
+                sys.exit(3)
+            print(f"Verification OK ({len(extracted.files)} files).")
+
+            phase = metrics.begin("install")
+            txn.prepare(plan)
+            txn.apply()
+            phase.files = len(txn.ops)
+        except BaseException:
+            # Before apply() nothing in dest has changed; apply() rolls itself back
+            shutil.rmtree(txn.root, ignore_errors=True)
+            raise
+
+        metrics.begin("post-verify")
+        _, dirs, symlinks = target_entries(target)
+        result = Manifest({**plan.unchanged, **extracted.files}, meta={"others": sorted(dirs | symlinks)})
+        problems = verify_tree(dest, result, quick=True)
+        if problems:
+            print("Post-restore verification FAILED:")
+            report_problems(problems)
+            # Committed but bad: put the previous tree back rather than letting recovery finish it
+            txn.rollback()
+            print(f"Rolled back; {dest} is as it was before the restore.")
+            sys.exit(4)
+        print("Post-restore verification OK.")
+        txn.finish(bak_root)
+        metrics.end()
+        print(f"Delta restore complete: wrote {len(plan.changed)} and removed {len(plan.removed)} paths.")
+        if bak_root and os.path.exists(bak_root):
+            print("Replaced files moved to:", bak_root)
+    finally:
+        try:
+            fcntl.flock(lockfd, fcntl.LOCK_UN)
+            lockfd.close()
+        except Exception:
+            pass
+
+    if not getattr(args, 'dry_run', False):
+        record_account_switch(args, email_before, provider=provider)
+    return True
+
+
+def _switch_to_ready_slot(args: argparse.Namespace, dest: str, email: str, backup: str) -> bool:
+    """restore --auto: when email's slot already holds the chosen backup, install it by rename (see slots.py)."""
+    if getattr(args, 'dry_run', False) or getattr(args, 'path', None):
+        return False
+    from .slots import ready_slot, switch_to_slot
+    if not ready_slot(email, backup):
+        return False
+    cprint(NEON_GREEN, f"Slot for {email} is staged with this backup; switching by rename.")
+    switch_to_slot(args, email, dest)
+    return True
+
+
+def _remove_downloads(paths: List[str]):
+    for path in paths:
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+
 def perform_restore(args: argparse.Namespace):
+    with metrics_from_args("restore", args) as metrics:
+        _perform_restore(args, metrics)
+
+
+def _perform_restore(args: argparse.Namespace, metrics: Metrics):
     email_before = get_active_session()
     
     # Check for required args if not set (legacy check)
@@ -216,16 +751,25 @@ def perform_restore(args: argparse.Namespace):
     chosen_src: Optional[str] = None
     from_archive: Optional[str] = None
     temp_download_path: Optional[str] = None # Initialize for cloud downloads
+    downloaded_paths: List[str] = []
+    from_snapshot: Optional[str] = None
+    store: Optional[ChunkStore] = None
+    provider = None
+
+    if getattr(args, 'engine', None) == "chunked":
+        store = ChunkStore()
+        from_snapshot = select_snapshot(args, store)
 
     # --- NEW CODE BLOCK: CLOUD DISCOVERY ---
-    if hasattr(args, 'cloud') and args.cloud:
+    elif hasattr(args, 'cloud') and args.cloud:
         provider = get_cloud_provider(args)
         if not provider:
             sys.exit(1)
         
         # 1. List backups
         print("Fetching file list from Cloud...")
-        files = provider.list_files()
+        wanted = [os.path.basename(args.from_archive)] if getattr(args, 'from_archive', None) else []
+        files = cloud_backups(provider, names=wanted)
         all_files = []
         for f in files:
             if is_backup_archive(f.name):
@@ -284,15 +828,27 @@ def perform_restore(args: argparse.Namespace):
             target_file_name = all_files[0][1]
             print(f"Auto-selected oldest cloud backup: {target_file_name}")
 
+        if getattr(args, 'auto', False) and _switch_to_ready_slot(args, dest, target_email, target_file_name):
+            return
+
         # 3. Download to a temporary file
         temp_download_path = os.path.join(tempfile.gettempdir(), target_file_name)
         # Ensure the directory for the temporary download exists
         os.makedirs(os.path.dirname(temp_download_path), exist_ok=True)
 
+        phase = metrics.begin("download", cloud=True)
         try:
-            provider.download_file(target_file_name, temp_download_path)
-        except Exception:
+            downloaded_paths = download_cloud_chain(provider, target_file_name, os.path.dirname(temp_download_path),
+                                                    listing={f.name: f for f in files}, cache=download_cache(args))
+        except ChecksumMismatch as e:
+            cprint(NEON_RED, f"Error: {e.name} arrived corrupted (its checksum does not match the cloud's). "
+                             "The downloaded copy was discarded and nothing was cached; run the restore again.")
             sys.exit(1)
+        except Exception as e:
+            cprint(NEON_RED, f"Error: could not download {target_file_name} from the cloud: {e}")
+            sys.exit(1)
+        phase.files = len(downloaded_paths)
+        metrics.end()
         
         from_archive = temp_download_path
     # ---------------------------------------
@@ -315,6 +871,8 @@ def perform_restore(args: argparse.Namespace):
 
         from_archive = latest_archive
         cprint(NEON_GREEN, f"Selected latest local backup for {target_email}: {from_archive}")
+        if _switch_to_ready_slot(args, dest, target_email, from_archive):
+            return
 
     elif hasattr(args, 'from_dir') and args.from_dir:
         chosen_src = os.path.abspath(os.path.expanduser(args.from_dir))
@@ -345,55 +903,136 @@ def perform_restore(args: argparse.Namespace):
         print(f"Searching for oldest backup archive in: {sd}")
         oldest_archive = find_oldest_archive_backup(sd)
         if not oldest_archive:
-            print(f"No timestamped backup archives (*.gemini.tar.gz) found in {sd}")
+            print(f"No timestamped backup archives (*.gemini.tar.*) found in {sd}")
             sys.exit(1)
         
         from_archive = oldest_archive
         print(f"Auto-selected oldest backup archive: {from_archive}")
 
+    patterns = getattr(args, 'path', None)
+    if isinstance(patterns, list) and patterns:
+        try:
+            restore_paths(args, metrics, dest, ts_now, path_selector(patterns),
+                          from_archive=from_archive, from_snapshot=from_snapshot, store=store)
+        finally:
+            _remove_downloads(downloaded_paths)
+        return
+
+    if delta_enabled(args) and not chosen_src:
+        try:
+            done = restore_delta(args, metrics, dest, ts_now, from_archive=from_archive,
+                                 from_snapshot=from_snapshot, store=store, provider=provider)
+        except BaseException:
+            _remove_downloads(downloaded_paths)
+            raise
+        if done:
+            _remove_downloads(downloaded_paths)
+            return
+    elif delta_enabled(args):
+        print("Delta restore works from an archive or a chunked snapshot; doing a full restore.")
+
+    mode = verify_mode(args)
+    # Verified against the manifest, an archive is extracted straight into the
+    # sibling of dest (hashing as it goes) and installed with a single rename
+    streaming = bool(from_archive) and mode == "manifest"
+    tmp_dest = f"{dest}.tmp-{ts_now}"
+
     lockfd = acquire_lock()
     try:
-        work_tmp = tempfile.mkdtemp(prefix="gemini-restore-")
+        work_tmp = None if streaming else tempfile.mkdtemp(prefix="gemini-restore-")
         try:
-            if from_archive:
+            copy_manifest = None
+            if streaming:
+                print(f"Extracting archive {from_archive} -> {tmp_dest}")
+                phase = metrics.begin("extract")
+                if not getattr(args, 'dry_run', False):
+                    if os.path.exists(tmp_dest):
+                        shutil.rmtree(tmp_dest)
+                    copy_manifest = Manifest()
+                    extract_backup(from_archive, tmp_dest, manifest=copy_manifest)
+                    phase.files = len(copy_manifest.files)
+                else:
+                    print("DRY RUN: would extract and hash archive.")
+                src_for_copy = None
+            elif from_archive:
                 print(f"Extracting archive {from_archive} -> {work_tmp}")
+                metrics.begin("extract")
                 if not getattr(args, 'dry_run', False):
-                    extract_archive(from_archive, work_tmp)
+                    extract_backup(from_archive, work_tmp)
                 else:
                     print("DRY RUN: would extract archive.")
                 src_for_copy = work_tmp
+            elif from_snapshot:
+                print(f"Materializing snapshot {from_snapshot} -> {work_tmp}")
+                metrics.begin("extract")
+                if not getattr(args, 'dry_run', False):
+                    store.restore(from_snapshot, work_tmp)
+                else:
+                    print("DRY RUN: would materialize snapshot.")
+                src_for_copy = work_tmp
             else:
                 # chosen_src is set (either provided or auto-selected)
                 src_for_copy = os.path.abspath(chosen_src)
                 print("Source to restore from:", src_for_copy)
 
-            # Copy into temporary dest - to prepare verification
-            tmp_dest = f"{dest}.tmp-{ts_now}"
-            print(f"Copying {src_for_copy} -> {tmp_dest}")
-            if not getattr(args, 'dry_run', False):
-                if os.path.exists(tmp_dest):
-                    shutil.rmtree(tmp_dest)
-                cp_cmd = f"cp -a {shlex_quote(src_for_copy)} {shlex_quote(tmp_dest)}"
-                run(cp_cmd)
-            else:
-                print("DRY RUN: would cp -a ...")
+            if not streaming:
+                # Copy into temporary dest - to prepare verification
+                print(f"Copying {src_for_copy} -> {tmp_dest}")
+                phase = metrics.begin("copy")
+                if not getattr(args, 'dry_run', False):
+                    if os.path.exists(tmp_dest):
+                        shutil.rmtree(tmp_dest)
+                    if mode == "diff":
+                        cp_cmd = f"cp -a {shlex_quote(src_for_copy)} {shlex_quote(tmp_dest)}"
+                        run(cp_cmd)
+                    else:
+                        copy_manifest = copy_tree(src_for_copy, tmp_dest)
+                        phase.files = len(copy_manifest.files)
+                else:
+                    print("DRY RUN: would cp -a ..." if mode == "diff" else "DRY RUN: would copy and hash ...")
 
-            # Verify copy with diff -r
-            print("Verifying copy with diff -r")
-            if not getattr(args, 'dry_run', False):
-                diff_proc = run(f"diff -r {shlex_quote(tmp_dest)} {shlex_quote(src_for_copy)}", capture=True, check=False)
-                if diff_proc.returncode != 0:
-                    print("Verification FAILED (diff shows differences):")
-                    if diff_proc.stdout:
-                        print(diff_proc.stdout)
-                    shutil.rmtree(tmp_dest, ignore_errors=True)
-                    sys.exit(3)
+            metrics.begin("verify")
+            if mode == "diff":
+                # Verify copy with diff -r
+                print("Verifying copy with diff -r")
+                if not getattr(args, 'dry_run', False):
+                    diff_proc = run(f"diff -r {shlex_quote(tmp_dest)} {shlex_quote(src_for_copy)}", capture=True, check=False)
+                    if diff_proc.returncode != 0:
+                        print("Verification FAILED (diff shows differences):")
+                        if diff_proc.stdout:
+                            print(diff_proc.stdout)
+                        shutil.rmtree(tmp_dest, ignore_errors=True)
+                        sys.exit(3)
+                    else:
+                        print("Verification OK.")
                 else:
-                    print("Verification OK.")
+                    print("DRY RUN: would run diff -r ...")
             else:
-                print("DRY RUN: would run diff -r ...")
+                # Verify the copy against the hashes taken while copying and, for
+                # archives, against the manifest recorded at backup time
+                print("Verifying copy against its manifest")
+                if not getattr(args, 'dry_run', False):
+                    archive_manifest = Manifest.load(manifest_path_for(from_archive)) if from_archive else None
+                    # Extracted files were hashed on the way in; a copy is re-read once. Without an
+                    # archive manifest to compare those hashes with, the extracted tree is re-read too.
+                    if streaming and archive_manifest is None:
+                        print("No manifest recorded with the archive; checking the extracted files against "
+                              "the hashes taken while extracting.")
+                    problems = [] if streaming and archive_manifest is not None else verify_tree(tmp_dest, copy_manifest)
+                    if archive_manifest is not None:
+                        problems += compare_manifests(archive_manifest, copy_manifest)
+                    if problems:
+                        print("Verification FAILED (copy does not match manifest):")
+                        report_problems(problems)
+                        shutil.rmtree(tmp_dest, ignore_errors=True)
+                        sys.exit(3)
+                    else:
+                        print("Verification OK.")
+                else:
+                    print("DRY RUN: would verify copy against manifest ...")
 
             # Prepare swap: move existing dest to archive unless --force
+            metrics.begin("install")
             bakname = None
             if os.path.exists(dest) and not args.force:
                 bak_filename = f".gemini.bak-{ts_now}"
@@ -423,13 +1062,23 @@ def perform_restore(args: argparse.Namespace):
                 print("DRY RUN: would os.replace(tmp_dest, dest)")
 
             # Post-restore verification
+            metrics.begin("post-verify")
             if not getattr(args, 'dry_run', False):
-                print("Post-restore verification: diff -r between restored dest and source")
-                diff2 = run(f"diff -r {shlex_quote(dest)} {shlex_quote(src_for_copy)}", capture=True, check=False)
-                if diff2.returncode != 0:
+                if mode == "diff":
+                    print("Post-restore verification: diff -r between restored dest and source")
+                    diff2 = run(f"diff -r {shlex_quote(dest)} {shlex_quote(src_for_copy)}", capture=True, check=False)
+                    failed = diff2.returncode != 0
+                    details = diff2.stdout
+                else:
+                    # Everything was hash-verified before the rename; (size, mtime) is enough now
+                    print("Post-restore verification: quick manifest check of restored dest")
+                    problems = verify_tree(dest, copy_manifest, quick=True)
+                    failed = bool(problems)
+                    details = "\n".join(problems[:20])
+                if failed:
                     print("Post-restore verification FAILED:")
-                    if diff2.stdout:
-                        print(diff2.stdout)
+                    if details:
+                        print(details)
                     print("Attempting rollback (if possible).")
                     if not getattr(args, 'force', False) and bakname and os.path.exists(bakname):
                         try:
@@ -443,68 +1092,27 @@ def perform_restore(args: argparse.Namespace):
             else:
                 print("DRY RUN: would run post-restore diff")
 
+            metrics.end()
             print("Restore complete.")
             if bakname and os.path.exists(bakname):
                 print("Previous .gemini moved to:", bakname)
 
             # Check for account switch and record it
             if not getattr(args, 'dry_run', False):
-                # --- Auto-Cooldown for Outgoing Account ---
-                if email_before:
-                    cprint(NEON_YELLOW, f"Auto-adding 24h cooldown for outgoing account: {email_before}")
-                    add_24h_cooldown_for_email(email_before)
-                    
-                    # Sync with Cloud
-                    try:
-                        # We need to sync resets.json to cloud if configured.
-                        # sync_resets_with_cloud expects a B2Manager-like object (with upload_string/download_to_string if B2).
-                        # But wait, generic provider has upload_file/download_file.
-                        # sync_resets_with_cloud logic might be coupled to B2Manager.
-                        
-                        # Let's check sync_resets_with_cloud in reset_helpers.py later.
-                        # For now, let's just try to get provider.
-                        
-                        provider_for_sync = None
-                        if getattr(args, 'cloud', False):
-                             provider_for_sync = locals().get('provider')
-
-                        if not provider_for_sync:
-                             provider_for_sync = get_cloud_provider(args)
-
-                        if provider_for_sync:
-                             # We need to adapt sync_resets_with_cloud to support generic provider
-                             # OR cast/check type if we haven't updated reset_helpers yet.
-                             # For this step, I'll pass the provider and let reset_helpers fail if not updated,
-                             # but I should update reset_helpers too.
-                             sync_resets_with_cloud(provider_for_sync)
-
-                    except Exception as e:
-                        cprint(NEON_RED, f"[WARN] Could not sync resets to cloud: {e}")
-                    
-                    # Also update the cooldown dashboard (gemini-cooldown.json)
-                    record_switch(email_before, args=args)
-                # ------------------------------------------
-
-                email_after = get_active_session()
-                if email_before != email_after and email_after is not None:
-                    print(f"Account switch detected: -> {email_after}")
-                    print("Recording switch for 24h cooldown period...")
-                    # Pass args to handle potential cloud upload
-                    record_switch(email_after, args=args)
+                record_account_switch(args, email_before, provider=provider)
 
         finally:
+            # A tmp_dest that was not installed (failed extraction or verification) is garbage
+            if os.path.exists(tmp_dest):
+                shutil.rmtree(tmp_dest, ignore_errors=True)
             # cleanup temp extraction dir if still present
-            if os.path.exists(work_tmp):
+            if work_tmp and os.path.exists(work_tmp):
                 try:
                     shutil.rmtree(work_tmp)
                 except Exception:
                     pass
-        # ADD THIS:
-        if temp_download_path and os.path.exists(temp_download_path):
-            try:
-                os.remove(temp_download_path)
-            except Exception:
-                pass
+        # Remove cloud downloads (archive, parents of an incremental chain, manifests)
+        _remove_downloads(downloaded_paths)
     finally:
         try:
             fcntl.flock(lockfd, fcntl.LOCK_UN)
@@ -524,10 +1132,21 @@ def main():
     p.add_argument("--bucket", help="B2 Bucket Name")
     p.add_argument("--b2-id", help="B2 Key ID (or set env GEMINI_B2_KEY_ID)")
     p.add_argument("--b2-key", help="B2 App Key (or set env GEMINI_B2_APP_KEY)")
+    p.add_argument("--no-cache", action="store_true", help="Download again instead of using the download cache (~/.geminiai-cli/cache)")
     p.add_argument("--auto", action="store_true", help="Automatically restore the next best available account")
+    p.add_argument("--engine", choices=["archive", "chunked"], default="archive", help="Restore from tar.gz archives (default) or the chunk repository")
+    p.add_argument("--verify", choices=VERIFY_MODES, help="Verify the restored copy from a hash manifest built while copying (default) or with diff -r")
+    p.add_argument("--path", action="append", metavar="GLOB", help="Restore only paths matching this gitignore-style pattern into the existing ~/.gemini (repeatable)")
+    p.add_argument("--delta", action="store_true", help="Rewrite only files that differ from the backup and delete extra ones, in a transaction that rolls back on failure")
+    p.add_argument("--timings", action="store_true", help="Print wall/CPU time, bytes read/written and file counts per phase")
+    p.add_argument("--metrics-json", metavar="PATH", help="Write per-phase timings and resource counters to PATH as JSON")
+    p.add_argument("--prefetch", action="store_true", help="Then download the next recommended account's newest cloud backup into the download cache in the background")
     args = p.parse_args()
 
     perform_restore(args)
 
+    from .prefetch import start_prefetch
+    start_prefetch(args)
+
 if __name__ == "__main__":
     main()
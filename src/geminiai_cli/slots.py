@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/slots.py
+
+"""
+slots.py - Pre-staged account slots: switching ~/.gemini by rename.
+
+A slot is an extracted, verified copy of an account's latest backup, kept in
+SLOTS_DIR (on the same filesystem as ~/.gemini):
+
+    slots/<email>/tree/      the ready-to-install .gemini tree
+    slots/<email>/slot.json  which backup it holds, written once it verified
+
+`slots refresh` builds a slot for every account whose latest backup (local,
+or in the bucket with --cloud) is newer than what its slot holds; with
+--interval it keeps running and does so whenever a new backup appears.
+`slots switch <email>` (or --auto) then only renames: the current ~/.gemini
+goes to old_configs (or is deleted with --force) and the slot's tree takes
+its place. A switched-to slot is used up until the next refresh.
+
+`restore --auto` uses a ready slot automatically when it holds the backup the
+restore would have picked.
+"""
+from __future__ import annotations
+import argparse
+import datetime
+import errno
+import fcntl
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from .config import SLOTS_DIR, OLD_CONFIGS_DIR, DEFAULT_BACKUP_DIR, NEON_GREEN, NEON_RED, NEON_CYAN, NEON_YELLOW
+from .cloud_factory import get_cloud_provider
+from .compression import strip_archive_suffix
+from .catalog import cloud_backups
+from .download_cache import download_cache
+from .manifest import Manifest, manifest_path_for
+from .recommend import get_recommendation
+from .restore import (acquire_lock, download_cloud_chain, extract_backup, is_backup_archive,
+                      parse_timestamp_from_name, record_account_switch)
+from .session import get_active_session
+from .ui import cprint
+from .verify import compare_manifests, report_problems
+
+SLOT_META = "slot.json"
+
+
+def backup_email(name: str) -> Optional[str]:
+    """Account of a backup archive named YYYY-MM-DD_HHMMSS-<email>.gemini.tar[...]."""
+    base = strip_archive_suffix(name[18:]) if len(name) > 18 else None
+    if not base or not base.endswith(".gemini"):
+        return None
+    return base[:-len(".gemini")]
+
+
+def latest_backups(names: List[str]) -> Dict[str, str]:
+    """email -> name of its newest backup archive, among names."""
+    latest: Dict[str, tuple] = {}
+    for name in names:
+        ts = parse_timestamp_from_name(name) if is_backup_archive(name) else None
+        email = backup_email(name) if ts else None
+        if is_slot_email(email) and (email not in latest or time.mktime(ts) > latest[email][0]):
+            latest[email] = (time.mktime(ts), name)
+    return {email: name for email, (_, name) in latest.items()}
+
+
+def is_slot_email(email) -> bool:
+    """Whether email can name a directory directly under SLOTS_DIR (it may come from a bucket's archive names)."""
+    return (isinstance(email, str) and bool(email) and not email.startswith(".")
+            and "/" not in email and os.sep not in email and ".." not in email)
+
+
+def slot_path(email: str) -> str:
+    if not is_slot_email(email):
+        raise ValueError(f"Not a valid account for a slot: {email!r}")
+    return os.path.join(SLOTS_DIR, email)
+
+
+def load_slot(email: str) -> Optional[dict]:
+    """The slot's metadata if it is ready (verified and not used up), else None."""
+    if not is_slot_email(email):
+        return None
+    root = slot_path(email)
+    try:
+        with open(os.path.join(root, SLOT_META), "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return meta if os.path.isdir(os.path.join(root, "tree")) else None
+
+
+def list_slots() -> Dict[str, dict]:
+    try:
+        emails = sorted(os.listdir(SLOTS_DIR))
+    except FileNotFoundError:
+        return {}
+    slots = {}
+    for email in emails:
+        meta = load_slot(email)
+        if meta is not None:
+            slots[email] = meta
+    return slots
+
+
+def ready_slot(email: str, backup: str) -> bool:
+    """Whether email's slot is ready and holds exactly the backup named backup."""
+    meta = load_slot(email)
+    return meta is not None and meta.get("backup") == os.path.basename(backup)
+
+
+def build_slot(email: str, archive_path: str) -> dict:
+    """
+    Extract archive_path (and its incremental chain) into email's slot,
+    hashing as it goes, and check it against the archive's manifest. The new
+    tree replaces the old one only once verified; RuntimeError if it fails.
+    """
+    root = slot_path(email)
+    os.makedirs(root, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    staging = os.path.join(root, f"tree.new-{stamp}")
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        extracted = Manifest()
+        extract_backup(archive_path, staging, manifest=extracted)
+        expected = Manifest.load(manifest_path_for(archive_path))
+        problems = compare_manifests(expected, extracted) if expected is not None else []
+        if problems:
+            report_problems(problems)
+            raise RuntimeError(f"{os.path.basename(archive_path)} does not match its manifest")
+
+        meta = {
+            "email": email,
+            "backup": os.path.basename(archive_path),
+            "files": len(extracted.files),
+            "bytes": extracted.total_size(),
+            "built": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+        }
+        # Same lock as restore and switch: a switch must never see a half-swapped slot
+        lockfd = acquire_lock(wait=True)
+        try:
+            # The slot is not ready while its tree is being swapped
+            meta_path = os.path.join(root, SLOT_META)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+            tree = os.path.join(root, "tree")
+            if os.path.exists(tree):
+                old = os.path.join(root, f"tree.old-{stamp}")
+                os.rename(tree, old)
+                shutil.rmtree(old, ignore_errors=True)
+            os.rename(staging, tree)
+
+            tmp = f"{meta_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(meta, fh, indent=2)
+            os.replace(tmp, meta_path)
+        finally:
+            try:
+                fcntl.flock(lockfd, fcntl.LOCK_UN)
+                lockfd.close()
+            except Exception:
+                pass
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return meta
+
+
+def refresh_slots(args: argparse.Namespace) -> int:
+    """Build the slots that are missing or older than their account's latest backup. Returns how many were built."""
+    wanted = getattr(args, 'email', None)
+    provider = None
+    if getattr(args, 'cloud', False):
+        provider = get_cloud_provider(args)
+        if not provider:
+            sys.exit(1)
+        listing = {f.name: f for f in cloud_backups(provider)}
+        latest = latest_backups(list(listing))
+    else:
+        search_dir = os.path.abspath(os.path.expanduser(getattr(args, 'search_dir', None) or DEFAULT_BACKUP_DIR))
+        try:
+            latest = latest_backups(os.listdir(search_dir))
+        except FileNotFoundError:
+            latest = {}
+    if wanted:
+        latest = {e: n for e, n in latest.items() if e in wanted}
+    if not latest:
+        print("No backups to stage.")
+        return 0
+
+    built = 0
+    for email, name in sorted(latest.items()):
+        if ready_slot(email, name):
+            continue
+        print(f"Staging {name} into slot {email}...")
+        download_dir = None
+        try:
+            if provider is not None:
+                download_dir = tempfile.mkdtemp(prefix="gemini-slot-")
+                download_cloud_chain(provider, name, download_dir, listing=listing, cache=download_cache(args))
+                archive_path = os.path.join(download_dir, name)
+            else:
+                archive_path = os.path.join(search_dir, name)
+            meta = build_slot(email, archive_path)
+            built += 1
+            cprint(NEON_GREEN, f"Slot {email} ready ({meta['files']} files).")
+        except Exception as e:
+            # One bad backup must not keep the other accounts from being staged
+            cprint(NEON_RED, f"Could not stage slot {email}: {e}")
+        finally:
+            if download_dir:
+                shutil.rmtree(download_dir, ignore_errors=True)
+    return built
+
+
+def switch_to_slot(args: argparse.Namespace, email: str, dest: str):
+    """
+    Install email's slot as dest by rename. The previous dest goes to
+    OLD_CONFIGS_DIR/.gemini.bak-<ts> (deleted afterwards with --force) and is
+    put back if the slot cannot be moved in.
+    """
+    if not is_slot_email(email):
+        print(f"Error: {email!r} is not a valid account email.")
+        sys.exit(1)
+    tree = os.path.join(slot_path(email), "tree")
+    ts_now = time.strftime("%Y%m%d-%H%M%S")
+    force = getattr(args, 'force', False) is True
+    aside = os.path.join(SLOTS_DIR if force else OLD_CONFIGS_DIR, f".gemini.bak-{ts_now}")
+
+    email_before = get_active_session()
+    lockfd = acquire_lock()
+    try:
+        # Checked under the lock: a refresh may be swapping this slot's tree
+        meta = load_slot(email)
+        if meta is None:
+            print(f"Error: no ready slot for {email} (run 'geminiai slots refresh').")
+            sys.exit(1)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        moved_aside = False
+        if os.path.lexists(dest):
+            os.makedirs(os.path.dirname(aside), exist_ok=True)
+            try:
+                os.rename(dest, aside)
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    print(f"Error: {os.path.dirname(aside)} and {dest} are on different filesystems; "
+                          "slots need a rename.")
+                    sys.exit(1)
+                raise
+            moved_aside = True
+        try:
+            os.rename(tree, dest)
+        except OSError as e:
+            if moved_aside:
+                os.rename(aside, dest)
+            if e.errno == errno.EXDEV:
+                print(f"Error: {SLOTS_DIR} and {dest} are on different filesystems; slots need a rename.")
+                sys.exit(1)
+            raise
+        # The tree is in use now; the slot is rebuilt by the next refresh
+        os.remove(os.path.join(slot_path(email), SLOT_META))
+    finally:
+        try:
+            fcntl.flock(lockfd, fcntl.LOCK_UN)
+            lockfd.close()
+        except Exception:
+            pass
+
+    cprint(NEON_GREEN, f"Switched {dest} to {email} ({meta['backup']}).")
+    if moved_aside:
+        if force:
+            shutil.rmtree(aside, ignore_errors=True)
+        else:
+            print("Previous .gemini moved to:", aside)
+    record_account_switch(args, email_before)
+
+
+def do_slots(args: argparse.Namespace):
+    action = getattr(args, 'slots_command', None)
+    if action == "refresh":
+        interval = getattr(args, 'interval', None)
+        refresh_slots(args)
+        while interval:
+            time.sleep(interval)
+            refresh_slots(args)
+    elif action == "switch":
+        email = getattr(args, 'email', None)
+        if getattr(args, 'auto', False):
+            rec = get_recommendation()
+            if not rec:
+                cprint(NEON_RED, "No 'Green' (Ready) accounts available for auto-switch.")
+                sys.exit(1)
+            email = rec.email
+            cprint(NEON_CYAN, f"Auto-switch recommendation: {email}")
+        if not email:
+            print("Error: give an account email or --auto.")
+            sys.exit(1)
+        dest = os.path.abspath(os.path.expanduser(getattr(args, 'dest', None) or "~/.gemini"))
+        switch_to_slot(args, email, dest)
+    else:
+        slots = list_slots()
+        if not slots:
+            cprint(NEON_YELLOW, "No ready slots. Build them with 'geminiai slots refresh'.")
+            return
+        for email, meta in slots.items():
+            print(f"{email:<40} {meta['backup']}  {meta['files']} files  staged {meta['built']}")
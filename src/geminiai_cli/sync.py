@@ -15,9 +15,13 @@ from .ui import cprint, NEON_GREEN, NEON_CYAN, NEON_YELLOW, NEON_RED, NEON_MAGEN
 from .cloud_factory import get_cloud_provider
 from .credentials import resolve_credentials
 from .ui import console
+from .manifest import Manifest, manifest_path_for
+from .compression import is_archive_name
+from .download_cache import download_cache
+from .catalog import cloud_backups, catalog_added
 
 def get_local_backups(backup_dir):
-    """Returns a set of local backup filenames (only .tar.gz)."""
+    """Returns a set of local backup filenames (unencrypted archives of any codec)."""
     if not os.path.isdir(backup_dir):
         # If directory doesn't exist, return empty set or exit?
         # If we are pushing, it's an error. If pulling, we might create it.
@@ -26,23 +30,32 @@ def get_local_backups(backup_dir):
     
     files = {
         f for f in os.listdir(backup_dir)
-        if os.path.isfile(os.path.join(backup_dir, f)) and f.endswith(".gemini.tar.gz")
+        if os.path.isfile(os.path.join(backup_dir, f)) and is_archive_name(f)
     }
     return files
 
-def get_cloud_backups(provider):
-    """Returns a set of cloud backup filenames."""
+def get_cloud_backups(provider, listing=None):
+    """Returns a set of cloud backup filenames; their CloudFile entries go into `listing` (a dict) if given."""
     cloud_files = set()
     try:
-        files = provider.list_files()
+        files = cloud_backups(provider)
         for f in files:
-            if f.name.endswith(".gemini.tar.gz"):
+            if is_archive_name(f.name):
                 cloud_files.add(f.name)
+                if listing is not None:
+                    listing[f.name] = f
     except Exception as e:
         cprint(NEON_RED, f"[ERROR] Failed to list cloud backups: {e}")
         sys.exit(1)
     return cloud_files
 
+def pull_manifest(provider, local_path):
+    """Fetch the sidecar manifest of a pulled archive, if the cloud has one."""
+    sidecar = manifest_path_for(local_path)
+    manifest = Manifest.loads(provider.download_to_string(os.path.basename(sidecar)))
+    if manifest is not None:
+        manifest.save(sidecar)
+
 def perform_sync(direction: str, args):
     """
     Unified sync logic.
@@ -77,7 +90,8 @@ def perform_sync(direction: str, args):
     
     cprint(NEON_CYAN, "Analyzing differences...")
     local_files = get_local_backups(backup_dir)
-    cloud_files = get_cloud_backups(provider)
+    listing = {}
+    cloud_files = get_cloud_backups(provider, listing)
 
     if direction == "push":
         missing = local_files - cloud_files
@@ -86,9 +100,20 @@ def perform_sync(direction: str, args):
             return
 
         cprint(NEON_YELLOW, f"Found {len(missing)} files missing in cloud. Uploading...")
+        uploaded = []
         for filename in sorted(missing):
             local_path = os.path.join(backup_dir, filename)
             provider.upload_file(local_path, filename)
+            uploaded.append(filename)
+            # Incremental backups can't be restored without their manifest
+            sidecar = manifest_path_for(local_path)
+            if os.path.exists(sidecar):
+                provider.upload_file(sidecar, os.path.basename(sidecar))
+                uploaded.append(os.path.basename(sidecar))
+        recorded = catalog_added(provider, uploaded)
+        for filename in uploaded:
+            if filename not in recorded:
+                cprint(NEON_RED, f"[WARN] {filename} is not in the bucket after uploading it.")
 
     elif direction == "pull":
         missing = cloud_files - local_files
@@ -97,8 +122,11 @@ def perform_sync(direction: str, args):
             return
 
         cprint(NEON_YELLOW, f"Found {len(missing)} files missing locally. Downloading...")
+        cache = download_cache(args)
         for filename in sorted(missing):
             local_path = os.path.join(backup_dir, filename)
-            provider.download_file(filename, local_path)
+            if cache.fetch(provider, filename, local_path, listing.get(filename)):
+                cprint(NEON_GREEN, f"{filename}: taken from the download cache")
+            pull_manifest(provider, local_path)
 
     cprint(NEON_GREEN, "Sync Completed Successfully!")
\ No newline at end of file
@@ -82,6 +82,8 @@ def print_rich_help():
         ("cooldown", "Show account cooldown status"),
         ("recommend", "Get the next best account recommendation"),
         ("stats", "Show usage statistics (last 7 days)"),
+        ("slots", "Pre-staged account trees for instant switching"),
+        ("bench", "Benchmark backup/restore on a synthetic tree"),
     ]
 
     for cmd, desc in commands:
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/verify.py
+
+"""
+verify.py - Copy a tree and verify the copy from a manifest, in one read of the source.
+
+Replaces the `cp -a src tmp` + `diff -r src tmp` pair used by backup and
+restore: copy_tree hashes every file while copying it, and verify_tree checks
+the copy against that manifest without touching the source again.  Files that
+were already verified (e.g. a tree that has only been renamed since) can be
+re-checked with a cheap (size, mtime) comparison instead of re-hashing.
+
+copy_tree can also take a previous copy of the same tree (link_dest, as in
+`rsync --link-dest`): unchanged files are then hardlinked or reflinked to it
+instead of being copied, so a new directory snapshot costs almost nothing.
+"""
+from __future__ import annotations
+import fcntl
+import os
+import shutil
+from typing import Collection, List, Optional
+
+from .manifest import Manifest, FileEntry, HashingReader, CHUNK_SIZE, hash_file, walk_tree
+from .settings import get_setting
+
+VERIFY_MODES = ("manifest", "diff")
+DEFAULT_VERIFY_MODE = "manifest"
+
+# How copy_tree reuses unchanged files from link_dest
+LINK_MODES = ("copy", "hardlink", "reflink")
+DEFAULT_LINK_MODE = "copy"
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+def _copy_metadata(src_st: os.stat_result, dest: str, symlink: bool = False):
+    """Preserve ownership, mode and timestamps like cp -a (ownership only when permitted)."""
+    try:
+        if symlink:
+            os.lchown(dest, src_st.st_uid, src_st.st_gid)
+        else:
+            os.chown(dest, src_st.st_uid, src_st.st_gid)
+    except OSError:
+        pass
+    if symlink:
+        try:
+            os.utime(dest, ns=(src_st.st_atime_ns, src_st.st_mtime_ns), follow_symlinks=False)
+        except (OSError, NotImplementedError):
+            pass
+        return
+    os.chmod(dest, src_st.st_mode & 0o7777)
+    os.utime(dest, ns=(src_st.st_atime_ns, src_st.st_mtime_ns))
+
+
+def _clone_file(src: str, dest: str) -> bool:
+    """
+    Make dest share src's data blocks: FICLONE where the filesystem supports
+    reflinks (btrfs, xfs, ...), else copy_file_range which lets the kernel copy
+    (or clone) without the data passing through userspace. False if neither works.
+    """
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            pass
+        if not hasattr(os, "copy_file_range"):
+            return False
+        remaining = os.fstat(s.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            return False
+        return remaining == 0
+
+
+def _reuse_from_link_dest(item, target: str, link_dest: str, prev: Optional[FileEntry], link_mode: str) -> bool:
+    """Hardlink/reflink item from the previous copy if it is unchanged there. True on success."""
+    if prev is None or prev.size != item.st.st_size or prev.mtime_ns != item.st.st_mtime_ns:
+        return False
+    old = os.path.join(link_dest, item.path)
+    try:
+        old_st = os.lstat(old)
+    except OSError:
+        return False
+    # The old file must still be what its manifest says (it could have been touched since)
+    if old_st.st_size != prev.size or old_st.st_mtime_ns != prev.mtime_ns:
+        return False
+
+    if link_mode == "hardlink":
+        # A hardlink shares the inode, so ownership and mode have to match too
+        if (old_st.st_mode, old_st.st_uid, old_st.st_gid) != (item.st.st_mode, item.st.st_uid, item.st.st_gid):
+            return False
+        try:
+            os.link(old, target)
+            return True
+        except OSError:
+            # EXDEV, EMLINK, filesystems without hardlinks: fall back to a copy
+            return False
+
+    if _clone_file(old, target):
+        _copy_metadata(item.st, target)
+        return True
+    return False
+
+
+def copy_tree(src: str, dest: str, link_dest: Optional[str] = None,
+              link_manifest: Optional[Manifest] = None, link_mode: str = DEFAULT_LINK_MODE,
+              exclude=None) -> Manifest:
+    """
+    Copy src to dest (which must not exist) preserving metadata, and return the
+    manifest of what was copied. Every copied file is read once; that read is hashed.
+
+    With link_dest/link_manifest (a previous copy of src and its manifest) and
+    link_mode "hardlink" or "reflink", files unchanged since that copy are
+    linked or cloned from it rather than copied; their manifest entries are
+    carried over and their paths listed in manifest.meta["linked"].
+
+    Directories and symlinks are listed in manifest.meta["others"] so the copy
+    can be checked for missing or extra entries, not just file contents.
+    Paths matched by exclude (an exclude.ExcludeMatcher) are not copied.
+    """
+    manifest = Manifest()
+    others = []
+    linked = []
+    dirs = []
+    reuse = link_mode != "copy" and link_dest is not None and link_manifest is not None
+
+    root_st = os.stat(src)
+    os.makedirs(dest)
+    for item in walk_tree(src, exclude=exclude):
+        target = os.path.join(dest, item.path)
+        if item.is_dir:
+            os.mkdir(target)
+            dirs.append((target, item.st))
+            others.append(item.path)
+        elif item.is_symlink:
+            os.symlink(os.readlink(item.full_path), target)
+            _copy_metadata(item.st, target, symlink=True)
+            others.append(item.path)
+        elif item.is_file:
+            prev = link_manifest.files.get(item.path) if reuse else None
+            if prev is not None and _reuse_from_link_dest(item, target, link_dest, prev, link_mode):
+                manifest.add(item.path, prev)
+                linked.append(item.path)
+                continue
+            try:
+                fh = open(item.full_path, "rb")
+            except FileNotFoundError:
+                continue
+            with fh, open(target, "wb") as out:
+                reader = HashingReader(fh)
+                shutil.copyfileobj(reader, out, CHUNK_SIZE)
+            _copy_metadata(item.st, target)
+            manifest.add(item.path, FileEntry(
+                size=reader.bytes_read,
+                mtime_ns=item.st.st_mtime_ns,
+                sha256=reader.hexdigest(),
+            ))
+        # Sockets, fifos and devices are skipped, as in the archive
+
+    # Directory times last (and deepest first): creating entries bumps the parent's mtime
+    for target, st in reversed(dirs):
+        _copy_metadata(st, target)
+    _copy_metadata(root_st, dest)
+
+    manifest.meta["others"] = others
+    if reuse:
+        manifest.meta["linked"] = linked
+    return manifest
+
+
+def verify_tree(root: str, manifest: Manifest, quick: bool = False,
+                verified: Optional[Collection[str]] = None, exclude=None) -> List[str]:
+    """
+    Check root against manifest and return a list of problems (empty when it matches).
+
+    By default every file is re-hashed. With quick=True only (size, mtime) are
+    compared, which is enough for files that were hash-verified earlier;
+    `verified` limits that shortcut to the given paths. Paths matched by
+    exclude are ignored on disk, as they were when the manifest was built.
+    """
+    verified = set(verified) if verified is not None else None
+    problems = []
+    files = manifest.files
+    others = manifest.meta.get("others")
+    others = set(others) if others is not None else None
+    seen = set()
+
+    for item in walk_tree(root, exclude=exclude):
+        seen.add(item.path)
+        if item.is_file and item.path in files:
+            entry = files[item.path]
+            if item.st.st_size != entry.size:
+                problems.append(f"size differs: {item.path}")
+            elif quick or (verified is not None and item.path in verified):
+                if item.st.st_mtime_ns != entry.mtime_ns:
+                    problems.append(f"mtime differs: {item.path}")
+            elif hash_file(item.full_path) != entry.sha256:
+                problems.append(f"content differs: {item.path}")
+        elif item.path in files:
+            problems.append(f"not a regular file: {item.path}")
+        elif others is not None and item.path not in others:
+            problems.append(f"unexpected: {item.path}")
+        elif others is None and item.is_file:
+            problems.append(f"unexpected: {item.path}")
+
+    for path in list(files) + list(others or []):
+        if path not in seen:
+            problems.append(f"missing: {path}")
+    return problems
+
+
+def compare_manifests(expected: Manifest, actual: Manifest) -> List[str]:
+    """Compare two manifests' file contents (by hash) without touching the disk."""
+    problems = []
+    for path, entry in expected.files.items():
+        got = actual.files.get(path)
+        if got is None:
+            problems.append(f"missing: {path}")
+        elif got.sha256 != entry.sha256:
+            problems.append(f"content differs: {path}")
+    for path in actual.files:
+        if path not in expected.files:
+            problems.append(f"unexpected: {path}")
+    return problems
+
+
+def report_problems(problems: List[str], limit: int = 20, out=print):
+    """Print at most `limit` verification problems, diff-style."""
+    for line in problems[:limit]:
+        out(f"  {line}")
+    if len(problems) > limit:
+        out(f"  ... and {len(problems) - limit} more")
+
+
+def link_mode(args) -> str:
+    """Resolve how directory snapshots reuse the previous one (--snapshot-mode / setting snapshot_mode)."""
+    mode = getattr(args, "snapshot_mode", None)
+    if mode not in LINK_MODES:
+        mode = get_setting("snapshot_mode", DEFAULT_LINK_MODE)
+    return mode if mode in LINK_MODES else DEFAULT_LINK_MODE
+
+
+def verify_mode(args) -> str:
+    """Resolve the verification mode from args, falling back to the saved setting."""
+    mode = getattr(args, "verify", None)
+    if mode not in VERIFY_MODES:
+        mode = get_setting("verify_mode", DEFAULT_VERIFY_MODE)
+    return mode if mode in VERIFY_MODES else DEFAULT_VERIFY_MODE
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# src/geminiai_cli/watch.py
+
+"""
+watch.py - `backup --watch`: event-driven, debounced incremental backups.
+
+Instead of a cron job that archives ~/.gemini every N minutes whether or not
+anything changed, the watcher subscribes to inotify events on the tree and
+runs an incremental backup once changes have settled:
+
+  * a burst of events is coalesced until the tree has been quiet for
+    `quiet_period` seconds,
+  * two backups are at least `min_interval` seconds apart,
+  * a tree that never goes quiet is still backed up after `max_delay` seconds.
+
+inotify is used through ctypes (Linux only, no extra package). Elsewhere, or
+when the kernel's watch limit is exhausted, the tree is polled by comparing
+(size, mtime) signatures instead, which still skips idle periods entirely.
+"""
+from __future__ import annotations
+import copy
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from typing import Callable, Dict, Optional
+
+from .exclude import excludes_from_args
+from .manifest import Manifest, manifest_path_for, walk_tree
+from .settings import get_setting
+
+DEFAULT_QUIET_PERIOD = 30
+DEFAULT_MIN_INTERVAL = 300
+DEFAULT_MAX_DELAY = 900
+DEFAULT_POLL_INTERVAL = 10
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT = struct.Struct("iIII")
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher:
+    """Recursive inotify watch on root; wait() reports whether anything changed outside excluded paths."""
+
+    def __init__(self, root: str, exclude=None):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._root = root
+        self._exclude = exclude
+        self._dirs: Dict[int, str] = {}
+        self._root_id = None
+        self._lost = False
+        try:
+            self._root_id = self._identity()
+            self._add_tree(root)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _add_watch(self, path: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return  # Gone again before we got to it
+            # ENOSPC: fs.inotify.max_user_watches exhausted
+            raise OSError(err, f"inotify_add_watch {path}: {os.strerror(err)}")
+        self._dirs[wd] = path
+
+    def _identity(self):
+        st = os.stat(self._root)
+        return st.st_dev, st.st_ino
+
+    def _reattach(self) -> bool:
+        """The root was moved or deleted: watch whatever directory is at its path now, if any."""
+        try:
+            identity = self._identity()
+        except OSError:
+            return False
+        if not os.path.isdir(self._root):
+            return False
+        # The old tree is not ours any more (its remaining watches would report stale paths)
+        for wd in list(self._dirs):
+            self._libc.inotify_rm_watch(self._fd, wd)
+        self._dirs.clear()
+        self._root_id = identity
+        self._lost = False
+        self._add_tree(self._root)
+        return True
+
+    def _excluded(self, path: str, is_dir: bool) -> bool:
+        if self._exclude is None or path == self._root:
+            return False
+        return self._exclude(os.path.relpath(path, self._root).replace(os.sep, "/"), is_dir)
+
+    def _add_tree(self, root: str):
+        if self._excluded(root, True):
+            return
+        self._add_watch(root)
+        prefix = os.path.relpath(root, self._root).replace(os.sep, "/")
+        exclude = None
+        if self._exclude is not None:
+            # walk_tree paths are relative to the subtree; the patterns are relative to the source
+            exclude = self._exclude if prefix == "." else (lambda p, d: self._exclude(f"{prefix}/{p}", d))
+        for item in walk_tree(root, exclude=exclude):
+            if item.is_dir:
+                self._add_watch(item.full_path)
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """Block up to timeout seconds (None: forever); True if the tree changed."""
+        if self._lost:
+            # Nothing is watched until a directory appears at the root path again
+            if self._reattach():
+                return True
+            time.sleep(DEFAULT_POLL_INTERVAL if timeout is None else min(DEFAULT_POLL_INTERVAL, timeout))
+            return self._reattach()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                if mask & (IN_MOVE_SELF | IN_DELETE_SELF) and self._dirs.get(wd) == self._root:
+                    self._lost = True
+                    changed = True
+                    continue
+                path = os.path.join(self._dirs[wd], os.fsdecode(name)) if wd in self._dirs and name else None
+                if path is not None and self._excluded(path, bool(mask & IN_ISDIR)):
+                    continue
+                changed = True
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and path is not None:
+                    # New subdirectory: watch it (and anything created in it meanwhile)
+                    self._add_tree(path)
+        if not self._lost:
+            # A root replaced by rename may not have sent IN_MOVE_SELF in this batch yet
+            try:
+                self._lost = self._identity() != self._root_id
+            except OSError:
+                self._lost = True
+        if self._lost:
+            self._reattach()
+            changed = True
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Fallback watcher: compares a (path, size, mtime) signature of the tree every interval seconds."""
+
+    def __init__(self, root: str, interval: float = DEFAULT_POLL_INTERVAL, sleep: Callable[[float], None] = time.sleep,
+                 exclude=None):
+        self._root = root
+        self._exclude = exclude
+        self._interval = interval
+        self._sleep = sleep
+        self._signature = self._scan()
+
+    def _scan(self):
+        return [(item.path, item.st.st_size, item.st.st_mtime_ns, item.st.st_mode) for item in walk_tree(self._root, exclude=self._exclude)]
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        self._sleep(self._interval if timeout is None else min(self._interval, timeout))
+        signature = self._scan()
+        changed = signature != self._signature
+        self._signature = signature
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(root: str, exclude=None):
+    """inotify where available, otherwise polling."""
+    try:
+        return InotifyWatcher(root, exclude=exclude)
+    except OSError as e:
+        print(f"inotify unavailable ({e}); polling {root} every {DEFAULT_POLL_INTERVAL}s instead.")
+        return PollingWatcher(root, exclude=exclude)
+
+
+class Debouncer:
+    """
+    Decides when a backup is due given change notifications (times in seconds
+    from a monotonic clock): after quiet_period without changes, no sooner than
+    min_interval after the previous backup, and at most max_delay after the
+    first unbacked-up change.
+    """
+
+    def __init__(self, quiet_period: float, min_interval: float, max_delay: float):
+        self.quiet_period = quiet_period
+        self.min_interval = min_interval
+        self.max_delay = max_delay
+        self.first_change: Optional[float] = None
+        self.last_change: Optional[float] = None
+        self.last_run: Optional[float] = None
+
+    @property
+    def pending(self) -> bool:
+        return self.first_change is not None
+
+    def changed(self, now: float):
+        if self.first_change is None:
+            self.first_change = now
+        self.last_change = now
+
+    def due_at(self) -> Optional[float]:
+        """When the pending backup should run, or None if nothing is pending."""
+        if not self.pending:
+            return None
+        at = min(self.last_change + self.quiet_period, self.first_change + self.max_delay)
+        if self.last_run is not None:
+            at = max(at, self.last_run + self.min_interval)
+        return at
+
+    def postpone(self, now: float):
+        """Keep the pending change but wait a fresh quiet period (e.g. the backup lock was busy)."""
+        self.first_change = now
+        self.last_change = now
+
+    def ran(self, now: float):
+        self.first_change = None
+        self.last_change = None
+        self.last_run = now
+
+
+def changed_since_last_backup(src: str, archive_dir: str, exclude=None) -> bool:
+    """True unless the newest local archive of src's account still matches src by (size, mtime)."""
+    # Imported here: backup imports restore, and both are heavier than the watcher needs
+    from .backup import read_active_email
+    from .restore import find_latest_archive_backup_for_email
+
+    email = read_active_email(src)
+    latest = find_latest_archive_backup_for_email(archive_dir, email) if email else None
+    manifest = Manifest.load(manifest_path_for(latest)) if latest else None
+    if manifest is None:
+        return True
+    seen = 0
+    for item in walk_tree(src, exclude=exclude):
+        if not item.is_file:
+            continue
+        entry = manifest.files.get(item.path)
+        if entry is None or entry.size != item.st.st_size or entry.mtime_ns != item.st.st_mtime_ns:
+            return True
+        seen += 1
+    return seen != len(manifest.files)
+
+
+def _seconds(args, attr: str, setting: str, default: float) -> float:
+    value = getattr(args, attr, None)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        value = get_setting(setting, default)
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+def watch_backups(args, backup: Optional[Callable] = None, watcher=None, clock: Callable[[], float] = time.monotonic):
+    """
+    Run until interrupted, taking an incremental backup of args.src whenever
+    it changed and the debounce rules allow. backup defaults to perform_backup.
+    """
+    if backup is None:
+        from .backup import perform_backup as backup
+
+    src = os.path.abspath(os.path.expanduser(args.src))
+    if not os.path.isdir(src):
+        print(f"Source does not exist: {src}")
+        raise SystemExit(1)
+
+    debounce = Debouncer(
+        quiet_period=_seconds(args, "quiet_period", "watch_quiet_period", DEFAULT_QUIET_PERIOD),
+        min_interval=_seconds(args, "min_interval", "watch_min_interval", DEFAULT_MIN_INTERVAL),
+        max_delay=float(get_setting("watch_max_delay", DEFAULT_MAX_DELAY)),
+    )
+    run_args = copy.copy(args)
+    run_args.watch = False
+    run_args.incremental = True
+
+    exclude = excludes_from_args(args)
+    watcher = watcher or open_watcher(src, exclude=exclude)
+    print(f"Watching {src} (quiet period {debounce.quiet_period:g}s, "
+          f"min interval {debounce.min_interval:g}s). Press Ctrl+C to stop.")
+    if changed_since_last_backup(src, os.path.abspath(os.path.expanduser(args.archive_dir)), exclude):
+        print("Changes since the last backup; one is scheduled.")
+        debounce.changed(clock())
+
+    try:
+        while True:
+            due = debounce.due_at()
+            timeout = None if due is None else max(0.0, due - clock())
+            if watcher.wait(timeout):
+                debounce.changed(clock())
+                continue
+            due = debounce.due_at()
+            if due is None or clock() < due:
+                continue
+
+            print("Changes settled; running incremental backup.")
+            try:
+                backup(run_args)
+            except SystemExit as e:
+                if e.code == 2:
+                    # Another backup/restore holds the lock: keep the change pending and retry later
+                    debounce.postpone(clock())
+                    continue
+                print(f"Backup failed (exit {e.code}); waiting for the next change.")
+            debounce.ran(clock())
+    except KeyboardInterrupt:
+        print("Watch stopped.")
+    finally:
+        watcher.close()
@@ -34,6 +34,14 @@ def mock_geminiai_home(fs):
          patch("geminiai_cli.config.DEFAULT_GEMINI_HOME", default_gemini_home):
         yield
 
+@pytest.fixture(autouse=True)
+def fresh_provider_registry():
+    """Providers shared within a process must not leak from one test into the next."""
+    from geminiai_cli.cloud_factory import clear_providers
+    clear_providers()
+    yield
+    clear_providers()
+
 @pytest.fixture
 def mock_console(mocker):
     """Mocks the rich console to prevent actual output during tests."""
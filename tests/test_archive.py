@@ -0,0 +1,211 @@
+# tests/test_archive.py
+
+import pytest
+import os
+import tarfile
+import hashlib
+import functools
+from unittest.mock import patch
+from geminiai_cli import archive
+from geminiai_cli.archive import create_archive
+from geminiai_cli.compression import ParallelGzipWriter
+
+# pyfakefs (fs fixture) is autouse in conftest.py
+
+def _make_tree(fs, root="/src"):
+    fs.create_file(os.path.join(root, "google_accounts.json"), contents='{"active": "a@b.com"}')
+    fs.create_file(os.path.join(root, "tmp", "proj", "chats", "session-1.json"), contents="chat")
+    fs.create_dir(os.path.join(root, "empty"))
+    return root
+
+def test_create_archive_layout_and_manifest(fs):
+    src = _make_tree(fs)
+    os.makedirs("/out")
+    manifest = create_archive(src, "/out/a.gemini.tar.gz")
+
+    with tarfile.open("/out/a.gemini.tar.gz", "r:gz") as tar:
+        names = tar.getnames()
+    # Same layout as `tar -C src -czf archive .`
+    assert "." in names
+    assert "./google_accounts.json" in names
+    assert "./tmp/proj/chats/session-1.json" in names
+    assert "./empty" in names
+
+    assert set(manifest.files) == {"google_accounts.json", "tmp/proj/chats/session-1.json"}
+    entry = manifest.files["tmp/proj/chats/session-1.json"]
+    assert entry.size == 4
+    assert entry.sha256 == hashlib.sha256(b"chat").hexdigest()
+
+def test_create_archive_roundtrip_content(fs):
+    src = _make_tree(fs)
+    os.makedirs("/out")
+    create_archive(src, "/out/a.tar.gz")
+    with tarfile.open("/out/a.tar.gz", "r:gz") as tar:
+        data = tar.extractfile("./google_accounts.json").read()
+    assert data == b'{"active": "a@b.com"}'
+
+def test_create_archive_symlink(fs):
+    src = _make_tree(fs)
+    fs.create_symlink(os.path.join(src, "link"), "google_accounts.json")
+    os.makedirs("/out")
+    manifest = create_archive(src, "/out/a.tar.gz")
+    with tarfile.open("/out/a.tar.gz", "r:gz") as tar:
+        member = tar.getmember("./link")
+    assert member.issym()
+    assert member.linkname == "google_accounts.json"
+    assert "link" not in manifest.files
+
+def test_create_archive_no_partial_on_failure(fs):
+    src = _make_tree(fs)
+    os.makedirs("/out")
+    with patch("geminiai_cli.archive.write_tar_stream", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            create_archive(src, "/out/a.tar.gz")
+    assert not os.path.exists("/out/a.tar.gz")
+    assert not os.path.exists("/out/a.tar.gz.part")
+
+def test_name_cache_unknown_ids():
+    names = archive._NameCache()
+    with patch("geminiai_cli.archive.pwd.getpwuid", side_effect=KeyError):
+        assert names.user(123456) == ""
+    with patch("geminiai_cli.archive.grp.getgrgid", side_effect=KeyError):
+        assert names.group(123456) == ""
+    # Cached: no further lookups
+    with patch("geminiai_cli.archive.pwd.getpwuid") as mock_pw:
+        names.user(123456)
+        mock_pw.assert_not_called()
+
+def test_create_archive_incremental_skips_unchanged(fs):
+    src = _make_tree(fs)
+    os.makedirs("/out")
+    full = create_archive(src, "/out/full.tar.gz")
+
+    with open(os.path.join(src, "google_accounts.json"), "w") as fh:
+        fh.write('{"active": "c@d.com"}')
+    inc = create_archive(src, "/out/inc.tar.gz", parent=full)
+
+    with tarfile.open("/out/inc.tar.gz", "r:gz") as tar:
+        names = tar.getnames()
+    assert "./google_accounts.json" in names
+    assert "./tmp/proj/chats/session-1.json" not in names
+    # Unchanged entries are carried over so the manifest still describes the whole tree
+    assert set(inc.files) == set(full.files)
+    assert inc.files["tmp/proj/chats/session-1.json"] == full.files["tmp/proj/chats/session-1.json"]
+    assert inc.meta["archived"] == ["google_accounts.json"]
+    assert "empty" in inc.meta["others"]
+
+def test_create_archive_exclude(fs):
+    from geminiai_cli.exclude import ExcludeMatcher
+    src = _make_tree(fs)
+    fs.create_file("/src/tmp/bin/rg", contents="binary")
+    fs.create_file("/src/debug.log", contents="noise")
+    os.makedirs("/out")
+    manifest = create_archive(src, "/out/a.tar.gz", exclude=ExcludeMatcher(["/tmp/bin/", "*.log"]))
+
+    with tarfile.open("/out/a.tar.gz", "r:gz") as tar:
+        names = tar.getnames()
+    assert "./tmp/bin" not in names and "./tmp/bin/rg" not in names and "./debug.log" not in names
+    assert "./tmp/proj/chats/session-1.json" in names
+    assert set(manifest.files) == {"google_accounts.json", "tmp/proj/chats/session-1.json"}
+    assert manifest.meta["excludes"] == ["/tmp/bin/", "*.log"]
+
+def test_extract_hashes_while_writing(fs):
+    from geminiai_cli.manifest import Manifest
+    from geminiai_cli.verify import compare_manifests, verify_tree
+    src = _make_tree(fs)
+    os.symlink("google_accounts.json", os.path.join(src, "link"))
+    os.makedirs("/out")
+    expected = create_archive(src, "/out/a.gemini.tar.gz")
+
+    extracted = Manifest()
+    archive.extract_archive_file("/out/a.gemini.tar.gz", "/dst", manifest=extracted)
+
+    assert compare_manifests(expected, extracted) == []
+    assert set(extracted.meta["others"]) == {"empty", "link", "tmp", "tmp/proj", "tmp/proj/chats"}
+    assert os.readlink("/dst/link") == "google_accounts.json"
+    # Entries describe the files as written, so a quick (size, mtime) check of dest passes
+    assert verify_tree("/dst", extracted, quick=True) == []
+
+
+def test_extract_replaces_entries_of_an_earlier_archive(fs):
+    from geminiai_cli.manifest import Manifest
+    fs.create_file("/v1/item", contents="file")
+    fs.create_dir("/v2")
+    os.symlink("elsewhere", "/v2/item")
+    os.makedirs("/out")
+    create_archive("/v1", "/out/1.tar.gz")
+    create_archive("/v2", "/out/2.tar.gz")
+
+    extracted = Manifest()
+    archive.extract_archive_file("/out/1.tar.gz", "/dst", manifest=extracted)
+    archive.extract_archive_file("/out/2.tar.gz", "/dst", manifest=extracted)
+    assert os.path.islink("/dst/item")
+    assert "item" not in extracted.files and extracted.meta["others"] == ["item"]
+
+
+def test_extract_refuses_paths_outside_dest(fs):
+    import io
+    from geminiai_cli.manifest import Manifest
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        info = tarfile.TarInfo("../escape")
+        info.size = 1
+        tar.addfile(info, io.BytesIO(b"x"))
+    buf.seek(0)
+    with pytest.raises((RuntimeError, tarfile.TarError)):
+        archive.extract_tar_stream(buf, "/dst", Manifest())
+    assert not os.path.exists("/escape")
+
+def _chat_tree(fs, files=40):
+    for i in range(files):
+        fs.create_file(f"/src/chats/c{i:02}.json", contents=os.urandom(3000).hex())
+    os.makedirs("/out")
+
+# Many blocks, so members are reached by seeking rather than by reading from the start
+_small_blocks = functools.partial(ParallelGzipWriter, block_size=32 * 1024)
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd", "none"])
+def test_extract_members_seeks_to_indexed_members(fs, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    from geminiai_cli.manifest import Manifest
+    _chat_tree(fs)
+    with patch("geminiai_cli.compression.ParallelGzipWriter", _small_blocks):
+        manifest = create_archive("/src", "/out/a.tar", codec=codec, threads=2)
+    index = manifest.meta["index"]
+    assert set(manifest.files) <= set(index["members"])
+    if codec == "gzip":
+        assert len(index["blocks"]) > 4
+
+    wanted = ["chats/c03.json", "chats/c37.json"]
+    extracted = archive.extract_members("/out/a.tar", "/dst", [index["members"][p] for p in wanted],
+                                        Manifest(), blocks=index["blocks"])
+    assert set(extracted.files) == set(wanted)
+    assert sorted(os.listdir("/dst/chats")) == ["c03.json", "c37.json"]
+    for p in wanted:
+        assert extracted.files[p].sha256 == manifest.files[p].sha256
+
+    # An index that does not match the archive is an error, not a silent partial restore
+    with pytest.raises(RuntimeError):
+        archive.extract_members("/out/a.tar", "/dst2", [index["members"]["chats/c03.json"] + 1],
+                                Manifest(), blocks=index["blocks"])
+
+def test_extract_members_of_encrypted_archive(fs):
+    pytest.importorskip("cryptography")
+    from geminiai_cli.manifest import Manifest
+    _chat_tree(fs)
+    with patch("geminiai_cli.compression.ParallelGzipWriter", _small_blocks):
+        manifest = create_archive("/src", "/out/a.tar.gz.enc", passphrase="pw", threads=2)
+    index = manifest.meta["index"]
+
+    wanted = ["chats/c05.json", "chats/c39.json"]
+    extracted = archive.extract_members("/out/a.tar.gz.enc", "/dst", [index["members"][p] for p in wanted],
+                                        Manifest(), blocks=index["blocks"], passphrase="pw")
+    assert {p: e.sha256 for p, e in extracted.files.items()} == {p: manifest.files[p].sha256 for p in wanted}
+
+def test_list_archive_reads_members(fs):
+    src = _make_tree(fs)
+    os.makedirs("/out")
+    create_archive(src, "/out/a.tar.gz")
+    files = {m.name: m.size for m in archive.list_archive("/out/a.tar.gz") if m.isfile()}
+    assert files == {"google_accounts.json": 21, "tmp/proj/chats/session-1.json": 4}
@@ -36,7 +36,7 @@ def test_restore_auto_success(mock_mkdtemp, mock_rmtree, mock_move, mock_replace
 
     mock_run.return_value.returncode = 0
 
-    with patch("sys.argv", ["restore.py", "--auto"]):
+    with patch("sys.argv", ["restore.py", "--auto", "--verify", "diff"]):
         restore.main()
 
     # Verify that get_recommendation was called
@@ -59,7 +59,7 @@ def test_restore_auto_success(mock_mkdtemp, mock_rmtree, mock_move, mock_replace
 @patch("geminiai_cli.restore.get_recommendation")
 def test_restore_auto_no_recommendation(mock_rec, mock_lock, fs):
     mock_rec.return_value = None
-    with patch("sys.argv", ["restore.py", "--auto"]):
+    with patch("sys.argv", ["restore.py", "--auto", "--verify", "diff"]):
         with pytest.raises(SystemExit) as e:
             restore.main()
         # Should exit with error if no recommendation
@@ -76,7 +76,7 @@ def test_restore_auto_no_backups_for_email(mock_rec, mock_lock, fs):
     fs.create_dir(search_dir)
     fs.create_file(os.path.join(search_dir, "2025-10-20_000000-other@example.com.gemini.tar.gz"))
 
-    with patch("sys.argv", ["restore.py", "--auto"]):
+    with patch("sys.argv", ["restore.py", "--auto", "--verify", "diff"]):
         with pytest.raises(SystemExit) as e:
             restore.main()
         assert e.value.code != 0
@@ -2,6 +2,7 @@
 
 import pytest
 from unittest.mock import patch, MagicMock
+import os
 import sys
 from geminiai_cli import b2
 
@@ -53,6 +54,30 @@ def test_b2_manager_download(mock_mem_info, mock_b2_api):
     b2_mgr.download("remote", "local")
     mock_bucket.download_file_by_name.assert_called()
 
+@patch("geminiai_cli.b2.B2Api")
+@patch("geminiai_cli.b2.InMemoryAccountInfo")
+def test_b2_manager_download_large_uses_ranges(mock_mem_info, mock_b2_api, fs):
+    data = bytes(range(200)) * 3
+    mock_bucket = MagicMock()
+    mock_bucket.get_file_info_by_name.return_value = MagicMock(size=len(data), id_="4_z123")
+
+    def download_file_by_id(file_id, range_=None):
+        start, end = range_
+        return MagicMock(save=lambda fh: fh.write(data[start:end + 1]))
+
+    mock_b2_api.return_value.download_file_by_id.side_effect = download_file_by_id
+    mock_b2_api.return_value.get_bucket_by_name.return_value = mock_bucket
+    b2_mgr = b2.B2Manager("id", "key", "bucket")
+
+    fs.create_dir("/dl")
+    with patch("geminiai_cli.b2.download_settings", return_value=(3, 100)):
+        b2_mgr.download("big.tar", "/dl/big.tar")
+    # Every range is read from the version that was looked up, never by name
+    calls = mock_b2_api.return_value.download_file_by_id.call_args_list
+    assert len(calls) == 6 and {c.args[0] for c in calls} == {"4_z123"}
+    mock_bucket.download_file_by_name.assert_not_called()
+    assert open("/dl/big.tar", "rb").read() == data
+
 @patch("geminiai_cli.b2.B2Api")
 @patch("geminiai_cli.b2.InMemoryAccountInfo")
 def test_b2_manager_download_fail(mock_mem_info, mock_b2_api):
@@ -174,37 +199,118 @@ def test_b2_manager_download_interface(mock_mem_info, mock_b2_api):
     b2_mgr.download_file("remote", "local")
     mock_bucket.download_file_by_name.assert_called()
 
+class FakeB2Session:
+    """b2_list_file_names / b2_list_file_versions over a flat list of (name, action) pairs."""
+
+    def __init__(self, files):
+        self.files = sorted(files)
+        self.calls = []
+
+    def _page(self, start_file_name, max_file_count, prefix):
+        matching = [(n, a) for n, a in self.files if n.startswith(prefix or "") and n >= (start_file_name or "")]
+        page, rest = matching[:max_file_count], matching[max_file_count:]
+        return {"files": [{"fileName": n, "action": a, "size": 1, "uploadTimestamp": 0, "contentSha1": "none"}
+                          for n, a in page],
+                "nextFileName": rest[0][0] if rest else None, "nextFileId": "id" if rest else None}
+
+    def list_file_names(self, bucket_id, start_file_name=None, max_file_count=None, prefix=None):
+        self.calls.append(("names", bucket_id, start_file_name, max_file_count, prefix))
+        return self._page(start_file_name, max_file_count, prefix)
+
+    def list_file_versions(self, bucket_id, start_file_name=None, start_file_id=None, max_file_count=None,
+                           prefix=None):
+        self.calls.append(("versions", bucket_id, start_file_name, max_file_count, prefix))
+        return self._page(start_file_name, max_file_count, prefix)
+
+
+def _fake_bucket(files):
+    bucket = MagicMock(id_="bucket-id")
+    bucket.api.session = FakeB2Session(files)
+    bucket.api.file_version_factory.from_api_response.side_effect = lambda e: MagicMock(
+        file_name=e["fileName"], action=e["action"], size=e["size"], upload_timestamp=e["uploadTimestamp"],
+        content_sha1=e["contentSha1"])
+    return bucket
+
 @patch("geminiai_cli.b2.B2Api")
 @patch("geminiai_cli.b2.InMemoryAccountInfo")
 def test_b2_manager_list_files(mock_mem_info, mock_b2_api):
-    mock_bucket = MagicMock()
-
-    # Mock generator return from ls
+    mock_bucket = MagicMock(id_="bucket-id")
     file_ver = MagicMock()
     file_ver.file_name = "test.txt"
     file_ver.size = 100
     file_ver.upload_timestamp = 1000
+    file_ver.content_sha1 = "a" * 40
+    file_ver.action = "upload"
+    large = MagicMock(file_name="big.tar", size=1, upload_timestamp=0, content_sha1="none", action="upload")
 
-    mock_bucket.ls.return_value = [(file_ver, None)]
+    mock_bucket.api.session.list_file_names.return_value = {"files": [{}, {}], "nextFileName": None}
+    mock_bucket.api.file_version_factory.from_api_response.side_effect = [file_ver, large]
     mock_b2_api.return_value.get_bucket_by_name.return_value = mock_bucket
     b2_mgr = b2.B2Manager("id", "key", "bucket")
 
     files = b2_mgr.list_files()
-    assert len(files) == 1
+    assert len(files) == 2
     assert files[0].name == "test.txt"
     assert files[0].size == 100
+    assert files[0].checksum == "sha1:" + "a" * 40
+    assert files[1].checksum is None
+
+@patch("geminiai_cli.b2.B2Api")
+@patch("geminiai_cli.b2.InMemoryAccountInfo")
+def test_b2_manager_list_files_pushes_prefix_down(mock_mem_info, mock_b2_api):
+    bucket = _fake_bucket([("2025-01-01_1-a.gemini.tar.gz", "upload"), ("2025-01-02_1-a.gemini.tar.gz", "upload"),
+                           ("2025-02-01_1-a.gemini.tar.gz", "upload"), ("gemini-catalog.json", "upload"),
+                           ("chunks/objects/ab/1", "upload"), ("chunks/snapshots/s1", "upload"),
+                           ("chunks/snapshots/s1", "hide")])
+    session = bucket.api.session
+    mock_b2_api.return_value.get_bucket_by_name.return_value = bucket
+    b2_mgr = b2.B2Manager("id", "key", "bucket")
+
+    # A top-level prefix is filtered by B2, and paging starts at it
+    assert [f.name for f in b2_mgr.iter_files("2025-01", page_size=1)] == ["2025-01-01_1-a.gemini.tar.gz",
+                                                                          "2025-01-02_1-a.gemini.tar.gz"]
+    assert session.calls == [("names", "bucket-id", "2025-01", 1, "2025-01"),
+                             ("names", "bucket-id", "2025-01-02_1-a.gemini.tar.gz", 1, "2025-01")]
+
+    # Older versions come from b2_list_file_versions; hide markers are not files
+    session.calls.clear()
+    assert [f.name for f in b2_mgr.list_files("chunks/s", latest_only=False)] == ["chunks/snapshots/s1"]
+    assert session.calls == [("versions", "bucket-id", "chunks/s", b2.B2_LIST_PAGE_SIZE, "chunks/s")]
+
+    # The whole bucket, lazily: nothing is listed until the iterator is consumed
+    session.calls.clear()
+    files = b2_mgr.iter_files("")
+    assert session.calls == []
+    assert next(files).name == "2025-01-01_1-a.gemini.tar.gz"
+    assert session.calls == [("names", "bucket-id", None, b2.B2_LIST_PAGE_SIZE, "")]
 
 @patch("geminiai_cli.b2.B2Api")
 @patch("geminiai_cli.b2.InMemoryAccountInfo")
 def test_b2_manager_list_files_fail(mock_mem_info, mock_b2_api):
     mock_bucket = MagicMock()
-    mock_bucket.ls.side_effect = Exception("List fail")
+    mock_bucket.api.session.list_file_names.side_effect = Exception("List fail")
     mock_b2_api.return_value.get_bucket_by_name.return_value = mock_bucket
     b2_mgr = b2.B2Manager("id", "key", "bucket")
 
     files = b2_mgr.list_files()
     assert files == []
 
+@patch("geminiai_cli.b2.B2Api")
+@patch("geminiai_cli.b2.InMemoryAccountInfo")
+def test_b2_manager_file_info(mock_mem_info, mock_b2_api):
+    mock_bucket = MagicMock()
+    mock_bucket.get_file_info_by_name.return_value = MagicMock(file_name="a.tar.gz", size=7, upload_timestamp=2000,
+                                                               content_sha1="b" * 40)
+    mock_b2_api.return_value.get_bucket_by_name.return_value = mock_bucket
+    b2_mgr = b2.B2Manager("id", "key", "bucket")
+
+    info = b2_mgr.file_info("a.tar.gz")
+    assert (info.name, info.size, info.last_modified, info.checksum) == ("a.tar.gz", 7, 2, "sha1:" + "b" * 40)
+    mock_bucket.ls.assert_not_called()
+
+    mock_bucket.get_file_info_by_name.side_effect = b2.FileNotPresent(file_id_or_name="missing")
+    assert b2_mgr.file_info("missing") is None
+
 @patch("geminiai_cli.b2.B2Api")
 @patch("geminiai_cli.b2.InMemoryAccountInfo")
 def test_b2_manager_delete_file(mock_mem_info, mock_b2_api):
@@ -230,3 +336,58 @@ def test_b2_manager_delete_file_fail(mock_mem_info, mock_b2_api):
 
     b2_mgr.delete_file("remote")
     # Should print error but not crash
+
+@patch("geminiai_cli.b2.B2Api")
+@patch("geminiai_cli.b2.InMemoryAccountInfo")
+def test_b2_manager_open_upload_stream(mock_mem_info, mock_b2_api):
+    mock_bucket = MagicMock()
+    received = {}
+    mock_bucket.upload_unbound_stream.side_effect = lambda reader, name: received.update(name=name, data=reader.read())
+    mock_b2_api.return_value.get_bucket_by_name.return_value = mock_bucket
+    b2_mgr = b2.B2Manager("id", "key", "bucket")
+
+    with b2_mgr.open_upload_stream("remote.tar.gz") as out:
+        out.write(b"abc")
+        out.write(b"def")
+    assert received == {"name": "remote.tar.gz", "data": b"abcdef"}
+
+@patch("geminiai_cli.b2.B2Api")
+@patch("geminiai_cli.b2.InMemoryAccountInfo")
+def test_b2_manager_open_upload_stream_fail(mock_mem_info, mock_b2_api):
+    mock_bucket = MagicMock()
+    mock_bucket.upload_unbound_stream.side_effect = Exception("Upload fail")
+    mock_b2_api.return_value.get_bucket_by_name.return_value = mock_bucket
+    b2_mgr = b2.B2Manager("id", "key", "bucket")
+
+    with pytest.raises(IOError):
+        with b2_mgr.open_upload_stream("remote.tar.gz") as out:
+            out.write(b"abc")
+
+@patch("geminiai_cli.b2.auth_cache_enabled", return_value=True)
+@patch("geminiai_cli.b2.AuthInfoCache")
+@patch("geminiai_cli.b2.SqliteAccountInfo")
+@patch("geminiai_cli.b2.B2Api")
+def test_b2_manager_reuses_cached_authorization(mock_b2_api, mock_sqlite, mock_auth_cache, mock_enabled, fs):
+    fs.create_file(b2.B2_AUTH_CACHE, st_mode=0o100644)
+    info = mock_sqlite.return_value
+    info.get_application_key_id.return_value = "id"
+    info.get_account_auth_token.return_value = "token"
+
+    b2_mgr = b2.B2Manager("id", "key", "bucket")
+    mock_sqlite.assert_called_once_with(file_name=b2.B2_AUTH_CACHE)
+    mock_b2_api.assert_called_once_with(info, cache=mock_auth_cache.return_value)
+    mock_b2_api.return_value.authorize_account.assert_not_called()
+    assert b2_mgr.bucket is mock_b2_api.return_value.get_bucket_by_name.return_value
+    # The cache holds the application key: owner-only
+    assert os.stat(b2.B2_AUTH_CACHE).st_mode & 0o777 == 0o600
+
+    # Another key, or nothing cached yet: authorize (and so refresh the cache)
+    b2.B2Manager("other-id", "key", "bucket")
+    info.get_application_key_id.side_effect = Exception("MissingAccountData")
+    b2.B2Manager("id", "key", "bucket")
+    assert mock_b2_api.return_value.authorize_account.call_count == 2
+
+def test_auth_cache_is_opt_in(fs):
+    assert b2.auth_cache_enabled() is False
+    with patch("geminiai_cli.b2.get_setting", return_value=True):
+        assert b2.auth_cache_enabled() is True
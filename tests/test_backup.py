@@ -5,6 +5,7 @@ from unittest.mock import patch, MagicMock
 import os
 import json
 from geminiai_cli import backup
+from geminiai_cli.cloud_storage import CloudFile
 from geminiai_cli.config import DEFAULT_GEMINI_HOME
 
 # Note: We rely on pyfakefs (fs fixture) which is autouse in conftest.py
@@ -121,7 +122,7 @@ def test_main_success(mock_replace, mock_run, mock_email, mock_lock, fs):
 def test_main_diff_fail(mock_run, mock_email, mock_lock, fs):
     fs.create_dir(DEFAULT_GEMINI_HOME)
 
-    with patch("sys.argv", ["backup.py"]):
+    with patch("sys.argv", ["backup.py", "--verify", "diff"]):
         mock_run.return_value.returncode = 1
         with pytest.raises(SystemExit) as e:
             backup.main()
@@ -156,6 +157,7 @@ def test_main_cloud(mock_replace, mock_get_provider, mock_run, mock_email, mock_
     with patch("sys.argv", ["backup.py", "--cloud", "--bucket", "b", "--b2-id", "i", "--b2-key", "k"]):
         mock_run.return_value.returncode = 0
         mock_b2 = MagicMock()
+        mock_b2.file_info.side_effect = lambda name: CloudFile(name, 1, 0)
         mock_get_provider.return_value = mock_b2
 
         backup.main()
@@ -163,6 +165,13 @@ def test_main_cloud(mock_replace, mock_get_provider, mock_run, mock_email, mock_
         mock_get_provider.assert_called()
         mock_b2.upload_file.assert_called()
 
+        # An upload the provider only reported as failed is not a finished backup
+        mock_b2.file_info.side_effect = None
+        mock_b2.file_info.return_value = None
+        with pytest.raises(SystemExit) as e:
+            backup.main()
+        assert e.value.code == 1
+
 @patch("geminiai_cli.backup.acquire_lock")
 @patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
 @patch("geminiai_cli.backup.run")
@@ -185,7 +194,7 @@ def test_main_cloud_missing_creds(mock_replace, mock_get_setting, mock_get_provi
 @patch("os.replace")
 def test_main_no_active_email(mock_replace, mock_run, mock_email, mock_lock, fs):
     fs.create_dir(DEFAULT_GEMINI_HOME)
-    with patch("sys.argv", ["backup.py"]):
+    with patch("sys.argv", ["backup.py", "--verify", "diff"]):
         mock_run.return_value.returncode = 0
         backup.main()
         assert mock_run.call_count >= 2
@@ -233,9 +242,230 @@ def test_main_lock_exception(mock_replace, mock_lock, fs):
 @patch("geminiai_cli.backup.run")
 def test_main_diff_fail_no_stdout(mock_run, mock_email, mock_lock, fs):
     fs.create_dir(DEFAULT_GEMINI_HOME)
-    with patch("sys.argv", ["backup.py"]):
+    with patch("sys.argv", ["backup.py", "--verify", "diff"]):
         mock_run.return_value.returncode = 2
         mock_run.return_value.stdout = ""
         with pytest.raises(SystemExit) as e:
             backup.main()
         assert e.value.code == 3
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+@patch("geminiai_cli.backup.run")
+def test_main_writes_archive_and_manifest(mock_run, mock_email, mock_lock, fs):
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "oauth_creds.json"), contents="{}")
+    def fake_run(cmd, **kwargs):
+        # cp -a is mocked, so fake its effect before step 4 runs
+        if cmd.startswith("cp -a"):
+            fs.create_dir("/dirs/.2025-01-01_120000-user@example.com.gemini.tmp-2025-01-01_120000")
+        return MagicMock(returncode=0)
+    mock_run.side_effect = fake_run
+
+    with patch("geminiai_cli.backup.make_timestamp", return_value="2025-01-01_120000"):
+        with patch("sys.argv", ["backup.py", "--archive-dir", "/out", "--dest-dir-parent", "/dirs"]):
+            backup.main()
+
+    archive_path = "/out/2025-01-01_120000-user@example.com.gemini.tar.gz"
+    assert os.path.exists(archive_path)
+    from geminiai_cli.manifest import Manifest, manifest_path_for
+    manifest = Manifest.load(manifest_path_for(archive_path))
+    assert "oauth_creds.json" in manifest.files
+    assert manifest.meta["archive"] == os.path.basename(archive_path)
+    # tar is no longer shelled out
+    assert not any("tar " in str(c) for c in mock_run.call_args_list)
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+@patch("geminiai_cli.backup.run")
+@patch("geminiai_cli.backup.get_cloud_provider")
+@patch("geminiai_cli.backup.push_snapshot", return_value=3)
+@patch("os.replace", wraps=os.replace)
+def test_main_chunked_engine(mock_replace, mock_push, mock_get_provider, mock_run, mock_email, mock_lock, fs):
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "oauth_creds.json"), contents="{}")
+    mock_run.return_value.returncode = 0
+    with patch("geminiai_cli.backup.ChunkStore") as mock_store_cls:
+        mock_store = mock_store_cls.return_value
+        mock_store.backup.return_value = ({}, MagicMock(files=1, reused_files=0, new_chunks=1, chunks=1, new_bytes=2))
+        mock_store.latest_snapshot_for_email.return_value = "parent.snapshot.json"
+        with patch("sys.argv", ["backup.py", "--engine", "chunked", "--cloud", "--archive-dir", "/out"]):
+            with patch("geminiai_cli.backup.os.replace"):
+                backup.main()
+
+    assert mock_store.backup.call_args[1]["parent"] == "parent.snapshot.json"
+    mock_push.assert_called_once()
+    # No tar.gz in chunked mode
+    assert not os.path.exists("/out") or not os.listdir("/out")
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+def test_main_chunked_engine_rejects_encrypt(mock_email, mock_lock, fs):
+    fs.create_dir(DEFAULT_GEMINI_HOME)
+    with patch("sys.argv", ["backup.py", "--engine", "chunked", "--encrypt"]):
+        with pytest.raises(SystemExit) as e:
+            backup.main()
+    assert e.value.code == 1
+    mock_lock.assert_not_called()
+
+def test_find_incremental_parent(fs):
+    from geminiai_cli.backup import find_incremental_parent
+    from geminiai_cli.manifest import Manifest, manifest_path_for
+    os.makedirs("/arch")
+    assert find_incremental_parent("/arch", "a@b.com", 24) == (None, None)
+
+    latest = "/arch/2025-01-01_100000-a@b.com.gemini.tar.gz"
+    fs.create_file(latest)
+    # No manifest next to the previous archive: must go full
+    assert find_incremental_parent("/arch", "a@b.com", 24) == (None, None)
+
+    Manifest(meta={"kind": "incremental", "chain_length": 2}).save(manifest_path_for(latest))
+    path, manifest = find_incremental_parent("/arch", "a@b.com", 24)
+    assert path == latest
+    assert manifest.meta["chain_length"] == 2
+    # Chain is capped by the periodic full backup
+    assert find_incremental_parent("/arch", "a@b.com", 3) == (None, None)
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+@patch("geminiai_cli.backup.run")
+def test_main_manifest_verify_fail(mock_run, mock_email, mock_lock, fs):
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "file"), contents="x")
+    with patch("geminiai_cli.backup.verify_tree", return_value=["content differs: file"]):
+        with patch("sys.argv", ["backup.py"]):
+            with pytest.raises(SystemExit) as e:
+                backup.main()
+    assert e.value.code == 3
+    # No external cp/diff in manifest mode
+    mock_run.assert_not_called()
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+@patch("geminiai_cli.backup.run")
+def test_main_hardlink_snapshots(mock_run, mock_email, mock_lock, fs):
+    from geminiai_cli.integrity import find_latest_backup
+    from geminiai_cli.prune import get_backup_list_dirs
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "chats.json"), contents="history")
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "google_accounts.json"), contents="{}")
+
+    for ts in ("2025-01-01_100000", "2025-01-01_110000"):
+        with patch("geminiai_cli.backup.make_timestamp", return_value=ts):
+            with patch("sys.argv", ["backup.py", "--dest-dir-parent", "/snaps", "--archive-dir", "/arch",
+                                    "--snapshot-mode", "hardlink"]):
+                backup.main()
+
+    first = "/snaps/2025-01-01_100000-user@example.com.gemini"
+    second = "/snaps/2025-01-01_110000-user@example.com.gemini"
+    assert os.stat(f"{second}/chats.json").st_ino == os.stat(f"{first}/chats.json").st_ino
+    assert backup.find_previous_snapshot("/snaps", "user@example.com")[0] == second
+    # Hidden manifests don't confuse the existing directory-backup discovery
+    assert find_latest_backup("/snaps") == second
+    assert [d for _, d in get_backup_list_dirs(os.listdir("/snaps"))] == [os.path.basename(second), os.path.basename(first)]
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+@patch("geminiai_cli.backup.get_cloud_provider")
+def test_main_cloud_no_local_streams_archive(mock_get_provider, mock_email, mock_lock, fs):
+    import io
+    import tarfile
+    from geminiai_cli.manifest import Manifest
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "chats.json"), contents="history")
+    uploaded = {}
+
+    class Stream(io.BytesIO):
+        def __init__(self, name):
+            super().__init__()
+            self.name = name
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc):
+            uploaded[self.name] = self.getvalue()
+
+    provider = mock_get_provider.return_value
+    provider.open_upload_stream.side_effect = Stream
+    provider.upload_string.side_effect = lambda text, name: uploaded.__setitem__(name, text)
+    provider.file_info.side_effect = lambda name: CloudFile(name, len(uploaded[name]), 0) if name in uploaded else None
+
+    with patch("geminiai_cli.backup.make_timestamp", return_value="2025-01-01_120000"):
+        with patch("sys.argv", ["backup.py", "--cloud", "--no-local", "--incremental", "--archive-dir", "/out",
+                                "--dest-dir-parent", "/dirs"]):
+            backup.main()
+
+    name = "2025-01-01_120000-user@example.com.gemini.tar.gz"
+    with tarfile.open(fileobj=io.BytesIO(uploaded[name]), mode="r:gz") as tar:
+        assert tar.extractfile("./chats.json").read() == b"history"
+    manifest = Manifest.loads(uploaded[f"{name}.manifest.json"])
+    assert manifest.meta["kind"] == "full" and "chats.json" in manifest.files
+    provider.upload_file.assert_not_called()
+    assert not os.path.exists("/out")
+    assert os.path.exists("/dirs/2025-01-01_120000-user@example.com.gemini/chats.json")
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+@pytest.mark.parametrize("argv", [
+    ["--no-local"],
+    ["--no-local", "--cloud", "--engine", "chunked"],
+    ["--no-local", "--cloud", "--encrypt", "--encryption", "gpg"],
+])
+def test_main_no_local_rejected(mock_email, mock_lock, argv, fs):
+    fs.create_dir(DEFAULT_GEMINI_HOME)
+    with patch("sys.argv", ["backup.py"] + argv):
+        with pytest.raises(SystemExit) as e:
+            backup.main()
+    assert e.value.code == 1
+    mock_lock.assert_not_called()
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+def test_main_default_and_custom_excludes(mock_email, mock_lock, fs):
+    from geminiai_cli.manifest import Manifest, manifest_path_for
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "chats.json"), contents="history")
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "tmp", "bin", "rg"), contents="binary")
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "tmp", "ab" * 32, "state"), contents="runtime")
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "debug.log"), contents="noise")
+    fs.create_file("/ex.txt", contents="*.log\n")
+
+    with patch("geminiai_cli.backup.make_timestamp", return_value="2025-01-01_120000"):
+        with patch("sys.argv", ["backup.py", "--src", DEFAULT_GEMINI_HOME, "--archive-dir", "/out",
+                                "--dest-dir-parent", "/dirs", "--exclude-from", "/ex.txt"]):
+            backup.main()
+
+    manifest = Manifest.load(manifest_path_for("/out/2025-01-01_120000-user@example.com.gemini.tar.gz"))
+    assert set(manifest.files) == {"chats.json"}
+    snapshot = "/dirs/2025-01-01_120000-user@example.com.gemini"
+    assert os.path.exists(f"{snapshot}/chats.json")
+    assert not os.path.exists(f"{snapshot}/tmp/bin") and not os.path.exists(f"{snapshot}/debug.log")
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+def test_main_exclude_from_missing_file(mock_email, mock_lock, fs):
+    with patch("sys.argv", ["backup.py", "--src", DEFAULT_GEMINI_HOME, "--exclude-from", "/missing.txt"]):
+        with pytest.raises(SystemExit) as e:
+            backup.main()
+    assert e.value.code == 1
+    mock_lock.assert_not_called()
+
+@patch("geminiai_cli.backup.acquire_lock")
+@patch("geminiai_cli.backup.read_active_email", return_value="user@example.com")
+def test_main_metrics_json_and_timings(mock_email, mock_lock, fs, capsys):
+    import json
+    fs.create_file(os.path.join(DEFAULT_GEMINI_HOME, "chats.json"), contents="history")
+    with patch("sys.argv", ["backup.py", "--src", DEFAULT_GEMINI_HOME, "--archive-dir", "/out",
+                            "--dest-dir-parent", "/dirs", "--timings", "--metrics-json", "/m/backup.json"]):
+        backup.main()
+
+    with open("/m/backup.json") as fh:
+        data = json.load(fh)
+    assert data["command"] == "backup" and data["ok"] is True
+    assert [p["name"] for p in data["phases"]] == ["archive", "copy", "verify", "install"]
+    assert data["phases"][0]["files"] == data["phases"][1]["files"] >= 1
+    assert "backup timings" in capsys.readouterr().out
+
+    # A failed run is still recorded
+    with patch("sys.argv", ["backup.py", "--src", DEFAULT_GEMINI_HOME, "--archive-dir", "/out",
+                            "--dest-dir-parent", "/dirs", "--metrics-json", "/m/backup.json"]), \
+         patch("geminiai_cli.backup.copy_tree", side_effect=SystemExit(3)):
+        with pytest.raises(SystemExit):
+            backup.main()
+    with open("/m/backup.json") as fh:
+        data = json.load(fh)
+    assert data["ok"] is False
+    assert data["phases"][-1]["name"] == "copy"
@@ -0,0 +1,144 @@
+# tests/test_bench.py
+
+import json
+import os
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from geminiai_cli import bench
+from geminiai_cli.exclude import ExcludeMatcher, DEFAULT_EXCLUDES
+from geminiai_cli.manifest import walk_tree
+
+
+def test_generate_tree_shape_and_determinism(fs):
+    stats = bench.generate_tree("/t1/.gemini", 120, sizes="small", depth=3, seed=7)
+    again = bench.generate_tree("/t2/.gemini", 120, sizes="small", depth=3, seed=7)
+    assert stats == again
+
+    with open("/t1/.gemini/google_accounts.json") as fh:
+        assert json.load(fh)["active"] == bench.BENCH_EMAIL
+    entries = list(walk_tree("/t1/.gemini"))
+    files = [e for e in entries if not e.is_dir]
+    assert len(files) == stats.files
+    assert sum(e.st.st_size for e in files) == stats.bytes
+    assert len([e for e in entries if e.is_dir]) == stats.dirs
+    chat_files = [e for e in files if e.path.endswith(".json") and "/chats/" in e.path]
+    assert len(chat_files) == 120
+    assert max(e.path.count("/") for e in chat_files) <= 3 + 2
+    for e in chat_files:
+        with open(os.path.join("/t1/.gemini", e.path), "rb") as a, open(os.path.join("/t2/.gemini", e.path), "rb") as b:
+            assert a.read() == b.read()
+
+    # The runtime data is there, and is what the default excludes drop
+    matcher = ExcludeMatcher(DEFAULT_EXCLUDES)
+    kept = [e for e in walk_tree("/t1/.gemini", exclude=matcher) if not e.is_dir]
+    assert len(kept) == stats.files - 11
+
+
+def test_generate_tree_size_distributions(fs):
+    small = bench.generate_tree("/s", 50, sizes="small", runtime=False)
+    large = bench.generate_tree("/l", 5, sizes="large", runtime=False)
+    assert small.bytes < 50 * 8192 + 4096
+    assert large.bytes > 5 * 256 * 1024
+    with pytest.raises(ValueError):
+        bench.generate_tree("/x", 1, sizes="huge")
+
+
+def test_run_phase_reports_time_and_rss(fs):
+    fs.create_dir("/work")
+    tree = bench.TreeStats(files=100, dirs=5, bytes=10_000_000)
+
+    def fake_popen(cmd, stdout, stderr, cwd, env):
+        assert env["HOME"] == "/work/home"
+        assert env["GEMINI_LOCAL_CLOUD_DIR"] == "/work/cloud"
+        assert "GEMINI_B2_KEY_ID" not in env
+        assert cmd[cmd.index("--child") + 1] == "backup"
+        stdout.write("Backup complete.\n")
+        with open(cmd[cmd.index("--result") + 1], "w") as fh:
+            json.dump({"seconds": 2.0}, fh)
+        with open(cmd[cmd.index("--result") + 1] + ".metrics", "w") as fh:
+            json.dump({"phases": [{"name": "archive", "wall_seconds": 1.5}, {"name": "copy", "wall_seconds": 0.5}]}, fh)
+        return MagicMock(pid=4242)
+
+    rusage = SimpleNamespace(ru_maxrss=51200)
+    with patch.dict(os.environ, {"GEMINI_B2_KEY_ID": "real"}), \
+         patch("geminiai_cli.bench.subprocess.Popen", side_effect=fake_popen), \
+         patch("geminiai_cli.bench.os.wait4", return_value=(4242, 0, rusage)) as mock_wait:
+        result = bench.run_phase("backup", "/work", {}, tree)
+
+    mock_wait.assert_called_once_with(4242, 0)
+    assert result.ok
+    assert result.seconds == 2.0
+    assert result.mb_per_s == 5.0
+    assert result.files_per_s == 50.0
+    assert result.peak_rss in (51200, 51200 * 1024)
+    assert "Backup complete." in result.log
+    assert result.stages == {"archive": 1.5, "copy": 0.5}
+
+
+def test_run_phase_failure(fs):
+    fs.create_dir("/work")
+    with patch("geminiai_cli.bench.subprocess.Popen", return_value=MagicMock(pid=1)), \
+         patch("geminiai_cli.bench.os.wait4", return_value=(1, 1 << 8, SimpleNamespace(ru_maxrss=1))):
+        result = bench.run_phase("restore", "/work", {}, bench.TreeStats(files=1, bytes=1))
+    assert not result.ok
+    assert result.mb_per_s == 0.0
+
+
+def test_phase_argv(fs):
+    assert bench._phase_argv("backup", {"compression": "zstd"}) == ["backup", "--compression", "zstd"]
+    assert bench._phase_argv("sync", {}) == ["sync", "push"]
+    assert bench._phase_argv("restore-cloud", {}) == ["restore", "--cloud"]
+    assert bench._phase_argv("restore", {})[:2] == ["restore", "--from-archive"]
+    with pytest.raises(ValueError):
+        bench._phase_argv("nope", {})
+
+
+def _report(seconds):
+    return bench.BenchReport(
+        profile={"files": 10, "sizes": "small", "depth": 2, "seed": 0},
+        tree=bench.TreeStats(files=10, dirs=2, bytes=1000),
+        phases=[bench.PhaseResult("backup", True, seconds, 10_000_000, 1.0, 1.0, log="noise")],
+    )
+
+
+def test_do_bench_writes_json_and_compares(fs, capsys):
+    fs.create_file("/base.json", contents=json.dumps(_report(2.0).to_dict()))
+    args = SimpleNamespace(profile="deep", files=None, sizes=None, depth=5, seed=3, phases="backup",
+                           baseline="/base.json", compression="zstd", verify=None, workdir=None,
+                           keep=False, json="/out.json")
+    with patch("geminiai_cli.bench.run_bench", return_value=_report(1.0)) as mock_run:
+        bench.do_bench(args)
+
+    call = mock_run.call_args
+    assert call.args == (3000, "small", 5)
+    assert call.kwargs["phases"] == ("backup",)
+    assert call.kwargs["options"] == {"compression": "zstd"}
+    with open("/out.json") as fh:
+        saved = json.load(fh)
+    assert saved["phases"][0]["seconds"] == 1.0 and "log" not in saved["phases"][0]
+    assert "-50%" in capsys.readouterr().out
+
+
+def test_do_bench_rejects_unknown_phase_and_fails_on_errors(fs):
+    args = SimpleNamespace(profile=None, files=None, sizes=None, depth=None, seed=0, phases="backup,bogus",
+                           baseline=None, compression=None, verify=None, workdir=None, keep=False, json=None)
+    with pytest.raises(SystemExit):
+        bench.do_bench(args)
+
+    args.phases = None
+    failed = _report(1.0)
+    failed.phases[0].ok = False
+    with patch("geminiai_cli.bench.run_bench", return_value=failed):
+        with pytest.raises(SystemExit) as e:
+            bench.do_bench(args)
+    assert e.value.code == 1
+
+
+def test_cli_dispatches_bench():
+    with patch("sys.argv", ["geminiai", "bench", "backup", "--profile", "small"]), \
+         patch("geminiai_cli.cli.do_bench") as mock_bench:
+        from geminiai_cli.cli import main
+        main()
+    mock_bench.assert_called_once()
+    assert mock_bench.call_args[0][0].profile == "small"
@@ -0,0 +1,122 @@
+# tests/test_catalog.py
+
+import json
+import pytest
+from unittest.mock import patch
+from geminiai_cli import catalog
+from geminiai_cli.cloud_local import LocalProvider
+
+A = "2025-01-01_100000-a@b.com.gemini.tar.gz"
+B = "2025-01-02_093000-c@d.com.gemini.tar.zst.gpg"
+
+
+@pytest.fixture
+def provider(fs):
+    provider = LocalProvider("/bucket")
+    for name in (A, A + ".manifest.json", B, "gemini-cooldown.json", "chunks/objects/ab"):
+        fs.create_file(f"/bucket/{name}", contents=name)
+    return provider
+
+
+def test_first_listing_writes_catalog(provider):
+    with patch.object(provider, "list_files", wraps=provider.list_files) as mock_list:
+        names = [f.name for f in catalog.cloud_backups(provider)]
+        assert names == [A, A + ".manifest.json", B]
+        # Served from the catalog from now on
+        assert [f.name for f in catalog.cloud_backups(provider)] == names
+    assert mock_list.call_count == 1
+
+    entries = json.loads(open("/bucket/gemini-catalog.json").read())["entries"]
+    assert entries[A]["email"] == "a@b.com" and entries[A]["timestamp"] == "2025-01-01_100000"
+    assert entries[B]["email"] == "c@d.com"
+    assert entries[A]["size"] == len(A)
+
+
+def test_upload_and_delete_update_catalog(provider, fs):
+    catalog.cloud_backups(provider)
+    new = "2025-02-01_100000-a@b.com.gemini.tar.gz"
+    fs.create_file("/up/new", contents="new archive")
+    provider.upload_file("/up/new", new)
+    catalog.catalog_added(provider, [new])
+    files = {f.name: f for f in catalog.cloud_backups(provider)}
+    assert files[new].size == len("new archive")
+
+    provider.delete_file(A)
+    catalog.catalog_removed(provider, [A, A + ".manifest.json"])
+    assert [f.name for f in catalog.cloud_backups(provider)] == [B, new]
+
+
+def test_added_objects_are_looked_up_one_by_one(provider, fs):
+    catalog.cloud_backups(provider)
+    new = "2025-02-01_100000-a@b.com.gemini.tar.gz"
+    fs.create_file(f"/bucket/{new}", contents="new archive")
+    with patch.object(provider, "list_files") as mock_list:
+        # An upload that never reached the bucket is not recorded
+        assert catalog.catalog_added(provider, [new, "2025-02-02_100000-a@b.com.gemini.tar.gz"]) == [new]
+    mock_list.assert_not_called()
+    assert sorted(catalog.load_catalog(provider)) == sorted([A, A + ".manifest.json", B, new])
+
+
+def test_archive_uploaded_behind_the_catalog(provider, fs):
+    catalog.cloud_backups(provider)
+    other = "2025-02-03_100000-c@d.com.gemini.tar.gz"
+    fs.create_file(f"/bucket/{other}", contents="from another host")
+    fs.create_file(f"/bucket/{other}.manifest.json", contents="{}")
+    assert other not in [f.name for f in catalog.cloud_backups(provider)]
+
+    # Asked for by name: looked up directly and recorded, without a listing
+    with patch.object(provider, "list_files") as mock_list:
+        names = [f.name for f in catalog.cloud_backups(provider, names=[other])]
+    mock_list.assert_not_called()
+    assert other in names and other + ".manifest.json" in names
+    assert other in catalog.load_catalog(provider)
+    assert catalog.cloud_backups(provider, names=["2025-02-04_100000-c@d.com.gemini.tar.gz"])[-1].name != \
+        "2025-02-04_100000-c@d.com.gemini.tar.gz"
+
+
+def test_stale_catalog_is_relisted(provider, fs):
+    catalog.cloud_backups(provider)
+    other = "2025-02-03_100000-c@d.com.gemini.tar.gz"
+    fs.create_file(f"/bucket/{other}", contents="from another host")
+    # Our own updates do not count as a listing
+    catalog.catalog_removed(provider, [A])
+    later = catalog.time.time() + catalog.CATALOG_MAX_AGE + 1
+    with patch.object(catalog.time, "time", return_value=later):
+        assert other in [f.name for f in catalog.cloud_backups(provider)]
+    assert A in catalog.load_catalog(provider)
+
+
+def test_concurrent_update_is_merged(provider, fs):
+    catalog.cloud_backups(provider)
+    theirs = "2025-03-01_100000-c@d.com.gemini.tar.gz"
+    ours = "2025-03-02_100000-a@b.com.gemini.tar.gz"
+    for name in (theirs, ours):
+        fs.create_file(f"/bucket/{name}", contents=name)
+    # Another run read the catalog before our save and writes its version right after it
+    stale = dict(catalog.load_catalog(provider), **{theirs: catalog._entry(provider.file_info(theirs))})
+    upload_string = provider.upload_string
+    raced = []
+
+    def racing_upload(data, name):
+        upload_string(data, name)
+        if not raced:
+            raced.append(name)
+            catalog.save_catalog(provider, stale)
+
+    with patch.object(provider, "upload_string", side_effect=racing_upload):
+        catalog.catalog_added(provider, [ours])
+    entries = catalog.load_catalog(provider)
+    assert theirs in entries and ours in entries
+
+
+def test_unreadable_catalog_is_rebuilt(provider, fs):
+    fs.create_file("/bucket/gemini-catalog.json", contents='{"version": 1, "files": {}}')
+    assert len(catalog.cloud_backups(provider)) == 3
+    assert catalog.load_catalog(provider) is not None
+
+
+def test_empty_listing_is_not_saved(fs):
+    provider = LocalProvider("/empty")
+    assert catalog.cloud_backups(provider) == []
+    assert catalog.rebuild_catalog(provider) == {}
+    assert catalog.load_catalog(provider) is None
@@ -0,0 +1,309 @@
+# tests/test_chunkstore.py
+
+import pytest
+import hashlib
+import io
+import os
+import random
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from geminiai_cli import chunkstore
+from geminiai_cli.chunkstore import (
+    ChunkStore, iter_chunks, snapshot_name_for, snapshot_base_name, snapshot_email,
+    push_snapshot, pull_snapshot, list_cloud_snapshots, forget_cloud_snapshot, gc_cloud, CLOUD_CHUNK_PREFIX
+)
+from geminiai_cli.cloud_storage import CloudFile
+
+def _random_bytes(n, seed=1):
+    return random.Random(seed).randbytes(n)
+
+def test_iter_chunks_reassembles_and_respects_bounds():
+    data = _random_bytes(300_000)
+    chunks = list(iter_chunks(io.BytesIO(data)))
+    assert b"".join(chunks) == data
+    assert all(len(c) <= chunkstore.MAX_CHUNK for c in chunks)
+    assert all(len(c) >= chunkstore.MIN_CHUNK for c in chunks[:-1])
+
+def test_iter_chunks_small_and_empty():
+    assert list(iter_chunks(io.BytesIO(b""))) == []
+    assert list(iter_chunks(io.BytesIO(b"abc"))) == [b"abc"]
+
+def test_iter_chunks_is_content_defined():
+    data = _random_bytes(300_000)
+    edited = data[:150_000] + b"INSERTED" + data[150_000:]
+    before = set(iter_chunks(io.BytesIO(data)))
+    after = list(iter_chunks(io.BytesIO(edited)))
+    # Only the chunk(s) around the insertion change
+    assert len([c for c in after if c not in before]) <= 2
+
+def _reference_cut(data, start, end):
+    # The plain per-byte gear loop _find_cut must agree with
+    if end - start <= chunkstore.MIN_CHUNK:
+        return end
+    limit = min(end, start + chunkstore.MAX_CHUNK)
+    h = 0
+    for i in range(start + chunkstore.MIN_CHUNK, limit):
+        h = ((h << 1) + chunkstore.GEAR[data[i]]) & 0xFFFFFFFF
+        if not h & chunkstore.AVG_MASK:
+            return i + 1
+    return limit
+
+def test_find_cut_matches_per_byte_gear_hash():
+    rnd = random.Random(7)
+    for k in range(60):
+        if k % 2:
+            data = _random_bytes(rnd.randint(1, 150_000), seed=k)
+        else:
+            # Low-entropy data puts cuts near block edges and runs to MAX_CHUNK
+            data = bytes(rnd.choice(b"ab\0") for _ in range(rnd.randint(1, 80_000)))
+        start = rnd.randint(0, len(data) - 1)
+        assert chunkstore._find_cut(data, start, len(data)) == _reference_cut(data, start, len(data))
+
+def test_snapshot_names():
+    name = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    assert name == "2025-01-01_120000-a@b.com.gemini.snapshot.json"
+    assert snapshot_base_name(name) == "2025-01-01_120000-a@b.com.gemini"
+    assert snapshot_email(name) == "a@b.com"
+    assert snapshot_base_name("random.json") is None
+    assert snapshot_base_name("bad.snapshot.json") is None
+    assert snapshot_email("bad") is None
+
+def _tree(fs, root="/src"):
+    fs.create_file(f"{root}/google_accounts.json", contents='{"active": "a@b.com"}')
+    fs.create_file(f"{root}/tmp/p/chats/session-1.json", contents=_random_bytes(100_000))
+    fs.create_symlink(f"{root}/link", "google_accounts.json")
+    return root
+
+def test_backup_and_restore_roundtrip(fs):
+    src = _tree(fs)
+    store = ChunkStore("/repo")
+    name = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    snapshot, stats = store.backup(src, name)
+
+    assert stats.files == 2
+    assert stats.new_chunks == stats.chunks
+    assert store.list_snapshots() == [name]
+    assert store.latest_snapshot_for_email("a@b.com") == name
+
+    manifest = store.restore(name, "/out")
+    with open("/out/tmp/p/chats/session-1.json", "rb") as fh:
+        assert fh.read() == _random_bytes(100_000)
+    assert os.readlink("/out/link") == "google_accounts.json"
+    assert set(manifest.files) == {"google_accounts.json", "tmp/p/chats/session-1.json"}
+    assert os.stat("/out/google_accounts.json").st_mtime_ns == os.stat(f"{src}/google_accounts.json").st_mtime_ns
+
+def test_restore_selected_paths(fs):
+    src = _tree(fs)
+    store = ChunkStore("/repo")
+    name = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    store.backup(src, name)
+
+    manifest = store.restore(name, "/out", select=lambda rel, is_dir: rel.startswith("tmp"))
+    assert set(manifest.files) == {"tmp/p/chats/session-1.json"}
+    assert sorted(os.listdir("/out")) == ["tmp"]
+
+def test_second_backup_reuses_unchanged_files(fs):
+    src = _tree(fs)
+    store = ChunkStore("/repo")
+    first = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    store.backup(src, first)
+
+    with open(f"{src}/google_accounts.json", "w") as fh:
+        fh.write('{"active": "a@b.com", "old": []}')
+    second = snapshot_name_for("2025-01-01_130000-a@b.com.gemini")
+    _, stats = store.backup(src, second, parent=first)
+
+    assert stats.reused_files == 1
+    assert stats.new_chunks == 1
+
+def test_get_chunk_detects_corruption(fs):
+    store = ChunkStore("/repo")
+    cid, new = store.put_chunk(b"payload")
+    assert new
+    assert store.put_chunk(b"payload") == (cid, False)
+    assert store.get_chunk(cid) == b"payload"
+
+    import zlib
+    with open(store.chunk_path(cid), "wb") as fh:
+        fh.write(zlib.compress(b"tampered"))
+    with pytest.raises(ValueError):
+        store.get_chunk(cid)
+
+def test_concurrent_writers_of_one_chunk(fs):
+    store, other = ChunkStore("/repo"), ChunkStore("/repo")
+    compress = chunkstore.zlib.compress
+    raced = []
+
+    def racing_compress(data, level):
+        # A second worker stores the same chunk while the first is mid-write
+        if not raced:
+            raced.append(None)
+            raced[0] = other.put_chunk(data)
+        return compress(data, level)
+
+    with patch("geminiai_cli.chunkstore.zlib.compress", side_effect=racing_compress):
+        cid, new = store.put_chunk(b"payload")
+    assert raced == [(cid, True)] and new is False
+    assert store.get_chunk(cid) == b"payload"
+    assert os.listdir(os.path.dirname(store.chunk_path(cid))) == [cid]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(store.put_chunk, [b"shared"] * 16))
+    assert len({cid for cid, _ in results}) == 1
+    assert store.get_chunk(results[0][0]) == b"shared"
+    assert not [n for n in os.listdir(os.path.dirname(store.chunk_path(results[0][0]))) if n.endswith(".part")]
+
+def test_forget_and_gc(fs):
+    src = _tree(fs)
+    store = ChunkStore("/repo")
+    first = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    store.backup(src, first)
+    fs.remove_object(f"{src}/tmp/p/chats/session-1.json")
+    second = snapshot_name_for("2025-01-01_130000-a@b.com.gemini")
+    store.backup(src, second, parent=first)
+
+    store.forget(first)
+    removed = store.gc()
+    assert removed > 0
+    # Everything the remaining snapshot needs is still there
+    store.restore(second, "/out")
+
+def test_push_snapshot_uploads_only_missing(fs):
+    src = _tree(fs)
+    store = ChunkStore("/repo")
+    name = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    snapshot, _ = store.backup(src, name)
+    all_chunks = [c for f in snapshot["files"].values() for c in f["chunks"]]
+    already = f"{CLOUD_CHUNK_PREFIX}{store.chunk_relpath(all_chunks[0])}"
+
+    provider = MagicMock()
+    provider.iter_files.return_value = iter([CloudFile(already, 1, 0)])
+    uploaded = push_snapshot(store, provider, name)
+
+    assert uploaded == len(set(all_chunks)) - 1
+    # Snapshot object goes up last
+    assert provider.upload_file.call_args_list[-1][0][1] == f"{CLOUD_CHUNK_PREFIX}snapshots/{name}"
+
+def test_pull_snapshot_and_list_cloud(fs):
+    src = _tree(fs)
+    remote = ChunkStore("/remote")
+    name = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    remote.backup(src, name)
+
+    def fake_download(remote_path, local_path):
+        rel = remote_path[len(CLOUD_CHUNK_PREFIX):]
+        with open(os.path.join("/remote", rel), "rb") as s, open(local_path, "wb") as d:
+            d.write(s.read())
+
+    provider = MagicMock()
+    provider.download_file.side_effect = fake_download
+    provider.iter_files.return_value = iter([
+        CloudFile(f"{CLOUD_CHUNK_PREFIX}snapshots/{name}", 1, 0),
+        CloudFile(f"{CLOUD_CHUNK_PREFIX}snapshots/junk.txt", 1, 0),
+    ])
+    assert list_cloud_snapshots(provider) == [name]
+
+    local = ChunkStore("/local")
+    fetched = pull_snapshot(local, provider, name)
+    assert fetched > 0
+    local.restore(name, "/out")
+    assert os.path.exists("/out/google_accounts.json")
+
+def _push_two(fs):
+    from geminiai_cli.cloud_local import LocalProvider
+    provider = LocalProvider("/bucket")
+    store = ChunkStore("/repo")
+    old = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    new = snapshot_name_for("2025-01-02_120000-a@b.com.gemini")
+    src = _tree(fs)
+    store.backup(src, old)
+    push_snapshot(store, provider, old)
+    with open(f"{src}/tmp/p/chats/session-1.json", "wb") as fh:
+        fh.write(_random_bytes(100_000, seed=2))
+    store.backup(src, new)
+    push_snapshot(store, provider, new)
+    return store, provider, old, new
+
+def test_cloud_gc_sweeps_chunks_of_forgotten_snapshots(fs):
+    store, provider, old, new = _push_two(fs)
+    chunks = lambda n: {c for f in store.load_snapshot(n)["files"].values() for c in f["chunks"]}
+    remote = lambda: {f.name.rsplit("/", 1)[-1] for f in provider.iter_files(prefix=f"{CLOUD_CHUNK_PREFIX}objects/")}
+    assert remote() == chunks(old) | chunks(new)
+
+    forget_cloud_snapshot(provider, old)
+    assert list_cloud_snapshots(provider) == [new]
+    # Just uploaded: could belong to a push whose snapshot is not up yet
+    assert gc_cloud(provider) == 0
+    assert gc_cloud(provider, grace=0) == len(chunks(old) - chunks(new))
+    assert remote() == chunks(new)
+
+    # An unreadable snapshot could reference anything
+    provider.upload_string("{", f"{CLOUD_CHUNK_PREFIX}snapshots/{old}")
+    forget_cloud_snapshot(provider, new)
+    assert gc_cloud(provider, grace=0) == 0
+    with pytest.raises(RuntimeError):
+        forget_cloud_snapshot(provider, "../gemini-catalog.json")
+
+def test_cloud_prune_forgets_old_snapshots(fs):
+    from types import SimpleNamespace
+    from geminiai_cli import prune
+    store, provider, old, new = _push_two(fs)
+    args = SimpleNamespace(backup_dir="/none", keep=1, dry_run=False, cloud=False, cloud_only=True)
+    with patch("geminiai_cli.prune.resolve_credentials", return_value=("id", "key", "bucket")), \
+         patch("geminiai_cli.prune.shared_provider", return_value=provider), \
+         patch.object(chunkstore.gc_cloud, "__defaults__", (0,)):
+        prune.do_prune(args)
+    assert list_cloud_snapshots(provider) == [new]
+    snapshot = store.load_snapshot(new)
+    remote = {f.name.rsplit("/", 1)[-1] for f in provider.iter_files(prefix=f"{CLOUD_CHUNK_PREFIX}objects/")}
+    assert remote == {c for f in snapshot["files"].values() for c in f["chunks"]}
+
+@pytest.mark.parametrize("bad", ["../escape.json", "/etc/passwd", "a/../../escape.json"])
+def test_restore_refuses_paths_outside_dest(fs, bad):
+    store = ChunkStore("/repo")
+    cid, _ = store.put_chunk(b"evil")
+    name = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    store.save_snapshot(name, {"version": 1, "name": name, "dirs": {}, "symlinks": {}, "files": {
+        "ok.json": {"size": 4, "mtime_ns": 0, "sha256": hashlib.sha256(b"evil").hexdigest(), "mode": 0o644,
+                    "chunks": [cid]},
+        bad: {"size": 4, "mtime_ns": 0, "sha256": hashlib.sha256(b"evil").hexdigest(), "mode": 0o644,
+              "chunks": [cid]}}})
+    with pytest.raises(RuntimeError, match="Refusing"):
+        store.restore(name, "/out/dest")
+    # Nothing at all was written
+    assert not os.path.exists("/out")
+
+def test_pull_snapshot_verifies_chunks(fs):
+    src = _tree(fs)
+    remote = ChunkStore("/remote")
+    name = snapshot_name_for("2025-01-01_120000-a@b.com.gemini")
+    remote.backup(src, name)
+
+    def corrupting_download(remote_path, local_path):
+        rel = remote_path[len(CLOUD_CHUNK_PREFIX):]
+        with open(os.path.join("/remote", rel), "rb") as s, open(local_path, "wb") as d:
+            d.write(s.read() if rel.startswith("snapshots/") else zlib.compress(b"garbage"))
+
+    provider = MagicMock()
+    provider.download_file.side_effect = corrupting_download
+    local = ChunkStore("/local")
+    with pytest.raises(RuntimeError, match="corrupt"):
+        pull_snapshot(local, provider, name)
+    assert local.all_chunk_ids() == set()
+    assert not [n for d in os.listdir(local.objects_dir) for n in os.listdir(os.path.join(local.objects_dir, d))]
+
+    # Chunk ids are never used as paths unchecked
+    snapshot = remote.load_snapshot(name)
+    snapshot["files"]["google_accounts.json"]["chunks"] = ["../../../../etc/evil"]
+    remote.save_snapshot(name, snapshot)
+    with pytest.raises(RuntimeError, match="Invalid chunk id"):
+        pull_snapshot(local, provider, name)
+    assert not os.path.exists("/etc/evil")
+
+def test_gc_holds_store_lock_exclusively(fs):
+    store = ChunkStore("/repo")
+    store.put_chunk(b"orphan")
+    with patch("geminiai_cli.chunkstore.fcntl.flock") as mock_flock:
+        assert store.gc() == 1
+    assert mock_flock.call_args_list[0].args[1] == chunkstore.fcntl.LOCK_EX
@@ -42,6 +42,25 @@ def test_main_backup(mock_perform_backup):
         main()
         mock_perform_backup.assert_called_once()
 
+@patch("geminiai_cli.cli.perform_backup")
+@patch("geminiai_cli.cli.perform_archive_listing")
+def test_main_backup_ls(mock_ls, mock_perform_backup):
+    with patch("sys.argv", ["geminiai", "backup", "ls", "a.gemini.tar.gz", "chats/", "*.json"]):
+        main()
+    mock_perform_backup.assert_not_called()
+    args = mock_ls.call_args[0][0]
+    assert args.archive == "a.gemini.tar.gz"
+    assert args.ls_paths == ["chats/", "*.json"]
+
+@patch("geminiai_cli.cli.perform_backup")
+@patch("geminiai_cli.cli.watch_backups")
+def test_main_backup_watch(mock_watch, mock_perform_backup):
+    with patch("sys.argv", ["geminiai", "backup", "--watch", "--quiet-period", "10"]):
+        main()
+    mock_watch.assert_called_once()
+    assert mock_watch.call_args[0][0].quiet_period == 10
+    mock_perform_backup.assert_not_called()
+
 @patch("geminiai_cli.cli.perform_restore")
 def test_main_restore(mock_perform_restore):
     with patch("sys.argv", ["geminiai", "restore"]):
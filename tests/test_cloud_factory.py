@@ -0,0 +1,37 @@
+# tests/test_cloud_factory.py
+
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from geminiai_cli.cloud_factory import get_cloud_provider, shared_provider, clear_providers
+
+
+@patch("geminiai_cli.b2.B2Api")
+@patch("geminiai_cli.b2.InMemoryAccountInfo")
+def test_one_authorized_b2_client_per_process(mock_mem_info, mock_b2_api, fs):
+    from geminiai_cli import cooldown
+    args = SimpleNamespace(b2_id="id", b2_key="key", bucket="bucket", cloud=True)
+    mock_b2_api.return_value.get_bucket_by_name.return_value.download_file_by_name.side_effect = Exception("missing")
+
+    provider = get_cloud_provider(args)
+    assert get_cloud_provider(args) is provider
+    cooldown._sync_cooldown_file("download", args)
+    cooldown._sync_cooldown_file("upload", args)
+    assert mock_b2_api.return_value.authorize_account.call_count == 1
+
+    # Other credentials or another bucket get their own client
+    assert get_cloud_provider(SimpleNamespace(b2_id="id", b2_key="key", bucket="other")) is not provider
+    assert mock_b2_api.return_value.authorize_account.call_count == 2
+
+    clear_providers()
+    assert get_cloud_provider(args) is not provider
+
+
+def test_failed_construction_is_not_cached():
+    backend = MagicMock(side_effect=[SystemExit(1), "client"])
+    try:
+        shared_provider(backend, "a")
+    except SystemExit:
+        pass
+    assert shared_provider(backend, "a") == "client"
+    assert shared_provider(backend, "a") == "client"
+    assert backend.call_count == 2
@@ -0,0 +1,88 @@
+# tests/test_cloud_local.py
+
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from geminiai_cli.cloud_local import LocalProvider
+from geminiai_cli.b2 import B2Manager
+from geminiai_cli.cloud_factory import get_cloud_provider
+
+
+def test_upload_download_list_delete(fs):
+    fs.create_file("/data/a.tar.gz", contents="archive")
+    provider = LocalProvider("/bucket")
+
+    provider.upload_file("/data/a.tar.gz", "a.tar.gz")
+    provider.upload_string('{"x": 1}', "meta/info.json")
+    assert [f.name for f in provider.list_files()] == ["a.tar.gz", "meta/info.json"]
+    assert [f.name for f in provider.list_files("meta/")] == ["meta/info.json"]
+    assert provider.list_files()[0].size == len("archive")
+
+    fs.create_dir("/out")
+    provider.download_file("a.tar.gz", "/out/a.tar.gz")
+    with open("/out/a.tar.gz") as fh:
+        assert fh.read() == "archive"
+    assert provider.download_to_string("meta/info.json") == '{"x": 1}'
+    assert provider.download_to_string("missing.json") is None
+    assert provider.file_info("a.tar.gz").size == len("archive")
+    assert provider.file_info("a.tar") is None
+
+    provider.delete_file("a.tar.gz")
+    provider.delete_file("a.tar.gz")
+    assert [f.name for f in provider.list_files()] == ["meta/info.json"]
+    with pytest.raises(FileNotFoundError):
+        provider.download_file("a.tar.gz", "/out/b")
+
+
+def test_upload_stream_is_atomic(fs):
+    provider = LocalProvider("/bucket")
+    with provider.open_upload_stream("big.tar.gz") as out:
+        out.write(b"part one ")
+        assert provider.list_files() == []
+        out.write(b"part two")
+    assert provider.download_to_string("big.tar.gz") == "part one part two"
+
+    with pytest.raises(RuntimeError):
+        with provider.open_upload_stream("broken.tar.gz") as out:
+            out.write(b"half")
+            raise RuntimeError("boom")
+    assert os.listdir("/bucket") == ["big.tar.gz"]
+
+
+def test_paths_cannot_escape_root(fs):
+    provider = LocalProvider("/bucket")
+    with pytest.raises(ValueError):
+        provider.upload_string("x", "../etc/passwd")
+    assert provider.download_to_string("../../etc/hostname") is None
+
+
+def test_factory_uses_local_dir_without_credentials(fs, monkeypatch):
+    monkeypatch.setenv("GEMINI_LOCAL_CLOUD_DIR", "/nas/gemini")
+    for var in ("GEMINI_AWS_ACCESS_KEY_ID", "GEMINI_AWS_SECRET_ACCESS_KEY", "GEMINI_S3_BUCKET"):
+        monkeypatch.delenv(var, raising=False)
+    with patch("geminiai_cli.cloud_factory.resolve_credentials", return_value=(None, None, None)):
+        provider = get_cloud_provider(MagicMock())
+    assert isinstance(provider, LocalProvider)
+    assert provider.bucket_name == "/nas/gemini"
+
+
+def test_factory_real_credentials_beat_local_dir(fs, monkeypatch):
+    monkeypatch.setenv("GEMINI_LOCAL_CLOUD_DIR", "/nas/gemini")
+    with patch("geminiai_cli.cloud_factory.resolve_credentials", return_value=("id", "key", "bucket")), \
+         patch("geminiai_cli.cloud_factory.shared_provider") as mock_shared:
+        provider = get_cloud_provider(MagicMock())
+    assert provider is mock_shared.return_value
+    assert mock_shared.call_args.args == (B2Manager, "id", "key", "bucket")
+
+
+def test_concurrent_uploads_of_one_object_do_not_mix(fs):
+    provider = LocalProvider("/bucket")
+    first = provider.open_upload_stream("obj")
+    second = provider.open_upload_stream("obj")
+    first.write(b"A" * 100)
+    second.write(b"B" * 50)
+    second.close()
+    first.write(b"A" * 100)
+    first.close()
+    assert provider.download_to_string("obj") == "A" * 200
+    assert os.listdir("/bucket") == ["obj"]
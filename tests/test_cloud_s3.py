@@ -5,7 +5,8 @@ from datetime import datetime, timezone
 from geminiai_cli.cloud_s3 import S3Provider
 import boto3 # Import boto3 to access its exceptions for mocking
 from botocore.exceptions import ClientError # Import ClientError for mocking boto3 exceptions
-from geminiai_cli.cloud_storage import CloudFile
+from geminiai_cli.cloud_storage import CloudFile, ObjectChanged
+import os
 import sys
 
 # Patch boto3.client at the module level where it's used in cloud_s3.py
@@ -65,6 +66,37 @@ def test_download_file_success(s3_provider, mock_s3_client, capsys):
     captured = capsys.readouterr()
     assert "Download successful." in captured.out
 
+def test_download_file_large_uses_ranges(s3_provider, mock_s3_client, fs):
+    data = b"x" * 300 + b"y" * 300
+    mock_s3_client.head_object.return_value = {"ContentLength": len(data), "ETag": '"abc"'}
+
+    def get_object(Bucket, Key, Range, IfMatch):
+        # Pinned to the version head_object described
+        assert IfMatch == '"abc"'
+        start, end = map(int, Range[len("bytes="):].split("-"))
+        return {"Body": MagicMock(read=MagicMock(return_value=data[start:end + 1]))}
+
+    mock_s3_client.get_object.side_effect = get_object
+    fs.create_dir("/dl")
+    with patch("geminiai_cli.cloud_s3.download_settings", return_value=(2, 256)):
+        s3_provider.download_file("big.tar", "/dl/big.tar")
+    mock_s3_client.download_file.assert_not_called()
+    assert mock_s3_client.get_object.call_count == 3
+    assert open("/dl/big.tar", "rb").read() == data
+
+def test_download_file_large_fails_when_object_changes(s3_provider, mock_s3_client, fs):
+    mock_s3_client.head_object.return_value = {"ContentLength": 600, "ETag": '"abc"'}
+    mock_s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "PreconditionFailed", "Message": "At least one of the pre-conditions you specified did not hold"}},
+        "GetObject")
+    fs.create_dir("/dl")
+    with patch("geminiai_cli.cloud_s3.download_settings", return_value=(2, 256)):
+        with pytest.raises(ObjectChanged):
+            s3_provider.download_file("big.tar", "/dl/big.tar")
+    # No range is retried: another attempt would hit the same new version
+    assert mock_s3_client.get_object.call_count <= 3
+    assert not os.path.exists("/dl/big.tar")
+
 def test_download_file_failure(s3_provider, mock_s3_client, capsys):
     """Test file download failure."""
     mock_s3_client.download_file.side_effect = Exception("Download failed")
@@ -80,12 +112,14 @@ def test_list_files_success(s3_provider, mock_s3_client):
             {
                 "Key": "file1.txt",
                 "Size": 100,
-                "LastModified": datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+                "LastModified": datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
+                "ETag": '"' + "b" * 32 + '"',
             },
             {
                 "Key": "folder/file2.txt",
                 "Size": 200,
-                "LastModified": datetime(2023, 1, 2, 13, 0, 0, tzinfo=timezone.utc)
+                "LastModified": datetime(2023, 1, 2, 13, 0, 0, tzinfo=timezone.utc),
+                "ETag": '"' + "c" * 32 + '-3"',
             },
         ]
     }
@@ -95,6 +129,32 @@ def test_list_files_success(s3_provider, mock_s3_client):
     assert files[0].size == 100
     assert files[0].last_modified == datetime(2023, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
     assert files[1].name == "folder/file2.txt"
+    # Only a single-part upload's ETag is the content MD5
+    assert files[0].checksum == "md5:" + "b" * 32
+    assert files[1].checksum is None
+
+def test_iter_files_follows_continuation_tokens(s3_provider, mock_s3_client):
+    def page(keys, token=None):
+        response = {"Contents": [{"Key": k, "Size": 1, "LastModified": datetime(2023, 1, 1, tzinfo=timezone.utc)}
+                                 for k in keys], "IsTruncated": token is not None}
+        if token:
+            response["NextContinuationToken"] = token
+        return response
+
+    pages = {None: page(["a", "b"], "t1"), "t1": page(["c", "d"], "t2"), "t2": page(["e"])}
+    mock_s3_client.list_objects_v2.side_effect = lambda **kw: pages[kw.get("ContinuationToken")]
+
+    assert [f.name for f in s3_provider.list_files("p/")] == ["a", "b", "c", "d", "e"]
+    assert mock_s3_client.list_objects_v2.call_count == 3
+    assert mock_s3_client.list_objects_v2.call_args_list[1].kwargs == {
+        "Bucket": "test-bucket", "Prefix": "p/", "MaxKeys": 1000, "ContinuationToken": "t1"}
+
+    # Stopping early leaves the remaining pages unrequested (beyond the one read ahead)
+    mock_s3_client.list_objects_v2.reset_mock()
+    files = s3_provider.iter_files("p/", page_size=2)
+    assert next(files).name == "a"
+    files.close()
+    assert mock_s3_client.list_objects_v2.call_count == 2
 
 def test_list_files_no_contents(s3_provider, mock_s3_client):
     """Test listing files when 'Contents' key is missing."""
@@ -167,6 +227,23 @@ def test_download_to_string_no_such_key(s3_provider, mock_s3_client):
     result = s3_provider.download_to_string("nonexistent.txt")
     assert result is None
 
+def test_file_info_is_one_head_request(s3_provider, mock_s3_client):
+    modified = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    mock_s3_client.head_object.return_value = {"ContentLength": 7, "LastModified": modified,
+                                               "ETag": '"' + "a" * 32 + '"'}
+    info = s3_provider.file_info("a.tar.gz")
+    assert (info.name, info.size, info.last_modified, info.checksum) == ("a.tar.gz", 7, modified, "md5:" + "a" * 32)
+    mock_s3_client.head_object.assert_called_once_with(Bucket="test-bucket", Key="a.tar.gz")
+    mock_s3_client.list_objects_v2.assert_not_called()
+
+    mock_s3_client.head_object.side_effect = ClientError({"Error": {"Code": "404", "Message": "Not Found"}},
+                                                         "HeadObject")
+    assert s3_provider.file_info("missing") is None
+    mock_s3_client.head_object.side_effect = ClientError({"Error": {"Code": "403", "Message": "Forbidden"}},
+                                                         "HeadObject")
+    with pytest.raises(ClientError):
+        s3_provider.file_info("secret")
+
 def test_download_to_string_other_failure(s3_provider, mock_s3_client, capsys):
     """Test string download for other failures."""
     mock_s3_client.get_object.side_effect = ClientError(
@@ -177,3 +254,40 @@ def test_download_to_string_other_failure(s3_provider, mock_s3_client, capsys):
         s3_provider.download_to_string("remote/string.txt")
     captured = capsys.readouterr()
     assert "S3 Download String Error" in captured.out
+
+def test_upload_stream_small_uses_put_object(s3_provider, mock_s3_client):
+    with s3_provider.open_upload_stream("remote/a.tar.gz") as out:
+        out.write(b"hello")
+    mock_s3_client.put_object.assert_called_once_with(Bucket="test-bucket", Key="remote/a.tar.gz", Body=b"hello")
+    mock_s3_client.create_multipart_upload.assert_not_called()
+
+def test_upload_stream_multipart(mock_s3_client):
+    from geminiai_cli.cloud_s3 import S3MultipartWriter
+    mock_s3_client.create_multipart_upload.return_value = {"UploadId": "u1"}
+    mock_s3_client.upload_part.side_effect = lambda **kw: {"ETag": f"e{kw['PartNumber']}"}
+
+    with S3MultipartWriter(mock_s3_client, "b", "k", part_size=4) as out:
+        out.write(b"abcdef")
+        out.write(b"ghij")
+
+    bodies = [c.kwargs["Body"] for c in mock_s3_client.upload_part.call_args_list]
+    assert bodies == [b"abcd", b"efgh", b"ij"]
+    mock_s3_client.complete_multipart_upload.assert_called_once_with(
+        Bucket="b", Key="k", UploadId="u1",
+        MultipartUpload={"Parts": [{"PartNumber": 1, "ETag": "e1"}, {"PartNumber": 2, "ETag": "e2"},
+                                   {"PartNumber": 3, "ETag": "e3"}]})
+    mock_s3_client.abort_multipart_upload.assert_not_called()
+
+def test_upload_stream_aborts_on_error(mock_s3_client):
+    from geminiai_cli.cloud_s3 import S3MultipartWriter
+    mock_s3_client.create_multipart_upload.return_value = {"UploadId": "u1"}
+    mock_s3_client.upload_part.return_value = {"ETag": "e"}
+
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter(mock_s3_client, "b", "k", part_size=4) as out:
+            out.write(b"abcdef")
+            raise RuntimeError("archive failed")
+
+    mock_s3_client.abort_multipart_upload.assert_called_once_with(Bucket="b", Key="k", UploadId="u1")
+    mock_s3_client.complete_multipart_upload.assert_not_called()
+    mock_s3_client.put_object.assert_not_called()
@@ -0,0 +1,181 @@
+# tests/test_cloud_storage.py
+
+import os
+import tempfile
+import pytest
+import json
+import threading
+import time
+from unittest.mock import patch
+from geminiai_cli.cloud_storage import CloudStorageProvider, StreamingUpload, UploadAborted, RangedDownload, download_settings
+
+
+class MemoryProvider(CloudStorageProvider):
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, local_path, remote_path):
+        with open(local_path, "rb") as fh:
+            self.objects[remote_path] = fh.read()
+
+    def download_file(self, remote_path, local_path):
+        pass
+
+    def list_files(self, prefix=""):
+        return []
+
+    def delete_file(self, remote_path):
+        pass
+
+    def upload_string(self, data_str, remote_path):
+        self.objects[remote_path] = data_str.encode()
+
+    def download_to_string(self, remote_path):
+        return None
+
+
+def test_default_upload_stream_spools_and_uploads(fs):
+    provider = MemoryProvider()
+    with provider.open_upload_stream("a.tar.gz") as out:
+        out.write(b"abc")
+        out.write(b"def")
+    assert provider.objects == {"a.tar.gz": b"abcdef"}
+    assert os.listdir(tempfile.gettempdir()) == []
+
+
+def test_default_upload_stream_abort_uploads_nothing(fs):
+    provider = MemoryProvider()
+    with pytest.raises(RuntimeError):
+        with provider.open_upload_stream("a.tar.gz") as out:
+            out.write(b"abc")
+            raise RuntimeError("boom")
+    assert provider.objects == {}
+    assert os.listdir(tempfile.gettempdir()) == []
+
+
+def test_streaming_upload_bounded_reads():
+    chunks = []
+
+    def consume(reader):
+        while True:
+            data = reader.read(4)
+            if not data:
+                break
+            chunks.append(data)
+
+    with StreamingUpload(consume, max_chunks=2) as out:
+        for _ in range(10):
+            out.write(b"xyz")
+    assert b"".join(chunks) == b"xyz" * 10
+    assert all(len(c) <= 4 for c in chunks)
+
+
+def test_streaming_upload_large_part_reads():
+    # SDKs read a whole part (tens of MiB) at a time from many small writes
+    part, item = 32 * 1024 * 1024, bytes(range(256)) * 256
+    parts = []
+
+    def consume(reader):
+        while True:
+            data = reader.read(part)
+            if not data:
+                break
+            parts.append(data)
+
+    start = time.monotonic()
+    with StreamingUpload(consume) as out:
+        for _ in range(2 * part // len(item) + 1):
+            out.write(item)
+    assert time.monotonic() - start < 5
+    assert [len(p) for p in parts] == [part, part, len(item)]
+    assert parts[1][:len(item)] == item
+
+
+def test_streaming_upload_abort_reaches_consumer():
+    seen = {}
+
+    def consume(reader):
+        try:
+            while reader.read(1024):
+                pass
+        except UploadAborted:
+            seen["aborted"] = True
+            raise
+
+    with pytest.raises(RuntimeError):
+        with StreamingUpload(consume) as out:
+            out.write(b"partial")
+            raise RuntimeError("archive failed")
+    assert seen == {"aborted": True}
+
+
+def test_streaming_upload_consumer_error_raises_on_close():
+    def consume(reader):
+        raise ValueError("rejected")
+
+    out = StreamingUpload(consume)
+    with pytest.raises(IOError, match="rejected"):
+        out.write(b"data")
+        out.close()
+
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+
+
+class FlakyRemote:
+    """read_range over DATA that records requests and fails the ranges in `fail` until cleared."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __call__(self, start, end):
+        with self.lock:
+            self.requests.append(start)
+        if start in self.fail:
+            raise IOError("connection reset")
+        return DATA[start:end + 1]
+
+
+def test_ranged_download_concurrent(fs):
+    fs.create_dir("/dl")
+    remote = FlakyRemote()
+    fetched = RangedDownload(remote, len(DATA), "etag-1", "/dl/a.tar", workers=3, part_size=1000).run()
+    assert fetched == 11
+    assert sorted(remote.requests) == list(range(0, 10240, 1000))
+    assert open("/dl/a.tar", "rb").read() == DATA
+    assert os.listdir("/dl") == ["a.tar"]
+
+
+def test_ranged_download_retries_then_resumes(fs):
+    fs.create_dir("/dl")
+    remote = FlakyRemote(fail={3000})
+    with pytest.raises(IOError):
+        RangedDownload(remote, len(DATA), "etag-1", "/dl/a.tar", workers=2, part_size=1000, sleep=lambda s: None).run()
+    assert remote.requests.count(3000) == 4
+    with open("/dl/a.tar.part.json") as fh:
+        assert 3 not in json.load(fh)["done"]
+
+    # Started again: only the missing range is fetched
+    remote.fail.clear()
+    remote.requests.clear()
+    assert RangedDownload(remote, len(DATA), "etag-1", "/dl/a.tar", workers=2, part_size=1000).run() == 1
+    assert remote.requests == [3000]
+    assert open("/dl/a.tar", "rb").read() == DATA
+
+
+def test_ranged_download_restarts_when_object_changed(fs):
+    fs.create_dir("/dl")
+    remote = FlakyRemote(fail={0})
+    with pytest.raises(IOError):
+        RangedDownload(remote, len(DATA), "etag-1", "/dl/a.tar", part_size=1000, sleep=lambda s: None).run()
+    remote.fail.clear()
+    assert RangedDownload(remote, len(DATA), "etag-2", "/dl/a.tar", part_size=1000).run() == 11
+
+
+def test_download_settings(fs):
+    settings = {"download_workers": 8, "download_part_size": 16}
+    with patch("geminiai_cli.cloud_storage.get_setting", side_effect=lambda k, d=None: settings.get(k, d)):
+        assert download_settings() == (8, 16 * 1024 * 1024)
+    assert download_settings() == (4, 8 * 1024 * 1024)
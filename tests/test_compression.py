@@ -0,0 +1,127 @@
+# tests/test_compression.py
+
+import pytest
+import gzip
+import io
+import os
+import tarfile
+from unittest.mock import patch, MagicMock
+from geminiai_cli import compression
+from geminiai_cli.compression import (
+    ParallelGzipWriter, compressed_writer, decompressed_reader, detect_codec,
+    is_archive_name, strip_archive_suffix, codec_from_name, resolve_level,
+    codec_from_args, level_from_args,
+)
+from geminiai_cli.archive import create_archive, extract_archive_file
+from geminiai_cli.config import TIMESTAMPED_DIR_REGEX
+
+def test_archive_names():
+    for ext in (".tar.gz", ".tar.zst", ".tar.lz4", ".tar"):
+        name = f"2025-01-01_120000-a@b.com.gemini{ext}"
+        assert is_archive_name(name)
+        assert not is_archive_name(name + ".gpg")
+        assert is_archive_name(name + ".gpg", encrypted=True)
+        assert strip_archive_suffix(name + ".gpg") == "2025-01-01_120000-a@b.com.gemini"
+        assert TIMESTAMPED_DIR_REGEX.match(name + ".gpg")
+    assert not is_archive_name("2025-01-01_120000-a@b.com.gemini")
+    assert strip_archive_suffix("notes.txt") is None
+    assert codec_from_name("x.gemini.tar.zst.gpg") == "zstd"
+    assert codec_from_name("x.zip") is None
+
+def test_parallel_gzip_is_multi_member_gzip():
+    data = os.urandom(50_000) + b"a" * 200_000
+    out = io.BytesIO()
+    with ParallelGzipWriter(out, level=6, threads=4, block_size=64 * 1024) as w:
+        for i in range(0, len(data), 10_000):
+            w.write(data[i:i + 10_000])
+    assert gzip.decompress(out.getvalue()) == data
+    # One member per block
+    assert out.getvalue().count(b"\x1f\x8b\x08") >= 4
+
+def test_parallel_gzip_empty_stream_is_valid():
+    out = io.BytesIO()
+    ParallelGzipWriter(out, threads=2).close()
+    assert gzip.decompress(out.getvalue()) == b""
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd", "lz4", "none"])
+def test_writer_reader_roundtrip(codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    if codec == "lz4":
+        pytest.importorskip("lz4")
+    data = b"gemini " * 50_000
+    out = io.BytesIO()
+    with compressed_writer(out, codec, threads=2) as w:
+        w.write(data)
+    out.seek(0)
+    assert decompressed_reader(out, codec).read() == data
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        with compressed_writer(io.BytesIO(), "brotli", level=1):
+            pass
+    with pytest.raises(ValueError):
+        decompressed_reader(io.BytesIO(), "brotli")
+
+def test_missing_optional_package():
+    with patch.object(compression, "zstandard", None):
+        assert not compression.codec_available("zstd")
+        with pytest.raises(RuntimeError):
+            with compressed_writer(io.BytesIO(), "zstd"):
+                pass
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd", "lz4", "none"])
+def test_create_and_extract_archive_detects_codec(fs, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    if codec == "lz4":
+        pytest.importorskip("lz4")
+    fs.create_file("/src/google_accounts.json", contents='{"active": "a@b.com"}')
+    fs.create_file("/src/tmp/chat.json", contents="x" * 10_000)
+    os.makedirs("/out")
+    archive = f"/out/a.gemini{compression.archive_suffix(codec)}"
+    create_archive("/src", archive, codec=codec, threads=2)
+
+    # Detected from content, even under a misleading name
+    os.rename(archive, "/out/renamed.bin")
+    assert detect_codec("/out/renamed.bin") == codec
+    extract_archive_file("/out/renamed.bin", "/dst")
+    assert open("/dst/tmp/chat.json").read() == "x" * 10_000
+
+def test_detect_codec_falls_back_to_name(fs):
+    fs.create_file("/a.gemini.tar.zst")
+    assert detect_codec("/a.gemini.tar.zst") == "zstd"
+    assert detect_codec("/missing.bin") == "gzip"
+
+def test_levels_and_args():
+    assert resolve_level("gzip", None) == 6
+    assert resolve_level("gzip", 42) == 9
+    assert resolve_level("zstd", 19) == 19
+    assert codec_from_args(MagicMock(compression="lz4")) == "lz4"
+    with patch("geminiai_cli.compression.get_setting", return_value="zstd"):
+        assert codec_from_args(MagicMock(compression=None)) == "zstd"
+    assert level_from_args(MagicMock(level=3)) == 3
+    with patch("geminiai_cli.compression.get_setting", return_value="7"):
+        assert level_from_args(MagicMock(level=None)) == 7
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd", "lz4", "none"])
+def test_seek_points_start_independent_blocks(codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    if codec == "lz4":
+        pytest.importorskip("lz4")
+    data = os.urandom(20_000) * 30
+    out = io.BytesIO()
+    with compressed_writer(out, codec, threads=3) as w:
+        w.write(data)
+    if codec != "none":
+        assert len(w.seek_points) == -(-len(data) // compression.BLOCK_SIZE)
+
+    offset = len(data) - 12_345
+    compressed, start = compression.seek_point(w.seek_points, codec, offset)
+    assert start <= offset
+    out.seek(compressed)
+    reader = decompressed_reader(out, codec)
+    reader.read(offset - start)
+    assert reader.read(100) == data[offset:offset + 100]
+    assert compression.seek_point([], "gzip", offset) == (0, 0)
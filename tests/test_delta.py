@@ -0,0 +1,124 @@
+# tests/test_delta.py
+
+import json
+import os
+import pytest
+from unittest.mock import patch
+from geminiai_cli.archive import create_archive
+from geminiai_cli.delta import DeltaTransaction, plan_delta, recover, target_entries
+from geminiai_cli.manifest import Manifest, FileEntry, hash_file
+
+
+def _backup(fs):
+    fs.create_file("/src/same.json", contents="same")
+    fs.create_file("/src/edited.json", contents="from backup")
+    fs.create_file("/src/chats/new.json", contents="new")
+    os.symlink("same.json", "/src/link")
+    return create_archive("/src", "/b.tar.gz")
+
+
+def _dest(fs):
+    fs.create_file("/d/same.json", contents="same")
+    fs.create_file("/d/edited.json", contents="changed here")
+    fs.create_file("/d/extra/deep/x.json", contents="x")
+    fs.create_dir("/d/chats")
+
+
+def test_target_entries_from_archive_index(fs):
+    files, dirs, symlinks = target_entries(_backup(fs))
+    assert sorted(files) == ["chats/new.json", "edited.json", "same.json"]
+    assert dirs == {"chats"}
+    assert symlinks == {"link"}
+
+
+def test_plan_delta(fs):
+    manifest = _backup(fs)
+    _dest(fs)
+    plan = plan_delta("/d", manifest)
+    assert plan.changed == ["chats/new.json", "edited.json", "link"]
+    # Only the top of a removed subtree is listed
+    assert plan.removed == ["extra"]
+    assert list(plan.unchanged) == ["same.json"]
+    assert plan.unchanged["same.json"].mtime_ns == os.lstat("/d/same.json").st_mtime_ns
+
+
+def test_plan_delta_type_changes(fs):
+    manifest = Manifest({"a": FileEntry(1, 0, "0" * 64)}, meta={"others": ["b"]})
+    fs.create_file("/d/a/inner.json")
+    fs.create_file("/d/b")
+    plan = plan_delta("/d", manifest)
+    assert plan.changed == ["a", "b"] and plan.removed == []
+
+
+def _staged_transaction(fs, manifest):
+    plan = plan_delta("/d", manifest)
+    txn = DeltaTransaction("/d", "20250101-000000")
+    for rel in plan.changed:
+        if rel in plan.dirs:
+            os.makedirs(os.path.join(txn.new, rel))
+        elif rel == "link":
+            os.symlink("same.json", os.path.join(txn.new, rel))
+        else:
+            fs.create_file(os.path.join(txn.new, rel), contents=f"backup {rel}")
+    txn.prepare(plan)
+    return txn
+
+
+def test_transaction_apply_and_finish(fs):
+    manifest = _backup(fs)
+    _dest(fs)
+    txn = _staged_transaction(fs, manifest)
+    txn.apply()
+    assert sorted(os.listdir("/d")) == ["chats", "edited.json", "link", "same.json"]
+    assert open("/d/edited.json").read() == "backup edited.json"
+    assert os.readlink("/d/link") == "same.json"
+    with open(os.path.join(txn.root, "journal.json")) as fh:
+        assert json.load(fh)["state"] == "committed"
+
+    txn.finish("/old/.gemini.bak-x")
+    assert open("/old/.gemini.bak-x/edited.json").read() == "changed here"
+    assert os.path.exists("/old/.gemini.bak-x/extra/deep/x.json")
+    assert not os.path.exists(txn.root)
+
+
+def test_transaction_failure_rolls_back(fs):
+    manifest = _backup(fs)
+    _dest(fs)
+    before = {rel: hash_file(os.path.join("/d", rel)) for rel in ("same.json", "edited.json", "extra/deep/x.json")}
+    txn = _staged_transaction(fs, manifest)
+
+    real_rename = os.rename
+    def failing_rename(src, dst):
+        if dst == "/d/link":
+            raise OSError("disk full")
+        return real_rename(src, dst)
+
+    with patch("geminiai_cli.delta.os.rename", side_effect=failing_rename):
+        with pytest.raises(OSError):
+            txn.apply()
+    assert sorted(os.listdir("/d")) == ["chats", "edited.json", "extra", "same.json"]
+    assert {rel: hash_file(os.path.join("/d", rel)) for rel in before} == before
+    assert not os.path.exists(txn.root)
+
+
+def test_recover_interrupted_transaction(fs):
+    manifest = _backup(fs)
+    _dest(fs)
+    txn = _staged_transaction(fs, manifest)
+    # Crash half way: journal says "applying", edited.json set aside but not yet replaced
+    txn.state = "applying"
+    txn._write_journal()
+    txn._set_aside("extra")
+    txn._set_aside("edited.json")
+    os.rename(os.path.join(txn.new, "chats/new.json"), "/d/chats/new.json")
+
+    assert recover("/d") == 1
+    assert open("/d/edited.json").read() == "changed here"
+    assert os.path.exists("/d/extra/deep/x.json")
+    assert os.listdir("/d/chats") == []
+    assert not os.path.exists(txn.root)
+
+    # A transaction that never wrote its journal touched nothing and is just removed
+    os.makedirs("/d.delta-20250101-000001/new")
+    assert recover("/d") == 1 and not os.path.exists("/d.delta-20250101-000001")
+    assert recover("/d") == 0
@@ -0,0 +1,122 @@
+# tests/test_download_cache.py
+
+import fcntl
+import hashlib
+import os
+import pytest
+from unittest.mock import patch
+from geminiai_cli.cloud_local import LocalProvider
+from geminiai_cli.cloud_storage import CloudFile
+from geminiai_cli.download_cache import DownloadCache, ChecksumMismatch, cache_limit
+
+
+def _bucket(fs, objects):
+    provider = LocalProvider("/bucket")
+    for name, data in objects.items():
+        fs.create_file(f"/up/{name}", contents=data)
+        provider.upload_file(f"/up/{name}", name)
+    return provider
+
+
+def _listing(provider, checksums=True):
+    files = {}
+    for f in provider.list_files():
+        if checksums:
+            with open(os.path.join("/bucket", f.name), "rb") as fh:
+                f.checksum = "sha1:" + hashlib.sha1(fh.read()).hexdigest()
+        files[f.name] = f
+    return files
+
+
+def test_second_fetch_is_a_hit(fs):
+    provider = _bucket(fs, {"a.tar.gz": b"archive a"})
+    cache = DownloadCache("/cache", limit=1024)
+    fs.create_dir("/out")
+
+    with patch.object(provider, "download_file", wraps=provider.download_file) as mock_dl:
+        assert cache.fetch(provider, "a.tar.gz", "/out/1", _listing(provider)["a.tar.gz"]) is False
+        assert cache.fetch(provider, "a.tar.gz", "/out/2", _listing(provider)["a.tar.gz"]) is True
+    assert mock_dl.call_count == 1
+    assert open("/out/2", "rb").read() == b"archive a"
+    # Removing what the caller got leaves the cached copy alone
+    os.remove("/out/1")
+    os.remove("/out/2")
+    assert cache.fetch(provider, "a.tar.gz", "/out/3", _listing(provider)["a.tar.gz"]) is True
+
+
+def test_changed_remote_is_downloaded_again(fs):
+    provider = _bucket(fs, {"a.tar.gz": b"old"})
+    cache = DownloadCache("/cache", limit=1024)
+    fs.create_dir("/out")
+    cache.fetch(provider, "a.tar.gz", "/out/a", _listing(provider)["a.tar.gz"])
+
+    with open("/bucket/a.tar.gz", "wb") as fh:
+        fh.write(b"new")
+    assert cache.fetch(provider, "a.tar.gz", "/out/a", _listing(provider)["a.tar.gz"]) is False
+    assert open("/out/a", "rb").read() == b"new"
+    # The replaced object does not linger
+    assert len(os.listdir("/cache/objects")) == 1
+
+
+def test_checksum_mismatch_is_rejected(fs):
+    provider = _bucket(fs, {"a.tar.gz": b"payload"})
+    remote = _listing(provider)["a.tar.gz"]
+    remote.checksum = "sha1:" + "0" * 40
+    cache = DownloadCache("/cache", limit=1024)
+    fs.create_dir("/out")
+    with pytest.raises(ChecksumMismatch):
+        cache.fetch(provider, "a.tar.gz", "/out/a", remote)
+    assert not os.path.exists("/out/a")
+    assert os.listdir("/cache/objects") == []
+
+
+
+def test_download_waits_for_concurrent_fetch_of_same_key(fs):
+    provider = _bucket(fs, {"a.tar.gz": b"archive a"})
+    remote = _listing(provider)["a.tar.gz"]
+    prefetch, restore = DownloadCache("/cache", limit=1024), DownloadCache("/cache", limit=1024)
+    fs.create_dir("/out")
+    real_flock = fcntl.flock
+    held = []
+
+    def flock(fh, op):
+        # The prefetch finishes the download while the restore waits for the key
+        if "/locks/" in fh.name and op == fcntl.LOCK_EX and not held:
+            held.append(fh.name)
+            prefetch.fetch(provider, "a.tar.gz", "/out/prefetched", remote)
+        return real_flock(fh, op)
+
+    with patch.object(provider, "download_file", wraps=provider.download_file) as mock_dl, \
+         patch("geminiai_cli.download_cache.fcntl.flock", side_effect=flock):
+        assert restore.fetch(provider, "a.tar.gz", "/out/a", remote) is True
+    assert mock_dl.call_count == 1
+    assert open("/out/a", "rb").read() == b"archive a"
+    assert [n for n in os.listdir("/cache") if n.startswith("download-")] == []
+
+def test_lru_eviction_and_bypass(fs):
+    provider = _bucket(fs, {"a": b"a" * 40, "b": b"b" * 40, "c": b"c" * 40, "big": b"x" * 200})
+    cache = DownloadCache("/cache", limit=100)
+    fs.create_dir("/out")
+    listing = _listing(provider, checksums=False)
+
+    with patch("geminiai_cli.download_cache.time.time", side_effect=range(100)):
+        cache.fetch(provider, "a", "/out/a", listing["a"])
+        cache.fetch(provider, "b", "/out/b", listing["b"])
+        assert cache.fetch(provider, "a", "/out/a", listing["a"]) is True
+        # c pushes the total over 100 bytes: b is the least recently used
+        cache.fetch(provider, "c", "/out/c", listing["c"])
+        assert cache.fetch(provider, "a", "/out/a", listing["a"]) is True
+        assert cache.fetch(provider, "b", "/out/b", listing["b"]) is False
+
+    # Larger than the whole cache, or not listed: a plain download
+    assert cache.fetch(provider, "big", "/out/big", listing["big"]) is False
+    assert cache.fetch(provider, "a", "/out/a2") is False
+    assert len(os.listdir("/cache/objects")) == 2
+
+
+def test_cache_limit_setting(fs):
+    with patch("geminiai_cli.download_cache.get_setting", return_value=1):
+        assert cache_limit() == 1024 * 1024
+        assert cache_limit(type("A", (), {"no_cache": True})()) == 0
+    with patch("geminiai_cli.download_cache.get_setting", return_value="bogus"):
+        assert cache_limit() == 2048 * 1024 * 1024
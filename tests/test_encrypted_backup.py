@@ -27,6 +27,7 @@ def test_backup_encrypt_calls_gpg(mocker, mock_subprocess):
     mocker.patch("geminiai_cli.backup.os.replace")
     mocker.patch("geminiai_cli.backup.atomic_symlink")
     mocker.patch("geminiai_cli.backup.os.remove") # Mock remove to prevent FileNotFoundError
+    mocker.patch("geminiai_cli.backup.create_archive") # Archive engine is covered in test_archive.py
 
     # Mock diff verification to pass
     mock_subprocess.return_value.returncode = 0
@@ -38,7 +39,9 @@ def test_backup_encrypt_calls_gpg(mocker, mock_subprocess):
         dest_dir_parent="/tmp/dest",
         dry_run=False,
         cloud=False,
-        encrypt=True  # New flag
+        encrypt=True,  # New flag
+        encryption="gpg",
+        verify="diff"
     )
 
     # Mock environment variable for password
@@ -90,7 +93,8 @@ def test_restore_decrypt_calls_gpg(mocker, mock_restore_subprocess):
         force=False,
         dry_run=False,
         cloud=False,
-        auto=False
+        auto=False,
+        verify="diff"
     )
 
     # Mock environment variable for password
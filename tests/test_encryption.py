@@ -0,0 +1,166 @@
+# tests/test_encryption.py
+
+import pytest
+import io
+import os
+from unittest.mock import patch, MagicMock
+
+pytest.importorskip("cryptography")
+
+from geminiai_cli import encryption
+from geminiai_cli.encryption import (
+    EncryptingWriter, DecryptingReader, DecryptionError, encryption_mode, read_passphrase,
+)
+
+def _encrypt(data, passphrase="pw", chunk_size=1024):
+    out = io.BytesIO()
+    with EncryptingWriter(out, passphrase, chunk_size=chunk_size) as w:
+        for i in range(0, len(data), 700):
+            w.write(data[i:i + 700])
+    return out.getvalue()
+
+@pytest.fixture(autouse=True)
+def cheap_kdf():
+    # scrypt at full cost makes the suite slow; the format stores its parameters anyway
+    with patch.object(encryption, "SCRYPT_LOG_N", 10):
+        yield
+
+@pytest.mark.parametrize("size", [0, 1, 1024, 1025, 5000])
+def test_roundtrip(size):
+    data = os.urandom(size)
+    sealed = _encrypt(data)
+    # Short inputs can occur in random ciphertext by chance; only check meaningful lengths
+    assert size < 16 or data not in sealed
+    reader = DecryptingReader(io.BytesIO(sealed), "pw")
+    assert reader.read() == data
+
+def test_read_in_pieces_and_peek():
+    data = bytes(range(256)) * 20
+    reader = DecryptingReader(io.BytesIO(_encrypt(data)), "pw")
+    assert reader.peek(4) == data[:4]
+    got = b""
+    while True:
+        piece = reader.read(333)
+        if not piece:
+            break
+        got += piece
+    assert got == data
+
+def test_wrong_passphrase():
+    reader = DecryptingReader(io.BytesIO(_encrypt(b"secret" * 100)), "nope")
+    with pytest.raises(DecryptionError):
+        reader.read()
+
+def test_tampering_and_truncation_detected():
+    sealed = bytearray(_encrypt(os.urandom(3000)))
+    flipped = bytes(sealed[:-5]) + bytes([sealed[-5] ^ 1]) + bytes(sealed[-4:])
+    with pytest.raises(DecryptionError):
+        DecryptingReader(io.BytesIO(flipped), "pw").read()
+
+    # Dropping the final chunk must not look like a complete archive
+    header = encryption._HEADER.size
+    truncated = bytes(sealed[:header + 1024 + 16])
+    with pytest.raises(DecryptionError):
+        DecryptingReader(io.BytesIO(truncated), "pw").read()
+
+def test_not_an_encrypted_archive():
+    with pytest.raises(DecryptionError):
+        DecryptingReader(io.BytesIO(b"\x1f\x8b plain gzip"), "pw")
+
+def test_encryption_mode_and_passphrase():
+    assert encryption_mode(MagicMock(encryption="gpg")) == "gpg"
+    with patch("geminiai_cli.encryption.get_setting", return_value=None):
+        assert encryption_mode(MagicMock(encryption=None)) == "aead"
+        with patch.object(encryption, "AESGCM", None):
+            assert encryption_mode(MagicMock(encryption=None)) == "gpg"
+    with patch.dict(os.environ, {"GEMINI_BACKUP_PASSWORD": "env-pw"}):
+        assert read_passphrase("x") == "env-pw"
+    with patch.dict(os.environ, {}, clear=True), patch("getpass.getpass", return_value=""):
+        assert read_passphrase("x") is None
+
+def test_encrypted_archive_roundtrip(fs):
+    from geminiai_cli.archive import create_archive, extract_archive_file
+    fs.create_file("/src/google_accounts.json", contents='{"active": "a@b.com"}')
+    os.makedirs("/out")
+    create_archive("/src", "/out/a.gemini.tar.gz.enc", passphrase="pw", threads=1)
+    with open("/out/a.gemini.tar.gz.enc", "rb") as fh:
+        assert b"a@b.com" not in fh.read()
+    # No plaintext intermediate left around
+    assert os.listdir("/out") == ["a.gemini.tar.gz.enc"]
+
+    extract_archive_file("/out/a.gemini.tar.gz.enc", "/dst", passphrase="pw")
+    assert open("/dst/google_accounts.json").read() == '{"active": "a@b.com"}'
+
+def test_backup_and_restore_encrypt_aead(fs):
+    from geminiai_cli import backup, restore
+    fs.create_file("/home/u/.gemini/google_accounts.json", contents='{"active": "a@b.com"}')
+
+    with patch.dict(os.environ, {"GEMINI_BACKUP_PASSWORD": "pw"}), \
+         patch("geminiai_cli.backup.acquire_lock"), \
+         patch("geminiai_cli.backup.make_timestamp", return_value="2025-01-01_100000"), \
+         patch("geminiai_cli.backup.subprocess.run") as mock_sub, \
+         patch("sys.argv", ["backup.py", "--encrypt", "--src", "/home/u/.gemini", "--archive-dir", "/arch", "--dest-dir-parent", "/snaps"]):
+        backup.main()
+    mock_sub.assert_not_called()  # no gpg
+    archive = "/arch/2025-01-01_100000-a@b.com.gemini.tar.gz.enc"
+    assert os.path.exists(archive)
+    assert restore.is_backup_archive(os.path.basename(archive))
+
+    with patch.dict(os.environ, {"GEMINI_BACKUP_PASSWORD": "pw"}):
+        restore.extract_archive(archive, "/restored")
+    assert open("/restored/google_accounts.json").read() == '{"active": "a@b.com"}'
+
+    with patch.dict(os.environ, {"GEMINI_BACKUP_PASSWORD": "wrong"}):
+        with pytest.raises(SystemExit):
+            restore.extract_archive(archive, "/restored2")
+
+def test_decrypting_reader_seek(fs):
+    from geminiai_cli.encryption import EncryptingWriter, DecryptingReader
+    data = os.urandom(10_000)
+    out = io.BytesIO()
+    writer = EncryptingWriter(out, "pw", chunk_size=1000)
+    writer.write(data)
+    writer.close()
+
+    out.seek(0)
+    reader = DecryptingReader(out, "pw")
+    reader.seek(4321)
+    assert reader.read(2000) == data[4321:6321]
+    reader.seek(9990)
+    assert reader.read() == data[9990:]
+    reader.seek(10_000)
+    assert reader.read() == b""
+
+@pytest.mark.parametrize("log_n, r, p, chunk_size", [(40, 8, 1, 1024), (10, 200, 1, 1024), (10, 8, 200, 1024),
+                                                     (10, 8, 1, 0xFFFFFFFF), (10, 8, 1, 0)])
+def test_untrusted_header_parameters_are_bounded(log_n, r, p, chunk_size):
+    header = encryption._HEADER.pack(encryption.MAGIC, encryption.FORMAT_VERSION, b"s" * encryption.SALT_SIZE,
+                                     log_n, r, p, chunk_size, b"n" * encryption.NONCE_PREFIX_SIZE)
+    with patch.object(encryption, "_derive_key") as mock_kdf:
+        with pytest.raises(DecryptionError, match="out of range"):
+            DecryptingReader(io.BytesIO(header + b"x" * 64), "pw")
+    mock_kdf.assert_not_called()
+
+def test_encrypted_chain_asks_for_passphrase_once(fs):
+    from geminiai_cli import restore
+    from geminiai_cli.archive import create_archive
+    from geminiai_cli.manifest import manifest_path_for
+    fs.create_file("/src/keep.json", contents="keep")
+    os.makedirs("/arch")
+    full_path = "/arch/2025-01-01_100000-a@b.com.gemini.tar.gz.enc"
+    full = create_archive("/src", full_path, passphrase="pw", threads=1)
+    full.meta.update(kind="full", chain_length=0)
+    full.save(manifest_path_for(full_path))
+    with open("/src/new.json", "w") as fh:
+        fh.write("new")
+    inc_path = "/arch/2025-01-01_110000-a@b.com.gemini.tar.gz.enc"
+    inc = create_archive("/src", inc_path, parent=full, passphrase="pw", threads=1)
+    inc.meta.update(kind="incremental", parent=os.path.basename(full_path), chain_length=1)
+    inc.save(manifest_path_for(inc_path))
+
+    with patch.dict(os.environ, {}, clear=True), patch("getpass.getpass", return_value="pw") as mock_getpass:
+        restore.extract_backup(inc_path, "/out")
+        restore.extract_selected(inc_path, "/sel", lambda rel, is_dir: rel == "new.json", restore.Manifest())
+    assert mock_getpass.call_count == 2
+    assert open("/out/keep.json").read() == "keep" and open("/out/new.json").read() == "new"
+    assert os.listdir("/sel") == ["new.json"]
@@ -0,0 +1,90 @@
+# tests/test_exclude.py
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from geminiai_cli.exclude import ExcludeMatcher, DEFAULT_EXCLUDES, excludes_from_args, path_selector
+from geminiai_cli.manifest import walk_tree
+
+HASH = "ab" * 32
+
+
+@pytest.mark.parametrize("pattern,path,is_dir,expected", [
+    ("*.log", "a.log", False, True),
+    ("*.log", "deep/dir/a.log", False, True),
+    ("*.log", "a.log.txt", False, False),
+    ("tmp/", "tmp", True, True),
+    ("tmp/", "tmp", False, False),
+    ("tmp/", "x/tmp", True, True),
+    ("/tmp", "x/tmp", True, False),
+    ("/settings.json", "settings.json", False, True),
+    ("cache/*.bin", "cache/a.bin", False, True),
+    ("cache/*.bin", "cache/sub/a.bin", False, False),
+    ("logs/**", "logs/a/b.txt", False, True),
+    ("**/node_modules", "a/b/node_modules", True, True),
+    ("a/**/z", "a/z", False, True),
+    ("a/**/z", "a/b/c/z", False, True),
+    ("file?.txt", "file1.txt", False, True),
+    ("[!x]y", "ay", False, True),
+    ("[!x]y", "xy", False, False),
+    ("\\#literal", "#literal", False, True),
+])
+def test_patterns(pattern, path, is_dir, expected):
+    assert ExcludeMatcher([pattern])(path, is_dir) is expected
+
+
+def test_negation_last_match_wins():
+    m = ExcludeMatcher(["*.log", "!keep.log", "# comment", ""])
+    assert m("a.log") is True
+    assert m("keep.log") is False
+    assert m.patterns == ["*.log", "!keep.log"]
+
+
+def test_default_profile():
+    m = ExcludeMatcher(DEFAULT_EXCLUDES)
+    assert m("tmp/bin", True)
+    assert m(f"tmp/{HASH}", True)
+    assert not m("tmp/my-project", True)
+    assert not m(f"other/{HASH}", True)
+    assert not m("bin", True)
+
+
+def test_empty_matcher_is_falsy():
+    assert not ExcludeMatcher(["# nothing"])
+
+
+def test_walk_tree_prunes_excluded_dirs(fs):
+    fs.create_file("/src/keep.txt")
+    fs.create_file("/src/tmp/bin/rg")
+    fs.create_file(f"/src/tmp/{HASH}/chats/c.json")
+    fs.create_file("/src/tmp/proj/notes.md")
+    fs.create_file("/src/debug.log")
+    m = ExcludeMatcher(list(DEFAULT_EXCLUDES) + ["*.log"])
+    paths = [item.path for item in walk_tree("/src", exclude=m)]
+    assert paths == ["keep.txt", "tmp", "tmp/proj", "tmp/proj/notes.md"]
+
+
+def test_excludes_from_args(fs):
+    fs.create_file("/ex.txt", contents="*.bak\n# c\n")
+    args = SimpleNamespace(exclude=["*.log"], exclude_from=["/ex.txt"], no_default_excludes=False)
+    m = excludes_from_args(args)
+    assert m.patterns == list(DEFAULT_EXCLUDES) + ["*.bak", "*.log"]
+
+    args = SimpleNamespace(exclude=None, exclude_from=None, no_default_excludes=True)
+    assert excludes_from_args(args) is None
+
+    with patch("geminiai_cli.exclude.get_setting",
+               side_effect=lambda k, d=None: {"default_excludes": False, "backup_excludes": ["cache/"]}.get(k, d)):
+        assert excludes_from_args(SimpleNamespace()).patterns == ["cache/"]
+
+
+def test_path_selector_selects_subtrees():
+    select = path_selector(["google_accounts.json", "tmp/*/chats/", "/settings.json"])
+    assert select("google_accounts.json")
+    assert select("tmp/proj/chats", is_dir=True)
+    assert select("tmp/proj/chats/session-1.json")
+    assert select("tmp/proj/chats/deep/log.json")
+    assert not select("tmp/proj/logs.json")
+    assert not select("tmp/proj", is_dir=True)
+    assert select("settings.json")
+    assert not select("nested/settings.json")
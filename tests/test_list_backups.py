@@ -5,15 +5,15 @@ from unittest.mock import patch, MagicMock
 import os
 import sys
 from geminiai_cli import list_backups
+from geminiai_cli.cloud_storage import CloudFile
 
 @patch("geminiai_cli.list_backups.B2Manager")
 def test_main_cloud(mock_b2):
     with patch("sys.argv", ["list_backups.py", "--cloud", "--bucket", "b", "--b2-id", "i", "--b2-key", "k"]):
-        mock_file = MagicMock()
-        mock_file.file_name = "backup.gemini.tar.gz"
-        mock_b2.return_value.list_backups.return_value = [(mock_file, None)]
+        mock_b2.return_value.download_to_string.return_value = None
+        mock_b2.return_value.list_files.return_value = [CloudFile("backup.gemini.tar.gz", 1, 0)]
         list_backups.main()
-        mock_b2.return_value.list_backups.assert_called()
+        mock_b2.return_value.list_files.assert_called()
 
 @patch("geminiai_cli.list_backups.B2Manager")
 def test_main_cloud_empty(mock_b2):
@@ -24,7 +24,7 @@ def test_main_cloud_empty(mock_b2):
 @patch("geminiai_cli.list_backups.B2Manager")
 def test_main_cloud_error(mock_b2):
     with patch("sys.argv", ["list_backups.py", "--cloud", "--bucket", "b", "--b2-id", "i", "--b2-key", "k"]):
-        mock_b2.return_value.list_backups.side_effect = Exception("Error")
+        mock_b2.return_value.list_files.side_effect = Exception("Error")
         with pytest.raises(SystemExit):
             list_backups.main()
 
@@ -61,6 +61,18 @@ def test_main_local_error(mock_listdir, mock_isdir):
     with patch("sys.argv", ["list_backups.py", "--search-dir", "/tmp"]):
         list_backups.main()
 
+@patch("geminiai_cli.list_backups.B2Manager")
+def test_main_cloud_uses_catalog(mock_b2):
+    with patch("sys.argv", ["list_backups.py", "--cloud", "--bucket", "b", "--b2-id", "i", "--b2-key", "k"]), \
+         patch("geminiai_cli.list_backups.cloud_backups", return_value=[CloudFile("2025-01-01_100000-a@b.com.gemini.tar.gz", 1, 0)]) as mock_catalog, \
+         patch("geminiai_cli.list_backups.rebuild_catalog") as mock_rebuild:
+        list_backups.main()
+        mock_rebuild.assert_not_called()
+        with patch("sys.argv", ["list_backups.py", "--cloud", "--refresh-catalog", "--bucket", "b", "--b2-id", "i", "--b2-key", "k"]):
+            list_backups.main()
+        mock_rebuild.assert_called_once_with(mock_b2.return_value)
+    mock_b2.return_value.list_files.assert_not_called()
+
 @patch("geminiai_cli.list_backups.B2Manager")
 def test_main_cloud_loop_continue(mock_b2):
     # Test line 38: if file_version.file_name.endswith...
@@ -70,3 +82,46 @@ def test_main_cloud_loop_continue(mock_b2):
         mock_b2.return_value.list_backups.return_value = [(mock_file, None)]
         list_backups.main()
         # Should print "No backups found" because only non-matching file
+
+def _archive_with_manifest(fs, incremental=False):
+    from geminiai_cli.archive import create_archive
+    from geminiai_cli.manifest import manifest_path_for
+    fs.create_file("/src/google_accounts.json", contents='{"active": "a@b.com"}')
+    fs.create_file("/src/tmp/p/chats/session-1.json", contents="chat")
+    os.makedirs("/backups")
+    path = "/backups/2025-01-01_100000-a@b.com.gemini.tar.gz"
+    manifest = create_archive("/src", path)
+    if incremental:
+        with open("/src/tmp/p/chats/session-1.json", "w") as fh:
+            fh.write("chat, continued")
+        path = "/backups/2025-01-01_110000-a@b.com.gemini.tar.gz"
+        manifest = create_archive("/src", path, parent=manifest)
+    manifest.save(manifest_path_for(path))
+    return path
+
+def test_backup_ls_reads_the_manifest(fs, capsys):
+    path = _archive_with_manifest(fs, incremental=True)
+    args = MagicMock(archive=os.path.basename(path), archive_dir="/backups", ls_paths=["chats/"])
+    with patch("geminiai_cli.list_backups.list_archive") as mock_list:
+        list_backups.perform_archive_listing(args)
+    mock_list.assert_not_called()
+    out = capsys.readouterr().out
+    assert "tmp/p/chats/session-1.json" in out and "google_accounts.json" not in out
+    assert "1 files, 15 bytes" in out
+
+    args.ls_paths = None
+    list_backups.perform_archive_listing(args)
+    out = capsys.readouterr().out
+    # Unchanged since the full backup: stored in the earlier archive of the chain
+    assert "google_accounts.json  (earlier backup)" in out
+
+def test_backup_ls_without_manifest_reads_the_archive(fs, capsys):
+    from geminiai_cli.manifest import manifest_path_for
+    path = _archive_with_manifest(fs)
+    os.remove(manifest_path_for(path))
+    list_backups.perform_archive_listing(MagicMock(archive=path, ls_paths=[]))
+    out = capsys.readouterr().out
+    assert "google_accounts.json" in out and "2 files, 25 bytes" in out
+
+    with pytest.raises(SystemExit):
+        list_backups.perform_archive_listing(MagicMock(archive="/backups/missing.tar.gz", archive_dir="/backups"))
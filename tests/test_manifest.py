@@ -0,0 +1,58 @@
+# tests/test_manifest.py
+
+import io
+import os
+import hashlib
+from geminiai_cli.manifest import (
+    Manifest, FileEntry, HashingReader, hash_file, walk_tree, manifest_path_for
+)
+
+def test_manifest_save_load_roundtrip(fs):
+    m = Manifest(meta={"archive": "x.gemini.tar.gz"})
+    m.add("a/b.json", FileEntry(size=3, mtime_ns=10, sha256="abc"))
+    fs.create_dir("/m")
+    m.save("/m/x.manifest.json")
+
+    loaded = Manifest.load("/m/x.manifest.json")
+    assert loaded.files == m.files
+    assert loaded.meta["archive"] == "x.gemini.tar.gz"
+    assert loaded.total_size() == 3
+    assert not os.path.exists("/m/x.manifest.json.part")
+
+def test_manifest_load_missing_or_corrupt(fs):
+    assert Manifest.load("/nope.json") is None
+    fs.create_file("/bad.json", contents="{not json")
+    assert Manifest.load("/bad.json") is None
+
+def test_manifest_path_for():
+    assert manifest_path_for("/b/x.gemini.tar.gz") == "/b/x.gemini.tar.gz.manifest.json"
+
+def test_hashing_reader():
+    reader = HashingReader(io.BytesIO(b"hello world"))
+    assert reader.read(5) == b"hello"
+    assert reader.read() == b" world"
+    assert reader.read() == b""
+    assert reader.bytes_read == 11
+    assert reader.hexdigest() == hashlib.sha256(b"hello world").hexdigest()
+
+def test_hash_file(fs):
+    fs.create_file("/f", contents="data")
+    assert hash_file("/f") == hashlib.sha256(b"data").hexdigest()
+
+def test_walk_tree_order_and_types(fs):
+    fs.create_file("/r/b.txt")
+    fs.create_file("/r/a/z.txt")
+    fs.create_file("/r/a/y.txt")
+    fs.create_symlink("/r/link", "b.txt")
+
+    items = list(walk_tree("/r"))
+    paths = [i.path for i in items]
+    assert paths == ["a", "b.txt", "link", "a/y.txt", "a/z.txt"]
+
+    by_path = {i.path: i for i in items}
+    assert by_path["a"].is_dir
+    assert by_path["b.txt"].is_file
+    assert by_path["link"].is_symlink
+
+def test_walk_tree_missing_root(fs):
+    assert list(walk_tree("/missing")) == []
@@ -0,0 +1,60 @@
+# tests/test_metrics.py
+
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from geminiai_cli import metrics
+
+
+def test_phases_are_sequential(fs):
+    m = metrics.Metrics("backup")
+    first = m.begin("archive")
+    first.files = 3
+    m.begin("upload", cloud=True)
+    m.end()
+    m.end()
+    assert [p.name for p in m.phases] == ["archive", "upload"]
+    assert m.phases[0].files == 3 and m.phases[1].cloud
+    assert all(p.wall_seconds >= 0 and p.cpu_seconds >= 0 for p in m.phases)
+    data = m.to_dict()
+    assert data["cloud_seconds"] == m.phases[1].wall_seconds
+    assert data["peak_rss"] > 0
+
+
+@pytest.mark.parametrize("exc,ok", [(None, True), (SystemExit(0), True), (SystemExit(3), False), (ValueError("x"), False)])
+def test_context_manager_records_outcome(fs, exc, ok):
+    m = metrics.Metrics("restore", json_path="/out/metrics.json")
+    try:
+        with m:
+            m.begin("extract")
+            if exc is not None:
+                raise exc
+    except BaseException:
+        pass
+    with open("/out/metrics.json") as fh:
+        data = json.load(fh)
+    assert data["ok"] is ok
+    assert [p["name"] for p in data["phases"]] == ["extract"]
+
+
+def test_report_prints_table_and_survives_bad_path(fs, capsys):
+    fs.create_file("/blocker", contents="")
+    m = metrics.Metrics("backup", timings=True, json_path="/blocker/metrics.json")
+    with m:
+        m.begin("copy").files = 7
+    out = capsys.readouterr().out
+    assert "backup timings" in out and "copy" in out
+    assert "Warning: could not write metrics" in out
+
+
+def test_metrics_from_args():
+    m = metrics.metrics_from_args("backup", SimpleNamespace(timings=True, metrics_json="/m.json"))
+    assert m.timings and m.json_path == "/m.json" and m.enabled
+
+    with patch("geminiai_cli.metrics.get_setting", return_value="~/metrics.json"):
+        m = metrics.metrics_from_args("backup", MagicMock())
+    assert not m.timings and m.json_path == "~/metrics.json"
+
+    with patch("geminiai_cli.metrics.get_setting", return_value=None):
+        assert not metrics.metrics_from_args("backup", SimpleNamespace()).enabled
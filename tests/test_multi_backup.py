@@ -0,0 +1,105 @@
+# tests/test_multi_backup.py
+
+import os
+import sys
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from geminiai_cli import multi_backup
+from geminiai_cli.backup import lock_path_for, LOCKFILE
+
+
+def _args(**kw):
+    base = dict(sources="/u/*/.gemini", archive_dir="/arch", dest_dir_parent="/snaps", jobs=2,
+                watch=False, src="~/.gemini", dry_run=False, cloud=False)
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def test_expand_sources_glob_and_file(fs):
+    for user in ("alice", "bob"):
+        fs.create_dir(f"/u/{user}/.gemini")
+    fs.create_file("/u/carol/.gemini", contents="not a dir")
+    assert multi_backup.expand_sources("/u/*/.gemini") == ["/u/alice/.gemini", "/u/bob/.gemini"]
+
+    fs.create_dir("/srv/ci/.gemini")
+    fs.create_file("/etc/gemini-sources", contents="# fleet\n/u/a*/.gemini\n\n/srv/ci/.gemini\n/missing\n")
+    assert multi_backup.expand_sources("/etc/gemini-sources") == ["/srv/ci/.gemini", "/u/alice/.gemini"]
+
+
+def test_source_labels_are_unique():
+    labels = multi_backup.source_labels(["/u/alice/.gemini", "/srv/alice/.gemini", "/data/shared"])
+    assert labels == [("alice", "/u/alice/.gemini"), ("alice-2", "/srv/alice/.gemini"),
+                      ("shared", "/data/shared")]
+
+
+def test_lock_path_per_source():
+    assert lock_path_for(os.path.abspath(os.path.expanduser("~/.gemini"))) == LOCKFILE
+    a, b = lock_path_for("/u/alice/.gemini"), lock_path_for("/u/bob/.gemini")
+    assert a != b and LOCKFILE not in (a, b)
+
+
+def test_backup_sources_bounded_and_isolated(fs):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_backup(args):
+        with lock:
+            running.append(args.src)
+            peak.append(len(running))
+        print(f"backing up {args.src}")
+        time.sleep(0.02)
+        with lock:
+            running.remove(args.src)
+        if args.src.endswith("bad/.gemini"):
+            sys.exit(3)
+        if args.src.endswith("busy/.gemini"):
+            sys.exit(2)
+
+    sources = [(u, f"/u/{u}/.gemini") for u in ("a", "b", "bad", "busy", "c")]
+    results = multi_backup.backup_sources(_args(), sources, fake_backup, jobs=2)
+
+    assert max(peak) <= 2
+    assert [r.status for r in results] == ["ok", "ok", "failed", "locked", "ok"]
+    assert results[2].output == "backing up /u/bad/.gemini\n"
+    assert sys.stdout is not None and not isinstance(sys.stdout, multi_backup._ThreadStdout)
+
+
+def test_backup_sources_gives_each_source_its_own_dirs(fs):
+    seen = []
+    multi_backup.backup_sources(_args(), [("alice", "/u/alice/.gemini")], seen.append, jobs=1)
+    args = seen[0]
+    assert (args.src, args.archive_dir, args.dest_dir_parent) == ("/u/alice/.gemini", "/arch/alice", "/snaps/alice")
+    assert args.threads >= 1
+
+
+@patch("geminiai_cli.backup.acquire_lock")
+def test_perform_multi_backup_end_to_end(mock_lock, fs, capsys):
+    for user in ("alice", "bob"):
+        fs.create_file(f"/u/{user}/.gemini/google_accounts.json", contents='{"active": "%s@example.com"}' % user)
+        fs.create_file(f"/u/{user}/.gemini/chats.json", contents=user)
+
+    multi_backup.perform_multi_backup(_args())
+
+    for user in ("alice", "bob"):
+        archives = [n for n in os.listdir(f"/arch/{user}") if n.endswith(".tar.gz")]
+        assert len(archives) == 1 and f"{user}@example.com" in archives[0]
+    locks = {c.args[0] for c in mock_lock.call_args_list}
+    assert len(locks) == 2
+    assert "2/2 sources backed up." in capsys.readouterr().out
+
+
+def test_perform_multi_backup_failures_exit(fs):
+    fs.create_dir("/u/alice/.gemini")
+    with pytest.raises(SystemExit) as e:
+        multi_backup.perform_multi_backup(_args(), backup=lambda args: sys.exit(1))
+    assert e.value.code == 1
+
+    with pytest.raises(SystemExit):
+        multi_backup.perform_multi_backup(_args(sources="/nothing/*"), backup=lambda args: None)
+
+    with pytest.raises(SystemExit):
+        multi_backup.perform_multi_backup(_args(watch=True), backup=lambda args: None)
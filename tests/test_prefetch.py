@@ -0,0 +1,83 @@
+# tests/test_prefetch.py
+
+import os
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from geminiai_cli import prefetch
+from geminiai_cli.archive import create_archive
+from geminiai_cli.cloud_local import LocalProvider
+from geminiai_cli.download_cache import DownloadCache
+from geminiai_cli.manifest import manifest_path_for
+
+A_OLD = "2025-01-01_100000-a@b.com.gemini.tar.gz"
+A = "2025-01-02_100000-a@b.com.gemini.tar.gz"
+C = "2025-01-03_100000-c@d.com.gemini.tar.gz"
+
+
+@pytest.fixture
+def bucket(fs):
+    provider = LocalProvider("/bucket")
+    fs.create_dir("/up")
+    for name in (A_OLD, A, C):
+        fs.create_file(f"/src-{name}/google_accounts.json", contents=name)
+        create_archive(f"/src-{name}", f"/up/{name}").save(manifest_path_for(f"/up/{name}"))
+        provider.upload_file(f"/up/{name}", name)
+        provider.upload_file(manifest_path_for(f"/up/{name}"), os.path.basename(manifest_path_for(name)))
+    return provider
+
+
+@pytest.fixture
+def cache():
+    cache = DownloadCache("/cache", limit=1024 * 1024)
+    with patch("geminiai_cli.prefetch.download_cache", return_value=cache):
+        yield cache
+
+
+def test_prefetch_caches_newest_backup_of_recommended_account(bucket, cache):
+    with patch("geminiai_cli.prefetch.get_recommendation", return_value=MagicMock(email="a@b.com")):
+        assert prefetch.prefetch_recommended(provider=bucket) == A
+
+    # The later restore download is a cache hit
+    listing = {f.name: f for f in bucket.list_files()}
+    with patch.object(bucket, "download_file") as mock_dl:
+        assert cache.fetch(bucket, A, "/restore.tar.gz", listing[A]) is True
+    mock_dl.assert_not_called()
+    assert not [d for d in os.listdir("/tmp") if d.startswith("gemini-prefetch-")]
+
+
+def test_prefetch_nothing_to_do(bucket, cache, capsys):
+    with patch("geminiai_cli.prefetch.get_recommendation", return_value=None):
+        assert prefetch.prefetch_recommended(provider=bucket) is None
+    with patch("geminiai_cli.prefetch.get_recommendation", return_value=MagicMock(email="x@y.com")):
+        assert prefetch.prefetch_recommended(provider=bucket) is None
+    assert "No backups found in cloud" in capsys.readouterr().out
+    cache.limit = 0
+    assert prefetch.prefetch_recommended(provider=bucket) is None
+    assert not os.path.exists("/cache/objects")
+
+
+def test_start_prefetch_only_when_enabled(fs):
+    with patch("geminiai_cli.prefetch.subprocess.Popen") as mock_popen:
+        assert prefetch.start_prefetch(SimpleNamespace(prefetch=False)) is None
+        assert prefetch.start_prefetch(SimpleNamespace(prefetch=True, dry_run=True)) is None
+        mock_popen.assert_not_called()
+
+        prefetch.start_prefetch(SimpleNamespace(prefetch=True, b2_id="id", b2_key="key", bucket=None))
+        cmd = mock_popen.call_args.args[0]
+        kwargs = mock_popen.call_args.kwargs
+        assert cmd[1:] == ["-m", "geminiai_cli.prefetch"]
+        assert kwargs["start_new_session"] is True
+        assert kwargs["env"]["GEMINI_B2_KEY_ID"] == "id" and kwargs["env"]["GEMINI_B2_APP_KEY"] == "key"
+
+    with patch("geminiai_cli.prefetch.get_setting", return_value=True):
+        assert prefetch.prefetch_enabled(SimpleNamespace()) is True
+
+
+def test_cli_recommend_starts_prefetch(fs):
+    from geminiai_cli import cli
+    with patch("sys.argv", ["geminiai", "recommend", "--prefetch"]), \
+         patch("geminiai_cli.cli.do_recommend"), \
+         patch("geminiai_cli.prefetch.subprocess.Popen") as mock_popen:
+        cli.main()
+    mock_popen.assert_called_once()
@@ -3,7 +3,9 @@
 import pytest
 from unittest.mock import patch, MagicMock, call
 import os
+import json
 import time
+from geminiai_cli.cloud_storage import CloudFile
 from geminiai_cli.prune import do_prune, get_backup_list, get_backup_list_dirs, prune_list, parse_ts
 from geminiai_cli.config import OLD_CONFIGS_DIR
 
@@ -100,6 +102,19 @@ def test_do_prune_local(mock_cprint, fs):
     assert os.path.exists(os.path.join(dir_backup_path, "2023-01-03_110000-u.gemini")) # Kept
 
 
+@patch("geminiai_cli.prune.cprint")
+def test_do_prune_local_removes_manifest_sidecar(mock_cprint, fs):
+    archive_dir = "/tmp/backups"
+    fs.create_dir(archive_dir)
+    fs.create_file(os.path.join(archive_dir, "2023-01-01_100000-u.gemini.tar.gz"))
+    fs.create_file(os.path.join(archive_dir, "2023-01-01_100000-u.gemini.tar.gz.manifest.json"))
+    fs.create_file(os.path.join(archive_dir, "2023-01-02_100000-u.gemini.tar.gz"))
+
+    do_prune(mock_args(keep=1))
+
+    assert not os.path.exists(os.path.join(archive_dir, "2023-01-01_100000-u.gemini.tar.gz.manifest.json"))
+
+
 @patch("geminiai_cli.prune.cprint")
 def test_do_prune_local_no_dir(mock_cprint, fs):
     # Dirs don't exist
@@ -139,7 +154,11 @@ def test_do_prune_cloud(mock_cprint, mock_b2_cls, mock_creds, fs):
     fv2.file_name = "2023-01-02_100000-u.gemini.tar.gz"
     fv2.id_ = "id2"
 
-    mock_b2.list_backups.return_value = [(fv1, None), (fv2, None)]
+    bucket = {}
+    mock_b2.upload_string.side_effect = lambda text, name: bucket.__setitem__(name, text)
+    mock_b2.download_to_string.side_effect = bucket.get
+    mock_b2.list_files.return_value = [CloudFile(fv1.file_name, 1, 0), CloudFile(fv2.file_name, 1, 0)]
+    mock_b2.bucket.get_file_info_by_name.side_effect = lambda name: {fv1.file_name: fv1, fv2.file_name: fv2}[name]
 
     args = mock_args(keep=1, cloud=True, backup_dir="/tmp/nonexistent") # Local part will be skipped
     
@@ -150,6 +169,9 @@ def test_do_prune_cloud(mock_cprint, mock_b2_cls, mock_creds, fs):
     do_prune(args)
 
     mock_b2.bucket.delete_file_version.assert_called_once_with("id1", "2023-01-01_100000-u.gemini.tar.gz")
+    # The catalog no longer lists the deleted archive
+    assert list(json.loads(bucket["gemini-catalog.json"])["entries"]) == ["2023-01-02_100000-u.gemini.tar.gz"]
+    mock_b2.list_files.assert_called_once()
 
 @patch("geminiai_cli.prune.resolve_credentials")
 @patch("geminiai_cli.prune.cprint")
@@ -231,7 +253,8 @@ def test_do_prune_cloud_delete_fail(mock_cprint, mock_b2_cls, mock_creds, fs):
     fv2.file_name = "2023-01-02_100000-u.gemini.tar.gz"
     fv2.id_ = "id2"
 
-    mock_b2.list_backups.return_value = [(fv1, None), (fv2, None)]
+    mock_b2.download_to_string.return_value = None
+    mock_b2.list_files.return_value = [CloudFile(fv1.file_name, 1, 0), CloudFile(fv2.file_name, 1, 0)]
     mock_b2.bucket.delete_file_version.side_effect = Exception("API Fail")
 
     args = mock_args(keep=1, cloud=True, backup_dir="/tmp/nonexistent")
@@ -240,3 +263,39 @@ def test_do_prune_cloud_delete_fail(mock_cprint, mock_b2_cls, mock_creds, fs):
 
     mock_b2.bucket.delete_file_version.assert_called()
     assert any("Failed to delete cloud file 2023-01-01_100000-u.gemini.tar.gz" in str(args) for args in mock_cprint.call_args_list)
+
+
+@patch("geminiai_cli.prune.cprint")
+def test_do_prune_chunk_snapshots(mock_cprint, fs):
+    from geminiai_cli.chunkstore import snapshot_name_for
+    fs.create_dir("/tmp/backups")
+    store = MagicMock()
+    store.list_snapshots.return_value = [
+        snapshot_name_for("2023-01-01_100000-u.gemini"),
+        snapshot_name_for("2023-01-02_100000-u.gemini"),
+    ]
+    store.gc.return_value = 4
+    with patch("geminiai_cli.prune.ChunkStore", return_value=store), \
+         patch("geminiai_cli.prune.acquire_lock") as mock_lock:
+        do_prune(mock_args(keep=1))
+
+    store.forget.assert_called_once_with(snapshot_name_for("2023-01-01_100000-u.gemini"))
+    store.gc.assert_called_once()
+    # Under the backup lock, so no backup or restore is using the store meanwhile
+    mock_lock.assert_called_once_with()
+
+def test_prune_list_keeps_incremental_parents():
+    from geminiai_cli.manifest import Manifest
+    backups = [(3, "c"), (2, "b"), (1, "a")]
+    manifests = {
+        "c": Manifest(meta={"kind": "incremental", "parent": "b"}),
+        "b": Manifest(meta={"kind": "incremental", "parent": "a"}),
+        "a": Manifest(meta={"kind": "full"}),
+    }
+    callback = MagicMock()
+    prune_list(backups, 1, False, callback, manifests.get)
+    callback.assert_not_called()
+
+    manifests["c"] = Manifest(meta={"kind": "full"})
+    prune_list(backups, 1, False, callback, manifests.get)
+    assert [c.args[0] for c in callback.call_args_list] == ["b", "a"]
@@ -6,6 +6,7 @@ import os
 import argparse
 import shutil
 import tempfile
+import tarfile
 from geminiai_cli import restore
 from geminiai_cli.restore import perform_restore
 from geminiai_cli.recommend import Recommendation, AccountStatus
@@ -16,6 +17,17 @@ def fs_setup(fs):
     """Ensure basic directories exist."""
     pass
 
+_os_replace = os.replace
+
+def _real_archive(fs, path):
+    """A valid archive of an empty tree: restore extracts in-process when verifying by manifest."""
+    from geminiai_cli.archive import create_archive
+    os.makedirs("/archive-src", exist_ok=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Several tests patch os.replace, which create_archive uses to finish the file
+    with patch("os.replace", _os_replace):
+        create_archive("/archive-src", path)
+
 @patch("geminiai_cli.restore.fcntl")
 def test_acquire_lock_success(mock_fcntl):
     with patch("geminiai_cli.restore.LOCKFILE", "/tmp/restore.lock"):
@@ -31,6 +43,13 @@ def test_acquire_lock_fail(mock_fcntl):
             restore.acquire_lock()
         assert e.value.code == 2
 
+@patch("geminiai_cli.restore.fcntl")
+def test_acquire_lock_wait(mock_fcntl):
+    with patch("geminiai_cli.restore.LOCKFILE", "/tmp/restore.lock"):
+        mock_fcntl.flock.side_effect = [BlockingIOError, None]
+        assert restore.acquire_lock(wait=True) is not None
+        assert mock_fcntl.flock.call_args_list[-1].args[1] == mock_fcntl.LOCK_EX
+
 def test_run():
     with patch("subprocess.run") as mock_run:
         restore.run("ls")
@@ -76,7 +95,7 @@ def test_main_from_dir(mock_replace, mock_run, mock_lock, fs):
     mock_run.return_value.returncode = 0
 
     with patch("shutil.move"):
-        with patch("sys.argv", ["restore.py", "--from-dir", src_dir]):
+        with patch("sys.argv", ["restore.py", "--from-dir", src_dir, "--verify", "diff"]):
             restore.main()
 
     assert mock_run.call_count >= 1
@@ -92,7 +111,7 @@ def test_main_from_archive(mock_replace, mock_run, mock_lock, fs):
 
     mock_run.return_value.returncode = 0
 
-    with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+    with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
         restore.main()
 
 @patch("geminiai_cli.restore.acquire_lock")
@@ -100,7 +119,7 @@ def test_main_from_archive(mock_replace, mock_run, mock_lock, fs):
 @patch("geminiai_cli.restore.run")
 @patch("os.replace")
 def test_main_auto_oldest(mock_replace, mock_run, mock_find_oldest, mock_lock, fs):
-    fs.create_file("/tmp/oldest.tar.gz")
+    _real_archive(fs, "/tmp/oldest.tar.gz")
     dest_dir = os.path.expanduser("~/.gemini")
     fs.create_dir(dest_dir)
 
@@ -129,7 +148,7 @@ def test_main_cloud(mock_replace, mock_sync, mock_run, mock_get_provider, mock_l
         # Create temp file so os.remove doesn't fail if called, though we patch it usually
         # But here we want normal execution flow
         temp_path = os.path.join(tempfile.gettempdir(), mock_file.name)
-        fs.create_file(temp_path)
+        _real_archive(fs, temp_path)
 
         restore.main()
         mock_get_provider.return_value.download_file.assert_called()
@@ -142,7 +161,7 @@ def test_main_verification_fail(mock_run, mock_lock, fs):
     dest_dir = os.path.expanduser("~/.gemini")
     fs.create_dir(dest_dir)
 
-    with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+    with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
         mock_run.side_effect = [
             MagicMock(returncode=0),
             MagicMock(returncode=0),
@@ -161,7 +180,7 @@ def test_main_post_verification_fail(mock_replace, mock_run, mock_lock, fs):
     dest_dir = os.path.expanduser("~/.gemini")
     fs.create_dir(dest_dir)
 
-    with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+    with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
         mock_run.side_effect = [
             MagicMock(returncode=0),
             MagicMock(returncode=0),
@@ -210,7 +229,7 @@ def test_main_from_archive_search_dir(mock_replace, mock_lock, fs):
     fs.create_dir(os.path.expanduser("~/.gemini"))
     search_dir = os.path.expanduser("~/.geminiai-cli/backups")
     fs.create_dir(search_dir)
-    fs.create_file(os.path.join(search_dir, "archive.tar.gz"))
+    _real_archive(fs, os.path.join(search_dir, "archive.tar.gz"))
 
     with patch("geminiai_cli.restore.run") as mock_run:
         mock_run.return_value.returncode = 0
@@ -240,7 +259,7 @@ def test_main_rollback_success(mock_replace, mock_run, mock_lock, fs):
      fs.create_file(archive)
      fs.create_dir(os.path.expanduser("~/.gemini"))
 
-     with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+     with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
         mock_run.side_effect = [
             MagicMock(returncode=0),
             MagicMock(returncode=0),
@@ -258,7 +277,7 @@ def test_main_rollback_fail(mock_run, mock_lock, fs):
      fs.create_file(archive)
      fs.create_dir(os.path.expanduser("~/.gemini"))
 
-     with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+     with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
         mock_run.side_effect = [MagicMock(returncode=0), MagicMock(returncode=0), MagicMock(returncode=0), MagicMock(returncode=1)]
 
         with patch("os.replace", side_effect=[None, None, OSError("Rollback Error")]) as mock_replace:
@@ -288,7 +307,7 @@ def test_main_cloud_specific_archive(mock_replace, mock_sync, mock_run, mock_get
 
         # Create temp file
         temp_path = os.path.join(tempfile.gettempdir(), specific_archive)
-        fs.create_file(temp_path)
+        _real_archive(fs, temp_path)
 
         restore.main()
         
@@ -297,7 +316,7 @@ def test_main_cloud_specific_archive(mock_replace, mock_sync, mock_run, mock_get
 @patch("geminiai_cli.restore.acquire_lock")
 @patch("os.replace")
 def test_main_lock_exception(mock_replace, mock_lock, fs):
-    fs.create_file("/tmp/backup.tar.gz")
+    _real_archive(fs, "/tmp/backup.tar.gz")
     fs.create_dir(os.path.expanduser("~/.gemini"))
 
     mock_fd = MagicMock()
@@ -321,7 +340,7 @@ def test_main_os_replace_fail_fallback(mock_run, mock_lock, fs):
 
     with patch("os.replace", side_effect=OSError(18, "Cross-device link")):
         with patch("shutil.move") as mock_move:
-            with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+            with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
                 restore.main()
                 mock_move.assert_called()
 
@@ -336,7 +355,7 @@ def test_main_temp_extraction_rmtree_fail(mock_replace, mock_run, mock_lock, fs)
 
     # Mock shutil.rmtree to fail
     with patch("shutil.rmtree", side_effect=Exception("Perm error")):
-        with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+        with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
             restore.main()
 
 @patch("geminiai_cli.restore.acquire_lock")
@@ -349,7 +368,7 @@ def test_main_dest_not_exists(mock_replace, mock_run, mock_lock, fs):
 
     mock_run.return_value.returncode = 0
 
-    with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+    with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
         restore.main()
         # Verify it created dest
         # Since we mocked os.replace, the actual move didn't happen, so dest isn't created by replace.
@@ -366,14 +385,14 @@ def test_main_tmp_dest_not_exists(mock_replace, mock_run, mock_lock, fs):
     fs.create_dir(os.path.expanduser("~/.gemini"))
     mock_run.return_value.returncode = 0
 
-    with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+    with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
         restore.main()
 
 @patch("geminiai_cli.restore.acquire_lock")
 @patch("geminiai_cli.restore.run")
 def test_main_force_replace(mock_run, mock_lock, fs):
     archive = "/tmp/archive.tar.gz"
-    fs.create_file(archive)
+    _real_archive(fs, archive)
     fs.create_dir(os.path.expanduser("~/.gemini"))
     mock_run.return_value.returncode = 0
 
@@ -411,7 +430,7 @@ def test_main_cleanup_temp_download(mock_replace, mock_sync, mock_run, mock_lock
 
             # Create the temp file so it exists to be cleaned up
             temp_path = os.path.join(tempfile.gettempdir(), mock_file.name)
-            fs.create_file(temp_path)
+            _real_archive(fs, temp_path)
 
             with patch("os.remove") as mock_remove:
                 # We need to manually simulate os.exists returning true for this path if fs doesn't handle it well
@@ -431,7 +450,7 @@ def test_main_verification_fail_with_stdout(mock_run, mock_lock, fs):
         MagicMock(returncode=0),
         MagicMock(returncode=1, stdout="diff output"),
     ]
-    with patch("sys.argv", ["restore.py", "--from-archive", archive]):
+    with patch("sys.argv", ["restore.py", "--from-archive", archive, "--verify", "diff"]):
         with pytest.raises(SystemExit) as e:
             restore.main()
         assert e.value.code == 3
@@ -709,3 +728,398 @@ def test_restore_auto_cooldown_outgoing(fs, capsys):
              mock_cooldown.assert_called_with("old@test.com")
              mock_switch.assert_any_call("old@test.com", args=args)
              mock_switch.assert_any_call("new@test.com", args=args)
+
+def _chunked_args(**overrides):
+    values = dict(
+        auto=False, cloud=False, dest="/dest/.gemini", search_dir="/backups",
+        from_dir=None, from_archive=None, dry_run=False, force=True, engine="chunked",
+    )
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+def test_restore_chunked_engine_materializes_snapshot(fs):
+    from geminiai_cli.chunkstore import ChunkStore, snapshot_name_for
+    fs.create_file("/src/oauth_creds.json", contents="{}")
+    store = ChunkStore("/repo")
+    name = snapshot_name_for("2025-01-01_120000-test@example.com.gemini")
+    store.backup("/src", name)
+
+    with patch("geminiai_cli.restore.ChunkStore", return_value=store), \
+         patch("geminiai_cli.restore.acquire_lock"), \
+         patch("geminiai_cli.restore.run") as mock_run, \
+         patch("geminiai_cli.restore.get_active_session", return_value=None):
+        mock_run.return_value.returncode = 0
+        def fake_run(cmd, **kwargs):
+            if cmd.startswith("cp -a"):
+                # The copy source must be the materialized snapshot
+                src = cmd.split()[2]
+                assert os.path.exists(os.path.join(src, "oauth_creds.json"))
+                shutil.copytree(src, cmd.split()[3])
+            return MagicMock(returncode=0)
+        mock_run.side_effect = fake_run
+        perform_restore(_chunked_args())
+
+    assert os.path.exists("/dest/.gemini/oauth_creds.json")
+
+def test_select_snapshot_rules(fs):
+    store = MagicMock()
+    store.list_snapshots.return_value = [
+        "2025-01-01_120000-a@b.com.gemini.snapshot.json",
+        "2025-01-02_120000-a@b.com.gemini.snapshot.json",
+        "2025-01-03_120000-c@d.com.gemini.snapshot.json",
+    ]
+    assert restore.select_snapshot(_chunked_args(), store) == "2025-01-01_120000-a@b.com.gemini.snapshot.json"
+
+    rec = Recommendation(email="a@b.com", status=AccountStatus.READY, last_used=None, next_reset=None)
+    with patch("geminiai_cli.restore.get_recommendation", return_value=rec):
+        assert restore.select_snapshot(_chunked_args(auto=True), store) == "2025-01-02_120000-a@b.com.gemini.snapshot.json"
+
+    with pytest.raises(SystemExit):
+        restore.select_snapshot(_chunked_args(from_archive="missing.snapshot.json"), store)
+
+    store.list_snapshots.return_value = []
+    with pytest.raises(SystemExit):
+        restore.select_snapshot(_chunked_args(), store)
+
+def test_select_snapshot_cloud_pulls(fs):
+    store = MagicMock()
+    name = "2025-01-01_120000-a@b.com.gemini.snapshot.json"
+    with patch("geminiai_cli.restore.get_cloud_provider") as mock_provider, \
+         patch("geminiai_cli.restore.list_cloud_snapshots", return_value=[name]), \
+         patch("geminiai_cli.restore.pull_snapshot", return_value=2) as mock_pull:
+        assert restore.select_snapshot(_chunked_args(cloud=True, from_archive=name), store) == name
+        mock_pull.assert_called_once_with(store, mock_provider.return_value, name)
+
+def _tar_extract(archive_path, extract_to):
+    import tarfile
+    with tarfile.open(archive_path, "r:gz") as tar:
+        tar.extractall(extract_to)
+
+def _incremental_chain(fs):
+    from geminiai_cli.archive import create_archive
+    from geminiai_cli.manifest import manifest_path_for
+    fs.create_file("/src/keep.json", contents="keep")
+    fs.create_file("/src/gone.json", contents="gone")
+    os.makedirs("/arch")
+    full_path = "/arch/2025-01-01_100000-a@b.com.gemini.tar.gz"
+    full = create_archive("/src", full_path)
+    full.meta.update(kind="full", chain_length=0)
+    full.save(manifest_path_for(full_path))
+
+    os.remove("/src/gone.json")
+    with open("/src/new.json", "w") as fh:
+        fh.write("new")
+    inc_path = "/arch/2025-01-01_110000-a@b.com.gemini.tar.gz"
+    inc = create_archive("/src", inc_path, parent=full)
+    inc.meta.update(kind="incremental", parent=os.path.basename(full_path), chain_length=1)
+    inc.save(manifest_path_for(inc_path))
+    return full_path, inc_path
+
+def test_resolve_backup_chain(fs):
+    full_path, inc_path = _incremental_chain(fs)
+    assert restore.resolve_backup_chain(inc_path) == [full_path, inc_path]
+    assert restore.resolve_backup_chain(full_path) == [full_path]
+
+    os.remove(full_path)
+    with pytest.raises(SystemExit):
+        restore.resolve_backup_chain(inc_path)
+
+@patch("geminiai_cli.restore.extract_archive", side_effect=_tar_extract)
+def test_extract_backup_replays_chain(mock_extract, fs):
+    full_path, inc_path = _incremental_chain(fs)
+    restore.extract_backup(inc_path, "/out")
+
+    assert [c.args[0] for c in mock_extract.call_args_list] == [full_path, inc_path]
+    assert open("/out/keep.json").read() == "keep"
+    assert open("/out/new.json").read() == "new"
+    # Deleted after the full backup was taken
+    assert not os.path.exists("/out/gone.json")
+
+def test_download_cloud_chain(fs):
+    full_path, inc_path = _incremental_chain(fs)
+    from geminiai_cli.manifest import manifest_path_for
+    store = {os.path.basename(p): p for p in (full_path, inc_path)}
+
+    provider = MagicMock()
+    provider.download_file.side_effect = lambda name, local: shutil.copy(store[name], local)
+    provider.download_to_string.side_effect = lambda name: open(manifest_path_for(store[name[:-len(".manifest.json")]])).read()
+
+    os.makedirs("/dl")
+    paths = restore.download_cloud_chain(provider, os.path.basename(inc_path), "/dl")
+    assert [c.args[0] for c in provider.download_file.call_args_list] == [
+        os.path.basename(inc_path), os.path.basename(full_path)]
+    assert len(paths) == 4
+    assert restore.resolve_backup_chain(os.path.join("/dl", os.path.basename(inc_path)))[0] == \
+        os.path.join("/dl", os.path.basename(full_path))
+
+@pytest.mark.parametrize("parent", ["../../.bashrc", "/etc/2025-01-01_100000-a@b.com.gemini.tar.gz",
+                                    "sub/2025-01-01_100000-a@b.com.gemini.tar.gz", "notes.txt"])
+def test_chain_rejects_unsafe_parent(parent, fs):
+    from geminiai_cli.manifest import Manifest, manifest_path_for
+    full_path, inc_path = _incremental_chain(fs)
+    m = Manifest.load(manifest_path_for(inc_path))
+    m.meta["parent"] = parent
+    m.save(manifest_path_for(inc_path))
+    with pytest.raises(SystemExit):
+        restore.resolve_backup_chain(inc_path)
+
+    provider = MagicMock()
+    provider.download_to_string.return_value = open(manifest_path_for(inc_path)).read()
+    os.makedirs("/dl", exist_ok=True)
+    with pytest.raises(SystemExit):
+        restore.download_cloud_chain(provider, os.path.basename(inc_path), "/dl")
+    assert provider.download_file.call_count == 1
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_manifest_verify_checks_archive_manifest(mock_session, mock_lock, fs):
+    full_path, _ = _incremental_chain(fs)
+    dest = os.path.expanduser("~/.gemini")
+
+    with patch("sys.argv", ["restore.py", "--from-archive", full_path, "--force"]):
+        restore.main()
+    assert open(os.path.join(dest, "keep.json")).read() == "keep"
+
+    # Archive content that no longer matches its recorded manifest is rejected
+    from geminiai_cli.manifest import Manifest, FileEntry, manifest_path_for
+    m = Manifest.load(manifest_path_for(full_path))
+    m.files["keep.json"] = FileEntry(4, 0, "0" * 64)
+    m.save(manifest_path_for(full_path))
+    with patch("sys.argv", ["restore.py", "--from-archive", full_path, "--force"]):
+        with pytest.raises(SystemExit) as e:
+            restore.main()
+    assert e.value.code == 3
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_cloud_metrics_json(mock_session, mock_lock, fs):
+    import json
+    from geminiai_cli.cloud_local import LocalProvider
+    full_path, inc_path = _incremental_chain(fs)
+    provider = LocalProvider("/bucket")
+    for path in (full_path, inc_path):
+        provider.upload_file(path, os.path.basename(path))
+        provider.upload_file(f"{path}.manifest.json", os.path.basename(path) + ".manifest.json")
+
+    dest = "/restored/.gemini"
+    with patch("geminiai_cli.restore.get_cloud_provider", return_value=provider), \
+         patch("sys.argv", ["restore.py", "--cloud", "--from-archive", os.path.basename(inc_path),
+                            "--dest", dest, "--metrics-json", "/m/restore.json"]):
+        restore.main()
+
+    assert open(f"{dest}/new.json").read() == "new"
+    with open("/m/restore.json") as fh:
+        data = json.load(fh)
+    assert data["ok"] is True
+    names = [p["name"] for p in data["phases"]]
+    assert names == ["download", "extract", "verify", "install", "post-verify"]
+    assert data["phases"][0]["cloud"] is True and data["phases"][0]["files"] == 4
+    assert data["cloud_seconds"] == data["phases"][0]["wall_seconds"]
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_streams_archive_into_dest_sibling(mock_session, mock_lock, fs):
+    from geminiai_cli.manifest import manifest_path_for
+    full_path, inc_path = _incremental_chain(fs)
+    dest = "/home/user/.gemini"
+
+    with patch("geminiai_cli.restore.copy_tree") as mock_copy, \
+         patch("geminiai_cli.restore.tempfile.mkdtemp") as mock_mkdtemp, \
+         patch("sys.argv", ["restore.py", "--from-archive", inc_path, "--dest", dest, "--force"]):
+        restore.main()
+    # No scratch workspace and no second copy of the tree
+    mock_copy.assert_not_called()
+    mock_mkdtemp.assert_not_called()
+    assert sorted(os.listdir(dest)) == ["keep.json", "new.json"]
+    assert [n for n in os.listdir("/home/user") if ".tmp-" in n] == []
+
+    # A chain whose content does not match its manifest is rejected and leaves nothing behind
+    with open(inc_path, "r+b") as fh:
+        fh.truncate(os.path.getsize(inc_path) // 2)
+    with patch("sys.argv", ["restore.py", "--from-archive", inc_path, "--dest", dest, "--force"]):
+        with pytest.raises((SystemExit, EOFError, OSError, tarfile.TarError)):
+            restore.main()
+    assert [n for n in os.listdir("/home/user") if ".tmp-" in n] == []
+    assert sorted(os.listdir(dest)) == ["keep.json", "new.json"]
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_streaming_without_manifest_rechecks_tree(mock_session, mock_lock, fs, capsys):
+    from geminiai_cli.manifest import manifest_path_for
+    full_path, _ = _incremental_chain(fs)
+    os.remove(manifest_path_for(full_path))
+    dest = "/home/user/.gemini"
+
+    with patch("geminiai_cli.restore.verify_tree", return_value=["keep.json: content changed"]) as mock_verify, \
+         patch("sys.argv", ["restore.py", "--from-archive", full_path, "--dest", dest, "--force"]):
+        with pytest.raises(SystemExit) as e:
+            restore.main()
+    assert e.value.code == 3
+    mock_verify.assert_called_once()
+    out = capsys.readouterr().out
+    assert "No manifest recorded with the archive" in out and "Verification OK." not in out
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_path_restores_only_selected_files(mock_session, mock_lock, fs):
+    full_path, inc_path = _incremental_chain(fs)
+    dest = "/home/user/.gemini"
+    fs.create_file(f"{dest}/keep.json", contents="edited")
+    fs.create_file(f"{dest}/other.json", contents="untouched")
+
+    # keep.json lives in the full backup, new.json in the incremental on top of it
+    with patch("geminiai_cli.restore.OLD_CONFIGS_DIR", "/old"), \
+         patch("geminiai_cli.restore.extract_members", wraps=restore.extract_members) as mock_members, \
+         patch("sys.argv", ["restore.py", "--from-archive", inc_path, "--dest", dest,
+                            "--path", "keep.json", "--path", "new.json"]):
+        restore.main()
+    assert [c.args[0] for c in mock_members.call_args_list] == [full_path, inc_path]
+    assert open(f"{dest}/keep.json").read() == "keep"
+    assert open(f"{dest}/new.json").read() == "new"
+    assert open(f"{dest}/other.json").read() == "untouched"
+    assert not os.path.exists(f"{dest}/gone.json")
+    # What was replaced is kept, and the staging dir is gone
+    old = [n for n in os.listdir("/old") if n.startswith(".gemini.bak-")]
+    assert len(old) == 1 and open(f"/old/{old[0]}/keep.json").read() == "edited"
+    assert [n for n in os.listdir("/home/user") if ".partial-" in n] == []
+
+    with patch("sys.argv", ["restore.py", "--from-archive", inc_path, "--dest", dest, "--path", "nothing*"]):
+        with pytest.raises(SystemExit) as e:
+            restore.main()
+    assert e.value.code == 1
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_path_without_index_scans_archive(mock_session, mock_lock, fs):
+    from geminiai_cli.manifest import manifest_path_for
+    full_path, _ = _incremental_chain(fs)
+    os.remove(manifest_path_for(full_path))
+    dest = "/home/user/.gemini"
+
+    with patch("sys.argv", ["restore.py", "--from-archive", full_path, "--dest", dest, "--path", "gone.json"]):
+        restore.main()
+    assert os.listdir(dest) == ["gone.json"]
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_delta_rewrites_only_changed_files(mock_session, mock_lock, fs):
+    full_path, inc_path = _incremental_chain(fs)
+    dest = "/home/user/.gemini"
+    fs.create_file(f"{dest}/keep.json", contents="keep")
+    fs.create_file(f"{dest}/new.json", contents="stale")
+    fs.create_file(f"{dest}/extra.json", contents="extra")
+    keep_ino = os.stat(f"{dest}/keep.json").st_ino
+
+    with patch("geminiai_cli.restore.OLD_CONFIGS_DIR", "/old"), \
+         patch("geminiai_cli.restore.record_account_switch") as mock_switch, \
+         patch("sys.argv", ["restore.py", "--from-archive", inc_path, "--dest", dest, "--delta"]):
+        restore.main()
+    assert sorted(os.listdir(dest)) == ["keep.json", "new.json"]
+    assert open(f"{dest}/new.json").read() == "new"
+    # The unchanged file was not rewritten
+    assert os.stat(f"{dest}/keep.json").st_ino == keep_ino
+    old = os.listdir("/old")
+    assert len(old) == 1 and sorted(os.listdir(f"/old/{old[0]}")) == ["extra.json", "new.json"]
+    assert [n for n in os.listdir("/home/user") if ".delta-" in n] == []
+    mock_switch.assert_called_once()
+
+    # No existing dest: falls back to a full restore
+    with patch("sys.argv", ["restore.py", "--from-archive", inc_path, "--dest", "/fresh/.gemini", "--delta"]):
+        restore.main()
+    assert sorted(os.listdir("/fresh/.gemini")) == ["keep.json", "new.json"]
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_delta_post_verify_failure_rolls_back(mock_session, mock_lock, fs):
+    full_path, inc_path = _incremental_chain(fs)
+    dest = "/home/user/.gemini"
+    fs.create_file(f"{dest}/keep.json", contents="keep")
+    fs.create_file(f"{dest}/new.json", contents="stale")
+    fs.create_file(f"{dest}/extra.json", contents="extra")
+
+    with patch("geminiai_cli.restore.OLD_CONFIGS_DIR", "/old"), \
+         patch("geminiai_cli.restore.verify_tree", return_value=["~ new.json (content differs)"]), \
+         patch("geminiai_cli.restore.record_account_switch") as mock_switch, \
+         patch("sys.argv", ["restore.py", "--from-archive", inc_path, "--dest", dest, "--delta"]):
+        with pytest.raises(SystemExit) as e:
+            restore.main()
+    assert e.value.code == 4
+    assert sorted(os.listdir(dest)) == ["extra.json", "keep.json", "new.json"]
+    assert open(f"{dest}/new.json").read() == "stale"
+    assert [n for n in os.listdir("/home/user") if ".delta-" in n] == []
+    assert not os.path.exists("/old")
+    mock_switch.assert_not_called()
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_main_delta_dry_run_leaves_interrupted_transaction(mock_session, mock_lock, fs, capsys):
+    full_path, inc_path = _incremental_chain(fs)
+    dest = "/home/user/.gemini"
+    fs.create_file(f"{dest}/keep.json", contents="keep")
+    fs.create_file(f"{dest}.delta-1/journal.json", contents="{}")
+
+    with patch("geminiai_cli.restore.recover_delta") as mock_recover, \
+         patch("sys.argv", ["restore.py", "--from-archive", inc_path, "--dest", dest, "--delta", "--dry-run"]):
+        restore.main()
+    mock_recover.assert_not_called()
+    assert os.path.exists(f"{dest}.delta-1/journal.json")
+    assert "would first settle an interrupted delta restore" in capsys.readouterr().out
+
+@patch("geminiai_cli.restore.get_recommendation")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_auto_restore_uses_ready_slot(mock_session, mock_rec, fs):
+    mock_rec.return_value = MagicMock(email="a@b.com")
+    fs.create_file("/backups/2025-01-01_100000-a@b.com.gemini.tar.gz")
+    args = argparse.Namespace(auto=True, search_dir="/backups", dest="/home/u/.gemini", cloud=False,
+                              dry_run=False, path=None, force=False)
+    with patch("geminiai_cli.slots.ready_slot", return_value=True) as mock_ready, \
+         patch("geminiai_cli.slots.switch_to_slot") as mock_switch, \
+         patch("geminiai_cli.restore.extract_backup") as mock_extract:
+        perform_restore(args)
+    mock_ready.assert_called_once_with("a@b.com", "/backups/2025-01-01_100000-a@b.com.gemini.tar.gz")
+    mock_switch.assert_called_once_with(args, "a@b.com", "/home/u/.gemini")
+    mock_extract.assert_not_called()
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_cloud_restore_reuses_download_cache(mock_session, mock_lock, fs):
+    from geminiai_cli.cloud_local import LocalProvider
+    full_path, inc_path = _incremental_chain(fs)
+    provider = LocalProvider("/bucket")
+    for path in (full_path, inc_path):
+        provider.upload_file(path, os.path.basename(path))
+        provider.upload_file(f"{path}.manifest.json", os.path.basename(path) + ".manifest.json")
+
+    argv = ["restore.py", "--cloud", "--from-archive", os.path.basename(inc_path), "--dest"]
+    with patch("geminiai_cli.restore.get_cloud_provider", return_value=provider), \
+         patch("geminiai_cli.download_cache.CACHE_DIR", "/cache"), \
+         patch.object(provider, "download_file", wraps=provider.download_file) as mock_dl:
+        for dest in ("/r1/.gemini", "/r2/.gemini"):
+            with patch("sys.argv", argv + [dest]):
+                restore.main()
+        assert mock_dl.call_count == 2
+        with patch("sys.argv", argv + ["/r3/.gemini", "--no-cache"]):
+            restore.main()
+        assert mock_dl.call_count == 4
+    assert open("/r2/.gemini/new.json").read() == "new"
+
+@patch("geminiai_cli.restore.acquire_lock")
+@patch("geminiai_cli.restore.get_active_session", return_value=None)
+def test_cloud_restore_reports_download_failure(mock_session, mock_lock, fs, capsys):
+    from geminiai_cli.cloud_local import LocalProvider
+    from geminiai_cli.download_cache import ChecksumMismatch
+    full_path, _ = _incremental_chain(fs)
+    provider = LocalProvider("/bucket")
+    provider.upload_file(full_path, os.path.basename(full_path))
+
+    argv = ["restore.py", "--cloud", "--from-archive", os.path.basename(full_path), "--dest", "/r/.gemini"]
+    for error, expected in ((ChecksumMismatch(os.path.basename(full_path)), "downloaded copy was discarded"),
+                            (OSError("connection reset"), "connection reset")):
+        with patch("geminiai_cli.restore.get_cloud_provider", return_value=provider), \
+             patch("geminiai_cli.restore.download_cloud_chain", side_effect=error), \
+             patch("sys.argv", argv):
+            with pytest.raises(SystemExit) as e:
+                restore.main()
+        assert e.value.code == 1
+        out = capsys.readouterr().out
+        assert os.path.basename(full_path) in out and expected in out
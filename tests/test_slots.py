@@ -0,0 +1,194 @@
+# tests/test_slots.py
+
+import errno
+import os
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from geminiai_cli import slots
+from geminiai_cli.archive import create_archive
+from geminiai_cli.manifest import manifest_path_for
+
+A = "2025-01-01_100000-a@b.com.gemini.tar.gz"
+A_NEWER = "2025-01-02_100000-a@b.com.gemini.tar.gz"
+C = "2025-01-01_120000-c@d.com.gemini.tar.gz"
+
+
+def _archive(fs, name, contents, search_dir="/backups"):
+    src = f"/src-{name}"
+    fs.create_file(f"{src}/google_accounts.json", contents=contents)
+    path = os.path.join(search_dir, name)
+    os.makedirs(search_dir, exist_ok=True)
+    create_archive(src, path).save(manifest_path_for(path))
+    return path
+
+
+@pytest.fixture
+def slots_dir(fs):
+    with patch("geminiai_cli.slots.SLOTS_DIR", "/slots"), patch("geminiai_cli.slots.OLD_CONFIGS_DIR", "/old"):
+        yield "/slots"
+
+
+def test_latest_backups():
+    names = [A, A_NEWER, C, "notes.txt", "2025-01-03_100000-x@y.com.gemini"]
+    assert slots.latest_backups(names) == {"a@b.com": A_NEWER, "c@d.com": C}
+    assert slots.backup_email(C + ".enc") == "c@d.com"
+
+
+def test_unsafe_emails_never_name_a_slot(fs, slots_dir):
+    names = [A, "2025-01-05_100000-../x.gemini.tar.gz", "2025-01-05_100000-..gemini.tar.gz",
+             "2025-01-05_100000-.hidden.gemini.tar.gz"]
+    assert slots.latest_backups(names) == {"a@b.com": A}
+    for email in ("../x", "..", ".hidden", "a/b", ""):
+        with pytest.raises(ValueError):
+            slots.slot_path(email)
+        assert slots.load_slot(email) is None
+    with pytest.raises(SystemExit):
+        slots.switch_to_slot(SimpleNamespace(), "../x", "/home/.gemini")
+
+
+def test_refresh_builds_only_stale_slots(fs, slots_dir):
+    _archive(fs, A, "old a")
+    _archive(fs, C, "c")
+    args = SimpleNamespace(search_dir="/backups", email=None, cloud=False)
+
+    assert slots.refresh_slots(args) == 2
+    assert open("/slots/a@b.com/tree/google_accounts.json").read() == "old a"
+    assert slots.ready_slot("a@b.com", A)
+    assert slots.refresh_slots(args) == 0
+
+    _archive(fs, A_NEWER, "new a")
+    assert slots.refresh_slots(args) == 1
+    assert slots.list_slots()["a@b.com"]["backup"] == A_NEWER
+    assert open("/slots/a@b.com/tree/google_accounts.json").read() == "new a"
+    assert sorted(os.listdir("/slots/a@b.com")) == ["slot.json", "tree"]
+
+
+
+def test_slot_is_swapped_under_the_backup_lock(fs, slots_dir):
+    _archive(fs, A, "a")
+    seen = []
+
+    def lock(wait=False):
+        # Taken after extraction and before anything in the slot is replaced
+        seen.append((wait, os.listdir("/slots/a@b.com")))
+        return MagicMock()
+
+    with patch("geminiai_cli.slots.acquire_lock", side_effect=lock), \
+         patch("geminiai_cli.slots.fcntl.flock") as mock_flock:
+        slots.refresh_slots(SimpleNamespace(search_dir="/backups", email=None, cloud=False))
+    assert len(seen) == 1 and seen[0][0] is True
+    assert [n for n in seen[0][1] if not n.startswith("tree.new-")] == []
+    mock_flock.assert_called_once()
+    assert slots.ready_slot("a@b.com", A)
+
+
+def test_refresh_skips_corrupt_backup(fs, slots_dir, capsys):
+    path = _archive(fs, A, "a")
+    from geminiai_cli.manifest import Manifest, FileEntry
+    m = Manifest.load(manifest_path_for(path))
+    m.files["google_accounts.json"] = FileEntry(1, 0, "0" * 64)
+    m.save(manifest_path_for(path))
+
+    assert slots.refresh_slots(SimpleNamespace(search_dir="/backups", email=["a@b.com"], cloud=False)) == 0
+    assert slots.load_slot("a@b.com") is None
+    assert "Could not stage slot a@b.com" in capsys.readouterr().out
+    assert not os.path.exists("/slots/a@b.com/tree")
+
+
+def test_refresh_from_cloud(fs, slots_dir):
+    from geminiai_cli.cloud_local import LocalProvider
+    path = _archive(fs, A, "cloud a", search_dir="/up")
+    provider = LocalProvider("/bucket")
+    provider.upload_file(path, A)
+    provider.upload_file(manifest_path_for(path), os.path.basename(manifest_path_for(path)))
+
+    with patch("geminiai_cli.slots.get_cloud_provider", return_value=provider):
+        assert slots.refresh_slots(SimpleNamespace(email=None, cloud=True)) == 1
+    assert open("/slots/a@b.com/tree/google_accounts.json").read() == "cloud a"
+
+
+@patch("geminiai_cli.slots.acquire_lock")
+@patch("geminiai_cli.slots.record_account_switch")
+@patch("geminiai_cli.slots.get_active_session", return_value="c@d.com")
+def test_switch_renames_slot_into_place(mock_session, mock_switch, mock_lock, fs, slots_dir):
+    _archive(fs, A, "a")
+    slots.refresh_slots(SimpleNamespace(search_dir="/backups", email=None, cloud=False))
+    fs.create_file("/home/u/.gemini/google_accounts.json", contents="current")
+    ino = os.stat("/slots/a@b.com/tree").st_ino
+
+    slots.switch_to_slot(SimpleNamespace(force=False), "a@b.com", "/home/u/.gemini")
+    assert os.stat("/home/u/.gemini").st_ino == ino
+    assert open("/home/u/.gemini/google_accounts.json").read() == "a"
+    old = os.listdir("/old")
+    assert len(old) == 1 and open(f"/old/{old[0]}/google_accounts.json").read() == "current"
+    mock_switch.assert_called_once()
+    assert mock_switch.call_args.args[1] == "c@d.com"
+    # Used up until the next refresh
+    assert slots.load_slot("a@b.com") is None
+    with pytest.raises(SystemExit):
+        slots.switch_to_slot(SimpleNamespace(force=True), "a@b.com", "/home/u/.gemini")
+
+
+@patch("geminiai_cli.slots.acquire_lock")
+@patch("geminiai_cli.slots.record_account_switch")
+@patch("geminiai_cli.slots.get_active_session", return_value=None)
+def test_switch_puts_dest_back_on_failure(mock_session, mock_switch, mock_lock, fs, slots_dir):
+    _archive(fs, A, "a")
+    slots.refresh_slots(SimpleNamespace(search_dir="/backups", email=None, cloud=False))
+    fs.create_file("/home/u/.gemini/google_accounts.json", contents="current")
+
+    real_rename = os.rename
+    def failing_rename(src, dst):
+        if src.endswith("/tree"):
+            raise OSError("busy")
+        return real_rename(src, dst)
+
+    with patch("geminiai_cli.slots.os.rename", side_effect=failing_rename):
+        with pytest.raises(OSError):
+            slots.switch_to_slot(SimpleNamespace(force=True), "a@b.com", "/home/u/.gemini")
+    assert open("/home/u/.gemini/google_accounts.json").read() == "current"
+    assert slots.ready_slot("a@b.com", A)
+    mock_switch.assert_not_called()
+
+
+
+@patch("geminiai_cli.slots.acquire_lock")
+@patch("geminiai_cli.slots.record_account_switch")
+@patch("geminiai_cli.slots.get_active_session", return_value=None)
+def test_switch_refuses_cross_device_move_aside(mock_session, mock_switch, mock_lock, fs, slots_dir):
+    _archive(fs, A, "a")
+    slots.refresh_slots(SimpleNamespace(search_dir="/backups", email=None, cloud=False))
+    fs.create_file("/home/u/.gemini/google_accounts.json", contents="current")
+
+    real_rename = os.rename
+    def cross_device(src, dst):
+        if src == "/home/u/.gemini":
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return real_rename(src, dst)
+
+    with patch("geminiai_cli.slots.os.rename", side_effect=cross_device):
+        with pytest.raises(SystemExit) as e:
+            slots.switch_to_slot(SimpleNamespace(force=False), "a@b.com", "/home/u/.gemini")
+    assert e.value.code == 1
+    assert open("/home/u/.gemini/google_accounts.json").read() == "current"
+    assert slots.ready_slot("a@b.com", A)
+    mock_switch.assert_not_called()
+
+
+def test_do_slots_switch_auto(fs, slots_dir):
+    rec = MagicMock(email="a@b.com")
+    args = SimpleNamespace(slots_command="switch", email=None, auto=True, dest="/g", force=False)
+    with patch("geminiai_cli.slots.get_recommendation", return_value=rec), \
+         patch("geminiai_cli.slots.switch_to_slot") as mock_switch:
+        slots.do_slots(args)
+    mock_switch.assert_called_once_with(args, "a@b.com", "/g")
+
+
+def test_cli_dispatches_slots():
+    with patch("sys.argv", ["geminiai", "slots", "refresh", "--email", "a@b.com"]), \
+         patch("geminiai_cli.cli.do_slots") as mock_slots:
+        from geminiai_cli.cli import main
+        main()
+    args = mock_slots.call_args[0][0]
+    assert args.slots_command == "refresh" and args.email == ["a@b.com"]
@@ -1,9 +1,10 @@
 # tests/test_sync.py
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 import os
 from geminiai_cli.sync import perform_sync, get_local_backups, get_cloud_backups
+from geminiai_cli.cloud_storage import CloudFile
 
 # NOTE: Since conftest.py uses pyfakefs (autouse=True), standard os functions are already patched.
 # We should NOT patch os.path.isdir, os.listdir, etc. manually.
@@ -59,6 +60,7 @@ def test_perform_sync_push_upload(mock_cprint, mock_get_cloud, mock_creds, mock_
 
     mock_b2 = MagicMock()
     mock_b2.bucket_name = "test-bucket"
+    mock_b2.file_info.return_value = None
     mock_get_provider.return_value = mock_b2
 
     # Create local file in fake fs
@@ -70,6 +72,9 @@ def test_perform_sync_push_upload(mock_cprint, mock_get_cloud, mock_creds, mock_
     perform_sync("push", args)
 
     mock_b2.upload_file.assert_called()
+    # The provider swallowed the upload failure: reported, and not catalogued
+    mock_cprint.assert_any_call(ANY, "[WARN] local.gemini.tar.gz is not in the bucket after uploading it.")
+    mock_b2.upload_string.assert_not_called()
 
 @patch("geminiai_cli.sync.get_cloud_provider")
 @patch("geminiai_cli.sync.resolve_credentials")
@@ -148,3 +153,23 @@ def test_perform_sync_push_missing_dir(mock_cprint, mock_get_provider, fs):
 
     with pytest.raises(SystemExit):
         perform_sync("push", args)
+
+@patch("geminiai_cli.sync.get_cloud_provider")
+def test_sync_transfers_manifests(mock_get_provider, fs):
+    fs.create_file("/b/2025-01-01_100000-a@b.com.gemini.tar.gz")
+    fs.create_file("/b/2025-01-01_100000-a@b.com.gemini.tar.gz.manifest.json", contents="{}")
+    provider = MagicMock()
+    provider.list_files.return_value = []
+    provider.file_info.side_effect = lambda name: CloudFile(name, 1, 0)
+    mock_get_provider.return_value = provider
+
+    perform_sync("push", mock_args(backup_dir="/b"))
+    uploaded = [c.args[1] for c in provider.upload_file.call_args_list]
+    assert "2025-01-01_100000-a@b.com.gemini.tar.gz.manifest.json" in uploaded
+
+    cloud = MagicMock()
+    cloud.name = "2025-01-01_110000-a@b.com.gemini.tar.gz"
+    provider.list_files.return_value = [cloud]
+    provider.download_to_string.return_value = '{"version": 1, "meta": {"kind": "full"}, "files": {}}'
+    perform_sync("pull", mock_args(backup_dir="/b"))
+    assert os.path.exists("/b/2025-01-01_110000-a@b.com.gemini.tar.gz.manifest.json")
@@ -0,0 +1,155 @@
+# tests/test_verify.py
+
+import pytest
+import os
+import hashlib
+from unittest.mock import patch, MagicMock
+from geminiai_cli.manifest import Manifest, FileEntry
+from geminiai_cli.verify import copy_tree, verify_tree, compare_manifests, report_problems, verify_mode
+
+# pyfakefs (fs fixture) is autouse in conftest.py
+
+def _tree(fs, root="/src"):
+    fs.create_file(f"{root}/google_accounts.json", contents='{"active": "a@b.com"}')
+    fs.create_file(f"{root}/tmp/p/chats/session-1.json", contents="chat")
+    fs.create_dir(f"{root}/empty")
+    fs.create_symlink(f"{root}/link", "google_accounts.json")
+    os.chmod(f"{root}/google_accounts.json", 0o600)
+    os.utime(f"{root}/tmp/p/chats/session-1.json", ns=(1_000_000_000, 2_000_000_000))
+    return root
+
+def test_copy_tree_copies_and_hashes(fs):
+    src = _tree(fs)
+    manifest = copy_tree(src, "/dst")
+
+    assert open("/dst/tmp/p/chats/session-1.json").read() == "chat"
+    assert os.readlink("/dst/link") == "google_accounts.json"
+    assert os.path.isdir("/dst/empty")
+    assert os.stat("/dst/google_accounts.json").st_mode & 0o777 == 0o600
+    assert os.stat("/dst/tmp/p/chats/session-1.json").st_mtime_ns == 2_000_000_000
+
+    entry = manifest.files["tmp/p/chats/session-1.json"]
+    assert entry.sha256 == hashlib.sha256(b"chat").hexdigest()
+    assert set(manifest.meta["others"]) == {"empty", "link", "tmp", "tmp/p", "tmp/p/chats"}
+
+def test_copy_tree_refuses_existing_dest(fs):
+    src = _tree(fs)
+    fs.create_dir("/dst")
+    with pytest.raises(FileExistsError):
+        copy_tree(src, "/dst")
+
+def test_verify_tree_ok_and_problems(fs):
+    src = _tree(fs)
+    manifest = copy_tree(src, "/dst")
+    assert verify_tree("/dst", manifest) == []
+
+    # Same size, different content: only a full (hashing) check notices
+    st = os.stat("/dst/tmp/p/chats/session-1.json")
+    with open("/dst/tmp/p/chats/session-1.json", "w") as fh:
+        fh.write("CHAT")
+    os.utime("/dst/tmp/p/chats/session-1.json", ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert verify_tree("/dst", manifest, quick=True) == []
+    assert verify_tree("/dst", manifest) == ["content differs: tmp/p/chats/session-1.json"]
+
+    os.remove("/dst/google_accounts.json")
+    fs.create_file("/dst/extra.txt")
+    os.rmdir("/dst/empty")
+    problems = verify_tree("/dst", manifest, quick=True)
+    assert "missing: google_accounts.json" in problems
+    assert "missing: empty" in problems
+    assert "unexpected: extra.txt" in problems
+
+def test_verify_tree_quick_detects_size_and_mtime(fs):
+    src = _tree(fs)
+    manifest = copy_tree(src, "/dst")
+    with open("/dst/google_accounts.json", "a") as fh:
+        fh.write(" ")
+    os.utime("/dst/tmp/p/chats/session-1.json", ns=(0, 5))
+    problems = verify_tree("/dst", manifest, quick=True)
+    assert problems == ["size differs: google_accounts.json", "mtime differs: tmp/p/chats/session-1.json"]
+
+def test_compare_manifests():
+    a = Manifest({"x": FileEntry(1, 1, "aa"), "y": FileEntry(1, 1, "bb")})
+    b = Manifest({"x": FileEntry(1, 9, "aa"), "z": FileEntry(1, 1, "cc")})
+    assert compare_manifests(a, a) == []
+    assert compare_manifests(a, b) == ["missing: y", "unexpected: z"]
+    b.files["x"] = FileEntry(1, 1, "zz")
+    assert "content differs: x" in compare_manifests(a, b)
+
+def test_report_problems_truncates():
+    out = MagicMock()
+    report_problems([f"missing: {i}" for i in range(5)], limit=2, out=out)
+    assert out.call_count == 3
+    assert "3 more" in out.call_args[0][0]
+
+def test_verify_mode():
+    assert verify_mode(MagicMock(verify="diff")) == "diff"
+    with patch("geminiai_cli.verify.get_setting", return_value="diff"):
+        assert verify_mode(MagicMock(verify=None)) == "diff"
+    with patch("geminiai_cli.verify.get_setting", return_value="bogus"):
+        assert verify_mode(MagicMock(verify=None)) == "manifest"
+
+def test_copy_tree_hardlinks_unchanged_files(fs):
+    src = _tree(fs)
+    first = copy_tree(src, "/snap1")
+    with open(f"{src}/google_accounts.json", "w") as fh:
+        fh.write('{"active": "c@d.com"}')
+
+    second = copy_tree(src, "/snap2", link_dest="/snap1", link_manifest=first, link_mode="hardlink")
+    assert second.meta["linked"] == ["tmp/p/chats/session-1.json"]
+    assert os.stat("/snap2/tmp/p/chats/session-1.json").st_ino == os.stat("/snap1/tmp/p/chats/session-1.json").st_ino
+    assert os.stat("/snap2/google_accounts.json").st_ino != os.stat("/snap1/google_accounts.json").st_ino
+    assert open("/snap2/google_accounts.json").read() == '{"active": "c@d.com"}'
+    assert second.files["tmp/p/chats/session-1.json"] == first.files["tmp/p/chats/session-1.json"]
+    assert verify_tree("/snap2", second, verified=second.meta["linked"]) == []
+
+def test_copy_tree_hardlink_requires_same_mode(fs):
+    src = _tree(fs)
+    first = copy_tree(src, "/snap1")
+    os.chmod("/snap1/tmp/p/chats/session-1.json", 0o400)
+    second = copy_tree(src, "/snap2", link_dest="/snap1", link_manifest=first, link_mode="hardlink")
+    # Linking would have changed the old snapshot's mode (shared inode), so it is copied
+    assert second.meta["linked"] == ["google_accounts.json"]
+    assert os.stat("/snap2/tmp/p/chats/session-1.json").st_mode & 0o777 != 0o400
+
+def test_copy_tree_reflink_and_fallback(fs):
+    src = _tree(fs)
+    first = copy_tree(src, "/snap1")
+
+    with patch("geminiai_cli.verify._clone_file", return_value=False):
+        second = copy_tree(src, "/snap2", link_dest="/snap1", link_manifest=first, link_mode="reflink")
+    assert second.meta["linked"] == []
+    assert open("/snap2/tmp/p/chats/session-1.json").read() == "chat"
+
+    def fake_clone(old, new):
+        import shutil
+        shutil.copyfile(old, new)
+        return True
+
+    with patch("geminiai_cli.verify._clone_file", side_effect=fake_clone):
+        third = copy_tree(src, "/snap3", link_dest="/snap1", link_manifest=first, link_mode="reflink")
+    assert set(third.meta["linked"]) == {"google_accounts.json", "tmp/p/chats/session-1.json"}
+    # A clone is a separate inode with its own (copied) metadata
+    assert os.stat("/snap3/google_accounts.json").st_ino != os.stat("/snap1/google_accounts.json").st_ino
+    assert os.stat("/snap3/google_accounts.json").st_mode & 0o777 == 0o600
+    assert verify_tree("/snap3", third) == []
+
+def test_link_mode():
+    from geminiai_cli.verify import link_mode
+    assert link_mode(MagicMock(snapshot_mode="hardlink")) == "hardlink"
+    with patch("geminiai_cli.verify.get_setting", return_value="reflink"):
+        assert link_mode(MagicMock(snapshot_mode=None)) == "reflink"
+
+def test_copy_and_verify_tree_with_exclude(fs):
+    from geminiai_cli.exclude import ExcludeMatcher
+    src = _tree(fs)
+    fs.create_file(f"{src}/tmp/bin/rg", contents="binary")
+    exclude = ExcludeMatcher(["/tmp/bin/"])
+    manifest = copy_tree(src, "/dst", exclude=exclude)
+    assert not os.path.exists("/dst/tmp/bin")
+    assert "tmp/bin" not in manifest.meta["others"]
+    assert verify_tree("/dst", manifest, exclude=exclude) == []
+    # Excluded paths showing up in the tree are ignored, not reported as unexpected
+    fs.create_file("/dst/tmp/bin/rg", contents="regenerated")
+    assert verify_tree("/dst", manifest, exclude=exclude) == []
+    assert verify_tree("/dst", manifest) != []
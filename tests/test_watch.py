@@ -0,0 +1,205 @@
+# tests/test_watch.py
+
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from geminiai_cli import watch
+from geminiai_cli.archive import create_archive
+from geminiai_cli.manifest import manifest_path_for
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedWatcher:
+    """Plays back [(seconds to wait, changed)]; raises KeyboardInterrupt when the script ends."""
+
+    def __init__(self, clock, script):
+        self.clock = clock
+        self.script = list(script)
+        self.timeouts = []
+        self.closed = False
+
+    def wait(self, timeout):
+        self.timeouts.append(timeout)
+        if not self.script:
+            raise KeyboardInterrupt
+        delay, changed = self.script.pop(0)
+        if timeout is not None and not changed:
+            delay = timeout
+        self.clock.now += delay
+        return changed
+
+    def close(self):
+        self.closed = True
+
+
+def _args(**kw):
+    base = dict(src="/home/user/.gemini", archive_dir="/home/user/.geminiai-cli/backups",
+                quiet_period=5, min_interval=60, watch=True, incremental=False)
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def test_debouncer_quiet_period_and_min_interval():
+    d = watch.Debouncer(quiet_period=5, min_interval=60, max_delay=100)
+    assert d.due_at() is None
+    d.changed(0)
+    d.changed(3)
+    assert d.due_at() == 8
+    d.ran(8)
+    assert d.due_at() is None
+    d.changed(10)
+    # Quiet at 15, but the previous backup was at 8
+    assert d.due_at() == 68
+
+
+def test_debouncer_max_delay_for_busy_trees():
+    d = watch.Debouncer(quiet_period=5, min_interval=0, max_delay=20)
+    for t in range(0, 30, 2):
+        d.changed(t)
+    assert d.due_at() == 20
+    d.postpone(30)
+    assert d.due_at() == 35
+
+
+def test_polling_watcher_detects_changes(fs):
+    fs.create_file("/w/a.txt", contents="1")
+    sleeps = []
+    w = watch.PollingWatcher("/w", interval=10, sleep=sleeps.append)
+    assert w.wait(3) is False
+    fs.create_file("/w/b.txt", contents="2")
+    assert w.wait(None) is True
+    assert w.wait(None) is False
+    assert sleeps == [3, 10, 10]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_inotify_watcher_real_fs(fs):
+    fs.pause()
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            w = watch.InotifyWatcher(root)
+            try:
+                assert w.wait(0) is False
+                os.mkdir(os.path.join(root, "sub"))
+                assert w.wait(2) is True
+                # The new directory is watched as well
+                with open(os.path.join(root, "sub", "f.txt"), "w") as fh:
+                    fh.write("x")
+                assert w.wait(2) is True
+                assert w.wait(0) is False
+            finally:
+                w.close()
+
+            from geminiai_cli.exclude import ExcludeMatcher
+            os.makedirs(os.path.join(root, "tmp", "bin"))
+            w = watch.InotifyWatcher(root, exclude=ExcludeMatcher(["/tmp/bin/", "*.swp"]))
+            try:
+                with open(os.path.join(root, "tmp", "bin", "rg"), "w") as fh:
+                    fh.write("x")
+                with open(os.path.join(root, "tmp", "a.swp"), "w") as fh:
+                    fh.write("x")
+                assert w.wait(0.2) is False
+                with open(os.path.join(root, "tmp", "real.json"), "w") as fh:
+                    fh.write("x")
+                assert w.wait(2) is True
+            finally:
+                w.close()
+    finally:
+        fs.resume()
+
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_inotify_watcher_follows_replaced_root(fs):
+    fs.pause()
+    try:
+        with tempfile.TemporaryDirectory() as parent:
+            root = os.path.join(parent, ".gemini")
+            os.mkdir(root)
+            w = watch.InotifyWatcher(root)
+            try:
+                # Renamed away and recreated, as a restore swaps the tree
+                os.rename(root, root + ".old")
+                os.mkdir(root)
+                assert w.wait(2) is True
+                with open(os.path.join(root, "new.json"), "w") as fh:
+                    fh.write("x")
+                assert w.wait(2) is True
+                # The old tree is no longer watched
+                with open(os.path.join(root + ".old", "old.json"), "w") as fh:
+                    fh.write("x")
+                assert w.wait(0.2) is False
+
+                # Deleted, and only created again later
+                shutil.rmtree(root)
+                assert w.wait(2) is True
+                assert w.wait(0.1) is False
+                os.mkdir(root)
+                assert w.wait(0.1) is True
+                with open(os.path.join(root, "again.json"), "w") as fh:
+                    fh.write("x")
+                assert w.wait(2) is True
+            finally:
+                w.close()
+    finally:
+        fs.resume()
+
+def test_changed_since_last_backup(fs):
+    src = "/home/user/.gemini"
+    archive_dir = "/home/user/.geminiai-cli/backups"
+    fs.create_file(f"{src}/google_accounts.json", contents='{"active": "u@example.com"}')
+    assert watch.changed_since_last_backup(src, archive_dir) is True
+
+    archive = f"{archive_dir}/2025-01-01_120000-u@example.com.gemini.tar.gz"
+    create_archive(src, archive).save(manifest_path_for(archive))
+    assert watch.changed_since_last_backup(src, archive_dir) is False
+
+    fs.create_file(f"{src}/chats.json", contents="new")
+    assert watch.changed_since_last_backup(src, archive_dir) is True
+
+
+def test_watch_backups_debounces_into_one_incremental(fs, monkeypatch):
+    monkeypatch.setattr(watch, "changed_since_last_backup", lambda src, archive_dir, exclude=None: False)
+    clock = FakeClock()
+    # A burst of three events, then silence
+    watcher = ScriptedWatcher(clock, [(1, True), (1, True), (1, True), (0, False), (0, False)])
+    backup = MagicMock()
+
+    watch.watch_backups(_args(), backup=backup, watcher=watcher, clock=clock)
+
+    backup.assert_called_once()
+    run_args = backup.call_args[0][0]
+    assert run_args.incremental is True and run_args.watch is False
+    assert clock.now == 8
+    # Idle afterwards: the watcher blocks with no timeout
+    assert watcher.timeouts[-1] is None
+    assert watcher.closed
+
+
+def test_watch_backups_retries_when_locked(fs, monkeypatch):
+    monkeypatch.setattr(watch, "changed_since_last_backup", lambda src, archive_dir, exclude=None: True)
+    clock = FakeClock()
+    watcher = ScriptedWatcher(clock, [(0, False), (0, False)])
+    backup = MagicMock(side_effect=[SystemExit(2), None])
+
+    watch.watch_backups(_args(), backup=backup, watcher=watcher, clock=clock)
+
+    assert backup.call_count == 2
+    assert clock.now == 10
+
+
+def test_watch_backups_missing_source(fs):
+    with pytest.raises(SystemExit) as e:
+        watch.watch_backups(_args(src="/nope"), backup=MagicMock(), watcher=MagicMock())
+    assert e.value.code == 1